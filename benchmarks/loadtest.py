@@ -0,0 +1,182 @@
+"""End-to-end documentation load test against a fake (or real) LLM endpoint.
+
+Splits the sample transcripts once, then documents every chapter with
+``generate_documentation`` for each requested worker count and reports the
+makespan, request latency percentiles and failure rate::
+
+    python benchmarks/loadtest.py --workers 1,2,4 --ttft 0.4 --tps 40 --slots 2
+    python benchmarks/loadtest.py --provider openai --error-rate 0.05 --json load.json
+
+With ``--endpoint`` the run targets that server instead of the built-in
+fake, using the provider settings from the environment.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import sys
+import tempfile
+import time
+from dataclasses import replace
+from pathlib import Path
+
+import click
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from docalypt import DocumentGenerationRequest, TranscriptSplitter, generate_documentation  # noqa: E402
+from docalypt.env import load_env  # noqa: E402
+from docalypt.llm import LLMSettings, settings_from_env  # noqa: E402
+from docalypt.testing import FakeLLMConfig, FakeLLMServer, LatencyProfile  # noqa: E402
+
+logger = logging.getLogger("docalypt.loadtest")
+
+
+def _split_transcripts(transcripts: list[Path], workdir: Path) -> list[Path]:
+    chapters: list[Path] = []
+    for transcript in transcripts:
+        output_dir = workdir / transcript.stem
+        TranscriptSplitter(transcript, output_dir=output_dir).split()
+        chapters.extend(sorted(output_dir.glob("*.md")))
+    return chapters
+
+
+def _run(chapters: list[Path], settings: LLMSettings, workers: int, pack: bool) -> dict:
+    result = generate_documentation(
+        DocumentGenerationRequest(
+            chapters=chapters,
+            settings=settings,
+            max_workers=workers,
+            pack_small_chapters=pack,
+            destination_dirname=f"documentation-{workers}",
+        )
+    )
+    summary = result.telemetry_summary()
+    attempted = len(result.written) + len(result.failures)
+    return {
+        "workers": workers,
+        "chapters": len(chapters),
+        "makespan": result.elapsed,
+        "chapters_per_second": len(result.written) / result.elapsed if result.elapsed else None,
+        "failure_rate": len(result.failures) / attempted if attempted else 0.0,
+        "latency_p50": summary["latency_p50"],
+        "latency_p99": summary["latency_p99"],
+        "summary": summary,
+    }
+
+
+def _format(value: float | None, unit: str = "s") -> str:
+    return "-" if value is None else f"{value:.2f}{unit}"
+
+
+@click.command()
+@click.option(
+    "--transcripts",
+    type=click.Path(exists=True, file_okay=False, path_type=Path),
+    default=ROOT / "transcripts",
+    show_default=True,
+    help="Directory of sample transcripts",
+)
+@click.option("--workers", default="1,2,4", show_default=True, help="Comma separated worker counts")
+@click.option(
+    "--provider",
+    type=click.Choice(["ollama", "openai", "anthropic"]),
+    default="ollama",
+    show_default=True,
+)
+@click.option("--model", help="Model name (defaults to the fake server's first model)")
+@click.option("--endpoint", help="Benchmark this endpoint instead of the fake server")
+@click.option("--ttft", default=0.3, show_default=True, help="Median time to first token (s)")
+@click.option("--ttft-spread", default=0.5, show_default=True, help="Lognormal sigma of the TTFT")
+@click.option("--tps", default=50.0, show_default=True, help="Output tokens per second")
+@click.option("--output-tokens", default=120, show_default=True, help="Tokens per fake answer")
+@click.option("--error-rate", default=0.0, show_default=True, help="Share of HTTP 500 answers")
+@click.option("--rate-limit-rate", default=0.0, show_default=True, help="Share of HTTP 429 answers")
+@click.option("--slots", default=0, show_default=True, help="Concurrent requests served (0 = unlimited)")
+@click.option("--seed", type=int, default=1, show_default=True)
+@click.option("--pack", is_flag=True, help="Pack small chapters into shared requests")
+@click.option("--json", "json_path", type=click.Path(dir_okay=False, path_type=Path), help="Write results as JSON")
+def main(
+    transcripts: Path,
+    workers: str,
+    provider: str,
+    model: str | None,
+    endpoint: str | None,
+    ttft: float,
+    ttft_spread: float,
+    tps: float,
+    output_tokens: int,
+    error_rate: float,
+    rate_limit_rate: float,
+    slots: int,
+    seed: int,
+    pack: bool,
+    json_path: Path | None,
+) -> None:
+    """Measure documentation throughput and latency under load."""
+
+    logging.basicConfig(level=logging.WARNING, format="[%(levelname)s] %(message)s")
+    worker_counts = [int(value) for value in workers.split(",") if value.strip()]
+    sources = sorted(transcripts.glob("*.md"))
+    if not sources:
+        raise click.ClickException(f"No transcripts found in {transcripts}")
+
+    server: FakeLLMServer | None = None
+    if endpoint:
+        load_env()
+        settings = replace(settings_from_env(), provider=provider, endpoint=endpoint)
+        if model:
+            settings.model = model
+    else:
+        config = FakeLLMConfig(
+            time_to_first_token=LatencyProfile(median=ttft, spread=ttft_spread),
+            tokens_per_second=tps,
+            output_tokens=output_tokens,
+            error_rate=error_rate,
+            rate_limit_rate=rate_limit_rate,
+            max_concurrency=slots,
+            seed=seed,
+        )
+        server = FakeLLMServer(config).start()
+        settings = LLMSettings(
+            provider=provider,
+            model=model or config.models[0],
+            endpoint=server.url,
+            api_key="fake",
+        )
+
+    runs = []
+    try:
+        with tempfile.TemporaryDirectory(prefix="docalypt-load-") as workdir:
+            chapters = _split_transcripts(sources, Path(workdir))
+            click.echo(f"{len(chapters)} chapter(s) from {len(sources)} transcript(s) via {provider}")
+            click.echo(f"{'workers':>7}  {'makespan':>9}  {'p50':>7}  {'p99':>7}  {'failed':>7}  {'ch/s':>6}")
+            for count in worker_counts:
+                started = time.perf_counter()
+                run = _run(chapters, settings, count, pack)
+                run["wall_clock"] = time.perf_counter() - started
+                runs.append(run)
+                click.echo(
+                    f"{count:>7}  {_format(run['makespan']):>9}  {_format(run['latency_p50']):>7}  "
+                    f"{_format(run['latency_p99']):>7}  {run['failure_rate']:>7.1%}  "
+                    f"{_format(run['chapters_per_second'], ''):>6}"
+                )
+    finally:
+        if server is not None:
+            server.stop()
+            stats = server.stats
+            click.echo(
+                f"Fake server: {stats.requests} request(s), {stats.errors} error(s), "
+                f"{stats.rate_limited} rate limited, {stats.output_tokens:,} tokens"
+            )
+
+    if json_path:
+        json_path.parent.mkdir(parents=True, exist_ok=True)
+        json_path.write_text(json.dumps({"provider": provider, "runs": runs}, indent=2), encoding="utf-8")
+        click.echo(f"Results written to {json_path}")
+
+
+if __name__ == "__main__":
+    main()
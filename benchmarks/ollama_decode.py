@@ -0,0 +1,211 @@
+"""CPU cost of decoding Ollama answers, per token.
+
+Decodes a synthetic ``/api/generate`` answer with each strategy and reports
+the CPU time per generated token:
+
+* ``per-line`` – the previous decoder (``decode``/``strip``/``json.loads``
+  for every line),
+* ``buffered/json`` and ``buffered/orjson`` – :func:`docalypt.ndjson.iter_ndjson`
+  with each JSON backend (``orjson`` only if installed),
+* ``bulk`` – one ``stream: false`` response body.
+
+``--segments`` sets how many bytes each simulated socket read returns: a
+reader that keeps up with the model gets about one frame per read, one that
+lags behind gets many::
+
+    python benchmarks/ollama_decode.py --tokens 20000 --segments 96,4096
+    python benchmarks/ollama_decode.py --endpoint http://localhost:11434 --model llama3
+
+With ``--endpoint`` it also measures ``generate()`` against a real Ollama
+server, streamed and with ``stream: false``. (The fake server batches
+tokens at high rates, so it does not model the per-token frames.)
+"""
+
+from __future__ import annotations
+
+import io
+import json
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Iterator
+
+import click
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from docalypt import ndjson  # noqa: E402
+
+_WORDS = "the quick brown fox jumps over a lazy dog while the model keeps streaming".split()
+
+
+def _stream_body(tokens: int) -> bytes:
+    frames = [
+        json.dumps(
+            {
+                "model": "llama3",
+                "created_at": "2024-05-01T12:00:00.000000Z",
+                "response": f" {_WORDS[index % len(_WORDS)]}",
+                "done": False,
+            }
+        )
+        for index in range(tokens)
+    ]
+    frames.append(
+        json.dumps(
+            {
+                "model": "llama3",
+                "created_at": "2024-05-01T12:00:01.000000Z",
+                "response": "",
+                "done": True,
+                "prompt_eval_count": 512,
+                "eval_count": tokens,
+                "eval_duration": 1_000_000_000,
+            }
+        )
+    )
+    return ("\n".join(frames) + "\n").encode("utf-8")
+
+
+def _bulk_body(tokens: int) -> bytes:
+    text = "".join(f" {_WORDS[index % len(_WORDS)]}" for index in range(tokens))
+    return json.dumps(
+        {"model": "llama3", "response": text, "done": True, "eval_count": tokens}
+    ).encode("utf-8")
+
+
+class _Segmented(io.RawIOBase):
+    """In-memory socket that returns at most ``segment`` bytes per read."""
+
+    def __init__(self, data: bytes, segment: int) -> None:
+        self._data = memoryview(data)
+        self._position = 0
+        self._segment = segment
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, target) -> int:
+        size = min(len(target), self._segment, len(self._data) - self._position)
+        target[:size] = self._data[self._position : self._position + size]
+        self._position += size
+        return size
+
+
+def _response(data: bytes, segment: int) -> io.BufferedReader:
+    return io.BufferedReader(_Segmented(data, segment))
+
+
+def _per_line(response) -> str:
+    pieces = []
+    for raw_line in response:
+        line = raw_line.decode("utf-8").strip()
+        if not line:
+            continue
+        chunk = json.loads(line)
+        text = chunk.get("response")
+        if text:
+            pieces.append(text)
+        if chunk.get("done"):
+            break
+    return "".join(pieces)
+
+
+def _buffered(response) -> str:
+    pieces = []
+    for chunk in ndjson.iter_ndjson(response):
+        text = chunk.get("response")
+        if text:
+            pieces.append(text)
+        if chunk.get("done"):
+            break
+    return "".join(pieces)
+
+
+def _bulk(response) -> str:
+    return ndjson.loads(response.read())["response"]
+
+
+@contextmanager
+def _backend(name: str) -> Iterator[None]:
+    """Temporarily force a JSON backend in :mod:`docalypt.ndjson`."""
+
+    saved = ndjson.orjson
+    if name == "json":
+        ndjson.orjson = None
+    try:
+        yield
+    finally:
+        ndjson.orjson = saved
+
+
+def _cpu_per_token(
+    decode: Callable[[io.BufferedReader], str], body: bytes, segment: int, tokens: int, repeat: int
+) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        response = _response(body, segment)
+        started = time.process_time()
+        decode(response)
+        best = min(best, time.process_time() - started)
+    return best / tokens * 1e6
+
+
+def _against_server(endpoint: str, model: str, tokens: int, repeat: int) -> None:
+    from docalypt.llm import LLMSettings, create_client
+
+    click.echo(f"\n{model} at {endpoint} (client thread CPU):")
+    for stream in (True, False):
+        settings = LLMSettings(
+            provider="ollama", model=model, endpoint=endpoint, stream=stream, max_tokens=tokens
+        )
+        client = create_client(settings)
+        best = float("inf")
+        for _ in range(repeat):
+            started = time.thread_time()
+            result = client.generate("Write a long essay about the history of computing.")
+            spent = time.thread_time() - started
+            best = min(best, spent / max(result.output_tokens or 1, 1))
+        label = "stream" if stream else "bulk (stream: false)"
+        click.echo(f"  {label:<22} {best * 1e6:7.2f} µs/token")
+
+
+@click.command()
+@click.option("--tokens", default=20000, show_default=True, help="Tokens in the synthetic answer")
+@click.option("--segments", default="96,4096", show_default=True, help="Bytes per simulated socket read")
+@click.option("--repeat", default=5, show_default=True, help="Runs per measurement (best is reported)")
+@click.option("--endpoint", help="Also measure generate() against this Ollama server")
+@click.option("--model", default="llama3", show_default=True, help="Model used with --endpoint")
+def main(tokens: int, segments: str, repeat: int, endpoint: str | None, model: str) -> None:
+    """Report the CPU time per token of each decoding strategy."""
+
+    stream_body = _stream_body(tokens)
+    bulk_body = _bulk_body(tokens)
+    expected = _per_line(_response(stream_body, 4096))
+    strategies: list[tuple[str, Callable, str]] = [
+        ("per-line", _per_line, "json"),
+        ("buffered/json", _buffered, "json"),
+    ]
+    if ndjson.orjson is not None:
+        strategies.append(("buffered/orjson", _buffered, "orjson"))
+    click.echo(f"{tokens:,} tokens, {len(stream_body) / 1e6:.1f} MB of NDJSON; CPU per token:")
+    for segment in [int(value) for value in segments.split(",") if value.strip()]:
+        click.echo(f"\n  {segment} bytes per read")
+        for label, decode, backend in strategies:
+            with _backend(backend):
+                if decode(_response(stream_body, segment)) != expected:
+                    raise SystemExit(f"{label} decoded a different answer")
+                cost = _cpu_per_token(decode, stream_body, segment, tokens, repeat)
+            click.echo(f"    {label:<18} {cost:7.2f} µs")
+    click.echo(f"\n  bulk (stream: false, {ndjson.JSON_BACKEND})")
+    cost = _cpu_per_token(_bulk, bulk_body, 64 * 1024, tokens, repeat)
+    click.echo(f"    {'bulk':<18} {cost:7.3f} µs")
+
+    if endpoint:
+        _against_server(endpoint, model, min(tokens, 2048), repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+"""Startup-time benchmark with a checked-in budget.
+
+Measures, in fresh interpreters:
+
+* ``import docalypt`` (cumulative time reported by ``-X importtime``),
+* ``python cli.py --help`` wall-clock time,
+* GUI time to first window and time until the LLM panel is ready (needs
+  PySide6; runs on Qt's ``offscreen`` platform).
+
+Each figure is the median of several runs and is compared against
+``startup_budget.json``; the script exits non-zero when a budget is
+exceeded, so it can run in CI::
+
+    python benchmarks/startup.py
+    python benchmarks/startup.py --runs 9 --top 15   # also list slowest imports
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import click
+
+ROOT = Path(__file__).resolve().parents[1]
+BUDGET_PATH = Path(__file__).with_name("startup_budget.json")
+_IMPORT_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)")
+
+_GUI_PROBE = """
+import time
+started = time.perf_counter()
+from PySide6.QtCore import QTimer
+from PySide6.QtWidgets import QApplication
+app = QApplication([])
+from docalypt.gui.main_window import MainWindow
+window = MainWindow()
+window.show()
+marks = {}
+
+def poll():
+    handle = window.windowHandle()
+    if "first_window" not in marks and handle is not None and handle.isExposed():
+        marks["first_window"] = time.perf_counter() - started
+    if "ready" not in marks and hasattr(window, "ollama_group"):
+        marks["ready"] = time.perf_counter() - started
+    if len(marks) == 2:
+        print(marks["first_window"] * 1000, marks["ready"] * 1000)
+        app.quit()
+
+timer = QTimer()
+timer.timeout.connect(poll)
+timer.start(1)
+app.exec()
+"""
+
+
+def _environment() -> dict[str, str]:
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(ROOT), env.get("PYTHONPATH")]))
+    env.setdefault("QT_QPA_PLATFORM", "offscreen")
+    return env
+
+
+def _import_times(code: str) -> list[tuple[int, int, str]]:
+    """Return ``(self_us, cumulative_us, module)`` for every import of ``code``."""
+
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+        env=_environment(),
+        cwd=ROOT,
+        check=True,
+    )
+    return [
+        (int(match.group(1)), int(match.group(2)), match.group(4))
+        for match in map(_IMPORT_LINE.match, completed.stderr.splitlines())
+        if match
+    ]
+
+
+def measure_import(runs: int) -> float:
+    samples = []
+    for _ in range(runs):
+        cumulative = {module: total for _, total, module in _import_times("import docalypt")}
+        samples.append(cumulative["docalypt"] / 1000)
+    return statistics.median(samples)
+
+
+def measure_cli_help(runs: int) -> float:
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        subprocess.run(
+            [sys.executable, str(ROOT / "cli.py"), "--help"],
+            capture_output=True,
+            env=_environment(),
+            cwd=ROOT,
+            check=True,
+        )
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def measure_gui(runs: int) -> tuple[float, float] | None:
+    try:
+        import PySide6  # noqa: F401
+    except ImportError:
+        return None
+    first, ready = [], []
+    for _ in range(runs):
+        completed = subprocess.run(
+            [sys.executable, "-c", _GUI_PROBE],
+            capture_output=True,
+            text=True,
+            env=_environment(),
+            cwd=ROOT,
+            check=True,
+            timeout=60,
+        )
+        window_ms, ready_ms = map(float, completed.stdout.split()[-2:])
+        first.append(window_ms)
+        ready.append(ready_ms)
+    return statistics.median(first), statistics.median(ready)
+
+
+@click.command()
+@click.option("--runs", default=5, show_default=True, help="Fresh interpreters per measurement")
+@click.option("--top", default=0, help="Also list the N slowest imports of 'import docalypt'")
+@click.option(
+    "--budget",
+    "budget_path",
+    type=click.Path(exists=True, dir_okay=False, path_type=Path),
+    default=BUDGET_PATH,
+    show_default=True,
+)
+def main(runs: int, top: int, budget_path: Path) -> None:
+    """Check CLI and GUI startup times against the budget."""
+
+    budget = json.loads(budget_path.read_text(encoding="utf-8"))
+    results: dict[str, float | None] = {
+        "import_docalypt_ms": measure_import(runs),
+        "cli_help_ms": measure_cli_help(runs),
+    }
+    gui = measure_gui(runs)
+    results["gui_first_window_ms"] = gui[0] if gui else None
+    results["gui_ready_ms"] = gui[1] if gui else None
+
+    over = []
+    for name, value in results.items():
+        limit = budget.get(name)
+        if value is None:
+            click.echo(f"{name:<22} skipped (PySide6 not installed)")
+            continue
+        status = "ok" if limit is None or value <= limit else "OVER BUDGET"
+        click.echo(f"{name:<22} {value:8.1f} ms  (budget {limit} ms)  {status}")
+        if status != "ok":
+            over.append(name)
+
+    if top:
+        click.echo(f"\nSlowest imports under 'import docalypt' (self time):")
+        for self_us, total_us, module in sorted(_import_times("import docalypt"), reverse=True)[:top]:
+            click.echo(f"  {self_us / 1000:7.2f} ms self {total_us / 1000:8.2f} ms total  {module}")
+
+    if over:
+        raise SystemExit(f"Startup budget exceeded: {', '.join(over)}")
+
+
+if __name__ == "__main__":
+    main()
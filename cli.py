@@ -2,15 +2,29 @@
 
 from __future__ import annotations
 
+import glob
+import json
 import logging
+import os
+import signal
 import sys
+import time
+from contextlib import contextmanager
+from dataclasses import replace
 from pathlib import Path
+from typing import TYPE_CHECKING, Iterable, Iterator
 
 import click
 
-from docalypt import TranscriptSplitter
 from docalypt.env import load_env
 
+if TYPE_CHECKING:  # pragma: no cover - annotations only
+    from docalypt.documentation import ChapterOutcome
+    from docalypt.search import SearchIndex
+
+# Commands import the rest of the package themselves, so ``--help`` and quick
+# commands such as ``search`` never load the LLM clients.
+
 logging.basicConfig(
     level=logging.INFO,
     format="[%(asctime)s] %(message)s",
@@ -19,39 +33,741 @@ logging.basicConfig(
 logger = logging.getLogger("docalypt.cli")
 
 
-@click.command()
+class _DefaultGroup(click.Group):
+    """Command group that runs ``split`` when no subcommand is named.
+
+    Keeps ``python cli.py transcript.md`` working alongside subcommands.
+    """
+
+    default_command = "split"
+
+    def parse_args(self, ctx: click.Context, args: list[str]) -> list[str]:
+        if args and args[0] not in self.commands and args[0] not in ctx.help_option_names:
+            args.insert(0, self.default_command)
+        return super().parse_args(ctx, args)
+
+
+@contextmanager
+def _traced_run(trace_path: Path | None, command: str, **attributes: object) -> Iterator[None]:
+    """Trace the command in a ``run`` span (``--trace`` or ``DOCALYPT_TRACE``)."""
+
+    from docalypt.tracing import configure_tracing, tracing_from_env
+
+    try:
+        tracer = configure_tracing(trace_path) if trace_path else tracing_from_env()
+    except OSError as exc:
+        raise click.BadParameter(str(exc), param_hint="--trace") from exc
+    try:
+        with tracer.span("run", command=command, **attributes):
+            yield
+    finally:
+        tracer.close()
+
+
+@click.group(cls=_DefaultGroup)
+def cli() -> None:
+    """Split transcripts into chapters, document them and search the results."""
+
+
+@cli.command()
 @click.argument("input", type=click.Path(exists=True, path_type=Path))
 @click.option("--output-dir", "-o", type=click.Path(path_type=Path), help="Output directory")
 @click.option("--marker", "-m", help="Custom regex for split markers")
 @click.option("--html", "export_html", is_flag=True, help="Also export consolidated HTML")
+@click.option("--docs", "generate_docs", is_flag=True, help="Document the new chapters with the configured LLM")
+@click.option("--model", help="Override the LLM model from the environment")
+@click.option(
+    "--metrics",
+    "metrics_path",
+    type=click.Path(dir_okay=False, path_type=Path),
+    help="Write per-request LLM telemetry as JSON (requires --docs)",
+)
+@click.option("--pack", is_flag=True, help="Document runs of small chapters in shared requests")
+@click.option("--hedge", is_flag=True, help="Duplicate slow requests to DOCALYPT_LLM_FALLBACKS")
+@click.option(
+    "--no-failover",
+    is_flag=True,
+    help="Do not reroute requests to DOCALYPT_LLM_FALLBACKS when the provider fails",
+)
+@click.option(
+    "--no-stream",
+    is_flag=True,
+    help="Receive Ollama answers in one piece instead of token by token (less CPU)",
+)
+@click.option(
+    "--deadline",
+    type=click.FloatRange(min=0, min_open=True),
+    help="Stop documenting after this many seconds and keep what is done",
+)
+@click.option(
+    "--auto-chapters",
+    is_flag=True,
+    help="Detect chapters from the text instead of the header (automatic without a header)",
+)
+@click.option("--no-index", is_flag=True, help="Do not add the output to the search index")
+@click.option(
+    "--trace",
+    "trace_path",
+    type=click.Path(dir_okay=False, path_type=Path),
+    help="Append timing spans to this file (JSON lines; OTLP/JSON for *.otlp.jsonl)",
+)
+@click.option("--verbose", "-v", is_flag=True, help="Enable debug logging")
+def split(
+    input: Path,
+    output_dir: Path | None,
+    marker: str | None,
+    export_html: bool,
+    generate_docs: bool,
+    model: str | None,
+    metrics_path: Path | None,
+    pack: bool,
+    hedge: bool,
+    no_failover: bool,
+    no_stream: bool,
+    deadline: float | None,
+    auto_chapters: bool,
+    no_index: bool,
+    trace_path: Path | None,
+    verbose: bool,
+) -> None:
+    """Split a Markdown transcript or caption file (SRT, VTT, JSON) into chapter files."""
+
+    load_env()
+    if verbose:
+        logger.setLevel(logging.DEBUG)
+    with _traced_run(trace_path, "split", input=str(input)):
+        from docalypt.search import open_index
+        from docalypt.splitting import TranscriptSplitter
+
+        logger.info("Input: %s", input)
+        search_index = None if no_index else open_index()
+        splitter = TranscriptSplitter(
+            input_path=input,
+            output_dir=output_dir,
+            marker_regex=marker,
+            search_index=search_index,
+            auto_chapters=auto_chapters,
+        )
+
+        chapters: list[Path] = []
+
+        def on_chapter(path: Path) -> None:
+            logger.info("Created %s", path.name)
+            chapters.append(path)
+
+        splitter.post_split_hooks = [on_chapter]
+
+        try:
+            count = splitter.split(export_html=export_html)
+            logger.info("Done! %d chapters generated.", count)
+            if export_html:
+                logger.info("HTML index created.")
+        except Exception as exc:
+            logger.error("Error: %s", exc)
+            sys.exit(1)
+
+        if not generate_docs:
+            return
+
+        _document_chapters(
+            chapters,
+            model=model,
+            no_stream=no_stream,
+            deadline=deadline,
+            pack=pack,
+            hedge=hedge,
+            failover=not no_failover,
+            search_index=search_index,
+            metrics_path=metrics_path,
+        )
+
+
+def _document_chapters(
+    chapters: list[Path],
+    *,
+    model: str | None,
+    no_stream: bool,
+    deadline: float | None,
+    pack: bool,
+    hedge: bool,
+    failover: bool,
+    search_index: SearchIndex | None,
+    metrics_path: Path | None,
+    max_workers: int | None = None,
+    provider_limits: dict[str, int] | None = None,
+    jsonl: bool = False,
+    shared: bool = False,
+) -> None:
+    """Document ``chapters`` with the LLM configured in the environment.
+
+    With ``shared`` only chapters without documentation are documented, and
+    only those this process wins the lease for (see :mod:`docalypt.leases`).
+    Leases are taken as the run pulls chapters in, about ``3 * max_workers``
+    at a time, and released as each chapter finishes, even if it failed.
+    Exits with status 1 if any chapter failed or the run was stopped early.
+    """
+
+    from docalypt.cancellation import CancellationToken
+    from docalypt.documentation import DocumentGenerationRequest, iter_documentation
+    from docalypt.llm import settings_from_env
+
+    settings = settings_from_env()
+    if model:
+        settings = replace(settings, model=model)
+    if no_stream:
+        settings = replace(settings, stream=False)
+    logger.info(
+        "Generating documentation with %s (%s) for %d chapters…",
+        settings.model,
+        settings.provider,
+        len(chapters),
+    )
+    # Ctrl-C stops the run cooperatively so finished chapters and metrics are kept.
+    cancel = CancellationToken()
+    leases = None
+    source: Iterable[Path] = chapters
+    if shared:
+        from docalypt.leases import LeaseManager
+
+        leases = LeaseManager()
+        source = leases.claim(chapters, cancel)
+    previous_handler = signal.signal(signal.SIGINT, lambda *_: cancel.cancel("Interrupted"))
+    try:
+        run = iter_documentation(
+            DocumentGenerationRequest(
+                chapters=source,
+                settings=settings,
+                max_workers=max_workers,
+                provider_limits=provider_limits or {},
+                cancel_token=cancel,
+                deadline=deadline,
+                pack_small_chapters=pack,
+                hedge=hedge,
+                failover=failover,
+                search_index=search_index,
+                before_write=leases.holds if leases is not None else None,
+            )
+        )
+        for outcome in run:
+            if leases is not None:
+                leases.release(outcome.chapter)
+            if jsonl:
+                _emit_json_line(_outcome_record(outcome))
+            elif outcome.succeeded:
+                logger.info("Documented %s → %s", outcome.chapter.name, outcome.destination)
+            elif outcome.error:
+                logger.error("Failed to document %s: %s", outcome.chapter.name, outcome.error)
+    finally:
+        signal.signal(signal.SIGINT, previous_handler)
+        if leases is not None:
+            leases.close()
+    result = run.result
+    if jsonl:
+        _emit_json_line({"event": "summary", **result.telemetry_summary()})
+    logger.info(result.describe_telemetry())
+    if result.hedge_stats:
+        logger.info(result.hedge_stats.summary())
+    if result.failovers:
+        targets = sorted({event.target for event in result.failovers})
+        logger.warning(
+            "%d request(s) failed over to %s", len(result.failovers), ", ".join(targets)
+        )
+    if metrics_path:
+        result.export_telemetry(metrics_path)
+        logger.info("Metrics written to %s", metrics_path)
+    if not result.success:
+        sys.exit(1)
+
+
+def _outcome_record(outcome: ChapterOutcome) -> dict[str, object]:
+    if outcome.succeeded:
+        status = "documented"
+    elif outcome.cancelled:
+        status = "skipped"
+    else:
+        status = "failed"
+    generations = outcome.generations
+    return {
+        "event": "chapter",
+        "chapter": str(outcome.chapter),
+        "status": status,
+        "documentation": str(outcome.destination) if outcome.destination else None,
+        "error": outcome.error,
+        "completed": outcome.completed,
+        "total": outcome.total,
+        "eta": outcome.eta,
+        "requests": len(generations),
+        "latency": sum(generation.latency for generation in generations),
+        "input_tokens": sum(generation.input_tokens or 0 for generation in generations),
+        "output_tokens": sum(generation.output_tokens or 0 for generation in generations),
+    }
+
+
+def _emit_json_line(record: dict[str, object]) -> None:
+    click.echo(json.dumps(record, ensure_ascii=False))
+    sys.stdout.flush()
+
+
+def _find_chapters(targets: tuple[str, ...]) -> list[Path]:
+    """Chapter files in the given output directories, files or glob patterns."""
+
+    from docalypt.documentation import DOCUMENTATION_SUBDIR, collect_chapter_files
+
+    chapters: list[Path] = []
+    for target in targets:
+        expanded = os.path.expanduser(target)
+        if any(char in expanded for char in "*?["):
+            matches = [Path(path) for path in sorted(glob.glob(expanded, recursive=True))]
+        else:
+            matches = [Path(expanded)]
+        if not any(path.exists() for path in matches):
+            raise click.BadParameter(f"{target} matches nothing", param_hint="TARGETS")
+        for path in matches:
+            if path.is_dir():
+                if path.name != DOCUMENTATION_SUBDIR:
+                    chapters.extend(collect_chapter_files(path))
+            elif (
+                path.suffix.lower() == ".md"
+                and not path.name.endswith(".docs.md")
+                and path.parent.name != DOCUMENTATION_SUBDIR
+            ):
+                chapters.append(path)
+    return list(dict.fromkeys(path.resolve() for path in chapters))
+
+
+def _parse_provider_limits(
+    ctx: click.Context, param: click.Parameter, values: tuple[str, ...]
+) -> dict[str, int]:
+    limits: dict[str, int] = {}
+    for value in values:
+        name, _, limit = value.partition("=")
+        if not name.strip() or not limit.strip().isdigit() or int(limit) < 1:
+            raise click.BadParameter(f"expected PROVIDER=N, got {value!r}")
+        limits[name.strip().lower()] = int(limit)
+    return limits
+
+
+@cli.command()
+@click.argument("targets", nargs=-1, required=True)
+@click.option("--model", help="Override the LLM model from the environment")
+@click.option(
+    "--workers",
+    "-j",
+    type=click.IntRange(min=1),
+    help="Concurrent requests across all transcripts (default: the provider's safe concurrency)",
+)
+@click.option(
+    "--provider-limit",
+    "provider_limits",
+    multiple=True,
+    callback=_parse_provider_limits,
+    metavar="PROVIDER=N",
+    help="At most N concurrent requests to this provider, including fallbacks (repeatable)",
+)
+@click.option(
+    "--jsonl",
+    is_flag=True,
+    help="Print one JSON object per finished chapter, then a summary, on stdout",
+)
+@click.option(
+    "--metrics",
+    "metrics_path",
+    type=click.Path(dir_okay=False, path_type=Path),
+    help="Write per-request LLM telemetry as JSON",
+)
+@click.option("--pack", is_flag=True, help="Document runs of small chapters in shared requests")
+@click.option("--hedge", is_flag=True, help="Duplicate slow requests to DOCALYPT_LLM_FALLBACKS")
+@click.option(
+    "--no-failover",
+    is_flag=True,
+    help="Do not reroute requests to DOCALYPT_LLM_FALLBACKS when the provider fails",
+)
+@click.option("--no-stream", is_flag=True, help="Receive Ollama answers in one piece (less CPU)")
+@click.option(
+    "--deadline",
+    type=click.FloatRange(min=0, min_open=True),
+    help="Stop documenting after this many seconds and keep what is done",
+)
+@click.option(
+    "--shared",
+    is_flag=True,
+    help="Share the work with other machines running --shared on the same directory",
+)
+@click.option("--no-index", is_flag=True, help="Do not add the documentation to the search index")
+@click.option(
+    "--trace",
+    "trace_path",
+    type=click.Path(dir_okay=False, path_type=Path),
+    help="Append timing spans to this file (JSON lines; OTLP/JSON for *.otlp.jsonl)",
+)
 @click.option("--verbose", "-v", is_flag=True, help="Enable debug logging")
-def cli(input: Path, output_dir: Path | None, marker: str | None, export_html: bool, verbose: bool) -> None:
-    """Split a Markdown transcript into chapter files."""
+def docs(
+    targets: tuple[str, ...],
+    model: str | None,
+    workers: int | None,
+    provider_limits: dict[str, int],
+    jsonl: bool,
+    metrics_path: Path | None,
+    pack: bool,
+    hedge: bool,
+    no_failover: bool,
+    no_stream: bool,
+    deadline: float | None,
+    shared: bool,
+    no_index: bool,
+    trace_path: Path | None,
+    verbose: bool,
+) -> None:
+    """Document already split chapters of one or more transcripts.
+
+    TARGETS are chapter output directories, chapter files or glob patterns
+    (quote them, e.g. 'chapters/*'). All chapters share one run, so
+    --workers limits the requests in flight across every transcript.
+    With --shared, chapters that already have documentation are skipped and
+    the rest are divided between all machines running the same command on
+    a shared directory. Exits with status 1 if any chapter fails.
+    """
 
     load_env()
     if verbose:
         logger.setLevel(logging.DEBUG)
+    with _traced_run(trace_path, "docs"):
+        chapters = _find_chapters(targets)
+        if not chapters:
+            logger.error("No chapter files found in %s", ", ".join(targets))
+            sys.exit(1)
+
+        from docalypt.search import open_index
+
+        _document_chapters(
+            chapters,
+            model=model,
+            no_stream=no_stream,
+            deadline=deadline,
+            pack=pack,
+            hedge=hedge,
+            failover=not no_failover,
+            search_index=None if no_index else open_index(),
+            metrics_path=metrics_path,
+            max_workers=workers,
+            provider_limits=provider_limits,
+            jsonl=jsonl,
+            shared=shared,
+        )
+
+
+@cli.command()
+@click.argument("input_dir", type=click.Path(exists=True, file_okay=False, path_type=Path))
+@click.option("--output-dir", "-o", type=click.Path(path_type=Path), help="Output directory")
+@click.option("--docs", "generate_docs", is_flag=True, help="Document new chapters with the configured LLM")
+@click.option("--model", help="Override the LLM model from the environment")
+@click.option(
+    "--workers",
+    "-j",
+    type=click.IntRange(min=1),
+    default=1,
+    show_default=True,
+    help="Transcripts processed at the same time",
+)
+@click.option(
+    "--queue-size",
+    type=click.IntRange(min=1),
+    default=8,
+    show_default=True,
+    help="Ready transcripts waiting for a worker before the watcher holds back",
+)
+@click.option(
+    "--debounce",
+    type=click.FloatRange(min=0),
+    default=2.0,
+    show_default=True,
+    help="Seconds a file must stay unchanged before it is processed",
+)
+@click.option(
+    "--poll-interval",
+    type=click.FloatRange(min=0.1),
+    default=1.0,
+    show_default=True,
+    help="Seconds between directory scans when inotify is not available",
+)
+@click.option("--no-inotify", is_flag=True, help="Always poll instead of using inotify")
+@click.option("--pack", is_flag=True, help="Document runs of small chapters in shared requests")
+@click.option("--no-stream", is_flag=True, help="Receive Ollama answers in one piece (less CPU)")
+@click.option("--marker", "-m", help="Custom regex for split markers")
+@click.option(
+    "--auto-chapters",
+    is_flag=True,
+    help="Detect chapters from the text instead of the header (automatic without a header)",
+)
+@click.option("--no-index", is_flag=True, help="Do not add the output to the search index")
+@click.option(
+    "--trace",
+    "trace_path",
+    type=click.Path(dir_okay=False, path_type=Path),
+    help="Append timing spans to this file (JSON lines; OTLP/JSON for *.otlp.jsonl)",
+)
+@click.option("--verbose", "-v", is_flag=True, help="Enable debug logging")
+def watch(
+    input_dir: Path,
+    output_dir: Path | None,
+    generate_docs: bool,
+    model: str | None,
+    workers: int,
+    queue_size: int,
+    debounce: float,
+    poll_interval: float,
+    no_inotify: bool,
+    pack: bool,
+    no_stream: bool,
+    marker: str | None,
+    auto_chapters: bool,
+    no_index: bool,
+    trace_path: Path | None,
+    verbose: bool,
+) -> None:
+    """Split (and document) transcripts as they appear in INPUT_DIR.
+
+    New and changed transcripts are processed once they have stopped
+    growing; unchanged ones are skipped, also across restarts. Runs until
+    interrupted with Ctrl-C.
+    """
 
-    logger.info("Input: %s", input)
-    splitter = TranscriptSplitter(
-        input_path=input,
-        output_dir=output_dir,
-        marker_regex=marker,
+    load_env()
+    if verbose:
+        logger.setLevel(logging.DEBUG)
+    with _traced_run(trace_path, "watch", input=str(input_dir)):
+        from docalypt.cancellation import CancellationToken
+        from docalypt.search import open_index
+        from docalypt.watch import TranscriptWatcher, WatchResult
+
+        settings = None
+        if generate_docs:
+            from docalypt.llm import settings_from_env
+
+            settings = settings_from_env()
+            if model:
+                settings = replace(settings, model=model)
+            if no_stream:
+                settings = replace(settings, stream=False)
+            logger.info("Documenting with %s (%s)", settings.model, settings.provider)
+
+        def on_result(result: WatchResult) -> None:
+            name = result.path.name
+            if result.unchanged:
+                logger.debug("%s is unchanged", name)
+            elif result.error:
+                logger.error("Failed to process %s: %s", name, result.error)
+            else:
+                message = f"{name}: {result.chapters} chapters"
+                if settings is not None:
+                    message += f", {result.documented} documented"
+                logger.info("%s in %.1fs → %s", message, result.elapsed, result.output_dir)
+                for chapter, error in result.failures:
+                    logger.error("Failed to document %s: %s", chapter.name, error)
+
+        watcher = TranscriptWatcher(
+            input_dir,
+            output_dir=output_dir,
+            settings=settings,
+            workers=workers,
+            queue_size=queue_size,
+            debounce=debounce,
+            poll_interval=poll_interval,
+            marker_regex=marker,
+            auto_chapters=auto_chapters,
+            search_index=None if no_index else open_index(),
+            use_inotify=not no_inotify,
+            on_result=on_result,
+            request_options={"pack_small_chapters": pack},
+        )
+        cancel = CancellationToken()
+        previous_handler = signal.signal(signal.SIGINT, lambda *_: cancel.cancel("Interrupted"))
+        try:
+            watcher.run(cancel)
+        finally:
+            signal.signal(signal.SIGINT, previous_handler)
+        logger.info("Stopped watching %s", input_dir)
+
+
+@cli.command()
+@click.option("--host", default="127.0.0.1", show_default=True, help="Address to listen on")
+@click.option("--port", default=8765, show_default=True, type=click.IntRange(0, 65535), help="Port to listen on")
+@click.option(
+    "--workers",
+    "-j",
+    type=click.IntRange(min=1),
+    default=1,
+    show_default=True,
+    help="Worker processes, each running one job at a time",
+)
+@click.option(
+    "--db",
+    "db_path",
+    type=click.Path(dir_okay=False, path_type=Path),
+    help="Job database (defaults to ~/.cache/docalypt/jobs.sqlite3)",
+)
+@click.option("--verbose", "-v", is_flag=True, help="Enable debug logging")
+def serve(host: str, port: int, workers: int, db_path: Path | None, verbose: bool) -> None:
+    """Run the job service: a local HTTP API and worker processes.
+
+    Other tools submit split and documentation jobs with POST /jobs, poll
+    them with GET /jobs/<id> and cancel them with POST /jobs/<id>/cancel.
+    Jobs are kept in SQLite; after a restart interrupted jobs resume
+    without redoing finished chapters. Stop the service with Ctrl-C.
+    """
+
+    load_env()
+    if verbose:
+        logger.setLevel(logging.DEBUG)
+
+    from docalypt.jobs import JobError
+    from docalypt.service import JobService
+
+    try:
+        service = JobService(db_path, workers=workers, host=host, port=port)
+    except (JobError, OSError) as exc:
+        logger.error("Cannot start the job service: %s", exc)
+        sys.exit(1)
+    service.start()
+    logger.info("Job service listening on %s with %d worker(s)", service.url, workers)
+    previous_handler = signal.signal(signal.SIGINT, lambda *_: service.request_stop())
+    try:
+        service.run()
+    finally:
+        signal.signal(signal.SIGINT, previous_handler)
+        logger.info("Stopping; running jobs will resume on the next start")
+        service.stop()
+
+
+@cli.command()
+@click.argument("query", nargs=-1, required=True)
+@click.option("--limit", "-n", default=20, show_default=True, help="Maximum number of hits")
+@click.option(
+    "--kind",
+    type=click.Choice(["chapter", "docs"]),
+    help="Only search chapters or only generated documentation",
+)
+@click.option(
+    "--refresh",
+    "refresh_dirs",
+    type=click.Path(exists=True, file_okay=False, path_type=Path),
+    multiple=True,
+    help="Index new or changed files under this directory first (repeatable)",
+)
+@click.option(
+    "--index",
+    "index_path",
+    type=click.Path(dir_okay=False, path_type=Path),
+    help="Search index file (defaults to ~/.cache/docalypt/search.sqlite3)",
+)
+def search(
+    query: tuple[str, ...],
+    limit: int,
+    kind: str | None,
+    refresh_dirs: tuple[Path, ...],
+    index_path: Path | None,
+) -> None:
+    """Search indexed chapters and documentation."""
+
+    from docalypt.search import SearchError, SearchIndex
+
+    try:
+        with SearchIndex(index_path) as index:
+            for directory in refresh_dirs:
+                changed = index.refresh(directory)
+                logger.info("Indexed %d new or changed file(s) under %s", changed, directory)
+            started = time.perf_counter()
+            hits = index.search(" ".join(query), limit=limit, kind=kind)
+            elapsed = time.perf_counter() - started
+    except SearchError as exc:
+        logger.error("Error: %s", exc)
+        sys.exit(1)
+
+    for hit in hits:
+        location = f" @ {hit.position}" if hit.position else ""
+        click.echo(f"{hit.path}{location}")
+        click.echo(f"    [{hit.kind}] {hit.title} — {hit.transcript}")
+        click.echo(f"    {hit.snippet}")
+    click.echo(f"{len(hits)} hit(s) in {elapsed * 1000:.1f} ms")
+    if not hits:
+        sys.exit(1)
+
+
+@cli.command()
+@click.argument("trace", type=click.Path(exists=True, dir_okay=False, path_type=Path))
+@click.option("--json", "as_json", is_flag=True, help="Print the summary as JSON")
+def report(trace: Path, as_json: bool) -> None:
+    """Summarise a trace file: latency percentiles per stage (span name)."""
+
+    from docalypt.tracing import summarize_trace
+
+    summary = summarize_trace(trace)
+    if as_json:
+        click.echo(json.dumps(summary, indent=2))
+        return
+    if not summary:
+        logger.error("No spans in %s", trace)
+        sys.exit(1)
+    width = max(len(row["name"]) for row in summary)
+    click.echo(
+        f"{'stage':<{width}} {'count':>6} {'errors':>6} "
+        f"{'p50':>9} {'p90':>9} {'p99':>9} {'max':>9} {'total':>10}"
     )
+    for row in summary:
+        click.echo(
+            f"{row['name']:<{width}} {row['count']:>6} {row['errors']:>6} "
+            f"{row['p50']:>8.3f}s {row['p90']:>8.3f}s {row['p99']:>8.3f}s "
+            f"{row['max']:>8.3f}s {row['total']:>9.3f}s"
+        )
+
 
-    splitter.post_split_hooks = [
-        lambda path: logger.info("Created %s", path.name)
-    ]
+@cli.command()
+@click.option(
+    "--provider",
+    help="Override the LLM provider from the environment (ollama, openai, anthropic or a plugin)",
+)
+@click.option("--endpoint", help="Override the provider endpoint")
+@click.option("--refresh", is_flag=True, help="Ignore the cache and ask the provider")
+@click.option("--json", "as_json", is_flag=True, help="Print the catalogue as JSON")
+def models(provider: str | None, endpoint: str | None, refresh: bool, as_json: bool) -> None:
+    """List the models offered by the configured LLM provider (cached)."""
 
+    load_env()
+
+    from docalypt.catalog import default_catalog
+    from docalypt.llm import LLMError, settings_from_env
+
+    settings = settings_from_env()
+    if provider:
+        # The key, model and fallbacks read from the environment belong to the
+        # configured provider; never send them to another one.
+        settings = replace(
+            settings, provider=provider, endpoint=endpoint, api_key=None, model="", fallbacks=[]
+        )
+    elif endpoint:
+        settings = replace(settings, endpoint=endpoint)
+    catalog = default_catalog()
     try:
-        count = splitter.split(export_html=export_html)
-        logger.info("Done! %d chapters generated.", count)
-        if export_html:
-            logger.info("HTML index created.")
-    except Exception as exc:
+        entry = catalog.get(settings, refresh=refresh)
+    except LLMError as exc:
         logger.error("Error: %s", exc)
         sys.exit(1)
 
+    if as_json:
+        click.echo(json.dumps(entry.to_dict(), indent=2))
+        catalog.wait(timeout=15)
+        return
+    for model in entry.models:
+        context = f"{model.context_length:,}" if model.context_length else "-"
+        click.echo(
+            f"{model.name:<40} {model.parameter_size or '-':>8} "
+            f"{model.quantization or '-':>8} {context:>9}"
+        )
+    stale = " (stale; cache refreshed for next time)" if entry.age > catalog.ttl else ""
+    click.echo(f"{len(entry.models)} model(s), listed {entry.age:.0f} s ago{stale}")
+    # Let a background revalidation finish so the next call sees fresh data.
+    catalog.wait(timeout=15)
+
 
 if __name__ == "__main__":
     cli()
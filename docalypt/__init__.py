@@ -1,26 +1,87 @@
-"""Docalypt application package."""
-
-from .config import AppConfig, load_config
-from .splitting import TranscriptSplitter
-from .documentation import (
-    DOCUMENTATION_SUBDIR,
-    LLMSettings,
-    OllamaSettings,
-    DocumentGenerationRequest,
-    DocumentGenerationResult,
-    collect_chapter_files,
-    generate_documentation,
-)
+"""Docalypt application package.
+
+Public names are imported from their submodules on first access, so
+``import docalypt`` stays cheap and the LLM clients (and their HTTP stack)
+are only loaded by code that documents chapters.
+"""
+
+from __future__ import annotations
+
+from importlib import import_module
+
+# ``typing`` alone costs more than the rest of ``import docalypt``; type
+# checkers treat a module-level TYPE_CHECKING constant the same way.
+TYPE_CHECKING = False
+if TYPE_CHECKING:  # pragma: no cover - static analysis only
+    from .cancellation import CancellationToken
+    from .catalog import ModelCatalog
+    from .config import AppConfig, load_config
+    from .documentation import (
+        DOCUMENTATION_SUBDIR,
+        DocumentGenerationRequest,
+        DocumentGenerationResult,
+        LLMSettings,
+        OllamaSettings,
+        collect_chapter_files,
+        generate_documentation,
+        iter_documentation,
+    )
+    from .pipeline import ChapterQueue
+    from .search import SearchIndex
+    from .splitting import TranscriptSplitter
+
+_EXPORTS = {
+    "AppConfig": ".config",
+    "CancellationToken": ".cancellation",
+    "ChapterQueue": ".pipeline",
+    "DOCUMENTATION_SUBDIR": ".documentation",
+    "DocumentGenerationRequest": ".documentation",
+    "DocumentGenerationResult": ".documentation",
+    "LLMSettings": ".documentation",
+    "ModelCatalog": ".catalog",
+    "OllamaSettings": ".documentation",
+    "Provider": ".providers",
+    "ProviderCapabilities": ".providers",
+    "SearchIndex": ".search",
+    "TranscriptSplitter": ".splitting",
+    "collect_chapter_files": ".documentation",
+    "generate_documentation": ".documentation",
+    "iter_documentation": ".documentation",
+    "load_config": ".config",
+    "register_provider": ".providers",
+}
+
+
+def __getattr__(name: str) -> object:
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(module, __name__), name)
+    globals()[name] = value  # later lookups bypass __getattr__
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(_EXPORTS))
+
 
 __all__ = [
     "AppConfig",
+    "CancellationToken",
+    "ChapterQueue",
     "DOCUMENTATION_SUBDIR",
     "DocumentGenerationRequest",
     "DocumentGenerationResult",
     "LLMSettings",
+    "ModelCatalog",
     "OllamaSettings",
+    "Provider",
+    "ProviderCapabilities",
+    "SearchIndex",
     "TranscriptSplitter",
     "collect_chapter_files",
     "generate_documentation",
+    "iter_documentation",
     "load_config",
+    "register_provider",
 ]
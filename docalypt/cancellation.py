@@ -0,0 +1,147 @@
+"""Cooperative cancellation and deadlines for long-running operations."""
+
+from __future__ import annotations
+
+import threading
+import time
+from typing import Callable, Dict
+
+CancelCallback = Callable[[], None]
+
+
+class CancellationToken:
+    """Thread-safe cancellation flag with an optional deadline.
+
+    Work loops poll :attr:`cancelled` between units of work. Blocking I/O
+    registers a callback with :meth:`on_cancel` (for example to shut down a
+    socket) so it is interrupted as soon as :meth:`cancel` is called or the
+    deadline passes.
+    """
+
+    def __init__(self, timeout: float | None = None) -> None:
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks: Dict[int, CancelCallback] = {}
+        self._next_id = 0
+        self._reason = ""
+        self._deadline: float | None = None
+        self._timer: threading.Timer | None = None
+        # Undoes the link to a parent token (see child()).
+        self._detach: CancelCallback | None = None
+        if timeout is not None:
+            self.set_deadline(timeout)
+
+    # State ---------------------------------------------------------------
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    @property
+    def reason(self) -> str:
+        return self._reason or "Cancelled"
+
+    def remaining(self) -> float | None:
+        """Seconds left before the deadline, or ``None`` without one."""
+
+        if self._deadline is None:
+            return None
+        return max(0.0, self._deadline - time.monotonic())
+
+    def clamp_timeout(self, timeout: float) -> float:
+        """Limit a per-operation timeout to the time left before the deadline."""
+
+        remaining = self.remaining()
+        if remaining is None:
+            return timeout
+        return max(0.01, min(timeout, remaining))
+
+    def wait(self, timeout: float | None = None) -> bool:
+        return self._event.wait(timeout)
+
+    def raise_if_cancelled(self, error: type[Exception] = RuntimeError) -> None:
+        if self.cancelled:
+            raise error(self.reason)
+
+    # Control -------------------------------------------------------------
+    def set_deadline(self, timeout: float) -> None:
+        """Cancel automatically ``timeout`` seconds from now."""
+
+        with self._lock:
+            deadline = time.monotonic() + max(0.0, timeout)
+            if self._deadline is not None and self._deadline <= deadline:
+                return
+            self._deadline = deadline
+            if self._timer is not None:
+                self._timer.cancel()
+            self._timer = threading.Timer(
+                max(0.0, timeout), self.cancel, kwargs={"reason": "Deadline exceeded"}
+            )
+            self._timer.daemon = True
+            self._timer.start()
+
+    def cancel(self, reason: str = "Cancelled") -> None:
+        with self._lock:
+            if self._event.is_set():
+                return
+            self._reason = reason
+            self._event.set()
+            callbacks = list(self._callbacks.values())
+            self._callbacks.clear()
+            if self._timer is not None:
+                self._timer.cancel()
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception:  # pragma: no cover - callbacks must not break cancel
+                pass
+
+    def close(self) -> None:
+        """Release the token once its work is done, without cancelling it.
+
+        Stops the deadline timer and detaches the token from the parent it
+        was created from, so a long-lived parent does not accumulate
+        callbacks from finished children.
+        """
+
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            detach, self._detach = self._detach, None
+        if detach is not None:
+            detach()
+
+    def on_cancel(self, callback: CancelCallback) -> Callable[[], None]:
+        """Run ``callback`` on cancellation; returns a function that unregisters it.
+
+        If the token is already cancelled the callback runs immediately.
+        """
+
+        with self._lock:
+            if not self._event.is_set():
+                key = self._next_id
+                self._next_id += 1
+                self._callbacks[key] = callback
+
+                def unregister() -> None:
+                    with self._lock:
+                        self._callbacks.pop(key, None)
+
+                return unregister
+        callback()
+        return lambda: None
+
+    def child(self, timeout: float | None = None) -> "CancellationToken":
+        """Return a token cancelled with this one, but cancellable on its own."""
+
+        token = CancellationToken(timeout=timeout)
+        if self._deadline is not None:
+            remaining = self.remaining() or 0.0
+            token.set_deadline(remaining)
+        unregister = self.on_cancel(lambda: token.cancel(self.reason))
+        token.on_cancel(unregister)
+        token._detach = unregister
+        return token
+
+
+__all__ = ["CancellationToken"]
@@ -0,0 +1,266 @@
+"""Cached model discovery shared by the GUI and the CLI.
+
+Listing models means a network round trip (and, for Ollama, one ``/api/show``
+call per model to learn its context length), so catalogues are cached per
+provider and endpoint, in memory and in ``~/.cache/docalypt/models.json``.
+
+Entries younger than the TTL are served as they are. Older entries are still
+served immediately, but trigger a background refresh
+(stale-while-revalidate); ``on_update`` is called with the new entry once it
+arrives. Only entries older than :data:`MAX_STALE` are ignored.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, List
+
+from .config import CACHE_DIR
+from .llm import LLMError, LLMSettings, ModelInfo, list_model_info, show_model
+
+CATALOG_PATH = CACHE_DIR / "models.json"
+DEFAULT_TTL = 300.0
+MAX_STALE = 7 * 24 * 3600.0
+# Concurrent /api/show requests while enriching an Ollama catalogue.
+SHOW_WORKERS = 4
+_FORMAT_VERSION = 1
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(slots=True)
+class CatalogEntry:
+    models: List[ModelInfo]
+    fetched_at: float  # time.time() of the listing
+
+    @property
+    def age(self) -> float:
+        return max(0.0, time.time() - self.fetched_at)
+
+    @property
+    def names(self) -> List[str]:
+        return [model.name for model in self.models]
+
+    def find(self, name: str) -> ModelInfo | None:
+        return next((model for model in self.models if model.name == name), None)
+
+    def to_dict(self) -> Dict[str, object]:
+        return {"fetched_at": self.fetched_at, "models": [model.to_dict() for model in self.models]}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, object]) -> "CatalogEntry":
+        return cls(
+            models=[ModelInfo.from_dict(item) for item in data.get("models", []) if isinstance(item, dict)],
+            fetched_at=float(data.get("fetched_at", 0.0)),
+        )
+
+
+def catalog_key(settings: LLMSettings) -> str:
+    """Cache key of a catalogue: the provider and its resolved endpoint."""
+
+    return f"{settings.normalized_provider()} {settings.resolved_endpoint().rstrip('/')}"
+
+
+class ModelCatalog:
+    """TTL cache of model catalogues with background revalidation."""
+
+    def __init__(
+        self,
+        path: Path | str | None = CATALOG_PATH,
+        ttl: float = DEFAULT_TTL,
+        max_stale: float = MAX_STALE,
+    ) -> None:
+        # ``path=None`` keeps the cache in memory only.
+        self.path = Path(path).expanduser() if path else None
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self._lock = threading.Lock()
+        self._entries: Dict[str, CatalogEntry] | None = None
+        self._refreshing: Dict[str, threading.Thread] = {}
+
+    # Lookup -------------------------------------------------------------
+    def cached(self, settings: LLMSettings) -> CatalogEntry | None:
+        """Return the cached catalogue without touching the network."""
+
+        with self._lock:
+            entry = self._load().get(catalog_key(settings))
+        if entry is None or entry.age > self.max_stale:
+            return None
+        return entry
+
+    def get(
+        self,
+        settings: LLMSettings,
+        refresh: bool = False,
+        on_update: Callable[[CatalogEntry], None] | None = None,
+    ) -> CatalogEntry:
+        """Return the catalogue for ``settings``.
+
+        Without a usable cache entry (or with ``refresh``) the catalogue is
+        fetched synchronously and :class:`LLMError` propagates. A stale entry
+        is returned as is while a background refresh runs.
+        """
+
+        entry = None if refresh else self.cached(settings)
+        if entry is None:
+            return self.refresh(settings)
+        if entry.age > self.ttl:
+            self.revalidate(settings, on_update)
+        return entry
+
+    def refresh(self, settings: LLMSettings) -> CatalogEntry:
+        """Fetch the catalogue now and store it."""
+
+        key = catalog_key(settings)
+        models = list_model_info(settings)
+        with self._lock:
+            previous = self._load().get(key)
+        self._enrich(settings, models, previous)
+        entry = CatalogEntry(models=models, fetched_at=time.time())
+        with self._lock:
+            self._load()[key] = entry
+            self._save()
+        return entry
+
+    def revalidate(
+        self, settings: LLMSettings, on_update: Callable[[CatalogEntry], None] | None = None
+    ) -> bool:
+        """Refresh in a background thread; at most one refresh per key runs.
+
+        Returns ``False`` if a refresh for this catalogue is already running.
+        """
+
+        key = catalog_key(settings)
+
+        def run() -> None:
+            try:
+                entry = self.refresh(settings)
+            except LLMError as exc:
+                logger.debug("Model catalogue refresh for %s failed: %s", key, exc)
+                return
+            finally:
+                with self._lock:
+                    self._refreshing.pop(key, None)
+            if on_update is not None:
+                on_update(entry)
+
+        with self._lock:
+            if key in self._refreshing:
+                return False
+            thread = threading.Thread(target=run, name="docalypt-catalog", daemon=True)
+            self._refreshing[key] = thread
+        thread.start()
+        return True
+
+    def wait(self, timeout: float | None = None) -> None:
+        """Wait for background refreshes, e.g. before a short-lived process exits."""
+
+        with self._lock:
+            threads = list(self._refreshing.values())
+        for thread in threads:
+            thread.join(timeout)
+
+    def invalidate(self, settings: LLMSettings | None = None) -> None:
+        """Forget one catalogue, or all of them."""
+
+        with self._lock:
+            entries = self._load()
+            if settings is None:
+                entries.clear()
+            else:
+                entries.pop(catalog_key(settings), None)
+            self._save()
+
+    # Helpers ------------------------------------------------------------
+    def _enrich(
+        self, settings: LLMSettings, models: List[ModelInfo], previous: CatalogEntry | None
+    ) -> None:
+        """Fill in context lengths, reusing those of unchanged models."""
+
+        if settings.resolved_provider().describe_model is None:
+            return
+        missing = []
+        for model in models:
+            known = previous.find(model.name) if previous else None
+            if known and known.context_length and known.size_bytes == model.size_bytes:
+                model.context_length = known.context_length
+            else:
+                missing.append(model)
+        if not missing:
+            return
+
+        def lookup(model: ModelInfo) -> None:
+            try:
+                model.context_length = show_model(settings, model.name).context_length
+            except LLMError as exc:
+                logger.debug("Cannot describe %s: %s", model.name, exc)
+
+        with ThreadPoolExecutor(max_workers=min(SHOW_WORKERS, len(missing))) as pool:
+            list(pool.map(lookup, missing))
+
+    def _load(self) -> Dict[str, CatalogEntry]:
+        if self._entries is not None:
+            return self._entries
+        self._entries = {}
+        if self.path is None:
+            return self._entries
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return self._entries
+        except (OSError, ValueError) as exc:
+            logger.warning("Ignoring unreadable model cache %s: %s", self.path, exc)
+            return self._entries
+        if isinstance(data, dict) and data.get("version") == _FORMAT_VERSION:
+            for key, value in data.get("entries", {}).items():
+                if isinstance(value, dict):
+                    self._entries[key] = CatalogEntry.from_dict(value)
+        return self._entries
+
+    def _save(self) -> None:
+        if self.path is None or self._entries is None:
+            return
+        payload = {
+            "version": _FORMAT_VERSION,
+            "entries": {key: entry.to_dict() for key, entry in self._entries.items()},
+        }
+        # Write-then-rename, so a GUI and a CLI never read a half-written file.
+        temporary = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            temporary.write_text(json.dumps(payload, indent=1), encoding="utf-8")
+            os.replace(temporary, self.path)
+        except OSError as exc:
+            logger.warning("Cannot write model cache %s: %s", self.path, exc)
+
+
+_default: ModelCatalog | None = None
+_default_lock = threading.Lock()
+
+
+def default_catalog() -> ModelCatalog:
+    """The process-wide catalogue backed by :data:`CATALOG_PATH`."""
+
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = ModelCatalog()
+        return _default
+
+
+__all__ = [
+    "CATALOG_PATH",
+    "CatalogEntry",
+    "DEFAULT_TTL",
+    "MAX_STALE",
+    "ModelCatalog",
+    "catalog_key",
+    "default_catalog",
+]
@@ -0,0 +1,286 @@
+"""Automatic chapter detection for transcripts without a chapter list.
+
+Boundaries are placed where the vocabulary shifts, following Hearst's
+TextTiling: every gap between timestamped snippets is scored by the cosine
+similarity of the term vectors on either side, and the deepest valleys of
+the smoothed similarity curve become chapter starts. Each chapter is titled
+with the terms most characteristic of it.
+
+NumPy is used for the block comparisons when it is installed; a pure Python
+fallback gives the same chapters, only more slowly.
+"""
+
+from __future__ import annotations
+
+import heapq
+import math
+import re
+from bisect import bisect_left, insort
+from collections import Counter
+from functools import lru_cache
+from statistics import median
+from typing import List, Sequence
+
+from .splitting import Chapter
+
+try:  # Optional dependency: vectorised block similarity.
+    import numpy as np
+except ImportError:  # pragma: no cover - depends on the environment
+    np = None
+
+# Width of the text compared on each side of a candidate boundary.
+WINDOW_SECONDS = 180.0
+MIN_CHAPTER_SECONDS = 120.0
+TITLE_TERMS = 3
+# Gaps deeper than mean + DEPTH_CUTOFF standard deviations become boundaries.
+# Stricter than TextTiling's default: lectures drift topic more gradually
+# than the expository text it was designed for.
+DEPTH_CUTOFF = 0.5
+MAX_VOCABULARY = 4096
+# Gaps scored per NumPy batch. Each batch builds a dense matrix of only the
+# snippets it compares, so memory stays bounded however long the transcript.
+GAP_BATCH = 256
+
+_WORD = re.compile(r"[A-Za-z][A-Za-z0-9'+-]*[A-Za-z0-9]")
+_STOPWORDS = frozenset(
+    """
+    about above actually after again against all also although always am an and any are
+    around as at back be because been before being below between both but by can could
+    did do does doing done down during each even every few first for from get gets getting
+    go goes going gonna got had has have having he her here hers him his how however i if
+    in into is it its itself just kind know let like lot make makes maybe me might more
+    most much must my need now of off ok okay on once one only or other our ours out over
+    own pretty probably put quite really right said same say see she should so some
+    something still such sure take than that the their them then there these they thing
+    things think this those though through to too two under until up us use used using
+    very want wanna was way we well were what when where which while who why will with
+    would yeah yes you your yours
+    """.split()
+)
+
+
+@lru_cache(maxsize=65536)
+def _term(word: str) -> str | None:
+    """Normalise a word to its index term, or ``None`` for stop words."""
+
+    term = word.lower().replace("'", "")
+    if len(term) < 3 or term in _STOPWORDS:
+        return None
+    if len(term) > 3 and term.endswith("s") and not term.endswith("ss"):
+        term = term[:-1]
+    return term
+
+
+def detect_chapters(
+    records: Sequence[tuple[int, str]],
+    window_seconds: float = WINDOW_SECONDS,
+    min_chapter_seconds: float = MIN_CHAPTER_SECONDS,
+    max_chapters: int | None = None,
+) -> List[Chapter]:
+    """Derive a chapter list from ``(timestamp, snippet)`` records.
+
+    Returns chapters in the form produced by the header parser, the first one
+    starting at the first record. Without ``max_chapters`` the number of
+    chapters follows the depth cut-off (:data:`DEPTH_CUTOFF`), subject to
+    ``min_chapter_seconds`` between boundaries.
+    """
+
+    if not records:
+        return []
+    timestamps = [timestamp for timestamp, _ in records]
+    units: list[Counter] = []
+    # Most frequent spelling of each term, used for titles ("USB", "ESP32").
+    surfaces: dict[str, Counter] = {}
+    for _, text in records:
+        unit: Counter = Counter()
+        for word in _WORD.findall(text):
+            term = _term(word)
+            if term is not None:
+                unit[term] += 1
+                surfaces.setdefault(term, Counter())[word] += 1
+        units.append(unit)
+    if len(records) < 3:
+        return _titled(records, units, surfaces, [0])
+
+    # Only terms that occur in at least two snippets can link the two sides
+    # of a gap; the vocabulary is capped to bound memory on long transcripts.
+    document_frequency: Counter = Counter()
+    for unit in units:
+        document_frequency.update(unit.keys())
+    vocabulary = {
+        term: column
+        for column, (term, _) in enumerate(
+            item for item in document_frequency.most_common(MAX_VOCABULARY) if item[1] > 1
+        )
+    }
+
+    steps = [later - earlier for earlier, later in zip(timestamps, timestamps[1:]) if later > earlier]
+    step = median(steps) if steps else 1.0
+    block = max(2, min(20, round(window_seconds / step)))
+    scores = _smooth(_gap_similarities(units, vocabulary, block))
+    depths = _depth_scores(scores)
+
+    if max_chapters is not None:
+        wanted = max(0, max_chapters - 1)
+        candidates = sorted(range(len(depths)), key=lambda gap: -depths[gap])
+        cutoff = 0.0
+    else:
+        wanted = len(depths)
+        average = sum(depths) / len(depths)
+        spread = math.sqrt(sum((depth - average) ** 2 for depth in depths) / len(depths))
+        cutoff = max(average + DEPTH_CUTOFF * spread, 1e-9)
+        candidates = sorted(
+            (gap for gap in range(len(depths)) if depths[gap] >= cutoff),
+            key=lambda gap: -depths[gap],
+        )
+
+    # Gap ``g`` lies between record ``g`` and ``g + 1``; a chapter starts at ``g + 1``.
+    starts = [0]
+    accepted = [timestamps[0]]
+    end = timestamps[-1]
+    for gap in candidates:
+        if len(starts) - 1 >= wanted:
+            break
+        start = timestamps[gap + 1]
+        if end - start < min_chapter_seconds:
+            continue
+        position = bisect_left(accepted, start)
+        if position < len(accepted) and accepted[position] - start < min_chapter_seconds:
+            continue
+        if position and start - accepted[position - 1] < min_chapter_seconds:
+            continue
+        insort(accepted, start)
+        starts.append(gap + 1)
+    return _titled(records, units, surfaces, sorted(starts))
+
+
+def _gap_similarities(
+    units: Sequence[Counter], vocabulary: dict[str, int], block: int
+) -> list[float]:
+    """Cosine similarity of the ``block`` units before and after each gap."""
+
+    if np is not None:
+        return _gap_similarities_numpy(units, vocabulary, block)
+    units = [
+        Counter({term: weight for term, weight in unit.items() if term in vocabulary})
+        for unit in units
+    ]
+    count = len(units)
+    scores = []
+    for gap in range(1, count):
+        left: Counter = Counter()
+        for unit in units[max(0, gap - block) : gap]:
+            left.update(unit)
+        right: Counter = Counter()
+        for unit in units[gap : min(count, gap + block)]:
+            right.update(unit)
+        dot = sum(weight * right[term] for term, weight in left.items() if term in right)
+        norm = math.sqrt(sum(v * v for v in left.values()) * sum(v * v for v in right.values()))
+        scores.append(dot / norm if norm else 0.0)
+    return scores
+
+
+def _gap_similarities_numpy(
+    units: Sequence[Counter], vocabulary: dict[str, int], block: int
+) -> list[float]:
+    count = len(units)
+    width = max(1, len(vocabulary))
+    scores: list[float] = []
+    for first in range(1, count, GAP_BATCH):
+        last = min(count, first + GAP_BATCH)
+        # Gaps first..last-1 compare the units low..high-1.
+        low = max(0, first - block)
+        high = min(count, last - 1 + block)
+        matrix = np.zeros((high - low + 1, width), dtype=np.float32)
+        for row, unit in enumerate(units[low:high], start=1):
+            for term, weight in unit.items():
+                column = vocabulary.get(term)
+                if column is not None:
+                    matrix[row, column] = weight
+        # Prefix sums turn every window into a difference of two rows.
+        cumulative = np.cumsum(matrix, axis=0, out=matrix)
+        gaps = np.arange(first, last)
+        left = cumulative[gaps - low] - cumulative[np.maximum(gaps - block, 0) - low]
+        right = cumulative[np.minimum(gaps + block, count) - low] - cumulative[gaps - low]
+        dot = np.einsum("ij,ij->i", left, right)
+        norm = np.linalg.norm(left, axis=1) * np.linalg.norm(right, axis=1)
+        similarity = np.divide(dot, norm, out=np.zeros_like(dot), where=norm > 0)
+        scores.extend(similarity.astype(float).tolist())
+    return scores
+
+
+def _smooth(scores: list[float], width: int = 3) -> list[float]:
+    half = width // 2
+    smoothed = []
+    for position in range(len(scores)):
+        window = scores[max(0, position - half) : position + half + 1]
+        smoothed.append(sum(window) / len(window))
+    return smoothed
+
+
+def _depth_scores(scores: list[float]) -> list[float]:
+    """How far each gap lies below the peaks reached climbing either way."""
+
+    count = len(scores)
+    left_peak = scores[:]
+    for position in range(1, count):
+        if scores[position - 1] >= scores[position]:
+            left_peak[position] = left_peak[position - 1]
+    right_peak = scores[:]
+    for position in range(count - 2, -1, -1):
+        if scores[position + 1] >= scores[position]:
+            right_peak[position] = right_peak[position + 1]
+    return [
+        (left_peak[position] - scores[position]) + (right_peak[position] - scores[position])
+        for position in range(count)
+    ]
+
+
+def _titled(
+    records: Sequence[tuple[int, str]],
+    units: Sequence[Counter],
+    surfaces: dict[str, Counter],
+    starts: Sequence[int],
+) -> List[Chapter]:
+    """Build chapters titled with their most distinctive terms (TF-IDF)."""
+
+    bounds = list(zip(starts, list(starts[1:]) + [len(records)]))
+    segments = []
+    for first, last in bounds:
+        counts: Counter = Counter()
+        for unit in units[first:last]:
+            counts.update(unit)
+        segments.append(counts)
+    segment_frequency: Counter = Counter()
+    for counts in segments:
+        segment_frequency.update(counts.keys())
+
+    chapters: List[Chapter] = []
+    seen: set[str] = set()
+    for position, ((first, _), counts) in enumerate(zip(bounds, segments), start=1):
+        ranked = heapq.nsmallest(
+            TITLE_TERMS,
+            counts,
+            key=lambda term: (
+                -counts[term] * math.log(1 + len(segments) / segment_frequency[term]),
+                term,
+            ),
+        )
+        words = []
+        for term in ranked:
+            surface = surfaces[term].most_common(1)[0][0]
+            words.append(surface[0].upper() + surface[1:])
+        title = ", ".join(words) or f"Part {position}"
+        # Titles key the chapter buckets in the splitter, so they must be unique.
+        if title in seen:
+            title = f"{title} ({position})"
+        seen.add(title)
+        chapters.append(Chapter(timestamp=records[first][0], title=title))
+    return chapters
+
+
+__all__ = [
+    "MIN_CHAPTER_SECONDS",
+    "WINDOW_SECONDS",
+    "detect_chapters",
+]
@@ -6,10 +6,9 @@ from dataclasses import dataclass
 from pathlib import Path
 from typing import Any, Dict
 
-import toml
-
 CONFIG_DIR = Path.home() / ".config" / "docalypt"
 CONFIG_PATH = CONFIG_DIR / "config.toml"
+CACHE_DIR = Path.home() / ".cache" / "docalypt"
 
 
 @dataclass(slots=True)
@@ -34,6 +33,9 @@ def load_config() -> AppConfig:
     if not CONFIG_PATH.exists():
         return AppConfig()
 
+    # Imported lazily: most installations have no config file at all.
+    import toml
+
     try:
         data = toml.load(CONFIG_PATH)
     except Exception:
@@ -50,4 +52,4 @@ def load_config() -> AppConfig:
     return config
 
 
-__all__ = ["AppConfig", "load_config", "CONFIG_PATH", "CONFIG_DIR"]
+__all__ = ["AppConfig", "load_config", "CACHE_DIR", "CONFIG_PATH", "CONFIG_DIR"]
@@ -2,39 +2,249 @@
 
 from __future__ import annotations
 
-from dataclasses import dataclass
+import json
+import logging
+import random
+import threading
+import time
+from collections import deque
+from collections.abc import Sized
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field, replace
+from datetime import datetime, timezone
 from pathlib import Path
-from typing import Sequence
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, Iterator, Sequence
 
+from .cancellation import CancellationToken
 from .llm import (
+    GenerationResult,
+    LLMCancelled,
     LLMError,
+    LLMRateLimited,
     LLMSettings,
+    PINNED_KEEP_ALIVE,
     PROMPT_TEMPLATE,
+    Prompt,
+    PromptCacheStats,
+    _BaseLLMClient,
     build_prompt,
     create_client,
+    release_model,
+    resolve_context_window,
+    warm_up_model,
     OllamaSettings,
 )
+from .hedging import HedgedClient, HedgeStats
+from .packing import (
+    ChapterPack,
+    build_packed_content,
+    pack_chapters,
+    packed_instructions,
+    parse_packed_response,
+)
+from .providers import rate_limiter
+from .resilience import FailoverClient, FailoverEvent
+from .scheduling import ChapterScheduler, estimate_tokens_from_size
+from .tokens import (
+    MAX_ADAPTIVE_OUTPUT_TOKENS,
+    MIN_OUTPUT_TOKENS,
+    get_estimator,
+    output_budget,
+    plan_budget,
+    split_to_budget,
+)
+from .tracing import get_tracer
+
+if TYPE_CHECKING:  # pragma: no cover - annotations only
+    from .search import SearchIndex
 
 
 DOCUMENTATION_SUBDIR = "documentation"
+# Retries of a rate-limited request, and the backoff between them (seconds).
+RATE_LIMIT_RETRIES = 5
+RETRY_BACKOFF = 1.0
+MAX_RETRY_DELAY = 60.0
+_DISCARDED = "Documentation discarded: the chapter was taken over by another worker"
+
+logger = logging.getLogger(__name__)
 
 
 @dataclass(slots=True)
 class DocumentGenerationRequest:
-    chapters: Sequence[Path]
+    # Any iterable works, including a ChapterQueue fed by a running splitter.
+    chapters: Iterable[Path]
     settings: LLMSettings
     prompt_template: str | None = None
     destination_dirname: str = DOCUMENTATION_SUBDIR
+    # Concurrent requests; ``None`` uses the provider's safe concurrency
+    # (ProviderCapabilities.max_concurrency).
+    max_workers: int | None = None
+    # Maximum concurrent requests per provider name, counted across the
+    # primary provider, failover and hedging (e.g. ``{"ollama": 1}``).
+    provider_limits: Dict[str, int] = field(default_factory=dict)
+    longest_first: bool = True
+    # Load (and pin) a local Ollama model before the first chapter is sent.
+    warm_up: bool = True
+    # Cancelling the token stops the run: queued chapters are skipped and
+    # in-flight requests are aborted. ``deadline`` (seconds) cancels it
+    # automatically once the whole run has taken that long.
+    cancel_token: CancellationToken | None = None
+    deadline: float | None = None
+    # Bundle runs of adjacent small chapters into one request each.
+    pack_small_chapters: bool = False
+    # Duplicate requests that are slow to start to ``settings.fallbacks``.
+    hedge: bool = False
+    # Send requests to the next entry of ``settings.fallbacks`` when one
+    # fails or its endpoint's circuit breaker is open.
+    failover: bool = True
+    # Generated documentation is added to the full-text index as it is written.
+    search_index: SearchIndex | None = None
+    # Asked right before a chapter's documentation is written; returning
+    # False discards it (e.g. another node has taken over the chapter).
+    before_write: Callable[[Path], bool] | None = None
 
 
 @dataclass(slots=True)
 class DocumentGenerationResult:
     written: list[tuple[Path, Path]]  # (chapter, documentation)
     failures: list[tuple[Path, str]]
+    telemetry: list[tuple[Path, GenerationResult]] = field(default_factory=list)
+    elapsed: float = 0.0
+    # Chapters not documented because the run was cancelled.
+    skipped: list[Path] = field(default_factory=list)
+    cancelled: bool = False
+    hedge_stats: HedgeStats | None = None
+    # Requests served by (or attempted on) a fallback endpoint.
+    failovers: list[FailoverEvent] = field(default_factory=list)
 
     @property
     def success(self) -> bool:
-        return not self.failures
+        return not self.failures and not self.cancelled
+
+    def _record(self, outcome: ChapterOutcome) -> None:
+        for generation in outcome.generations:
+            self.telemetry.append((outcome.chapter, generation))
+        if outcome.destination is not None:
+            self.written.append((outcome.chapter, outcome.destination))
+        elif outcome.cancelled:
+            self.skipped.append(outcome.chapter)
+        else:
+            self.failures.append((outcome.chapter, outcome.error or "Unknown error"))
+
+    @property
+    def cache_stats(self) -> PromptCacheStats:
+        stats = PromptCacheStats()
+        for _, generation in self.telemetry:
+            stats.record(
+                generation.input_tokens or 0,
+                generation.cached_input_tokens,
+                generation.cache_write_tokens,
+            )
+        return stats
+
+    def telemetry_summary(self) -> Dict[str, Any]:
+        """Aggregate the per-request telemetry into run-level figures."""
+
+        generations = [generation for _, generation in self.telemetry]
+        latencies = sorted(generation.latency for generation in generations)
+        first_tokens = [
+            generation.time_to_first_token
+            for generation in generations
+            if generation.time_to_first_token is not None
+        ]
+        output_tokens = sum(generation.output_tokens or 0 for generation in generations)
+        generation_time = 0.0
+        for generation in generations:
+            rate = generation.tokens_per_second
+            if rate and generation.output_tokens:
+                generation_time += generation.output_tokens / rate
+        return {
+            "requests": len(generations),
+            "succeeded": len(self.written),
+            "failed": len(self.failures),
+            "skipped": len(self.skipped),
+            "cancelled": self.cancelled,
+            "elapsed": self.elapsed,
+            "input_tokens": sum(generation.input_tokens or 0 for generation in generations),
+            "output_tokens": output_tokens,
+            "cached_input_tokens": sum(
+                generation.cached_input_tokens for generation in generations
+            ),
+            "latency_mean": sum(latencies) / len(latencies) if latencies else None,
+            "latency_p50": _percentile(latencies, 0.50),
+            "latency_p95": _percentile(latencies, 0.95),
+            "latency_p99": _percentile(latencies, 0.99),
+            "time_to_first_token_mean": (
+                sum(first_tokens) / len(first_tokens) if first_tokens else None
+            ),
+            "tokens_per_second": output_tokens / generation_time if generation_time else None,
+            "hedging": self.hedge_stats.to_dict() if self.hedge_stats else None,
+            "failovers": len(self.failovers),
+            "coalesced": sum(1 for generation in generations if generation.coalesced),
+        }
+
+    def telemetry_report(self) -> Dict[str, Any]:
+        """Return a JSON-serialisable report of the run and each request."""
+
+        destinations = dict(self.written)
+        return {
+            "generated_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "summary": self.telemetry_summary(),
+            "requests": [
+                {
+                    "chapter": str(chapter),
+                    "documentation": str(destinations[chapter])
+                    if chapter in destinations
+                    else None,
+                    **generation.to_dict(),
+                }
+                for chapter, generation in self.telemetry
+            ],
+            "failures": [
+                {"chapter": str(chapter), "error": error} for chapter, error in self.failures
+            ],
+            "skipped": [str(chapter) for chapter in self.skipped],
+            "failovers": [event.to_dict() for event in self.failovers],
+        }
+
+    def export_telemetry(self, path: Path) -> Path:
+        """Write :meth:`telemetry_report` to ``path`` as JSON."""
+
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(self.telemetry_report(), indent=2), encoding="utf-8")
+        return path
+
+    def describe_telemetry(self) -> str:
+        """Return a one-line human readable summary of the telemetry."""
+
+        summary = self.telemetry_summary()
+        if not summary["requests"]:
+            return "LLM telemetry: no requests completed"
+        parts = [
+            f"{summary['requests']} request(s)",
+            f"{summary['input_tokens']:,} in / {summary['output_tokens']:,} out tokens",
+            f"p50 latency {summary['latency_p50']:.1f}s",
+        ]
+        if summary["time_to_first_token_mean"] is not None:
+            parts.append(f"mean TTFT {summary['time_to_first_token_mean']:.2f}s")
+        if summary["tokens_per_second"]:
+            parts.append(f"{summary['tokens_per_second']:.1f} tok/s")
+        if self.hedge_stats and self.hedge_stats.hedged:
+            stats = self.hedge_stats
+            parts.append(
+                f"{stats.hedged} hedged (+{stats.extra_input_tokens + stats.extra_output_tokens:,} tokens)"
+            )
+        if self.failovers:
+            parts.append(f"{len(self.failovers)} failed over")
+        return "LLM telemetry: " + ", ".join(parts)
+
+
+def _percentile(ordered: Sequence[float], fraction: float) -> float | None:
+    if not ordered:
+        return None
+    index = min(len(ordered) - 1, max(0, round(fraction * (len(ordered) - 1))))
+    return ordered[index]
 
 
 def collect_chapter_files(output_dir: Path) -> list[Path]:
@@ -48,40 +258,636 @@ def collect_chapter_files(output_dir: Path) -> list[Path]:
     return files
 
 
+@dataclass(slots=True)
+class ChapterOutcome:
+    """Result for one chapter, as yielded by :func:`iter_documentation`.
+
+    ``completed`` and ``total`` count the chapters of the run (``total`` is
+    ``None`` for unsized sources such as a ChapterQueue); ``eta`` is the
+    estimated number of seconds left, extrapolated from the run so far.
+    """
+
+    chapter: Path
+    destination: Path | None = None
+    # More than one entry when an oversized chapter was documented in parts.
+    generations: list[GenerationResult] = field(default_factory=list)
+    error: str | None = None
+    cancelled: bool = False
+    completed: int = 0
+    total: int | None = None
+    eta: float | None = None
+
+    @property
+    def succeeded(self) -> bool:
+        return self.destination is not None
+
+    @property
+    def progress(self) -> float | None:
+        """Fraction of the run completed, when the total is known."""
+
+        if not self.total:
+            return None
+        return min(1.0, self.completed / self.total)
+
+
+def _cancelled_outcomes(unit: Path | ChapterPack) -> list[ChapterOutcome]:
+    chapters = unit.chapters if isinstance(unit, ChapterPack) else (unit,)
+    return [ChapterOutcome(chapter=chapter, cancelled=True) for chapter in chapters]
+
+
+class DocumentationRun:
+    """Iterator over a documentation run, yielding chapters as they finish.
+
+    Chapters arrive in completion order. Once the iterator is exhausted
+    :attr:`result` holds the aggregate (in input order) that
+    :func:`generate_documentation` returns. Closing it early cancels the
+    rest of the run.
+    """
+
+    def __init__(self, request: DocumentGenerationRequest) -> None:
+        self.result = DocumentGenerationResult(written=[], failures=[])
+        self._outcomes = _iter_documentation(request, self.result)
+
+    def __iter__(self) -> "DocumentationRun":
+        return self
+
+    def __next__(self) -> ChapterOutcome:
+        return next(self._outcomes)
+
+    def close(self) -> None:
+        self._outcomes.close()
+
+
+def iter_documentation(request: DocumentGenerationRequest) -> DocumentationRun:
+    """Start documenting chapters and yield each :class:`ChapterOutcome` when done.
+
+    Chapters are consumed lazily, so documentation starts as soon as the
+    first chapter is available. With more than one worker (by default the
+    provider's safe concurrency, see :mod:`docalypt.providers`) several
+    chapters are documented concurrently, longest first unless
+    ``longest_first`` is off.
+
+    For Ollama the model is warmed up and pinned in memory for the duration
+    of the run, then released back to its configured keep-alive.
+
+    When the run is cancelled (or its deadline passes) the remaining
+    chapters are yielded with ``cancelled`` set and listed in ``skipped``.
+    """
+
+    return DocumentationRun(request)
+
+
 def generate_documentation(request: DocumentGenerationRequest) -> DocumentGenerationResult:
-    """Generate documentation for provided chapters using the configured LLM."""
+    """Generate documentation for provided chapters using the configured LLM.
 
-    client = create_client(request.settings)
-    written: list[tuple[Path, Path]] = []
-    failures: list[tuple[Path, str]] = []
+    Runs :func:`iter_documentation` to completion; results are reported in
+    input order.
+    """
 
-    created_dirs: set[Path] = set()
-    for chapter in request.chapters:
+    run = iter_documentation(request)
+    for _ in run:
+        pass
+    return run.result
+
+
+def _iter_documentation(
+    request: DocumentGenerationRequest, result: DocumentGenerationResult
+) -> Iterator[ChapterOutcome]:
+    started = time.perf_counter()
+    settings = resolve_context_window(request.settings)
+    cancel = request.cancel_token or CancellationToken()
+    if request.deadline is not None:
+        # Closed when the run ends, so the caller's token does not keep it.
+        cancel = cancel.child(timeout=request.deadline)
+    total = len(request.chapters) if isinstance(request.chapters, Sized) else None
+    # Not entered: a generator must not change its consumer's current span.
+    # Chapter spans name it as their parent instead.
+    span = get_tracer().span(
+        "documentation",
+        provider=settings.normalized_provider(),
+        model=settings.model,
+        chapters=total,
+    )
+    pinned = request.warm_up and settings.resolved_provider().capabilities.model_residency
+    if pinned:
         try:
-            chapter_text = chapter.read_text(encoding="utf-8")
-            template = request.prompt_template or PROMPT_TEMPLATE
-            prompt = build_prompt(chapter.name, chapter_text, template)
-            markdown = client.generate(prompt)
-            destination_dir = chapter.parent / request.destination_dirname
-            if destination_dir not in created_dirs:
-                destination_dir.mkdir(parents=True, exist_ok=True)
-                created_dirs.add(destination_dir)
-            destination = destination_dir / f"{chapter.stem}.docs.md"
-            destination.write_text(markdown, encoding="utf-8")
-            written.append((chapter, destination))
+            warm_up_model(settings, cancel=cancel)
         except LLMError as exc:
-            failures.append((chapter, str(exc)))
-        except Exception as exc:  # pragma: no cover - safety net
-            failures.append((chapter, str(exc)))
-    return DocumentGenerationResult(written=written, failures=failures)
+            logger.warning("Model warm-up failed: %s", exc)
+        settings = replace(settings, keep_alive=PINNED_KEEP_ALIVE)
+
+    work_started = time.perf_counter()
+    completed = 0
+    collected: dict[int, list[ChapterOutcome]] = {}
+    units = _document_units(request, settings, cancel, result, span)
+    try:
+        for index, outcomes in units:
+            collected[index] = outcomes
+            for outcome in outcomes:
+                completed += 1
+                outcome.completed = completed
+                outcome.total = total
+                if total is not None:
+                    rate = (time.perf_counter() - work_started) / completed
+                    outcome.eta = max(0, total - completed) * rate
+                yield outcome
+    except GeneratorExit:
+        cancel.cancel("Run abandoned")
+        span.record_error("Run abandoned")
+        span.end()
+        raise
+    finally:
+        units.close()
+        if cancel is not request.cancel_token:
+            cancel.close()
+        if pinned:
+            try:
+                release_model(replace(request.settings, context_window=settings.context_window))
+            except LLMError as exc:
+                logger.warning("Failed to release model: %s", exc)
+
+    for index in sorted(collected):
+        for outcome in collected[index]:
+            result._record(outcome)
+    result.cancelled = cancel.cancelled
+    result.elapsed = time.perf_counter() - started
+    span.set(
+        written=len(result.written),
+        failed=len(result.failures),
+        skipped=len(result.skipped),
+        cancelled=result.cancelled,
+    )
+    span.end()
+    if result.cancelled:
+        logger.warning(
+            "Documentation stopped (%s): %d chapter(s) skipped",
+            cancel.reason,
+            len(result.skipped),
+        )
+
+
+def _document_units(
+    request: DocumentGenerationRequest,
+    settings: LLMSettings,
+    cancel: CancellationToken,
+    result: DocumentGenerationResult,
+    run_span: Any = None,
+) -> Iterator[tuple[int, list[ChapterOutcome]]]:
+    """Yield ``(unit index, outcomes)`` as each chapter or pack finishes."""
+
+    slots = {
+        name.strip().lower(): threading.BoundedSemaphore(max(1, limit))
+        for name, limit in request.provider_limits.items()
+    }
+
+    def connect(target: LLMSettings) -> _BaseLLMClient:
+        client = create_client(target)
+        semaphore = slots.get(target.normalized_provider())
+        return _BoundedClient(client, semaphore) if semaphore is not None else client
+
+    client = connect(settings)
+    if request.failover and settings.fallbacks:
+        client = FailoverClient([client, *(connect(fallback) for fallback in settings.fallbacks)])
+        result.failovers = client.events
+    if request.hedge and settings.fallbacks:
+        client = HedgedClient(client, [connect(backup) for backup in settings.fallbacks])
+        result.hedge_stats = client.stats
+    template = request.prompt_template or PROMPT_TEMPLATE
+    template_tokens = estimate_tokens_from_size(len(template))
+    scheduler = ChapterScheduler(
+        max_tokens=settings.max_tokens,
+        longest_first=request.longest_first,
+    )
+    condition = threading.Condition()
+
+    provider = settings.normalized_provider()
+    limiter = rate_limiter(settings)
+    tracer = get_tracer()
+    estimator = get_estimator(settings.tokenizer)
+    context_window = settings.resolved_context_window()
+
+    def send(prompt: Prompt, max_tokens: int) -> GenerationResult:
+        """Send one request, backing off while the provider rate-limits it."""
+
+        attempt = 0
+        while True:
+            if limiter is not None:
+                limiter.acquire(cancel)
+            try:
+                return client.generate(prompt, max_tokens=max_tokens, cancel=cancel)
+            except LLMRateLimited as exc:
+                if attempt >= RATE_LIMIT_RETRIES:
+                    raise
+                delay = _retry_delay(attempt, exc.retry_after)
+                attempt += 1
+                logger.info("Rate limited (%s); retrying in %.1fs", exc, delay)
+                if cancel.wait(delay):
+                    raise LLMCancelled(cancel.reason) from exc
+
+    def generate_budgeted(
+        name: str,
+        content: str,
+        prompt_tokens: int,
+        allow_chunking: bool = True,
+        instructions: str = "",
+        max_tokens: int | None = None,
+    ) -> list[GenerationResult]:
+        """Preflight the prompt locally and chunk it if it cannot fit the context."""
+
+        prompt = build_prompt(name, content, template)
+        if instructions:
+            prompt = Prompt(prefix=prompt.prefix, suffix=prompt.suffix + instructions)
+        raw_tokens = estimator.tokenizer.count(prompt.text)
+        content_tokens = estimator.estimate(content, provider)
+        budget = plan_budget(
+            prompt_tokens=round(raw_tokens * estimator.factor(provider)),
+            content_tokens=content_tokens,
+            context_window=context_window,
+            max_tokens=max_tokens or settings.max_tokens,
+            adaptive=settings.adaptive_max_tokens,
+        )
+        if budget.fits:
+            with tracer.span(
+                "llm.request",
+                provider=provider,
+                model=settings.model,
+                prompt_tokens=budget.prompt_tokens,
+                max_tokens=budget.max_tokens,
+            ) as span:
+                generation = send(prompt, budget.max_tokens)
+                span.set(
+                    served_by=generation.provider,
+                    input_tokens=generation.input_tokens,
+                    output_tokens=generation.output_tokens,
+                    cached_input_tokens=generation.cached_input_tokens or None,
+                    time_to_first_token=generation.time_to_first_token,
+                    tokens_per_second=generation.tokens_per_second,
+                    hedged=generation.hedged or None,
+                    coalesced=generation.coalesced or None,
+                )
+            if not generation.hedged and generation.provider == provider:
+                estimator.calibrate(provider, raw_tokens, generation.input_tokens)
+            with condition:
+                scheduler.record(prompt_tokens, generation)
+            return [generation]
+        if not allow_chunking:
+            raise LLMError(f"{name} does not fit the {context_window}-token context window")
+
+        overhead = budget.prompt_tokens - content_tokens
+        output_reserve = max(settings.max_tokens, MIN_OUTPUT_TOKENS) - MIN_OUTPUT_TOKENS
+        capacity = budget.content_capacity - overhead - output_reserve
+        if capacity <= 0:
+            raise LLMError(
+                f"Prompt template does not fit the {context_window}-token context window"
+            )
+        chunks = split_to_budget(content, capacity, estimator, provider)
+        logger.warning(
+            "%s exceeds the %d-token context window; documenting it in %d parts",
+            name,
+            context_window,
+            len(chunks),
+        )
+        generations: list[GenerationResult] = []
+        for position, chunk in enumerate(chunks, start=1):
+            part_name = f"{name} (part {position} of {len(chunks)})"
+            part_tokens = overhead + estimator.estimate(chunk, provider)
+            generations.extend(
+                generate_budgeted(part_name, chunk, part_tokens, allow_chunking=False)
+            )
+        return generations
+
+    def write_docs(chapter: Path, markdown: str) -> Path | None:
+        if request.before_write is not None and not request.before_write(chapter):
+            return None
+        destination_dir = chapter.parent / request.destination_dirname
+        destination_dir.mkdir(parents=True, exist_ok=True)
+        destination = destination_dir / f"{chapter.stem}.docs.md"
+        destination.write_text(markdown, encoding="utf-8")
+        if request.search_index is not None:
+            request.search_index.add_documentation(destination, chapter)
+        return destination
+
+    def document_chapter(
+        chapter: Path, prompt_tokens: int, parent: Any = None
+    ) -> ChapterOutcome:
+        outcome = ChapterOutcome(chapter=chapter)
+        if cancel.cancelled:
+            outcome.cancelled = True
+            return outcome
+        with tracer.span("chapter", parent=parent or run_span, chapter=chapter.name) as span:
+            try:
+                chapter_text = chapter.read_text(encoding="utf-8")
+                span.set(bytes=len(chapter_text))
+                outcome.generations = generate_budgeted(
+                    chapter.name, chapter_text.strip(), prompt_tokens
+                )
+                markdown = "\n\n".join(generation.text for generation in outcome.generations)
+                if len(outcome.generations) > 1:
+                    markdown = (
+                        f"<!-- Documented in {len(outcome.generations)} parts: the chapter"
+                        f" exceeds the {context_window}-token context window. -->\n\n"
+                        + markdown
+                    )
+                outcome.destination = write_docs(chapter, markdown)
+                if outcome.destination is None:
+                    outcome.error = _DISCARDED
+            except LLMCancelled:
+                outcome.cancelled = True
+            except LLMError as exc:
+                outcome.error = str(exc)
+            except (OSError, ValueError) as exc:
+                # Unreadable chapter, e.g. one that is not valid UTF-8.
+                outcome.error = str(exc)
+            except Exception as exc:  # pragma: no cover - safety net
+                outcome.error = str(exc)
+            _trace_outcome(span, outcome)
+        return outcome
+
+    def document_pack(pack: ChapterPack, prompt_tokens: int) -> list[ChapterOutcome]:
+        """Document a pack in one request, falling back to one request per chapter."""
+
+        if cancel.cancelled:
+            return _cancelled_outcomes(pack)
+        with tracer.span("pack", parent=run_span, chapters=len(pack)) as span:
+            outcomes = _document_pack(pack, prompt_tokens, span)
+            span.set(
+                written=sum(1 for outcome in outcomes if outcome.succeeded),
+                failed=sum(1 for outcome in outcomes if outcome.error),
+            )
+        return outcomes
+
+    def _document_pack(
+        pack: ChapterPack, prompt_tokens: int, span: Any
+    ) -> list[ChapterOutcome]:
+        names = pack.names
+        generations: list[GenerationResult] = []
+        sections = None
+        try:
+            texts = [chapter.read_text(encoding="utf-8") for chapter in pack.chapters]
+            generations = generate_budgeted(
+                pack.name,
+                build_packed_content(list(zip(names, texts))),
+                prompt_tokens,
+                allow_chunking=False,
+                instructions=packed_instructions(names),
+                max_tokens=output_budget_for(pack, prompt_tokens),
+            )
+            sections = parse_packed_response(generations[0].text, names)
+        except LLMCancelled:
+            return _cancelled_outcomes(pack)
+        except (LLMError, OSError, ValueError) as exc:
+            # Each chapter is tried on its own, so only a broken one fails.
+            logger.info("Packed request for %s failed: %s", pack.name, exc)
+
+        if sections is None:
+            logger.info("Documenting %s individually", pack.name)
+            outcomes = [
+                document_chapter(chapter, prompt_tokens_for(chapter), parent=span)
+                for chapter in pack.chapters
+            ]
+        else:
+            outcomes = []
+            for chapter in pack.chapters:
+                outcome = ChapterOutcome(chapter=chapter)
+                try:
+                    outcome.destination = write_docs(chapter, sections[chapter.name])
+                    if outcome.destination is None:
+                        outcome.error = _DISCARDED
+                except OSError as exc:
+                    outcome.error = str(exc)
+                outcomes.append(outcome)
+        # The shared request is accounted to the first chapter of the pack.
+        outcomes[0].generations[:0] = generations
+        return outcomes
+
+    def document(unit: Path | ChapterPack, prompt_tokens: int) -> list[ChapterOutcome]:
+        if isinstance(unit, ChapterPack):
+            return document_pack(unit, prompt_tokens)
+        return [document_chapter(unit, prompt_tokens)]
+
+    def prompt_tokens_for(unit: Path | ChapterPack) -> int:
+        chapters = unit.chapters if isinstance(unit, ChapterPack) else (unit,)
+        tokens = template_tokens
+        for chapter in chapters:
+            try:
+                size = chapter.stat().st_size
+            except OSError:
+                size = 0
+            tokens += estimate_tokens_from_size(size)
+        return tokens
+
+    def output_budget_for(unit: Path | ChapterPack, prompt_tokens: int) -> int:
+        if isinstance(unit, ChapterPack):
+            return min(settings.max_tokens * len(unit), MAX_ADAPTIVE_OUTPUT_TOKENS)
+        return output_budget(
+            prompt_tokens - template_tokens, settings.max_tokens, settings.adaptive_max_tokens
+        )
+
+    units: Iterable[Path | ChapterPack] = request.chapters
+    if request.pack_small_chapters:
+        units = pack_chapters(request.chapters)
+
+    workers = max(1, request.max_workers or settings.resolved_provider().capabilities.max_concurrency)
+    if workers == 1:
+        # Keep iterating after a cancel so a pipelined ChapterQueue is drained
+        # and the splitter feeding it never blocks.
+        for index, unit in enumerate(units):
+            yield index, document(unit, 0 if cancel.cancelled else prompt_tokens_for(unit))
+    else:
+        yield from _run_concurrently(
+            units,
+            workers,
+            scheduler,
+            condition,
+            cancel,
+            document,
+            prompt_tokens_for,
+            output_budget_for,
+        )
+
+
+class _BoundedClient(_BaseLLMClient):
+    """Holds a slot of a per-provider semaphore while a request runs."""
+
+    def __init__(self, client: _BaseLLMClient, semaphore: threading.BoundedSemaphore) -> None:
+        super().__init__(client.settings)
+        self.client = client
+        self.provider = client.provider
+        self.semaphore = semaphore
+
+    def generate(
+        self,
+        prompt: Prompt | str,
+        max_tokens: int | None = None,
+        cancel: CancellationToken | None = None,
+        on_first_token: Callable[[], None] | None = None,
+    ) -> GenerationResult:
+        while not self.semaphore.acquire(timeout=0.1):
+            if cancel is not None and cancel.cancelled:
+                raise LLMCancelled(cancel.reason or "Cancelled")
+        try:
+            return self.client.generate(
+                prompt, max_tokens, cancel=cancel, on_first_token=on_first_token
+            )
+        finally:
+            self.semaphore.release()
+
+
+def _retry_delay(attempt: int, retry_after: float | None) -> float:
+    """Backoff before retry ``attempt`` (from 0), honouring ``Retry-After``."""
+
+    if retry_after is not None:
+        return min(retry_after, MAX_RETRY_DELAY)
+    # Jittered, so throttled workers do not come back in lockstep.
+    return min(RETRY_BACKOFF * 2**attempt, MAX_RETRY_DELAY) * random.uniform(0.5, 1.0)
+
+
+def _trace_outcome(span: Any, outcome: ChapterOutcome) -> None:
+    if not span.recording:
+        return
+    span.set(
+        parts=len(outcome.generations),
+        input_tokens=sum(generation.input_tokens or 0 for generation in outcome.generations),
+        output_tokens=sum(generation.output_tokens or 0 for generation in outcome.generations),
+        cancelled=outcome.cancelled or None,
+    )
+    if outcome.error:
+        span.record_error(outcome.error)
+
+
+def _run_concurrently(
+    units: Iterable[Path | ChapterPack],
+    workers: int,
+    scheduler: ChapterScheduler,
+    condition: threading.Condition,
+    cancel: CancellationToken,
+    document: Callable[[Path | ChapterPack, int], list[ChapterOutcome]],
+    prompt_tokens_for: Callable[[Path | ChapterPack], int],
+    output_budget_for: Callable[[Path | ChapterPack, int], int],
+) -> Iterator[tuple[int, list[ChapterOutcome]]]:
+    """Dispatch chapters to a worker pool, picking the costliest pending one first.
+
+    A feeder thread moves chapters from the (possibly blocking) source into
+    the scheduler. For unsized sources such as a ChapterQueue it only keeps a
+    small window pending, so a bounded queue still applies back-pressure to
+    the splitter; the longest-first choice is made within that window.
+    Finished chapters are yielded from the calling thread as they complete.
+
+    On cancellation pending chapters are dropped at once. Like the
+    single-worker path, the generator then keeps draining the source, so a
+    pipelined splitter is not blocked and every chapter is reported as
+    skipped, and ends once the source is exhausted and the (aborted)
+    in-flight requests have finished.
+    """
+
+    window = None if isinstance(units, Sized) else workers * 2
+    state = {"exhausted": False, "in_flight": 0}
+    errors: list[BaseException] = []
+    # Exceptions escaping ``document`` in a worker thread.
+    failures: list[BaseException] = []
+    completed: deque[tuple[int, list[ChapterOutcome]]] = deque()
+
+    def wake() -> None:
+        with condition:
+            condition.notify_all()
+
+    def feed() -> None:
+        try:
+            for index, chapter in enumerate(units):
+                if cancel.cancelled:
+                    with condition:
+                        completed.append((index, _cancelled_outcomes(chapter)))
+                        condition.notify_all()
+                    continue
+                tokens = prompt_tokens_for(chapter)
+                budget = output_budget_for(chapter, tokens)
+                with condition:
+                    while (
+                        window is not None
+                        and len(scheduler) >= window
+                        and not cancel.cancelled
+                    ):
+                        condition.wait()
+                    if cancel.cancelled:
+                        completed.append((index, _cancelled_outcomes(chapter)))
+                        continue
+                    scheduler.add(index, chapter, tokens, budget)
+                    condition.notify_all()
+        except BaseException as exc:  # pragma: no cover - propagated below
+            errors.append(exc)
+        finally:
+            with condition:
+                state["exhausted"] = True
+                condition.notify_all()
+
+    def run(index: int, chapter: Path | ChapterPack, tokens: int) -> None:
+        outcome = None
+        try:
+            outcome = document(chapter, tokens)
+        except BaseException as exc:  # raised to the caller below
+            failures.append(exc)
+        finally:
+            with condition:
+                if outcome is not None:
+                    completed.append((index, outcome))
+                state["in_flight"] -= 1
+                condition.notify_all()
+
+    def can_dispatch() -> bool:
+        return bool(len(scheduler)) and state["in_flight"] < workers
+
+    def drained() -> bool:
+        return state["exhausted"] and not len(scheduler) and not state["in_flight"]
+
+    def actionable() -> bool:
+        if completed or failures or drained():
+            return True
+        if cancel.cancelled:
+            return bool(len(scheduler))
+        return can_dispatch()
+
+    unregister = cancel.on_cancel(wake)
+    feeder = threading.Thread(target=feed, name="docalypt-chapter-feeder", daemon=True)
+    feeder.start()
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            while True:
+                item = None
+                with condition:
+                    condition.wait_for(actionable)
+                    if failures:
+                        raise failures[0]
+                    ready = list(completed)
+                    completed.clear()
+                    if cancel.cancelled:
+                        for pending in scheduler.drain():
+                            ready.append((pending.index, _cancelled_outcomes(pending.chapter)))
+                    elif can_dispatch():
+                        item = scheduler.pop()
+                        state["in_flight"] += 1
+                        condition.notify_all()
+                    finished = item is None and drained() and not completed
+                if item is not None:
+                    pool.submit(run, item.index, item.chapter, item.prompt_tokens)
+                yield from ready
+                if finished:
+                    break
+    finally:
+        unregister()
+    feeder.join()
+    if errors:
+        raise errors[0]
 
 
 __all__ = [
+    "ChapterOutcome",
     "DOCUMENTATION_SUBDIR",
     "DocumentGenerationRequest",
     "DocumentGenerationResult",
+    "DocumentationRun",
     "LLMSettings",
     "OllamaSettings",
     "collect_chapter_files",
     "generate_documentation",
+    "iter_documentation",
 ]
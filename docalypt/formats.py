@@ -0,0 +1,222 @@
+"""Input adapters for caption formats.
+
+Each adapter streams a caption file into the ``(timestamp, snippet)``
+records the splitter works on, without converting it to a Markdown
+transcript first. Readers are chosen by file extension; further formats can
+be added with :func:`register_format`.
+"""
+
+from __future__ import annotations
+
+import json
+import re
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, TextIO
+
+Record = tuple[int, str]
+RecordReader = Callable[[TextIO], Iterator[Record]]
+
+# Caption cues last a few seconds each; they are merged into snippets of
+# about this length so chapters read like the Markdown transcripts.
+SNIPPET_SECONDS = 20
+MARKDOWN_SUFFIXES = (".md", ".markdown")
+_CHUNK_SIZE = 64 * 1024
+
+_CUE_TIME = re.compile(r"(?:(\d+):)?(\d{1,2}):(\d{2})(?:[.,](\d{1,3}))?")
+_TAG = re.compile(r"<[^>]*>|\{\\[^}]*\}")
+
+
+def _seconds(value: str) -> float:
+    match = _CUE_TIME.match(value.strip())
+    if not match:
+        raise ValueError(f"Invalid cue timestamp: {value!r}")
+    hours, minutes, seconds, fraction = match.groups()
+    return int(hours or 0) * 3600 + int(minutes) * 60 + int(seconds) + float(f"0.{fraction or 0}")
+
+
+def _clean(text: str) -> str:
+    return " ".join(_TAG.sub("", text).split())
+
+
+def _iter_cues(lines: Iterable[str]) -> Iterator[tuple[float, list[str]]]:
+    """Yield ``(start, text lines)`` for each cue of an SRT or WebVTT file."""
+
+    start: float | None = None
+    text: list[str] = []
+    for raw in lines:
+        line = raw.strip().lstrip("\ufeff")
+        if "-->" in line:
+            if start is not None and text:
+                yield start, text
+            start, text = _seconds(line.split("-->", 1)[0]), []
+        elif not line:
+            if start is not None and text:
+                yield start, text
+            start, text = None, []
+        elif start is not None:
+            cleaned = _clean(line)
+            if cleaned:
+                text.append(cleaned)
+    if start is not None and text:
+        yield start, text
+
+
+def read_srt(handle: TextIO) -> Iterator[Record]:
+    """Stream records from a SubRip (``.srt``) file."""
+
+    for start, lines in _iter_cues(handle):
+        yield int(start), " ".join(lines)
+
+
+def read_vtt(handle: TextIO) -> Iterator[Record]:
+    """Stream records from a WebVTT (``.vtt``) file.
+
+    Auto-generated YouTube captions "roll": every cue repeats the line shown
+    before it. Lines already emitted by the previous cue are dropped.
+    """
+
+    previous: list[str] = []
+    for start, lines in _iter_cues(handle):
+        fresh = [line for line in lines if line not in previous]
+        previous = lines
+        if fresh:
+            yield int(start), " ".join(fresh)
+
+
+def _iter_json_array(handle: TextIO, key: str) -> Iterator[object]:
+    """Decode the elements of a JSON array one at a time.
+
+    The array is either the whole document or the value of the first
+    ``key`` member, so large caption exports are never loaded whole.
+    """
+
+    decoder = json.JSONDecoder()
+    buffer = ""
+    position = 0
+
+    def fill() -> bool:
+        nonlocal buffer, position
+        chunk = handle.read(_CHUNK_SIZE)
+        if not chunk:
+            return False
+        buffer = buffer[position:] + chunk
+        position = 0
+        return True
+
+    fill()
+    # Find the start of the array.
+    member = re.compile(r'"%s"\s*:\s*\[' % re.escape(key))
+    while True:
+        stripped = buffer.lstrip("\ufeff \t\r\n")
+        if stripped.startswith("["):
+            position = len(buffer) - len(stripped) + 1
+            break
+        match = member.search(buffer)
+        if match:
+            position = match.end()
+            break
+        if not fill():
+            raise ValueError(f"No '{key}' array found in JSON captions")
+
+    while True:
+        while position < len(buffer) and buffer[position] in " \t\r\n,":
+            position += 1
+        if position >= len(buffer):
+            if not fill():
+                raise ValueError("Unterminated JSON caption array")
+            continue
+        if buffer[position] == "]":
+            return
+        try:
+            item, position = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            if not fill():
+                raise
+            continue
+        yield item
+
+
+def read_json(handle: TextIO) -> Iterator[Record]:
+    """Stream records from YouTube JSON captions.
+
+    Supports the ``json3`` timed-text format (``{"events": [{"tStartMs": …,
+    "segs": [{"utf8": …}]}]}``) and the list of ``{"start", "text"}`` objects
+    produced by common transcript downloaders.
+    """
+
+    for item in _iter_json_array(handle, "events"):
+        if not isinstance(item, dict):
+            continue
+        if "segs" in item:
+            start = (item.get("tStartMs") or 0) / 1000
+            segments = item.get("segs") or []
+            text = "".join(str(seg.get("utf8", "")) for seg in segments if isinstance(seg, dict))
+        elif "text" in item:
+            start = float(item.get("start") or 0)
+            text = str(item["text"])
+        else:
+            continue
+        text = _clean(text)
+        if text:
+            yield int(start), text
+
+
+def coalesce(records: Iterable[Record], seconds: int = SNIPPET_SECONDS) -> Iterator[Record]:
+    """Merge consecutive short records into snippets spanning ``seconds``."""
+
+    start: int | None = None
+    parts: list[str] = []
+    for timestamp, text in records:
+        if start is not None and timestamp - start >= seconds:
+            yield start, " ".join(parts)
+            start, parts = None, []
+        if start is None:
+            start = timestamp
+        parts.append(text)
+    if start is not None:
+        yield start, " ".join(parts)
+
+
+_READERS: Dict[str, RecordReader] = {
+    ".json": read_json,
+    ".srt": read_srt,
+    ".vtt": read_vtt,
+}
+
+
+def register_format(suffix: str, reader: RecordReader) -> None:
+    """Make the splitter read files ending in ``suffix`` with ``reader``."""
+
+    _READERS[suffix.lower()] = reader
+
+
+def reader_for(path: Path) -> RecordReader | None:
+    """Return the caption reader for ``path``, or ``None`` for Markdown."""
+
+    return _READERS.get(Path(path).suffix.lower())
+
+
+def supported_suffixes() -> tuple[str, ...]:
+    return MARKDOWN_SUFFIXES + tuple(sorted(_READERS))
+
+
+def read_records(path: Path, reader: RecordReader) -> Iterator[Record]:
+    """Stream coalesced records from a caption file."""
+
+    with Path(path).open(encoding="utf-8") as handle:
+        yield from coalesce(reader(handle))
+
+
+__all__ = [
+    "Record",
+    "RecordReader",
+    "SNIPPET_SECONDS",
+    "coalesce",
+    "read_json",
+    "read_records",
+    "read_srt",
+    "read_vtt",
+    "reader_for",
+    "register_format",
+    "supported_suffixes",
+]
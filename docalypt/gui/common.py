@@ -4,18 +4,20 @@ from __future__ import annotations
 
 import logging
 from pathlib import Path
-from typing import Sequence
+from typing import TYPE_CHECKING, Sequence
 
 from PySide6.QtCore import QObject, QThread, Signal
 from PySide6.QtWidgets import QTextEdit
 
-from ..documentation import (
-    DocumentGenerationRequest,
-    DocumentGenerationResult,
-    generate_documentation,
-)
-from ..llm import LLMError, LLMSettings, list_models
-from ..splitting import TranscriptSplitter
+from ..cancellation import CancellationToken
+from ..llm import LLMError, LLMSettings, list_running_models
+from ..pipeline import ChapterQueue
+
+if TYPE_CHECKING:  # pragma: no cover - annotations only
+    from ..catalog import ModelCatalog
+    from ..documentation import DocumentGenerationRequest
+    from ..search import SearchIndex
+    from ..splitting import TranscriptSplitter
 
 
 class QtLogHandler(logging.Handler):
@@ -52,36 +54,132 @@ class SplitWorker(QObject):
             self.error.emit(str(exc))
 
 
+def format_duration(seconds: float) -> str:
+    """Format a duration such as an ETA compactly (``"2m 05s"``)."""
+
+    seconds = max(0, int(round(seconds)))
+    hours, remainder = divmod(seconds, 3600)
+    minutes, seconds = divmod(remainder, 60)
+    if hours:
+        return f"{hours}h {minutes:02d}m"
+    if minutes:
+        return f"{minutes}m {seconds:02d}s"
+    return f"{seconds}s"
+
+
 class DocumentationWorker(QObject):
-    finished = Signal(DocumentGenerationResult)
+    # Carries the DocumentGenerationResult.
+    finished = Signal(object)
+    error = Signal(str)
     chapter_done = Signal(str, str)
     chapter_failed = Signal(str, str)
+    # Percent complete and ETA in seconds (both -1 when the total is unknown,
+    # e.g. while pipelined with the splitter) and the chapters finished so far.
+    progress = Signal(int, int, float)
 
     def __init__(self, request: DocumentGenerationRequest):
         super().__init__()
+        if request.cancel_token is None:
+            request.cancel_token = CancellationToken()
         self.request = request
 
+    def cancel(self) -> None:
+        """Stop the run; safe to call from the GUI thread while ``run`` blocks."""
+
+        self.request.cancel_token.cancel("Stopped by user")
+
+    def run(self) -> None:
+        from ..documentation import iter_documentation
+
+        try:
+            run = iter_documentation(self.request)
+            for outcome in run:
+                if outcome.succeeded:
+                    self.chapter_done.emit(outcome.chapter.name, str(outcome.destination))
+                elif not outcome.cancelled:
+                    self.chapter_failed.emit(
+                        outcome.chapter.name, outcome.error or "Unknown error"
+                    )
+                percent = -1 if outcome.progress is None else round(outcome.progress * 100)
+                eta = -1.0 if outcome.eta is None else outcome.eta
+                self.progress.emit(percent, outcome.completed, eta)
+            self.finished.emit(run.result)
+        except Exception as exc:  # pragma: no cover - runtime guard
+            self.error.emit(str(exc) or type(exc).__name__)
+        finally:
+            # A pipelined splitter must not block on chapters nobody reads.
+            if isinstance(self.request.chapters, ChapterQueue):
+                self.request.chapters.drain()
+
+
+class IndexRefreshWorker(QObject):
+    """Bring the search index up to date with files in a directory."""
+
+    finished = Signal(int)
+    failed = Signal(str)
+
+    def __init__(self, index: SearchIndex, root: Path):
+        super().__init__()
+        self.index = index
+        self.root = root
+
     def run(self) -> None:
-        result = generate_documentation(self.request)
-        for chapter, destination in result.written:
-            self.chapter_done.emit(chapter.name, str(destination))
-        for chapter, error in result.failures:
-            self.chapter_failed.emit(chapter.name, error)
-        self.finished.emit(result)
+        try:
+            self.finished.emit(self.index.refresh(self.root))
+        except Exception as exc:  # pragma: no cover - runtime guard
+            self.failed.emit(str(exc) or type(exc).__name__)
 
 
 class ModelListWorker(QObject):
-    finished = Signal(list)
+    """List models through the model catalogue.
+
+    ``models`` carries :class:`~docalypt.llm.ModelInfo` lists and may fire
+    twice: first with the cached catalogue, then with the refreshed one when
+    the cache was stale (or ``force`` is set).
+    """
+
+    models = Signal(list)
+    resident = Signal(list)
+    finished = Signal()
     failed = Signal(str)
 
-    def __init__(self, settings: LLMSettings):
+    def __init__(
+        self,
+        settings: LLMSettings,
+        force: bool = False,
+        catalog: ModelCatalog | None = None,
+    ):
         super().__init__()
         self.settings = settings
+        self.force = force
+        if catalog is None:
+            from ..catalog import default_catalog
+
+            catalog = default_catalog()
+        self.catalog = catalog
 
     def run(self) -> None:
         try:
-            models = list_models(self.settings)
-            self.finished.emit(models)
+            entry = self.catalog.cached(self.settings)
+            if entry is not None:
+                self.models.emit(entry.models)
+            if self.force or entry is None or entry.age > self.catalog.ttl:
+                try:
+                    fresh = self.catalog.refresh(self.settings)
+                except LLMError:
+                    if entry is None:
+                        raise
+                    logging.getLogger(__name__).warning(
+                        "Model list may be out of date; the provider did not answer"
+                    )
+                else:
+                    self.models.emit(fresh.models)
+            try:
+                running = list_running_models(self.settings)
+            except LLMError:
+                running = []
+            self.resident.emit(running)
+            self.finished.emit()
         except LLMError as exc:
             self.failed.emit(str(exc))
         except Exception as exc:  # pragma: no cover - safety net
@@ -90,7 +188,9 @@ class ModelListWorker(QObject):
 
 __all__ = [
     "DocumentationWorker",
+    "IndexRefreshWorker",
     "ModelListWorker",
     "QtLogHandler",
     "SplitWorker",
+    "format_duration",
 ]
@@ -5,7 +5,7 @@ from __future__ import annotations
 import logging
 from dataclasses import replace
 from pathlib import Path
-from typing import Optional
+from typing import Iterable, Optional
 
 from PySide6.QtCore import QThread
 from PySide6.QtWidgets import (
@@ -21,8 +21,15 @@ from PySide6.QtWidgets import (
     QWidget,
 )
 
-from ..documentation import DocumentGenerationRequest, collect_chapter_files
+from ..documentation import (
+    DocumentGenerationRequest,
+    DocumentGenerationResult,
+    collect_chapter_files,
+)
 from ..llm import settings_from_env
+from ..formats import supported_suffixes
+from ..pipeline import ChapterQueue
+from ..search import open_index
 from ..splitting import TranscriptSplitter
 from .common import DocumentationWorker, QtLogHandler, SplitWorker
 
@@ -43,6 +50,9 @@ class CompactWindow(QWidget):
         self._output_dir: Path = Path.cwd() / "chapters"
         self._split_thread: Optional[QThread] = None
         self._doc_thread: Optional[QThread] = None
+        self._doc_worker: Optional[DocumentationWorker] = None
+        self._search_index = open_index()
+        self._pipelined = False
 
         self._build_ui()
         self._apply_defaults()
@@ -71,6 +81,8 @@ class CompactWindow(QWidget):
         self.enable_ollama = QCheckBox(
             "Generate documentation with configured LLM"
         )
+        self.pipeline_check = QCheckBox("Document chapters while splitting")
+        self.pipeline_check.setChecked(True)
         self.model_edit = QLineEdit(DEFAULT_MODEL)
         self.model_edit.setPlaceholderText("Model name (e.g. llama3)")
 
@@ -84,12 +96,17 @@ class CompactWindow(QWidget):
         layout.addLayout(output_row)
         layout.addWidget(self.split_btn)
         layout.addWidget(self.enable_ollama)
+        layout.addWidget(self.pipeline_check)
         layout.addLayout(ollama_row)
         layout.addWidget(self.log_area, stretch=1)
 
         handler = QtLogHandler(self.log_area)
         handler.setFormatter(logging.Formatter("[%(asctime)s] %(message)s", "%H:%M:%S"))
-        self.logger.addHandler(handler)
+        # Attach to the package logger so core modules (e.g. model load
+        # timings from docalypt.llm) show up in the log panel as well.
+        package_logger = logging.getLogger("docalypt")
+        package_logger.setLevel(logging.INFO)
+        package_logger.addHandler(handler)
 
     def _apply_defaults(self) -> None:
         model = self._llm_defaults.model or DEFAULT_MODEL
@@ -104,7 +121,10 @@ class CompactWindow(QWidget):
 
     def _select_input(self) -> None:
         path, _ = QFileDialog.getOpenFileName(
-            self, "Select transcript", str(Path.cwd()), "Markdown files (*.md)"
+            self,
+            "Select transcript",
+            str(Path.cwd()),
+            "Transcripts (" + " ".join(f"*{suffix}" for suffix in supported_suffixes()) + ")",
         )
         if path:
             self._input = Path(path)
@@ -127,7 +147,21 @@ class CompactWindow(QWidget):
         self.split_btn.setEnabled(False)
         self.logger.info("Splitting transcript…")
 
-        splitter = TranscriptSplitter(self._input, self._output_dir)
+        splitter = TranscriptSplitter(
+            self._input, self._output_dir, search_index=self._search_index
+        )
+        self._pipelined = False
+        if (
+            self.enable_ollama.isChecked()
+            and self.pipeline_check.isChecked()
+            and self.model_edit.text().strip()
+            and not (self._doc_thread and self._doc_thread.isRunning())
+        ):
+            chapter_queue = ChapterQueue()
+            splitter.chapter_queue = chapter_queue
+            self._pipelined = True
+            self._start_documentation(chapter_queue)
+
         self._split_thread = QThread()
         worker = SplitWorker(splitter)
         worker.moveToThread(self._split_thread)
@@ -139,7 +173,7 @@ class CompactWindow(QWidget):
     def _on_split_finished(self, count: int, worker: SplitWorker) -> None:
         self.logger.info("Split finished: %d chapters", count)
         self.split_btn.setEnabled(True)
-        if self.enable_ollama.isChecked():
+        if self.enable_ollama.isChecked() and not self._pipelined:
             self._start_documentation()
         if self._split_thread:
             self._split_thread.quit()
@@ -156,27 +190,34 @@ class CompactWindow(QWidget):
             self._split_thread = None
         worker.deleteLater()
 
-    def _start_documentation(self) -> None:
+    def _start_documentation(self, chapters: Iterable[Path] | None = None) -> None:
         model = self.model_edit.text().strip()
         if not model:
             self.logger.error("Documentation skipped: missing model name")
             return
-        chapters = collect_chapter_files(self._output_dir)
-        if not chapters:
-            self.logger.warning("No chapters found for documentation")
-            return
+        if chapters is None:
+            chapters = collect_chapter_files(self._output_dir)
+            if not chapters:
+                self.logger.warning("No chapters found for documentation")
+                return
+            scope = f"for {len(chapters)} chapters"
+        else:
+            scope = "as chapters are split"
 
         settings = replace(self._llm_defaults, model=model)
-        request = DocumentGenerationRequest(chapters=chapters, settings=settings)
+        request = DocumentGenerationRequest(
+            chapters=chapters, settings=settings, search_index=self._search_index
+        )
         provider = (self._llm_defaults.provider or "ollama").capitalize()
         self.logger.info(
-            "Generating documentation with %s (%s) for %d chapters",
+            "Generating documentation with %s (%s) %s",
             model,
             provider,
-            len(chapters),
+            scope,
         )
 
         self.enable_ollama.setEnabled(False)
+        self.pipeline_check.setEnabled(False)
         self.model_edit.setEnabled(False)
 
         self._doc_thread = QThread()
@@ -189,32 +230,53 @@ class CompactWindow(QWidget):
         worker.chapter_failed.connect(
             lambda chapter, error: self.logger.error("Failed %s: %s", chapter, error)
         )
-        worker.finished.connect(lambda _: self._on_doc_finished(worker))
+        worker.finished.connect(lambda result: self._on_doc_finished(result, worker))
+        worker.error.connect(lambda message: self._on_doc_error(message, worker))
+        self._doc_worker = worker
         self._doc_thread.start()
 
-    def _on_doc_finished(self, worker: DocumentationWorker) -> None:
+    def _on_doc_finished(
+        self, result: DocumentGenerationResult, worker: DocumentationWorker
+    ) -> None:
         self.logger.info("Documentation finished")
+        if result.cancelled:
+            self.logger.warning("Stopped early; %d chapter(s) skipped", len(result.skipped))
+        if result.telemetry:
+            self.logger.info(result.describe_telemetry())
+            self.logger.info(result.cache_stats.summary())
+        self._end_documentation(worker)
+
+    def _on_doc_error(self, message: str, worker: DocumentationWorker) -> None:
+        self.logger.error("Documentation failed: %s", message)
+        self._end_documentation(worker)
+
+    def _end_documentation(self, worker: DocumentationWorker) -> None:
         self.enable_ollama.setEnabled(True)
+        self.pipeline_check.setEnabled(True)
         self.model_edit.setEnabled(True)
         if self._doc_thread:
             self._doc_thread.quit()
             self._doc_thread.wait()
             self._doc_thread = None
+        self._doc_worker = None
         worker.deleteLater()
 
     def _update_controls(self) -> None:
         enabled = self.enable_ollama.isChecked()
         self.model_edit.setEnabled(enabled)
+        self.pipeline_check.setEnabled(enabled)
         if enabled and not self.model_edit.text().strip():
             self.split_btn.setToolTip("Provide a model name or disable generation")
         else:
             self.split_btn.setToolTip("")
 
     def closeEvent(self, event) -> None:  
+        if self._doc_worker is not None:
+            self._doc_worker.cancel()
         for thread in (self._split_thread, self._doc_thread):
             if thread and thread.isRunning():
                 thread.quit()
-                thread.wait(500)
+                thread.wait(1500 if thread is self._doc_thread else 500)
         super().closeEvent(event)
 
 
@@ -4,10 +4,10 @@ from __future__ import annotations
 
 import logging
 from pathlib import Path
-from typing import Optional
+from typing import TYPE_CHECKING, Iterable, Optional
 
 from PySide6.QtGui import QIcon
-from PySide6.QtCore import Qt, QThread, Signal
+from PySide6.QtCore import Qt, QThread, QTimer, QUrl, Signal
 from PySide6.QtGui import QDesktopServices, QDragEnterEvent, QDropEvent
 from PySide6.QtWidgets import (
     QApplication,
@@ -34,31 +34,52 @@ from PySide6.QtWidgets import (
     QMessageBox,
 )
 
-from ..documentation import (
-    DOCUMENTATION_SUBDIR,
-    DocumentGenerationRequest,
-    DocumentGenerationResult,
-    LLMSettings,
-    collect_chapter_files,
-)
 from ..llm import (
-    DEFAULT_ANTHROPIC_ENDPOINT,
     DEFAULT_ANTHROPIC_VERSION,
     DEFAULT_OLLAMA_ENDPOINT,
-    DEFAULT_OPENAI_ENDPOINT,
     PROMPT_TEMPLATE,
+    LLMError,
+    LLMSettings,
+    ModelInfo,
     settings_from_env,
 )
-from ..splitting import TranscriptSplitter
-from .common import DocumentationWorker, ModelListWorker, QtLogHandler, SplitWorker
+from ..formats import supported_suffixes
+from ..pipeline import ChapterQueue
+from .common import (
+    DocumentationWorker,
+    IndexRefreshWorker,
+    ModelListWorker,
+    QtLogHandler,
+    SplitWorker,
+    format_duration,
+)
+
+if TYPE_CHECKING:  # pragma: no cover - annotations only
+    from ..documentation import DocumentGenerationResult
+    from ..providers import Provider
+    from ..search import SearchIndex
+
+# The catalogue, providers, search index and documentation modules are
+# imported where they are first used so the window can appear without them.
 
 DEFAULT_MODEL = "llama3"
-DOCS_SUBDIR = DOCUMENTATION_SUBDIR
-PROVIDER_OPTIONS = [
-    ("Local Ollama", "ollama"),
-    ("OpenAI compatible", "openai"),
-    ("Anthropic Claude", "anthropic"),
-]
+
+
+def _find_provider(provider: str) -> Provider | None:
+    from ..providers import find_provider
+
+    return find_provider(provider)
+
+
+def _describe_model(info: ModelInfo | None) -> str:
+    """Tooltip text with the capabilities a provider reported for a model."""
+
+    if info is None:
+        return ""
+    parts = [info.parameter_size, info.quantization]
+    if info.context_length:
+        parts.append(f"{info.context_length:,}-token context")
+    return " · ".join(filter(None, parts))
 
 
 class MainWindow(QMainWindow):
@@ -77,7 +98,6 @@ class MainWindow(QMainWindow):
         self.logger = logging.getLogger("docalypt.gui")
         self.logger.setLevel(logging.INFO)
 
-        self._default_llm_settings = settings_from_env()
         self._input_path: Optional[Path] = None
         self._output_dir: Path = Path.cwd() / "chapters"
         self._split_thread: Optional[QThread] = None
@@ -87,12 +107,40 @@ class MainWindow(QMainWindow):
         self._model_thread: Optional[QThread] = None
         self._model_worker: Optional[ModelListWorker] = None
         self._available_models: list[str] = []
+        self._model_details: dict[str, ModelInfo] = {}
+        self._resident_models: set[str] = set()
         self._pending_model_provider: Optional[str] = None
+        self._last_result: Optional[DocumentGenerationResult] = None
+        self._index_thread: Optional[QThread] = None
+        self._index_worker: Optional[IndexRefreshWorker] = None
+        # Opened in _finish_startup, together with the provider registry.
+        self._search_index: Optional[SearchIndex] = None
+        self._provider_options: list[tuple[str, str]] = []
 
         self._build_ui()
-        self._apply_default_settings()
         self._connect_signals()
+        # The LLM panel is by far the largest part of the window; it is built
+        # once the event loop runs so the window appears without waiting for it.
+        QTimer.singleShot(0, self._finish_startup)
+
+    def _finish_startup(self) -> None:
+        from ..providers import available_providers
+        from ..search import open_index
+
+        self._search_index = open_index()
+        self.search_edit.setEnabled(self._search_index is not None)
+        # Scans the plugin entry points, so it is kept out of module import.
+        self._provider_options = [
+            (provider.label, provider.name) for provider in available_providers()
+        ]
+        self._default_llm_settings = settings_from_env()
+        self._build_llm_panel()
+        self._apply_default_settings()
+        self._connect_llm_signals()
         self._refresh_chapter_list()
+        # Show the cached catalogue right away; the refresh below only
+        # touches the network when it has gone stale.
+        self._show_cached_models()
         self._update_doc_controls()
         self._refresh_models()
 
@@ -103,12 +151,14 @@ class MainWindow(QMainWindow):
         layout = QVBoxLayout(central)
 
         toolbar = QHBoxLayout()
-        self.open_btn = QPushButton("📂 Open Markdown…")
+        self.open_btn = QPushButton("📂 Open Transcript…")
         self.output_btn = QPushButton("📁 Output Folder…")
         self.split_btn = QPushButton("🚀 Split Transcript")
         self.open_folder_btn = QPushButton("📂 Reveal Output")
         self.clear_log_btn = QPushButton("🧹 Clear Log")
         self.save_log_btn = QPushButton("💾 Save Log…")
+        self.export_metrics_btn = QPushButton("📊 Export Metrics…")
+        self.export_metrics_btn.setEnabled(False)
         for button in (
             self.open_btn,
             self.output_btn,
@@ -116,10 +166,26 @@ class MainWindow(QMainWindow):
             self.open_folder_btn,
             self.clear_log_btn,
             self.save_log_btn,
+            self.export_metrics_btn,
         ):
             toolbar.addWidget(button)
         layout.addLayout(toolbar)
 
+        self.search_edit = QLineEdit()
+        self.search_edit.setPlaceholderText("🔎 Search chapters and documentation…")
+        self.search_edit.setClearButtonEnabled(True)
+        self.search_edit.setEnabled(False)
+        layout.addWidget(self.search_edit)
+        self.search_results = QListWidget()
+        self.search_results.setMaximumHeight(180)
+        self.search_results.setToolTip("Double-click a result to open it.")
+        self.search_results.hide()
+        layout.addWidget(self.search_results)
+        # Query after a short pause in typing rather than on every keystroke.
+        self._search_timer = QTimer(self)
+        self._search_timer.setSingleShot(True)
+        self._search_timer.setInterval(150)
+
         self.progress = QProgressBar()
         self.progress.hide()
         layout.addWidget(self.progress)
@@ -127,6 +193,16 @@ class MainWindow(QMainWindow):
         self.log_area = QTextEdit(readOnly=True)
         layout.addWidget(self.log_area, stretch=1)
 
+        handler = QtLogHandler(self.log_area)
+        handler.setFormatter(logging.Formatter("[%(asctime)s] %(message)s", "%H:%M:%S"))
+        # Attach to the package logger so core modules (e.g. model load
+        # timings from docalypt.llm) show up in the log panel as well.
+        package_logger = logging.getLogger("docalypt")
+        package_logger.setLevel(logging.INFO)
+        package_logger.addHandler(handler)
+
+    def _build_llm_panel(self) -> None:
+        layout = self.centralWidget().layout()
         self.ollama_group = QGroupBox("LLM Provider")
         ollama_layout = QVBoxLayout(self.ollama_group)
 
@@ -135,6 +211,14 @@ class MainWindow(QMainWindow):
         )
         ollama_layout.addWidget(self.enable_ollama)
 
+        self.pipeline_check = QCheckBox(
+            "Document chapters while splitting (pipelined)"
+        )
+        self.pipeline_check.setToolTip(
+            "Start documenting each chapter as soon as the splitter writes it."
+        )
+        ollama_layout.addWidget(self.pipeline_check)
+
         self.ollama_tabs = QTabWidget()
         ollama_layout.addWidget(self.ollama_tabs)
 
@@ -143,7 +227,7 @@ class MainWindow(QMainWindow):
         form = QFormLayout()
 
         self.provider_combo = QComboBox()
-        for label, value in PROVIDER_OPTIONS:
+        for label, value in self._provider_options:
             self.provider_combo.addItem(label, value)
         form.addRow("Provider", self.provider_combo)
 
@@ -181,6 +265,18 @@ class MainWindow(QMainWindow):
         version_layout.addWidget(self.version_edit)
         form.addRow("API version", self.version_row)
 
+        self.keep_alive_edit = QLineEdit()
+        self.keep_alive_edit.setPlaceholderText("Server default (e.g. 10m, -1 to pin)")
+        self.keep_alive_row = QWidget()
+        keep_alive_layout = QHBoxLayout(self.keep_alive_row)
+        keep_alive_layout.setContentsMargins(0, 0, 0, 0)
+        keep_alive_layout.addWidget(self.keep_alive_edit)
+        form.addRow("Keep alive", self.keep_alive_row)
+
+        self.prompt_cache_check = QCheckBox("Reuse the static prompt prefix across chapters")
+        self.prompt_cache_check.setChecked(True)
+        form.addRow("Prompt caching", self.prompt_cache_check)
+
         self.temperature_spin = QDoubleSpinBox()
         self.temperature_spin.setRange(0.0, 2.0)
         self.temperature_spin.setDecimals(2)
@@ -200,6 +296,16 @@ class MainWindow(QMainWindow):
         self.max_tokens_spin.setValue(800)
         form.addRow("Max tokens", self.max_tokens_spin)
 
+        self.adaptive_tokens_check = QCheckBox("Scale max tokens with chapter size")
+        self.adaptive_tokens_check.setChecked(True)
+        form.addRow("Adaptive budget", self.adaptive_tokens_check)
+
+        self.context_window_spin = QSpinBox()
+        self.context_window_spin.setRange(0, 1_000_000)
+        self.context_window_spin.setSingleStep(1024)
+        self.context_window_spin.setSpecialValueText("Provider default")
+        form.addRow("Context window", self.context_window_spin)
+
         self.presence_penalty_spin = QDoubleSpinBox()
         self.presence_penalty_spin.setRange(-2.0, 2.0)
         self.presence_penalty_spin.setDecimals(2)
@@ -226,6 +332,21 @@ class MainWindow(QMainWindow):
         self.top_k_spin.setValue(40)
         form.addRow("Top_k", self.top_k_spin)
 
+        self.concurrency_spin = QSpinBox()
+        self.concurrency_spin.setRange(1, 16)
+        self.concurrency_spin.setValue(1)
+        form.addRow("Concurrent requests", self.concurrency_spin)
+
+        self.pack_check = QCheckBox("Pack small chapters into shared requests")
+        self.pack_check.setToolTip(
+            "Intros, outros and other short chapters are documented together in one "
+            "request and split back into separate files."
+        )
+        form.addRow("Packing", self.pack_check)
+
+        self.hedge_check = QCheckBox("Hedge slow requests to fallback endpoints")
+        form.addRow("Hedging", self.hedge_check)
+
         settings_layout.addLayout(form)
         settings_layout.addStretch(1)
 
@@ -251,20 +372,26 @@ class MainWindow(QMainWindow):
         doc_toolbar = QHBoxLayout()
         self.select_all_btn = QPushButton("Select all")
         self.generate_docs_btn = QPushButton("Generate documentation")
+        self.stop_docs_btn = QPushButton("Stop")
+        self.stop_docs_btn.setEnabled(False)
+        self.stop_docs_btn.setToolTip(
+            "Skip the remaining chapters and abort requests in flight."
+        )
         doc_toolbar.addWidget(self.select_all_btn)
         doc_toolbar.addWidget(self.generate_docs_btn)
+        doc_toolbar.addWidget(self.stop_docs_btn)
         ollama_layout.addLayout(doc_toolbar)
 
-        layout.insertWidget(2, self.ollama_group)
+        self.doc_progress = QProgressBar()
+        self.doc_progress.hide()
+        ollama_layout.addWidget(self.doc_progress)
 
-        handler = QtLogHandler(self.log_area)
-        handler.setFormatter(logging.Formatter("[%(asctime)s] %(message)s", "%H:%M:%S"))
-        self.logger.addHandler(handler)
+        layout.insertWidget(4, self.ollama_group)
 
     def _apply_default_settings(self) -> None:
         settings = self._default_llm_settings
         provider = (settings.provider or "ollama").strip().lower()
-        valid_providers = {value for _, value in PROVIDER_OPTIONS}
+        valid_providers = {value for _, value in self._provider_options}
         if provider not in valid_providers:
             provider = "ollama"
         index = self.provider_combo.findData(provider)
@@ -293,6 +420,11 @@ class MainWindow(QMainWindow):
         else:
             self.version_edit.setText(DEFAULT_ANTHROPIC_VERSION)
 
+        self.keep_alive_edit.setText(settings.keep_alive or "")
+        self.context_window_spin.setValue(settings.context_window or 0)
+        self.adaptive_tokens_check.setChecked(settings.adaptive_max_tokens)
+        self.prompt_cache_check.setChecked(settings.prompt_caching)
+
         self._apply_provider_fields()
 
     def _apply_provider_fields(self) -> None:
@@ -305,6 +437,7 @@ class MainWindow(QMainWindow):
 
         self.api_key_row.setVisible(requires_key)
         self.version_row.setVisible(is_anthropic)
+        self.keep_alive_row.setVisible(self._provider_keeps_models(provider))
 
         if is_anthropic and not self.version_edit.text().strip():
             self.version_edit.setText(DEFAULT_ANTHROPIC_VERSION)
@@ -316,18 +449,26 @@ class MainWindow(QMainWindow):
         return "ollama"
 
     def _default_endpoint_for(self, provider: str) -> str:
-        if provider == "openai":
-            return DEFAULT_OPENAI_ENDPOINT
-        if provider == "anthropic":
-            return DEFAULT_ANTHROPIC_ENDPOINT
-        return DEFAULT_OLLAMA_ENDPOINT
+        entry = _find_provider(provider)
+        return entry.default_endpoint if entry else DEFAULT_OLLAMA_ENDPOINT
 
     @staticmethod
     def _provider_requires_key(provider: str) -> bool:
-        return provider in {"openai", "anthropic"}
+        entry = _find_provider(provider)
+        return bool(entry and entry.requires_api_key)
+
+    @staticmethod
+    def _provider_lists_models(provider: str) -> bool:
+        entry = _find_provider(provider)
+        return bool(entry and entry.capabilities.model_listing)
+
+    @staticmethod
+    def _provider_keeps_models(provider: str) -> bool:
+        entry = _find_provider(provider)
+        return bool(entry and entry.capabilities.model_residency)
 
     def _provider_label(self, provider: str) -> str:
-        for label, value in PROVIDER_OPTIONS:
+        for label, value in self._provider_options:
             if value == provider:
                 return label
         return provider.capitalize()
@@ -339,13 +480,20 @@ class MainWindow(QMainWindow):
         self.open_folder_btn.clicked.connect(self._reveal_output)
         self.clear_log_btn.clicked.connect(self.log_area.clear)
         self.save_log_btn.clicked.connect(self._save_log)
+        self.export_metrics_btn.clicked.connect(self._export_metrics)
+        self.search_edit.textChanged.connect(self._search_timer.start)
+        self._search_timer.timeout.connect(self._run_search)
+        self.search_results.itemDoubleClicked.connect(self._open_search_result)
+
+    def _connect_llm_signals(self) -> None:
         self.enable_ollama.stateChanged.connect(self._update_doc_controls)
         self.provider_combo.currentIndexChanged.connect(self._on_provider_changed)
         self.model_combo.currentTextChanged.connect(self._update_doc_controls)
         self.chapter_list.itemSelectionChanged.connect(self._update_doc_controls)
         self.select_all_btn.clicked.connect(self._select_all)
         self.generate_docs_btn.clicked.connect(self._start_documentation)
-        self.refresh_models_btn.clicked.connect(self._refresh_models)
+        self.stop_docs_btn.clicked.connect(self._stop_documentation)
+        self.refresh_models_btn.clicked.connect(lambda: self._refresh_models(force=True))
         self.reset_prompt_btn.clicked.connect(self._reset_prompt)
 
     # Drag & drop --------------------------------------------------------
@@ -358,7 +506,7 @@ class MainWindow(QMainWindow):
         if not urls:
             return
         path = Path(urls[0].toLocalFile())
-        if path.suffix.lower() == ".md":
+        if path.suffix.lower() in supported_suffixes():
             self._load_markdown(path)
 
     # Actions ------------------------------------------------------------
@@ -367,7 +515,7 @@ class MainWindow(QMainWindow):
             self,
             "Select transcript",
             str(Path.cwd()),
-            "Markdown files (*.md)",
+            "Transcripts (" + " ".join(f"*{suffix}" for suffix in supported_suffixes()) + ")",
         )
         if path:
             self._load_markdown(Path(path))
@@ -400,7 +548,26 @@ class MainWindow(QMainWindow):
             self.logger.warning("A split operation is already running")
             return
 
-        splitter = TranscriptSplitter(self._input_path, self._output_dir)
+        from ..splitting import TranscriptSplitter
+
+        splitter = TranscriptSplitter(
+            self._input_path, self._output_dir, search_index=self._search_index
+        )
+        if self.pipeline_check.isChecked() and self.enable_ollama.isChecked():
+            if self._doc_thread and self._doc_thread.isRunning():
+                self.logger.warning(
+                    "Documentation is already running; splitting without pipelining"
+                )
+            elif self._documentation_ready():
+                workers = int(self.concurrency_spin.value())
+                chapter_queue = ChapterQueue(maxsize=workers * 2)
+                splitter.chapter_queue = chapter_queue
+                self._launch_documentation(chapter_queue, "as chapters are split")
+            else:
+                self.logger.warning(
+                    "Pipelined documentation skipped: provide a model and API key"
+                )
+
         thread = QThread(self)
         worker = SplitWorker(splitter)
         worker.moveToThread(thread)
@@ -451,18 +618,95 @@ class MainWindow(QMainWindow):
             Path(path).write_text(self.log_area.toPlainText(), encoding="utf-8")
             self.logger.info("Log saved to %s", path)
 
+    def _export_metrics(self) -> None:
+        if not self._last_result:
+            return
+        path, _ = QFileDialog.getSaveFileName(
+            self,
+            "Export LLM metrics",
+            "docalypt-metrics.json",
+            "JSON files (*.json)",
+        )
+        if path:
+            self._last_result.export_telemetry(Path(path))
+            self.logger.info("Metrics exported to %s", path)
+
+    # Search -------------------------------------------------------------
+    def _run_search(self) -> None:
+        from ..search import SearchError
+
+        self.search_results.clear()
+        query = self.search_edit.text().strip()
+        if not query or self._search_index is None:
+            self.search_results.hide()
+            return
+        try:
+            hits = self._search_index.search(query, limit=50)
+        except SearchError as exc:
+            self.logger.warning("%s", exc)
+            hits = []
+        for hit in hits:
+            location = f" @ {hit.position}" if hit.position else ""
+            item = QListWidgetItem(
+                f"[{hit.kind}] {hit.transcript} – {hit.title}{location}\n    {hit.snippet}"
+            )
+            item.setData(Qt.UserRole, hit.path)
+            item.setToolTip(str(hit.path))
+            self.search_results.addItem(item)
+        if not hits:
+            self.search_results.addItem("No matches")
+        self.search_results.show()
+
+    def _open_search_result(self, item: QListWidgetItem) -> None:
+        path = item.data(Qt.UserRole)
+        if path:
+            QDesktopServices.openUrl(QUrl.fromLocalFile(str(path)))
+
     # Documentation ------------------------------------------------------
     def _refresh_chapter_list(self) -> None:
+        from ..documentation import collect_chapter_files
+
         self.chapter_list.clear()
         if not self._output_dir.exists():
             self._update_doc_controls()
             return
+        self._refresh_index()
         for chapter in collect_chapter_files(self._output_dir):
             item = QListWidgetItem(chapter.name)
             item.setData(Qt.UserRole, chapter)
             self.chapter_list.addItem(item)
         self._update_doc_controls()
 
+    def _refresh_index(self) -> None:
+        """Index files written outside Docalypt without blocking the window."""
+
+        if self._search_index is None:
+            return
+        if self._index_thread is not None and self._index_thread.isRunning():
+            return
+        worker = IndexRefreshWorker(self._search_index, self._output_dir)
+        thread = QThread(self)
+        self._index_worker = worker
+        self._index_thread = thread
+        worker.moveToThread(thread)
+        thread.started.connect(worker.run)
+        worker.failed.connect(self._on_index_failed)
+        worker.finished.connect(thread.quit)
+        worker.failed.connect(thread.quit)
+        thread.finished.connect(self._cleanup_index_thread)
+        thread.start()
+
+    def _on_index_failed(self, message: str) -> None:
+        self.logger.warning("Could not update the search index: %s", message)
+
+    def _cleanup_index_thread(self) -> None:
+        if self._index_worker:
+            self._index_worker.deleteLater()
+            self._index_worker = None
+        if self._index_thread:
+            self._index_thread.deleteLater()
+            self._index_thread = None
+
     def _select_all(self) -> None:
         for index in range(self.chapter_list.count()):
             self.chapter_list.item(index).setSelected(True)
@@ -482,55 +726,82 @@ class MainWindow(QMainWindow):
 
     def _on_provider_changed(self) -> None:
         self._apply_provider_fields()
-        provider = self._current_provider()
-        if provider != "ollama" and self._available_models:
-            self._available_models = []
-            self._apply_model_choices([])
+        self._show_cached_models()
         self._update_doc_controls()
 
-    def _refresh_models(self) -> None:
+    def _show_cached_models(self) -> None:
+        """Fill the model list from the catalogue cache, without network access."""
+
+        from ..catalog import default_catalog
+
+        try:
+            entry = default_catalog().cached(self._gather_settings(require_model=False))
+        except LLMError:
+            entry = None
+        models = entry.models if entry else []
+        if models or self._available_models:
+            self._set_models(models)
+
+    def _refresh_models(self, force: bool = False) -> None:
         if self._model_thread and self._model_thread.isRunning():
             return
         provider = self._current_provider()
-        if provider != "ollama":
+        if not self._provider_lists_models(provider):
             self.logger.info(
-                "Model listing is only available for local Ollama providers."
+                "%s does not support model listing.", self._provider_label(provider)
             )
             return
-        self.logger.info("Refreshing Ollama models…")
+        self.logger.info("Refreshing %s models…", self._provider_label(provider))
         self.refresh_models_btn.setEnabled(False)
         self.refresh_models_btn.setText("Refreshing…")
 
         self._pending_model_provider = provider
-        worker = ModelListWorker(self._gather_settings(require_model=False))
+        worker = ModelListWorker(self._gather_settings(require_model=False), force=force)
         thread = QThread(self)
         self._model_worker = worker
         self._model_thread = thread
         worker.moveToThread(thread)
         thread.started.connect(worker.run)
-        worker.finished.connect(self._handle_models_loaded)
+        worker.resident.connect(self._on_resident_models)
+        worker.models.connect(self._handle_models_loaded)
+        worker.finished.connect(self._handle_models_finished)
         worker.failed.connect(self._handle_models_failed)
         worker.finished.connect(thread.quit)
         worker.failed.connect(thread.quit)
         thread.finished.connect(self._finalize_model_refresh)
         thread.start()
 
-    def _handle_models_loaded(self, models: list[str]) -> None:
-        self._on_models_loaded(models)
+    def _handle_models_loaded(self, models: list[ModelInfo]) -> None:
+        self._set_models(models)
+
+    def _handle_models_finished(self) -> None:
+        self._on_models_loaded(self._available_models)
 
     def _handle_models_failed(self, message: str) -> None:
         self._on_models_failed(message)
 
     def _on_models_loaded(self, models: list[str]) -> None:
-        self._available_models = models
         provider = self._pending_model_provider or "ollama"
         label = self._provider_label(provider)
         if models:
             self.logger.info("Discovered %d model(s) from %s", len(models), label)
         else:
             self.logger.warning("No models were reported by %s", label)
+        # Re-apply so models found resident are highlighted.
         self._apply_model_choices(models)
 
+    def _set_models(self, models: list[ModelInfo]) -> None:
+        self._model_details = {model.name: model for model in models}
+        self._available_models = sorted(self._model_details)
+        self._apply_model_choices(self._available_models)
+
+    def _on_resident_models(self, models: list[str]) -> None:
+        self._resident_models = set(models)
+        if models:
+            self.logger.info("Resident in memory: %s", ", ".join(models))
+        else:
+            self.logger.info("No models are currently loaded in memory")
+
     def _on_models_failed(self, message: str) -> None:
         provider = self._pending_model_provider or "ollama"
         label = self._provider_label(provider)
@@ -542,6 +813,15 @@ class MainWindow(QMainWindow):
         self.model_combo.clear()
         if models:
             self.model_combo.addItems(models)
+            for index, name in enumerate(models):
+                tooltip = _describe_model(self._model_details.get(name))
+                if name in self._resident_models:
+                    font = self.model_combo.font()
+                    font.setBold(True)
+                    self.model_combo.setItemData(index, font, Qt.FontRole)
+                    tooltip = "; ".join(filter(None, ["Loaded in memory", tooltip]))
+                if tooltip:
+                    self.model_combo.setItemData(index, tooltip, Qt.ToolTipRole)
         if current_text:
             index = self.model_combo.findText(current_text)
             if index >= 0:
@@ -575,6 +855,7 @@ class MainWindow(QMainWindow):
         endpoint = self.endpoint_edit.text().strip() or None
         api_key = self.api_key_edit.text().strip() or None
         version = self.version_edit.text().strip() or None
+        keep_alive = self.keep_alive_edit.text().strip() or None
         settings = LLMSettings(
             provider=provider,
             model=model,
@@ -588,6 +869,11 @@ class MainWindow(QMainWindow):
             endpoint=endpoint,
             api_key=api_key,
             anthropic_version=version or None,
+            prompt_caching=self.prompt_cache_check.isChecked(),
+            keep_alive=keep_alive if self._provider_keeps_models(provider) else None,
+            context_window=int(self.context_window_spin.value()) or None,
+            adaptive_max_tokens=self.adaptive_tokens_check.isChecked(),
+            fallbacks=list(self._default_llm_settings.fallbacks),
         )
         if provider == "anthropic" and not settings.anthropic_version:
             settings.anthropic_version = DEFAULT_ANTHROPIC_VERSION
@@ -598,7 +884,7 @@ class MainWindow(QMainWindow):
         provider = self._current_provider()
         requires_key = self._provider_requires_key(provider)
         is_anthropic = provider == "anthropic"
-        is_ollama = provider == "ollama"
+        lists_models = self._provider_lists_models(provider)
         self._apply_provider_fields()
 
         has_model = bool(self.model_combo.currentText().strip())
@@ -613,10 +899,18 @@ class MainWindow(QMainWindow):
             self.temperature_spin,
             self.top_p_spin,
             self.max_tokens_spin,
+            self.adaptive_tokens_check,
+            self.context_window_spin,
             self.presence_penalty_spin,
             self.frequency_penalty_spin,
             self.repeat_penalty_spin,
             self.top_k_spin,
+            self.keep_alive_edit,
+            self.prompt_cache_check,
+            self.concurrency_spin,
+            self.pack_check,
+            self.hedge_check,
+            self.pipeline_check,
             self.chapter_list,
             self.select_all_btn,
             self.prompt_edit,
@@ -626,13 +920,21 @@ class MainWindow(QMainWindow):
             widget.setEnabled(enabled)
 
         self.api_key_edit.setEnabled(enabled and requires_key)
+        has_fallbacks = bool(self._default_llm_settings.fallbacks)
+        self.hedge_check.setEnabled(enabled and has_fallbacks)
+        self.hedge_check.setToolTip(
+            "Requests slower than usual to start are duplicated to the next fallback "
+            "and the first answer wins."
+            if has_fallbacks
+            else "Configure DOCALYPT_LLM_FALLBACKS to enable hedging."
+        )
         self.version_edit.setEnabled(enabled and is_anthropic)
 
-        self.refresh_models_btn.setVisible(is_ollama)
-        self.refresh_models_btn.setEnabled(enabled and is_ollama)
-        if not is_ollama:
+        self.refresh_models_btn.setVisible(lists_models)
+        self.refresh_models_btn.setEnabled(enabled and lists_models)
+        if not lists_models:
             self.refresh_models_btn.setToolTip(
-                "Model discovery is only available for local Ollama instances."
+                "This provider does not support model discovery."
             )
         else:
             self.refresh_models_btn.setToolTip("")
@@ -654,6 +956,20 @@ class MainWindow(QMainWindow):
 
         if self._model_thread and self._model_thread.isRunning():
             self.refresh_models_btn.setEnabled(False)
+        running = bool(self._doc_thread and self._doc_thread.isRunning())
+        if running:
+            self.generate_docs_btn.setEnabled(False)
+        self.stop_docs_btn.setEnabled(running)
+
+    def _documentation_ready(self) -> bool:
+        provider = self._current_provider()
+        has_model = bool(self.model_combo.currentText().strip())
+        has_key = (
+            bool(self.api_key_edit.text().strip())
+            if self._provider_requires_key(provider)
+            else True
+        )
+        return has_model and has_key
 
     def _start_documentation(self) -> None:
         if not self.enable_ollama.isChecked():
@@ -662,27 +978,40 @@ class MainWindow(QMainWindow):
         if not chapters:
             self.logger.warning("No chapters selected for documentation")
             return
+        if self._doc_thread and self._doc_thread.isRunning():
+            self.logger.warning("Documentation is already running")
+            return
+        self._launch_documentation(chapters, f"for {len(chapters)} chapters")
+
+    def _launch_documentation(self, chapters: Iterable[Path], scope: str) -> None:
+        from ..documentation import DOCUMENTATION_SUBDIR, DocumentGenerationRequest
+
         settings = self._gather_settings()
         prompt_template = self.prompt_edit.toPlainText().strip() or PROMPT_TEMPLATE
         request = DocumentGenerationRequest(
             chapters=chapters,
             settings=settings,
             prompt_template=prompt_template,
-            destination_dirname=DOCS_SUBDIR,
+            destination_dirname=DOCUMENTATION_SUBDIR,
+            max_workers=int(self.concurrency_spin.value()),
+            pack_small_chapters=self.pack_check.isChecked(),
+            hedge=self.hedge_check.isChecked(),
+            search_index=self._search_index,
         )
         self.logger.info(
-            "Generating documentation with %s (%s) for %d chapters…",
+            "Generating documentation with %s (%s) %s…",
             settings.model,
             self._provider_label(settings.provider),
-            len(chapters),
+            scope,
         )
         self.generate_docs_btn.setEnabled(False)
+        self.stop_docs_btn.setEnabled(True)
         self.chapter_list.setEnabled(False)
         self.select_all_btn.setEnabled(False)
-
-        if self._doc_thread and self._doc_thread.isRunning():
-            self.logger.warning("Documentation is already running")
-            return
+        self.doc_progress.setRange(0, 100)
+        self.doc_progress.setValue(0)
+        self.doc_progress.setFormat("Starting…")
+        self.doc_progress.show()
 
         thread = QThread(self)
         worker = DocumentationWorker(request)
@@ -691,30 +1020,72 @@ class MainWindow(QMainWindow):
         thread.started.connect(worker.run)
         worker.chapter_done.connect(self._on_chapter_documented)
         worker.chapter_failed.connect(self._on_chapter_failed)
+        worker.progress.connect(self._on_doc_progress)
         worker.finished.connect(self._on_generation_finished)
+        worker.error.connect(self._on_generation_error)
         worker.finished.connect(thread.quit)
+        worker.error.connect(thread.quit)
         thread.finished.connect(self._cleanup_doc_thread)
 
         self._doc_thread = thread
         self._doc_worker = worker
         thread.start()
 
+    def _stop_documentation(self) -> None:
+        if self._doc_worker is None:
+            return
+        self.logger.info("Stopping documentation…")
+        self.stop_docs_btn.setEnabled(False)
+        self._doc_worker.cancel()
+
     def _on_chapter_documented(self, chapter_name: str, output: str) -> None:
         self.logger.info("Documentation created for %s → %s", chapter_name, output)
 
     def _on_chapter_failed(self, chapter_name: str, error: str) -> None:
         self.logger.error("Failed to document %s: %s", chapter_name, error)
 
+    def _on_doc_progress(self, percent: int, completed: int, eta: float) -> None:
+        if percent < 0:
+            self.doc_progress.setRange(0, 0)
+            self.doc_progress.setFormat(f"{completed} chapter(s) documented")
+            return
+        self.doc_progress.setRange(0, 100)
+        self.doc_progress.setValue(percent)
+        if eta > 0:
+            self.doc_progress.setFormat(f"%p% – about {format_duration(eta)} left")
+        else:
+            self.doc_progress.setFormat("%p%")
+
     def _on_generation_finished(self, result: DocumentGenerationResult) -> None:
         self.logger.info(
             "Documentation generation finished (%d succeeded, %d failed)",
             len(result.written),
             len(result.failures),
         )
+        if result.cancelled:
+            self.logger.warning(
+                "Documentation stopped early; %d chapter(s) skipped", len(result.skipped)
+            )
+        if result.telemetry:
+            self.logger.info(result.describe_telemetry())
+            self.logger.info(result.cache_stats.summary())
+        self._last_result = result
+        self.export_metrics_btn.setEnabled(bool(result.telemetry or result.failures))
         if result.written:
-            target_dir = self._output_dir / DOCS_SUBDIR
+            from ..documentation import DOCUMENTATION_SUBDIR
+
+            target_dir = self._output_dir / DOCUMENTATION_SUBDIR
             self.logger.info("Documentation stored in %s", target_dir)
+        self._end_generation()
+
+    def _on_generation_error(self, message: str) -> None:
+        self.logger.error("Documentation generation failed: %s", message)
+        self._end_generation()
+
+    def _end_generation(self) -> None:
         self.generate_docs_btn.setEnabled(True)
+        self.stop_docs_btn.setEnabled(False)
+        self.doc_progress.hide()
         self.chapter_list.setEnabled(True)
         self.select_all_btn.setEnabled(True)
         self._refresh_chapter_list()
@@ -731,10 +1102,19 @@ class MainWindow(QMainWindow):
 
     # Qt lifecycle -------------------------------------------------------
     def closeEvent(self, event) -> None:  
-        for thread in (self._split_thread, self._doc_thread, self._model_thread):
+        # Aborting the documentation run first lets its thread exit promptly
+        # instead of holding the endpoint until the current request finishes.
+        if self._doc_worker is not None:
+            self._doc_worker.cancel()
+        for thread in (
+            self._split_thread,
+            self._doc_thread,
+            self._model_thread,
+            self._index_thread,
+        ):
             if thread and thread.isRunning():
                 thread.quit()
-                thread.wait(500)
+                thread.wait(1500 if thread is self._doc_thread else 500)
         super().closeEvent(event)
 
 
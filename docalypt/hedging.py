@@ -0,0 +1,222 @@
+"""Hedged LLM requests to cut tail latency.
+
+A request that has not produced its first token within an adaptive delay
+(by default the observed p95 time-to-first-token) is duplicated to a
+fallback endpoint. Whichever copy answers first is used and the other one
+is cancelled. The tokens spent on the losing copies are tracked so the
+latency win can be weighed against its cost.
+"""
+
+from __future__ import annotations
+
+import queue
+import threading
+import time
+from collections import deque
+from dataclasses import asdict, dataclass
+from typing import Callable, Dict, Sequence
+
+from .cancellation import CancellationToken
+from .llm import GenerationResult, LLMCancelled, Prompt, _BaseLLMClient
+
+HEDGE_QUANTILE = 0.95
+# Delay used until enough first-token samples have been observed.
+INITIAL_HEDGE_DELAY = 10.0
+MIN_HEDGE_DELAY = 0.5
+MIN_SAMPLES = 5
+SAMPLE_WINDOW = 200
+# How long to wait for a cancelled loser to report what it consumed.
+LOSER_GRACE = 2.0
+
+
+class LatencyTracker:
+    """Thread-safe sliding window of latency samples."""
+
+    def __init__(self, window: int = SAMPLE_WINDOW) -> None:
+        self._samples: deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._samples)
+
+    def add(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def quantile(self, fraction: float) -> float | None:
+        with self._lock:
+            ordered = sorted(self._samples)
+        if not ordered:
+            return None
+        index = min(len(ordered) - 1, max(0, round(fraction * (len(ordered) - 1))))
+        return ordered[index]
+
+
+@dataclass(slots=True)
+class HedgeStats:
+    """What hedging did during a run and what it cost in extra tokens.
+
+    Extra input tokens of a cancelled copy that never reported usage are
+    estimated from the winning copy.
+    """
+
+    requests: int = 0
+    hedged: int = 0
+    backup_wins: int = 0
+    extra_input_tokens: int = 0
+    extra_output_tokens: int = 0
+
+    def to_dict(self) -> Dict[str, int]:
+        return asdict(self)
+
+    def summary(self) -> str:
+        if not self.hedged:
+            return f"Hedging: none of {self.requests} request(s) needed a backup"
+        return (
+            f"Hedging: {self.hedged} of {self.requests} request(s) hedged "
+            f"({self.backup_wins} won by the backup), extra cost "
+            f"{self.extra_input_tokens:,} in / {self.extra_output_tokens:,} out tokens"
+        )
+
+
+class HedgedClient:
+    """Wrap a client so slow requests are raced against a fallback client."""
+
+    def __init__(
+        self,
+        primary: _BaseLLMClient,
+        backups: Sequence[_BaseLLMClient],
+        quantile: float = HEDGE_QUANTILE,
+        initial_delay: float = INITIAL_HEDGE_DELAY,
+    ) -> None:
+        self.primary = primary
+        self.backups = list(backups)
+        self.settings = primary.settings
+        self.provider = primary.provider
+        self.quantile = quantile
+        self.initial_delay = initial_delay
+        self.first_token_latency = LatencyTracker()
+        self.stats = HedgeStats()
+        self._lock = threading.Lock()
+        self._next_backup = 0
+
+    def hedge_delay(self) -> float:
+        """Seconds to wait for a first token before sending a duplicate."""
+
+        if len(self.first_token_latency) < MIN_SAMPLES:
+            return self.initial_delay
+        observed = self.first_token_latency.quantile(self.quantile) or self.initial_delay
+        return max(MIN_HEDGE_DELAY, observed)
+
+    def generate(
+        self,
+        prompt: Prompt | str,
+        max_tokens: int | None = None,
+        cancel: CancellationToken | None = None,
+        on_first_token: Callable[[], None] | None = None,
+    ) -> GenerationResult:
+        parent = cancel or CancellationToken()
+        outcomes: queue.Queue = queue.Queue()
+        progress = threading.Event()
+        forwarded = threading.Event()
+        tokens: list[CancellationToken] = []
+
+        def attempt(position: int, client: _BaseLLMClient) -> None:
+            started = time.perf_counter()
+
+            def first_token() -> None:
+                if position == 0:
+                    self.first_token_latency.add(time.perf_counter() - started)
+                progress.set()
+                if on_first_token is not None and not forwarded.is_set():
+                    forwarded.set()
+                    on_first_token()
+
+            try:
+                result = client.generate(
+                    prompt, max_tokens, cancel=tokens[position], on_first_token=first_token
+                )
+            except BaseException as exc:
+                outcomes.put((position, None, exc))
+            else:
+                outcomes.put((position, result, None))
+            progress.set()
+
+        def launch(client: _BaseLLMClient) -> None:
+            tokens.append(parent.child())
+            threading.Thread(
+                target=attempt,
+                args=(len(tokens) - 1, client),
+                name="docalypt-hedge",
+                daemon=True,
+            ).start()
+
+        launch(self.primary)
+        if self.backups and not progress.wait(self.hedge_delay()) and not parent.cancelled:
+            launch(self._pick_backup())
+
+        pending = len(tokens)
+        winner: tuple[int, GenerationResult] | None = None
+        error: BaseException | None = None
+        try:
+            while pending and winner is None:
+                position, result, exc = outcomes.get()
+                pending -= 1
+                if result is not None:
+                    winner = (position, result)
+                elif error is None:
+                    error = exc
+        finally:
+            # Cancelling a child also unregisters it from the parent, which
+            # may be a whole run's token: finished attempts are cancelled too.
+            for other, token in enumerate(tokens):
+                if winner is None or other != winner[0]:
+                    token.cancel("Lost the hedged race")
+            if winner is not None:
+                tokens[winner[0]].cancel("Hedged request finished")
+
+        hedged = len(tokens) > 1
+        with self._lock:
+            self.stats.requests += 1
+            if hedged:
+                self.stats.hedged += 1
+        if winner is None:
+            assert error is not None
+            raise error
+
+        position, result = winner
+        if position != 0:
+            result.hedged = True
+            with self._lock:
+                self.stats.backup_wins += 1
+        if pending:
+            self._account_losers(outcomes, pending, result)
+        return result
+
+    def _pick_backup(self) -> _BaseLLMClient:
+        with self._lock:
+            backup = self.backups[self._next_backup % len(self.backups)]
+            self._next_backup += 1
+        return backup
+
+    def _account_losers(self, outcomes: queue.Queue, pending: int, winner: GenerationResult) -> None:
+        for _ in range(pending):
+            try:
+                _, result, exc = outcomes.get(timeout=LOSER_GRACE)
+            except queue.Empty:
+                result, exc = None, None
+            loser = result or (exc.partial if isinstance(exc, LLMCancelled) else None)
+            input_tokens = (loser.input_tokens if loser else None) or winner.input_tokens or 0
+            output_tokens = (loser.output_tokens if loser else None) or 0
+            with self._lock:
+                self.stats.extra_input_tokens += input_tokens
+                self.stats.extra_output_tokens += output_tokens
+
+
+__all__ = [
+    "HEDGE_QUANTILE",
+    "HedgeStats",
+    "HedgedClient",
+    "LatencyTracker",
+]
@@ -0,0 +1,777 @@
+"""Durable queue of split and documentation jobs.
+
+Jobs are stored in SQLite (``~/.cache/docalypt/jobs.sqlite3`` by default),
+so they survive restarts of the service that runs them (see
+:mod:`docalypt.service`). A *split* job splits a transcript into
+``<output>/<transcript stem>/``; a *docs* job also documents the chapters,
+or documents an existing chapter directory.
+
+Progress is recorded per chapter as it happens. A job interrupted by a
+restart is queued again and resumes where it stopped: a finished split is
+not repeated and chapters whose documentation was written are not sent to
+the LLM again.
+
+A job is given up (marked failed) once its worker has died during
+``MAX_ATTEMPTS`` attempts, so a job that crashes its worker is not retried
+forever. Being stopped by a worker shutdown does not use up an attempt.
+
+Workers claim the queued job with the highest priority (oldest first within
+a priority) in a write transaction, so any number of worker processes can
+share one database. A running job is recorded with its worker's host and
+PID; only jobs whose worker is gone are ever put back in the queue.
+"""
+
+from __future__ import annotations
+
+import ctypes
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, field, replace
+from pathlib import Path
+from typing import Any, Dict, List
+
+from .cancellation import CancellationToken
+from .config import CACHE_DIR, AppConfig, load_config
+from .tracing import get_tracer
+
+JOBS_PATH = CACHE_DIR / "jobs.sqlite3"
+
+KIND_SPLIT = "split"
+KIND_DOCS = "docs"
+JOB_KINDS = (KIND_SPLIT, KIND_DOCS)
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED_STATES = (SUCCEEDED, FAILED, CANCELLED)
+
+PRIORITY_LOW = 0
+PRIORITY_NORMAL = 1
+PRIORITY_HIGH = 2
+PRIORITIES = {"low": PRIORITY_LOW, "normal": PRIORITY_NORMAL, "high": PRIORITY_HIGH}
+
+# Per-job options and their types.
+JOB_OPTIONS: Dict[str, type] = {
+    "model": str,
+    "marker": str,
+    "auto_chapters": bool,
+    "pack": bool,
+    "hedge": bool,
+    "index": bool,
+}
+
+# Chapter states.
+PENDING = "pending"
+DOCUMENTED = "documented"
+
+# Seconds between checks for new jobs and for cancellation of the running one.
+POLL_INTERVAL = 0.5
+# Attempts after which a job that keeps stopping its worker is failed.
+MAX_ATTEMPTS = 3
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY,
+    kind TEXT NOT NULL,
+    input TEXT NOT NULL,
+    output_dir TEXT,
+    options TEXT NOT NULL DEFAULT '{}',
+    priority INTEGER NOT NULL DEFAULT 1,
+    state TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    worker TEXT,
+    cancel_requested INTEGER NOT NULL DEFAULT 0,
+    split_done INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    metrics TEXT NOT NULL DEFAULT '{}'
+);
+CREATE INDEX IF NOT EXISTS jobs_queue ON jobs (state, priority DESC, id);
+CREATE TABLE IF NOT EXISTS chapters (
+    job_id INTEGER NOT NULL REFERENCES jobs (id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    path TEXT NOT NULL,
+    state TEXT NOT NULL,
+    destination TEXT,
+    error TEXT,
+    PRIMARY KEY (job_id, path)
+);
+"""
+
+
+class JobError(RuntimeError):
+    """Raised for invalid jobs and when the job database cannot be used."""
+
+
+@dataclass(slots=True)
+class Job:
+    id: int
+    kind: str
+    input: Path
+    output_dir: Path | None
+    state: str
+    priority: int = PRIORITY_NORMAL
+    # Per-job overrides, see JOB_OPTIONS.
+    options: Dict[str, Any] = field(default_factory=dict)
+    created_at: float = 0.0  # time.time()
+    started_at: float | None = None
+    finished_at: float | None = None
+    attempts: int = 0
+    worker: str | None = None
+    cancel_requested: bool = False
+    split_done: bool = False
+    error: str | None = None
+    metrics: Dict[str, Any] = field(default_factory=dict)
+    # Chapter counts by state, filled in by JobStore.get().
+    chapters: Dict[str, int] = field(default_factory=dict)
+
+    @property
+    def finished(self) -> bool:
+        return self.state in FINISHED_STATES
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "input": str(self.input),
+            "output_dir": str(self.output_dir) if self.output_dir else None,
+            "state": self.state,
+            "priority": self.priority,
+            "options": self.options,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "attempts": self.attempts,
+            "worker": self.worker,
+            "cancel_requested": self.cancel_requested,
+            "error": self.error,
+            "metrics": self.metrics,
+            "chapters": self.chapters,
+        }
+
+
+@dataclass(slots=True)
+class JobChapter:
+    path: Path
+    state: str
+    destination: Path | None = None
+    error: str | None = None
+
+
+def parse_priority(value: object) -> int:
+    """A priority given as ``low``/``normal``/``high`` or as a number."""
+
+    if isinstance(value, bool):
+        raise JobError(f"Invalid priority: {value!r}")
+    if isinstance(value, int):
+        return value
+    text = str(value).strip().lower()
+    if text in PRIORITIES:
+        return PRIORITIES[text]
+    try:
+        return int(text)
+    except ValueError:
+        raise JobError(
+            f"Invalid priority {value!r}; expected a number or one of " + ", ".join(PRIORITIES)
+        ) from None
+
+
+class JobStore:
+    """SQLite-backed job queue, shared by the API and the worker processes.
+
+    Like :class:`~docalypt.search.SearchIndex`, one connection is shared by
+    the threads of a process and every statement runs under a lock.
+    """
+
+    def __init__(self, path: Path | str | None = None) -> None:
+        self.path = Path(path).expanduser() if path else JOBS_PATH
+        self._lock = threading.Lock()
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            # Autocommit; claims open their own write transaction.
+            self._db = sqlite3.connect(
+                self.path, timeout=30.0, isolation_level=None, check_same_thread=False
+            )
+            self._db.row_factory = sqlite3.Row
+            self._db.execute("PRAGMA journal_mode = WAL")
+            self._db.execute("PRAGMA synchronous = NORMAL")
+            self._db.execute("PRAGMA foreign_keys = ON")
+            self._db.executescript(_SCHEMA)
+        except (OSError, sqlite3.Error) as exc:
+            raise JobError(f"Cannot open job database {self.path}: {exc}") from exc
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+    def __enter__(self) -> "JobStore":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    # Submitting and inspecting ------------------------------------------
+    def submit(
+        self,
+        kind: str,
+        input: Path | str,
+        output_dir: Path | str | None = None,
+        priority: int = PRIORITY_NORMAL,
+        options: Dict[str, Any] | None = None,
+    ) -> Job:
+        """Queue a job; raises :class:`JobError` if it cannot be run."""
+
+        if kind not in JOB_KINDS:
+            raise JobError(f"Unknown job kind {kind!r}; expected one of " + ", ".join(JOB_KINDS))
+        source = Path(input).expanduser().resolve()
+        if source.is_dir():
+            if kind == KIND_SPLIT:
+                raise JobError(f"{source} is a directory; split jobs need a transcript")
+        elif not source.is_file():
+            raise JobError(f"{source} does not exist")
+        for name, value in (options or {}).items():
+            expected = JOB_OPTIONS.get(name)
+            if expected is None:
+                raise JobError(f"Unknown option {name!r}; expected one of " + ", ".join(JOB_OPTIONS))
+            if not isinstance(value, expected):
+                raise JobError(f"Option {name!r} must be a {expected.__name__}")
+        destination = Path(output_dir).expanduser().resolve() if output_dir else None
+        with self._lock:
+            cursor = self._db.execute(
+                "INSERT INTO jobs (kind, input, output_dir, options, priority, state, created_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    kind,
+                    str(source),
+                    str(destination) if destination else None,
+                    json.dumps(options or {}),
+                    priority,
+                    QUEUED,
+                    time.time(),
+                ),
+            )
+            job_id = cursor.lastrowid
+        job = self.get(job_id)
+        assert job is not None
+        return job
+
+    def get(self, job_id: int) -> Job | None:
+        with self._lock:
+            row = self._db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None:
+                return None
+            counts = self._db.execute(
+                "SELECT state, COUNT(*) FROM chapters WHERE job_id = ? GROUP BY state", (job_id,)
+            ).fetchall()
+        job = _job_from_row(row)
+        job.chapters = {state: count for state, count in counts}
+        return job
+
+    def jobs(self, state: str | None = None, limit: int = 100) -> List[Job]:
+        """Most recent jobs first, optionally only those in ``state``."""
+
+        query = "SELECT * FROM jobs"
+        parameters: tuple[object, ...] = ()
+        if state:
+            query += " WHERE state = ?"
+            parameters = (state,)
+        query += " ORDER BY id DESC LIMIT ?"
+        with self._lock:
+            rows = self._db.execute(query, (*parameters, limit)).fetchall()
+            counts = self._db.execute(
+                "SELECT job_id, state, COUNT(*) FROM chapters"
+                f" WHERE job_id IN ({', '.join('?' * len(rows))}) GROUP BY job_id, state",
+                [row["id"] for row in rows],
+            ).fetchall()
+        jobs = {row["id"]: _job_from_row(row) for row in rows}
+        for job_id, state, count in counts:
+            jobs[job_id].chapters[state] = count
+        return list(jobs.values())
+
+    def chapters(self, job_id: int) -> List[JobChapter]:
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT path, state, destination, error FROM chapters"
+                " WHERE job_id = ? ORDER BY position",
+                (job_id,),
+            ).fetchall()
+        return [
+            JobChapter(
+                path=Path(row["path"]),
+                state=row["state"],
+                destination=Path(row["destination"]) if row["destination"] else None,
+                error=row["error"],
+            )
+            for row in rows
+        ]
+
+    def cancel(self, job_id: int) -> Job | None:
+        """Cancel a queued job at once, or ask the worker to stop a running one."""
+
+        with self._lock:
+            self._db.execute(
+                "UPDATE jobs SET state = ?, finished_at = ?, error = 'Cancelled'"
+                " WHERE id = ? AND state = ?",
+                (CANCELLED, time.time(), job_id, QUEUED),
+            )
+            self._db.execute(
+                "UPDATE jobs SET cancel_requested = 1 WHERE id = ? AND state = ?",
+                (job_id, RUNNING),
+            )
+        return self.get(job_id)
+
+    # Running ------------------------------------------------------------
+    def claim(self, worker: str) -> Job | None:
+        """Take the next queued job for ``worker``, or ``None`` if there is none."""
+
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._db.execute(
+                    "SELECT id FROM jobs WHERE state = ? ORDER BY priority DESC, id LIMIT 1",
+                    (QUEUED,),
+                ).fetchone()
+                if row is not None:
+                    self._db.execute(
+                        "UPDATE jobs SET state = ?, worker = ?, started_at = ?,"
+                        " attempts = attempts + 1, error = NULL WHERE id = ?",
+                        (RUNNING, worker, time.time(), row["id"]),
+                    )
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+        return self.get(row["id"]) if row is not None else None
+
+    def cancel_requested(self, job_id: int) -> bool:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT cancel_requested FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        return bool(row and row["cancel_requested"])
+
+    def requeue(
+        self,
+        job_id: int | None = None,
+        worker: str | None = None,
+        stopped: bool = False,
+    ) -> int:
+        """Put running jobs back in the queue: all of them, one, or one worker's.
+
+        Used when a worker stops mid-job (``stopped``: the attempt is given
+        back) and when a worker process dies. A job that has used
+        ``MAX_ATTEMPTS`` attempts is failed instead. Returns how many jobs
+        were requeued.
+        """
+
+        where = "state = ?"
+        parameters: tuple[object, ...] = (RUNNING,)
+        if job_id is not None:
+            where += " AND id = ?"
+            parameters += (job_id,)
+        if worker is not None:
+            where += " AND worker = ?"
+            parameters += (worker,)
+        with self._lock:
+            # A job whose cancellation was pending when it stopped stays stopped.
+            self._db.execute(
+                "UPDATE jobs SET state = ?, finished_at = ?, error = 'Cancelled'"
+                f" WHERE {where} AND cancel_requested = 1",
+                (CANCELLED, time.time(), *parameters),
+            )
+            if stopped:
+                return self._db.execute(
+                    "UPDATE jobs SET state = ?, worker = NULL, attempts = attempts - 1"
+                    f" WHERE {where}",
+                    (QUEUED, *parameters),
+                ).rowcount
+            failed = self._db.execute(
+                "UPDATE jobs SET state = ?, finished_at = ?, error = ?"
+                f" WHERE {where} AND attempts >= ?",
+                (
+                    FAILED,
+                    time.time(),
+                    f"Gave up after {MAX_ATTEMPTS} attempts; the worker died each time",
+                    *parameters,
+                    MAX_ATTEMPTS,
+                ),
+            ).rowcount
+            if failed:
+                logger.warning("Gave up on %d job(s) that kept stopping their worker", failed)
+            return self._db.execute(
+                f"UPDATE jobs SET state = ?, worker = NULL WHERE {where}", (QUEUED, *parameters)
+            ).rowcount
+
+    def requeue_orphans(self) -> int:
+        """Requeue the running jobs of workers on this host that have died.
+
+        Used when a service starts, for jobs whose worker died with a
+        previous service. Jobs of live workers, including those of other
+        services sharing the database, are left alone.
+        """
+
+        host = socket.gethostname()
+        with self._lock:
+            workers = [
+                row["worker"]
+                for row in self._db.execute(
+                    "SELECT DISTINCT worker FROM jobs WHERE state = ? AND worker IS NOT NULL",
+                    (RUNNING,),
+                )
+            ]
+        requeued = 0
+        for worker in workers:
+            worker_host, _, pid = worker.rpartition(":")
+            if worker_host == host and pid.isdigit() and not _process_alive(int(pid)):
+                requeued += self.requeue(worker=worker)
+        return requeued
+
+    def record_split(self, job_id: int, chapters: List[Path]) -> None:
+        with self._lock:
+            self._db.execute("BEGIN")
+            try:
+                self._db.execute("DELETE FROM chapters WHERE job_id = ?", (job_id,))
+                self._db.executemany(
+                    "INSERT OR IGNORE INTO chapters (job_id, position, path, state)"
+                    " VALUES (?, ?, ?, ?)",
+                    [(job_id, index, str(path), PENDING) for index, path in enumerate(chapters)],
+                )
+                self._db.execute("UPDATE jobs SET split_done = 1 WHERE id = ?", (job_id,))
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+
+    def record_chapter(
+        self,
+        job_id: int,
+        path: Path,
+        state: str,
+        destination: Path | None = None,
+        error: str | None = None,
+    ) -> None:
+        with self._lock:
+            self._db.execute(
+                "UPDATE chapters SET state = ?, destination = ?, error = ?"
+                " WHERE job_id = ? AND path = ?",
+                (state, str(destination) if destination else None, error, job_id, str(path)),
+            )
+
+    def finish(
+        self,
+        job_id: int,
+        state: str,
+        error: str | None = None,
+        metrics: Dict[str, Any] | None = None,
+    ) -> None:
+        with self._lock:
+            self._db.execute(
+                "UPDATE jobs SET state = ?, finished_at = ?, error = ?, metrics = ? WHERE id = ?",
+                (state, time.time(), error, json.dumps(metrics or {}), job_id),
+            )
+
+    def save_metrics(self, job_id: int, metrics: Dict[str, Any]) -> None:
+        with self._lock:
+            self._db.execute(
+                "UPDATE jobs SET metrics = ? WHERE id = ?", (json.dumps(metrics), job_id)
+            )
+
+
+def _job_from_row(row: sqlite3.Row) -> Job:
+    return Job(
+        id=row["id"],
+        kind=row["kind"],
+        input=Path(row["input"]),
+        output_dir=Path(row["output_dir"]) if row["output_dir"] else None,
+        state=row["state"],
+        priority=row["priority"],
+        options=json.loads(row["options"] or "{}"),
+        created_at=row["created_at"],
+        started_at=row["started_at"],
+        finished_at=row["finished_at"],
+        attempts=row["attempts"],
+        worker=row["worker"],
+        cancel_requested=bool(row["cancel_requested"]),
+        split_done=bool(row["split_done"]),
+        error=row["error"],
+        metrics=json.loads(row["metrics"] or "{}"),
+    )
+
+
+# Execution -------------------------------------------------------------------
+def run_job(
+    store: JobStore,
+    job: Job,
+    cancel: CancellationToken,
+    config: AppConfig | None = None,
+) -> str:
+    """Run a claimed job to completion and return its final state.
+
+    Returns :data:`QUEUED` when ``cancel`` fired without a cancellation
+    request for the job (the worker is shutting down): the job is put back
+    in the queue with its progress kept.
+    """
+
+    config = config or load_config()
+    metrics: Dict[str, Any] = dict(job.metrics)
+    metrics["queue_wait"] = (job.started_at or time.time()) - job.created_at
+    search_index = None
+    if job.options.get("index", True):
+        from .search import open_index
+
+        search_index = open_index()
+    try:
+        chapters = _split(store, job, config, metrics, search_index)
+        if job.kind == KIND_DOCS and chapters and not cancel.cancelled:
+            _document(store, job, chapters, cancel, metrics, search_index)
+    except Exception as exc:
+        logger.error("Job %d failed: %s", job.id, exc)
+        store.finish(job.id, FAILED, str(exc), metrics)
+        return FAILED
+    finally:
+        if search_index is not None:
+            search_index.close()
+
+    if cancel.cancelled and not store.cancel_requested(job.id):
+        store.save_metrics(job.id, metrics)
+        store.requeue(job.id, stopped=True)
+        return QUEUED
+    if cancel.cancelled:
+        state, error = CANCELLED, cancel.reason
+    elif metrics.get("failed"):
+        state, error = FAILED, f"{metrics['failed']} chapter(s) could not be documented"
+    else:
+        state, error = SUCCEEDED, None
+    store.finish(job.id, state, error, metrics)
+    return state
+
+
+def _job_output_dir(job: Job, config: AppConfig) -> Path:
+    root = job.output_dir or config.output_dir
+    return Path(root) / job.input.stem
+
+
+def _split(
+    store: JobStore,
+    job: Job,
+    config: AppConfig,
+    metrics: Dict[str, Any],
+    search_index: Any,
+) -> List[Path]:
+    """The job's chapters, splitting the transcript unless that is done already."""
+
+    if job.split_done:
+        chapters = [chapter.path for chapter in store.chapters(job.id)]
+        metrics["resumed"] = True
+        return chapters
+    if job.input.is_dir():
+        from .documentation import collect_chapter_files
+
+        chapters = collect_chapter_files(job.input)
+        store.record_split(job.id, chapters)
+        metrics["chapters"] = len(chapters)
+        return chapters
+
+    from .splitting import TranscriptSplitter
+
+    chapters = []
+    started = time.perf_counter()
+    TranscriptSplitter(
+        input_path=job.input,
+        output_dir=_job_output_dir(job, config),
+        marker_regex=job.options.get("marker"),
+        post_split_hooks=[chapters.append],
+        search_index=search_index,
+        auto_chapters=bool(job.options.get("auto_chapters", False)),
+        config=config,
+    ).split()
+    metrics["split_seconds"] = time.perf_counter() - started
+    metrics["chapters"] = len(chapters)
+    store.record_split(job.id, chapters)
+    return chapters
+
+
+def _document(
+    store: JobStore,
+    job: Job,
+    chapters: List[Path],
+    cancel: CancellationToken,
+    metrics: Dict[str, Any],
+    search_index: Any,
+) -> None:
+    """Document the chapters that have no documentation from an earlier attempt."""
+
+    from .documentation import DocumentGenerationRequest, iter_documentation
+    from .llm import settings_from_env
+
+    done = {
+        chapter.path
+        for chapter in store.chapters(job.id)
+        if chapter.state == DOCUMENTED and chapter.destination and chapter.destination.exists()
+    }
+    pending = [path for path in chapters if path not in done]
+    settings = settings_from_env()
+    if job.options.get("model"):
+        settings = replace(settings, model=str(job.options["model"]))
+    run = iter_documentation(
+        DocumentGenerationRequest(
+            chapters=pending,
+            settings=settings,
+            cancel_token=cancel,
+            pack_small_chapters=bool(job.options.get("pack", False)),
+            hedge=bool(job.options.get("hedge", False)),
+            search_index=search_index,
+        )
+    )
+    for outcome in run:
+        if outcome.succeeded:
+            store.record_chapter(job.id, outcome.chapter, DOCUMENTED, outcome.destination)
+        elif not outcome.cancelled:
+            store.record_chapter(job.id, outcome.chapter, FAILED, error=outcome.error)
+    summary = run.result.telemetry_summary()
+    metrics["documented"] = len(done) + len(run.result.written)
+    metrics["failed"] = len(run.result.failures)
+    metrics["reused"] = len(done)
+    for key in (
+        "requests",
+        "input_tokens",
+        "output_tokens",
+        "cached_input_tokens",
+        "latency_p50",
+        "latency_p95",
+        "tokens_per_second",
+    ):
+        metrics[key] = summary[key]
+    metrics["docs_seconds"] = summary["elapsed"]
+
+
+# Workers ---------------------------------------------------------------------
+def worker_name(pid: int | None = None) -> str:
+    """How the worker running in process ``pid`` (default: this one) is recorded."""
+
+    return f"{socket.gethostname()}:{pid or os.getpid()}"
+
+
+def _process_alive(pid: int) -> bool:
+    if os.name == "nt":  # pragma: no cover - Windows
+        kernel32 = ctypes.windll.kernel32
+        # PROCESS_QUERY_LIMITED_INFORMATION
+        handle = kernel32.OpenProcess(0x1000, False, pid)
+        if not handle:
+            # Access denied means the process exists.
+            return kernel32.GetLastError() == 5
+        try:
+            code = ctypes.c_ulong()
+            if not kernel32.GetExitCodeProcess(handle, ctypes.byref(code)):
+                return True
+            return code.value == 259  # STILL_ACTIVE
+        finally:
+            kernel32.CloseHandle(handle)
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class JobWorker:
+    """Claims and runs jobs one at a time until :meth:`stop` is called."""
+
+    def __init__(self, store: JobStore, name: str | None = None) -> None:
+        self.store = store
+        self.name = name or worker_name()
+        self.config = load_config()
+        self._stopping = threading.Event()
+        self._current: CancellationToken | None = None
+        self._lock = threading.Lock()
+
+    def stop(self) -> None:
+        """Stop after requeueing the running job, if any."""
+
+        self._stopping.set()
+        with self._lock:
+            if self._current is not None:
+                self._current.cancel("Worker stopped")
+
+    def run(self) -> None:
+        while not self._stopping.is_set():
+            job = self.store.claim(self.name)
+            if job is None:
+                self._stopping.wait(POLL_INTERVAL)
+                continue
+            self.run_one(job)
+
+    def run_one(self, job: Job) -> str:
+        cancel = CancellationToken()
+        with self._lock:
+            self._current = cancel
+            if self._stopping.is_set():
+                cancel.cancel("Worker stopped")
+        watcher = threading.Thread(
+            target=self._watch_cancellation, args=(job.id, cancel), daemon=True
+        )
+        watcher.start()
+        logger.info("%s: running %s job %d (%s)", self.name, job.kind, job.id, job.input.name)
+        span = get_tracer().span(
+            "job", job=job.id, kind=job.kind, input=job.input.name, attempt=job.attempts
+        )
+        try:
+            with span:
+                state = run_job(self.store, job, cancel, self.config)
+                span.set(state=state)
+        finally:
+            with self._lock:
+                self._current = None
+            # Also stops the watcher thread.
+            cancel.cancel("Job finished")
+            watcher.join()
+        logger.info("%s: job %d %s", self.name, job.id, state)
+        return state
+
+    def _watch_cancellation(self, job_id: int, cancel: CancellationToken) -> None:
+        while not cancel.wait(POLL_INTERVAL):
+            if self.store.cancel_requested(job_id):
+                cancel.cancel("Cancelled")
+
+
+__all__ = [
+    "CANCELLED",
+    "DOCUMENTED",
+    "FAILED",
+    "FINISHED_STATES",
+    "JOBS_PATH",
+    "JOB_KINDS",
+    "JOB_OPTIONS",
+    "Job",
+    "JobChapter",
+    "JobError",
+    "JobStore",
+    "JobWorker",
+    "KIND_DOCS",
+    "KIND_SPLIT",
+    "MAX_ATTEMPTS",
+    "PENDING",
+    "PRIORITIES",
+    "PRIORITY_HIGH",
+    "PRIORITY_LOW",
+    "PRIORITY_NORMAL",
+    "QUEUED",
+    "RUNNING",
+    "SUCCEEDED",
+    "parse_priority",
+    "run_job",
+    "worker_name",
+]
@@ -0,0 +1,310 @@
+"""Chapter leases for several machines documenting one shared directory.
+
+Nodes that mount the same output tree (over NFS, for instance) coordinate
+through lease files alone, without a central server. Before documenting a
+chapter a node creates ``.docalypt-leases/<chapter>.<generation>.lease``
+next to it. Creation is exclusive (a hard link of a private temporary file,
+which is atomic on NFS too), so of several nodes racing for a chapter
+exactly one wins. The holder refreshes the file's modification time every
+:data:`HEARTBEAT_INTERVAL` seconds.
+
+A lease whose modification time has not changed for :data:`LEASE_TTL`
+seconds belongs to a node that died or hung. Another node takes the chapter
+over by creating the next generation. The generation is a fencing token: a
+holder that finds a newer generation has lost the chapter and must not
+write its documentation (:meth:`LeaseManager.holds`, used as
+``DocumentGenerationRequest.before_write``). Expiry is judged by how long a
+node has *watched* a lease stay unchanged, so clocks need not be in sync.
+
+Chapters whose documentation exists are never claimed, so runs on any
+number of nodes together document every chapter once. A chapter that failed
+on one node is released without documentation; a node still waiting for it
+then claims it and tries again, while the failing node does not.
+
+Leases are taken as chapters are pulled from :meth:`LeaseManager.claim`, not
+when their requests start. A concurrent documentation run pulls ahead to
+keep ``2 * workers`` chapters pending, so with ``--workers N`` a node holds
+about ``3 * N`` leases at once, ``2 * N`` of them for chapters it has not
+started yet. Other nodes wait for those chapters until they are done.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List
+
+from .cancellation import CancellationToken
+from .documentation import DOCUMENTATION_SUBDIR
+
+LEASE_DIRNAME = ".docalypt-leases"
+LEASE_SUFFIX = ".lease"
+# Seconds a lease may go without a heartbeat before others take it over.
+LEASE_TTL = 120.0
+HEARTBEAT_INTERVAL = 15.0
+# Seconds between checks of chapters leased by other nodes.
+POLL_INTERVAL = 2.0
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(slots=True)
+class Lease:
+    chapter: Path
+    path: Path
+    generation: int
+    lost: bool = False
+
+
+def _documentation_path(chapter: Path, destination_dirname: str) -> Path:
+    return chapter.parent / destination_dirname / f"{chapter.stem}.docs.md"
+
+
+class LeaseManager:
+    """Claims chapters for this node and keeps its leases alive until :meth:`close`."""
+
+    def __init__(
+        self,
+        owner: str | None = None,
+        ttl: float = LEASE_TTL,
+        heartbeat_interval: float = HEARTBEAT_INTERVAL,
+        poll_interval: float = POLL_INTERVAL,
+        destination_dirname: str = DOCUMENTATION_SUBDIR,
+    ) -> None:
+        self.owner = owner or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.ttl = ttl
+        self.heartbeat_interval = heartbeat_interval
+        self.poll_interval = poll_interval
+        self.destination_dirname = destination_dirname
+        self._lock = threading.Lock()
+        self._held: Dict[Path, Lease] = {}
+        # Lease file -> (modification time, when this node first saw it).
+        self._observed: Dict[Path, tuple[int, float]] = {}
+        self._stop = threading.Event()
+        self._heartbeat: threading.Thread | None = None
+
+    # Claiming -----------------------------------------------------------
+    def claim(
+        self, chapters: Iterable[Path], cancel: CancellationToken | None = None
+    ) -> Iterator[Path]:
+        """Yield the chapters this node should document, as it wins their leases.
+
+        Chapters leased by other nodes are checked again every
+        ``poll_interval`` seconds until they are documented or their lease
+        expires, so the generator ends only when no chapter is left undone
+        (or ``cancel`` fires). Chapters whose documentation failed on this
+        node are not retried here, but once released another node waiting
+        for them claims them. Each chapter is leased as it is pulled from the
+        generator, so a consumer that reads ahead holds leases on chapters it
+        has not started.
+        """
+
+        remaining = list(dict.fromkeys(Path(chapter) for chapter in chapters))
+        while remaining and not (cancel is not None and cancel.cancelled):
+            waiting: List[Path] = []
+            for chapter in remaining:
+                if cancel is not None and cancel.cancelled:
+                    return
+                if self.documented(chapter):
+                    continue
+                if self.acquire(chapter) is not None:
+                    yield chapter
+                elif not self.documented(chapter):
+                    waiting.append(chapter)
+            remaining = waiting
+            if remaining:
+                logger.debug("%d chapter(s) leased by other nodes", len(remaining))
+                if cancel is not None:
+                    cancel.wait(self.poll_interval)
+                else:
+                    time.sleep(self.poll_interval)
+
+    def documented(self, chapter: Path) -> bool:
+        return _documentation_path(chapter, self.destination_dirname).exists()
+
+    def acquire(self, chapter: Path) -> Lease | None:
+        """Lease ``chapter`` if nobody holds a live lease on it."""
+
+        chapter = Path(chapter)
+        directory = chapter.parent / LEASE_DIRNAME
+        generations = self._generations(chapter)
+        current = max(generations, default=0)
+        if current and not self._expired(generations[current]):
+            return None
+        try:
+            directory.mkdir(exist_ok=True)
+        except OSError as exc:
+            logger.warning("Cannot create lease directory %s: %s", directory, exc)
+            return None
+        generation = current + 1
+        path = directory / f"{chapter.name}.{generation}{LEASE_SUFFIX}"
+        if not self._create(path, chapter, generation):
+            return None
+        if current:
+            logger.info("Took over %s from an expired lease", chapter.name)
+        for stale in generations.values():
+            _unlink(stale)
+            self._observed.pop(stale, None)
+        lease = Lease(chapter=chapter, path=path, generation=generation)
+        if self.documented(chapter):
+            # Finished by the previous holder just before its lease expired.
+            _unlink(path)
+            return None
+        with self._lock:
+            self._held[chapter] = lease
+        self._start_heartbeat()
+        return lease
+
+    def holds(self, chapter: Path) -> bool:
+        """Whether this node still holds ``chapter``'s newest lease."""
+
+        with self._lock:
+            lease = self._held.get(Path(chapter))
+        if lease is None or lease.lost:
+            return False
+        newest = max(self._generations(lease.chapter), default=0)
+        # The owner check catches a newer holder that reused our generation
+        # number after the lease files were cleaned up.
+        if newest != lease.generation or self._owner_of(lease.path) != self.owner:
+            lease.lost = True
+            logger.warning("Lost the lease on %s to another node", lease.chapter.name)
+            return False
+        return True
+
+    def release(self, chapter: Path) -> None:
+        """Give up ``chapter``'s lease, e.g. once it is documented or failed."""
+
+        with self._lock:
+            lease = self._held.pop(Path(chapter), None)
+        if lease is not None and not lease.lost:
+            _unlink(lease.path)
+
+    def close(self) -> None:
+        """Release every lease still held and stop the heartbeat."""
+
+        with self._lock:
+            chapters = list(self._held)
+        for chapter in chapters:
+            self.release(chapter)
+        self._stop_heartbeat()
+
+    # Helpers ------------------------------------------------------------
+    def _generations(self, chapter: Path) -> Dict[int, Path]:
+        directory = chapter.parent / LEASE_DIRNAME
+        prefix = f"{chapter.name}."
+        try:
+            names = os.listdir(directory)
+        except FileNotFoundError:
+            return {}
+        generations: Dict[int, Path] = {}
+        for name in names:
+            if not (name.startswith(prefix) and name.endswith(LEASE_SUFFIX)):
+                continue
+            number = name[len(prefix) : -len(LEASE_SUFFIX)]
+            if number.isdigit():
+                generations[int(number)] = directory / name
+        return generations
+
+    @staticmethod
+    def _owner_of(path: Path) -> str | None:
+        try:
+            return json.loads(path.read_text(encoding="utf-8")).get("owner")
+        except (OSError, ValueError, AttributeError):
+            return None
+
+    def _expired(self, path: Path) -> bool:
+        """Whether ``path`` has gone unchanged for ``ttl`` seconds while watched."""
+
+        try:
+            mtime = path.stat().st_mtime_ns
+        except FileNotFoundError:
+            return True
+        now = time.monotonic()
+        seen = self._observed.get(path)
+        if seen is None or seen[0] != mtime:
+            self._observed[path] = (mtime, now)
+            return False
+        return now - seen[1] >= self.ttl
+
+    def _create(self, path: Path, chapter: Path, generation: int) -> bool:
+        """Create ``path`` exclusively; ``False`` if another node was faster."""
+
+        temporary = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+        record = {
+            "owner": self.owner,
+            "chapter": chapter.name,
+            "generation": generation,
+            "acquired_at": time.time(),
+        }
+        try:
+            temporary.write_text(json.dumps(record), encoding="utf-8")
+        except OSError as exc:
+            logger.warning("Cannot write lease %s: %s", path, exc)
+            return False
+        try:
+            os.link(temporary, path)
+            return True
+        except FileExistsError:
+            return False
+        except OSError:
+            # Over NFS a link can succeed although the reply was lost.
+            try:
+                return os.stat(temporary).st_nlink == 2
+            except OSError:
+                return False
+        finally:
+            _unlink(temporary)
+
+    def _start_heartbeat(self) -> None:
+        with self._lock:
+            if self._heartbeat is not None:
+                return
+            self._stop.clear()
+            self._heartbeat = threading.Thread(
+                target=self._beat, name="docalypt-lease-heartbeat", daemon=True
+            )
+            self._heartbeat.start()
+
+    def _stop_heartbeat(self) -> None:
+        self._stop.set()
+        if self._heartbeat is not None:
+            self._heartbeat.join()
+            self._heartbeat = None
+
+    def _beat(self) -> None:
+        while not self._stop.wait(self.heartbeat_interval):
+            with self._lock:
+                leases = [lease for lease in self._held.values() if not lease.lost]
+            for lease in leases:
+                try:
+                    os.utime(lease.path)
+                except FileNotFoundError:
+                    lease.lost = True
+                    logger.warning("Lease on %s was taken over", lease.chapter.name)
+                except OSError as exc:
+                    logger.warning("Cannot renew lease on %s: %s", lease.chapter.name, exc)
+
+
+def _unlink(path: Path) -> None:
+    try:
+        path.unlink()
+    except FileNotFoundError:
+        pass
+    except OSError as exc:
+        logger.debug("Cannot remove %s: %s", path, exc)
+
+
+__all__ = [
+    "HEARTBEAT_INTERVAL",
+    "LEASE_DIRNAME",
+    "LEASE_TTL",
+    "Lease",
+    "LeaseManager",
+]
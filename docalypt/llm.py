@@ -2,17 +2,47 @@
 
 from __future__ import annotations
 
+import http.client
 import json
+import logging
 import os
-from dataclasses import dataclass
-from typing import Dict, List
+import socket
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field, fields, replace
+from email.utils import parsedate_to_datetime
+from typing import TYPE_CHECKING, Callable, Dict, Iterator, List
 from urllib.error import HTTPError, URLError
-from urllib.request import Request, urlopen
+from urllib.request import HTTPHandler, HTTPSHandler, Request, build_opener
+
+from .cancellation import CancellationToken
+from .ndjson import iter_ndjson, loads
+
+if TYPE_CHECKING:  # pragma: no cover - annotations only
+    from .providers import Provider
 
 DEFAULT_OLLAMA_ENDPOINT = "http://localhost:11434"
 DEFAULT_OPENAI_ENDPOINT = "https://api.openai.com/v1"
 DEFAULT_ANTHROPIC_ENDPOINT = "https://api.anthropic.com/v1"
 DEFAULT_ANTHROPIC_VERSION = "2023-06-01"
+# Ollama's own idle keep-alive, restored when a run releases its pinned model.
+DEFAULT_OLLAMA_KEEP_ALIVE = "5m"
+PINNED_KEEP_ALIVE = "-1"
+# Socket timeout for generation requests, clamped to a run's deadline.
+REQUEST_TIMEOUT = 120
+# Finished connections are kept open for the next request to the same host.
+IDLE_CONNECTION_TTL = 30.0
+MAX_IDLE_CONNECTIONS = 8
+# Unread response bytes drained so a connection can be reused.
+DRAIN_LIMIT = 64 * 1024
+# Sharing of identical in-flight requests (see docalypt.singleflight): not at
+# all, within this process, or across the processes of this machine.
+COALESCE_OFF = "off"
+COALESCE_PROCESS = "process"
+COALESCE_HOST = "host"
+
+logger = logging.getLogger(__name__)
 
 
 ENV_PROVIDER = "DOCALYPT_LLM_PROVIDER"
@@ -23,6 +53,17 @@ ENV_OPENAI_ENDPOINT = "DOCALYPT_OPENAI_BASE_URL"
 ENV_ANTHROPIC_KEY = "DOCALYPT_ANTHROPIC_API_KEY"
 ENV_ANTHROPIC_ENDPOINT = "DOCALYPT_ANTHROPIC_BASE_URL"
 ENV_ANTHROPIC_VERSION = "DOCALYPT_ANTHROPIC_VERSION"
+ENV_PROMPT_CACHING = "DOCALYPT_PROMPT_CACHING"
+ENV_OLLAMA_KEEP_ALIVE = "DOCALYPT_OLLAMA_KEEP_ALIVE"
+ENV_CONTEXT_WINDOW = "DOCALYPT_LLM_CONTEXT_WINDOW"
+ENV_FALLBACKS = "DOCALYPT_LLM_FALLBACKS"
+ENV_STREAM = "DOCALYPT_LLM_STREAM"
+ENV_COALESCE = "DOCALYPT_LLM_COALESCE"
+# Ollama's own setting for the context window of models without ``num_ctx``.
+ENV_OLLAMA_CONTEXT_LENGTH = "OLLAMA_CONTEXT_LENGTH"
+# Largest context window chosen automatically for a model that has no
+# ``num_ctx``; a larger one costs KV cache memory on every request.
+MAX_AUTO_CONTEXT_WINDOW = 8192
 
 LEGACY_OPENAI_KEY = "OPENAI_API_KEY"
 LEGACY_OPENAI_ENDPOINT = "OPENAI_BASE_URL"
@@ -34,6 +75,28 @@ class LLMError(RuntimeError):
     """Raised when a model provider returns an error or cannot be reached."""
 
 
+class LLMCancelled(LLMError):
+    """Raised when a request is abandoned because its cancellation token fired.
+
+    ``partial`` holds what had been streamed so far, when anything had.
+    """
+
+    def __init__(self, message: str = "Cancelled", partial: GenerationResult | None = None):
+        super().__init__(message)
+        self.partial = partial
+
+
+class LLMRateLimited(LLMError):
+    """Raised when the provider asks to slow down (HTTP 429 or ``Retry-After``).
+
+    ``retry_after`` is the delay the provider asked for, in seconds, if any.
+    """
+
+    def __init__(self, message: str = "Rate limited", retry_after: float | None = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
 @dataclass(slots=True)
 class LLMSettings:
     provider: str = "ollama"
@@ -48,41 +111,48 @@ class LLMSettings:
     endpoint: str | None = None
     api_key: str | None = None
     anthropic_version: str | None = None
+    prompt_caching: bool = True
+    keep_alive: str | None = None
+    context_window: int | None = None
+    adaptive_max_tokens: bool = True
+    tokenizer: str = "heuristic"
+    # Ollama only: ``False`` asks for each answer in a single response body.
+    # Cheaper on CPU for batch runs, but there is no time to first token.
+    stream: bool = True
+    # Identical concurrent requests share one upstream call: COALESCE_OFF,
+    # COALESCE_PROCESS or COALESCE_HOST.
+    coalesce: str = COALESCE_PROCESS
+    # Other endpoints/providers able to serve the same requests, in order of
+    # preference (used for failover and for hedging slow requests).
+    fallbacks: List["LLMSettings"] = field(default_factory=list)
+
+    def resolved_provider(self) -> Provider:
+        """The registry entry of the provider (see :mod:`docalypt.providers`)."""
+
+        from .providers import get_provider
+
+        return get_provider(self.provider)
 
     def normalized_provider(self) -> str:
-        provider = (self.provider or "ollama").strip().lower()
-        if provider not in {"ollama", "openai", "anthropic"}:
-            raise LLMError(f"Unsupported provider: {self.provider}")
-        return provider
+        self.resolved_provider()
+        return (self.provider or "ollama").strip().lower()
 
     def resolved_endpoint(self) -> str:
-        provider = self.normalized_provider()
-        endpoint = (self.endpoint or "").strip()
-        if provider == "ollama":
-            return endpoint or DEFAULT_OLLAMA_ENDPOINT
-        if provider == "openai":
-            return endpoint or os.getenv(ENV_OPENAI_ENDPOINT) or os.getenv(LEGACY_OPENAI_ENDPOINT) or DEFAULT_OPENAI_ENDPOINT
-        if provider == "anthropic":
-            return (
-                endpoint
-                or os.getenv(ENV_ANTHROPIC_ENDPOINT)
-                or os.getenv(LEGACY_ANTHROPIC_ENDPOINT)
-                or DEFAULT_ANTHROPIC_ENDPOINT
-            )
-        raise LLMError(f"Unsupported provider: {self.provider}")
+        provider = self.resolved_provider()
+        return (
+            (self.endpoint or "").strip()
+            or _first_env(provider.endpoint_env)
+            or provider.default_endpoint
+        )
 
     def resolved_api_key(self) -> str | None:
-        provider = self.normalized_provider()
-        if provider == "openai":
-            return (self.api_key or os.getenv(ENV_OPENAI_KEY) or os.getenv(LEGACY_OPENAI_KEY) or "").strip() or None
-        if provider == "anthropic":
-            return (
-                self.api_key
-                or os.getenv(ENV_ANTHROPIC_KEY)
-                or os.getenv(LEGACY_ANTHROPIC_KEY)
-                or ""
-            ).strip() or None
-        return (self.api_key or "").strip() or None
+        provider = self.resolved_provider()
+        return (self.api_key or _first_env(provider.api_key_env) or "").strip() or None
+
+    def resolved_context_window(self) -> int:
+        if self.context_window:
+            return self.context_window
+        return self.resolved_provider().capabilities.context_window
 
     def resolved_anthropic_version(self) -> str:
         return (
@@ -92,98 +162,691 @@ class LLMSettings:
         )
 
 
+def _first_env(names: tuple[str, ...]) -> str | None:
+    for name in names:
+        value = os.getenv(name)
+        if value:
+            return value
+    return None
+
+
 PROMPT_TEMPLATE = """You are helping maintain the Docalypt Markdown Transcript Splitter and Documentation suite.
 Create a standalone Markdown documentation section for the chapter below.
 
+Guidelines:
+- Use helpful headings and paragraphs.
+- Summarize the narrative and highlight key ideas.
+- Do not include code snippets or TODO lists.
+- Respond with valid Markdown only.
+
 Chapter file name: {chapter_name}
 
 Chapter transcript content:
 ```markdown
 {chapter_content}
 ```
-
-Guidelines:
-- Use helpful headings and paragraphs.
-- Summarize the narrative and highlight key ideas.
-- Do not include code snippets or TODO lists.
-- Respond with valid Markdown only.
 """
 
 
+@dataclass(frozen=True, slots=True)
+class Prompt:
+    """A prompt split into a static instruction prefix and a per-chapter suffix.
+
+    The prefix is everything in the template before the first line that
+    references a placeholder, so it is byte-identical for every chapter of a
+    run and can be reused by providers that cache prompt prefixes.
+    """
+
+    prefix: str
+    suffix: str
+
+    @property
+    def text(self) -> str:
+        return f"{self.prefix}{self.suffix}"
+
+    def __str__(self) -> str:
+        return self.text
+
+
+@dataclass(slots=True)
+class PromptCacheStats:
+    """Input token accounting used to report prompt-prefix cache savings."""
+
+    requests: int = 0
+    input_tokens: int = 0
+    cached_input_tokens: int = 0
+    cache_write_tokens: int = 0
+
+    def record(self, input_tokens: int, cached: int = 0, written: int = 0) -> None:
+        self.requests += 1
+        self.input_tokens += max(input_tokens, 0)
+        self.cached_input_tokens += max(cached, 0)
+        self.cache_write_tokens += max(written, 0)
+
+    def merge(self, other: "PromptCacheStats") -> None:
+        self.requests += other.requests
+        self.input_tokens += other.input_tokens
+        self.cached_input_tokens += other.cached_input_tokens
+        self.cache_write_tokens += other.cache_write_tokens
+
+    @property
+    def hit_ratio(self) -> float:
+        if not self.input_tokens:
+            return 0.0
+        return self.cached_input_tokens / self.input_tokens
+
+    def summary(self) -> str:
+        if not self.input_tokens:
+            return "Prompt cache: no token usage reported by provider"
+        return (
+            f"Prompt cache: {self.cached_input_tokens:,} of {self.input_tokens:,} "
+            f"input tokens served from cache ({self.hit_ratio:.0%})"
+        )
+
+
 def build_prompt(
     chapter_name: str,
     chapter_content: str,
     template: str = PROMPT_TEMPLATE,
-) -> str:
+) -> Prompt:
     if "{chapter_name}" not in template or "{chapter_content}" not in template:
         raise LLMError(
             "Prompt template must include {chapter_name} and {chapter_content} placeholders"
         )
-    return template.format(
-        chapter_name=chapter_name,
-        chapter_content=chapter_content.strip(),
+    first_placeholder = min(
+        template.index("{chapter_name}"), template.index("{chapter_content}")
     )
+    cut = template.rfind("\n", 0, first_placeholder) + 1
+    values = {
+        "chapter_name": chapter_name,
+        "chapter_content": chapter_content.strip(),
+    }
+    return Prompt(
+        prefix=template[:cut].format(**values),
+        suffix=template[cut:].format(**values),
+    )
+
+
+def _coerce_prompt(prompt: Prompt | str) -> Prompt:
+    if isinstance(prompt, Prompt):
+        return prompt
+    return Prompt(prefix="", suffix=str(prompt))
+
+
+@dataclass(slots=True)
+class ModelInfo:
+    """A model offered by a provider and the capabilities it reports.
+
+    Hosted providers only report names; Ollama fills in the details.
+    """
+
+    name: str
+    family: str | None = None
+    parameter_size: str | None = None
+    quantization: str | None = None
+    size_bytes: int | None = None
+    context_length: int | None = None
+    # The window the model runs with (Ollama's ``num_ctx`` parameter), if set.
+    num_ctx: int | None = None
+
+    def to_dict(self) -> Dict[str, object]:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, object]) -> "ModelInfo":
+        known = {item.name for item in fields(cls)}
+        return cls(**{key: value for key, value in data.items() if key in known})
+
+
+@dataclass(slots=True)
+class GenerationResult:
+    """Generated text plus the performance telemetry of a single request.
+
+    Durations are in seconds. Token counts are ``None`` when the provider
+    did not report them.
+    """
+
+    text: str
+    provider: str = ""
+    model: str = ""
+    latency: float = 0.0
+    time_to_first_token: float | None = None
+    input_tokens: int | None = None
+    output_tokens: int | None = None
+    cached_input_tokens: int = 0
+    cache_write_tokens: int = 0
+    load_duration: float | None = None
+    prompt_eval_duration: float | None = None
+    eval_duration: float | None = None
+    # Served by a duplicate request sent to a fallback endpoint.
+    hedged: bool = False
+    # Shared with an identical request that was already in flight.
+    coalesced: bool = False
+
+    @property
+    def tokens_per_second(self) -> float | None:
+        if not self.output_tokens:
+            return None
+        if self.eval_duration:
+            return self.output_tokens / self.eval_duration
+        generation_time = self.latency - (self.time_to_first_token or 0.0)
+        if generation_time <= 0:
+            return None
+        return self.output_tokens / generation_time
+
+    def to_dict(self) -> Dict[str, object]:
+        """Return the telemetry fields as JSON-serialisable values (without text)."""
+
+        return {
+            "provider": self.provider,
+            "model": self.model,
+            "latency": self.latency,
+            "time_to_first_token": self.time_to_first_token,
+            "input_tokens": self.input_tokens,
+            "output_tokens": self.output_tokens,
+            "cached_input_tokens": self.cached_input_tokens,
+            "cache_write_tokens": self.cache_write_tokens,
+            "load_duration": self.load_duration,
+            "prompt_eval_duration": self.prompt_eval_duration,
+            "eval_duration": self.eval_duration,
+            "tokens_per_second": self.tokens_per_second,
+            "hedged": self.hedged,
+            "coalesced": self.coalesced,
+        }
 
 
 class _BaseLLMClient:
+    provider = ""
+
     def __init__(self, settings: LLMSettings) -> None:
         self.settings = settings
 
-    def generate(self, prompt: str) -> str:  # pragma: no cover - interface only
+    def generate(
+        self,
+        prompt: Prompt | str,
+        max_tokens: int | None = None,
+        cancel: CancellationToken | None = None,
+        on_first_token: Callable[[], None] | None = None,
+    ) -> GenerationResult:  # pragma: no cover - interface only
         raise NotImplementedError
 
+    def _cache_prefix(self, prompt: Prompt) -> bool:
+        """Whether to send ``prompt`` as a cacheable prefix plus a suffix."""
+
+        return (
+            self.settings.prompt_caching
+            and bool(prompt.prefix)
+            and self.settings.resolved_provider().capabilities.prefix_caching
+        )
+
+    def _new_result(self) -> GenerationResult:
+        return GenerationResult(text="", provider=self.provider, model=self.settings.model.strip())
+
+    @staticmethod
+    def _partial(
+        result: GenerationResult, pieces: List[str], timer: "_StreamTimer"
+    ) -> GenerationResult:
+        """Fill ``result`` from a stream that was cut short."""
+
+        result.text = "".join(pieces)
+        if result.output_tokens is None and pieces:
+            # Providers stream roughly one token per chunk.
+            result.output_tokens = len(pieces)
+        return timer.finish(result)
+
+
+class _StreamTimer:
+    """Track latency and time-to-first-token for a streamed response."""
+
+    __slots__ = ("started", "first_token", "on_first_token")
+
+    def __init__(self, on_first_token: Callable[[], None] | None = None) -> None:
+        self.started = time.perf_counter()
+        self.first_token: float | None = None
+        self.on_first_token = on_first_token
+
+    def mark_token(self) -> None:
+        if self.first_token is None:
+            self.first_token = time.perf_counter() - self.started
+            if self.on_first_token is not None:
+                self.on_first_token()
+
+    def finish(self, result: GenerationResult) -> GenerationResult:
+        result.latency = time.perf_counter() - self.started
+        result.time_to_first_token = self.first_token
+        return result
+
+
+def _iter_sse(response) -> Iterator[tuple[str, str]]:
+    """Yield ``(event, data)`` pairs from a server-sent events stream."""
+
+    event = ""
+    data: list[str] = []
+    for raw_line in response:
+        line = raw_line.decode("utf-8").rstrip("\r\n")
+        if not line:
+            if data:
+                yield event, "\n".join(data)
+            event, data = "", []
+            continue
+        if line.startswith(":"):
+            continue
+        field_name, _, value = line.partition(":")
+        value = value[1:] if value.startswith(" ") else value
+        if field_name == "event":
+            event = value
+        elif field_name == "data":
+            data.append(value)
+    if data:
+        yield event, "\n".join(data)
+
+
+def _raise_payload_error(payload: object) -> None:
+    if not isinstance(payload, dict) or "error" not in payload:
+        return
+    error = payload["error"]
+    if isinstance(error, dict) and "message" in error:
+        raise LLMError(str(error["message"]))
+    raise LLMError(str(error))
+
+
+def _http_error(exc: HTTPError | URLError) -> LLMError:
+    """Translate a urllib error, keeping rate limiting apart from failures."""
+
+    if isinstance(exc, HTTPError):
+        retry_after = _retry_after(exc.headers.get("Retry-After") if exc.headers else None)
+        if exc.code == 429 or retry_after is not None:
+            return LLMRateLimited(str(exc), retry_after=retry_after)
+    return LLMError(str(exc))
+
+
+def _retry_after(value: str | None) -> float | None:
+    """Seconds requested by a ``Retry-After`` header (delay or HTTP date)."""
+
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        moment = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if moment is None:
+        return None
+    return max(0.0, moment.timestamp() - time.time())
+
+
+def _nanoseconds(value: object) -> float | None:
+    if isinstance(value, (int, float)) and value > 0:
+        return value / 1e9
+    return None
+
+
+# Abortable transport -----------------------------------------------------------
+class _AbortHandle:
+    """Socket of an in-flight request, shut down when its token is cancelled.
+
+    Shutting the socket down from another thread wakes a blocked read
+    immediately, which a plain timeout cannot do.
+    """
+
+    __slots__ = ("_sock", "_aborted", "_lock")
+
+    def __init__(self) -> None:
+        self._sock: socket.socket | None = None
+        self._aborted = False
+        self._lock = threading.Lock()
+
+    def attach(self, sock: socket.socket) -> None:
+        with self._lock:
+            self._sock = sock
+            aborted = self._aborted
+        if aborted:
+            _shutdown(sock)
+
+    def abort(self) -> None:
+        with self._lock:
+            self._aborted = True
+            sock = self._sock
+        if sock is not None:
+            _shutdown(sock)
+
+
+def _shutdown(sock: socket.socket) -> None:
+    try:
+        sock.shutdown(socket.SHUT_RDWR)
+    except OSError:
+        pass
+
+
+class _AbortableHTTPConnection(http.client.HTTPConnection):
+    abort_handle: _AbortHandle | None = None
+
+    def connect(self) -> None:
+        super().connect()
+        if self.abort_handle is not None:
+            self.abort_handle.attach(self.sock)
+
+
+class _AbortableHTTPSConnection(http.client.HTTPSConnection):
+    abort_handle: _AbortHandle | None = None
+
+    def connect(self) -> None:
+        super().connect()
+        if self.abort_handle is not None:
+            self.abort_handle.attach(self.sock)
+
+
+def _connection_factory(connection_class, request: Request):
+    def factory(host: str, **kwargs):
+        connection = connection_class(host, **kwargs)
+        connection.abort_handle = getattr(request, "abort_handle", None)
+        return connection
+
+    return factory
+
+
+class _ConnectionPool:
+    """Idle keep-alive connections, so consecutive requests skip the handshake."""
+
+    def __init__(self) -> None:
+        self._idle: Dict[tuple, List[tuple[float, http.client.HTTPConnection]]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple) -> http.client.HTTPConnection | None:
+        expired: list[http.client.HTTPConnection] = []
+        connection = None
+        with self._lock:
+            idle = self._idle.get(key, [])
+            cutoff = time.monotonic() - IDLE_CONNECTION_TTL
+            while idle:
+                released, candidate = idle.pop()
+                if released >= cutoff:
+                    connection = candidate
+                    break
+                expired.append(candidate)
+        for stale in expired:
+            stale.close()
+        return connection
+
+    def put(self, key: tuple, connection: http.client.HTTPConnection) -> None:
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            idle.append((time.monotonic(), connection))
+            surplus = idle[:-MAX_IDLE_CONNECTIONS]
+            del idle[:-MAX_IDLE_CONNECTIONS]
+        for _, stale in surplus:
+            stale.close()
+
+    def clear(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for connections in idle.values():
+            for _, connection in connections:
+                connection.close()
+
+
+_POOL = _ConnectionPool()
+
+
+def close_idle_connections() -> None:
+    """Close the kept-alive connections of finished requests."""
+
+    _POOL.clear()
+
+
+class _PooledHandlerMixin:
+    """``do_open`` that reuses connections instead of sending ``Connection: close``.
+
+    The connection travels with the response; :func:`_open` returns it to
+    the pool once the response was read to the end.
+    """
+
+    def _pooled_open(self, connection_class, req, **kwargs):
+        if req._tunnel_host:  # HTTPS through a proxy: keep urllib's own path
+            return self.do_open(_connection_factory(connection_class, req), req, **kwargs)
+        if not req.host:
+            raise URLError("no host given")
+        key = (connection_class, req.host, req.type)
+        headers = dict(req.unredirected_hdrs)
+        headers.update({name: value for name, value in req.headers.items() if name not in headers})
+        headers = {name.title(): value for name, value in headers.items()}
+        handle = getattr(req, "abort_handle", None)
+
+        connection = _POOL.get(key)
+        while True:
+            reused = connection is not None
+            if connection is None:
+                connection = _connection_factory(connection_class, req)(
+                    req.host, timeout=req.timeout, **kwargs
+                )
+            else:
+                connection.timeout = req.timeout
+                connection.sock.settimeout(req.timeout)
+                if handle is not None:
+                    handle.attach(connection.sock)
+            try:
+                connection.request(
+                    req.get_method(),
+                    req.selector,
+                    req.data,
+                    headers,
+                    encode_chunked=req.has_header("Transfer-encoding"),
+                )
+                response = connection.getresponse()
+            except (ConnectionError, http.client.RemoteDisconnected) as exc:
+                connection.close()
+                if reused:
+                    # The server closed the idle connection; retry on a new one.
+                    connection = None
+                    continue
+                raise URLError(exc) from exc
+            except OSError as exc:
+                connection.close()
+                raise URLError(exc) from exc
+            except BaseException:
+                connection.close()
+                raise
+            break
+        response.url = req.get_full_url()
+        response.msg = response.reason
+        response.pool_slot = (key, connection)
+        return response
+
+
+class _AbortableHTTPHandler(_PooledHandlerMixin, HTTPHandler):
+    def http_open(self, req):
+        return self._pooled_open(_AbortableHTTPConnection, req)
+
+
+class _AbortableHTTPSHandler(_PooledHandlerMixin, HTTPSHandler):
+    def https_open(self, req):
+        return self._pooled_open(_AbortableHTTPSConnection, req, context=self._context)
+
+
+def _release(response, reusable: bool) -> None:
+    """Return the connection of a finished response to the pool, or close it."""
+
+    slot = getattr(response, "pool_slot", None)
+    if slot is None:
+        return
+    response.pool_slot = None
+    key, connection = slot
+    if reusable and not response.will_close:
+        try:
+            if not response.isclosed():
+                # Read the end of the body (e.g. the last chunk after Ollama's
+                # "done" frame) so the connection is ready for the next request.
+                response.read(DRAIN_LIMIT)
+        except (OSError, http.client.HTTPException):
+            reusable = False
+        if reusable and response.isclosed():
+            _POOL.put(key, connection)
+            return
+    connection.close()
+
+
+# Keeps urllib's proxy and redirect handling; only the connections differ.
+_OPENER = build_opener(_AbortableHTTPHandler, _AbortableHTTPSHandler)
+
+
+@contextmanager
+def _pooled(
+    request: Request,
+    timeout: float,
+    cancel: CancellationToken | None = None,
+    detach: Callable[[], None] | None = None,
+):
+    """Open ``request`` on a pooled connection and return it to the pool after.
+
+    ``detach`` unregisters the cancellation callback that can abort the
+    connection; it runs before the connection goes back to the pool, so a
+    late cancel cannot shut down a socket another request is using.
+    """
+
+    try:
+        response = _OPENER.open(request, timeout=timeout)
+    except HTTPError as exc:
+        _release(exc.fp, reusable=False)
+        raise
+    # Released before closing: closing marks the response as read to the end.
+    try:
+        yield response
+    except BaseException:
+        _release(response, reusable=False)
+        response.close()
+        raise
+    if detach is not None:
+        detach()
+    # Checked after detaching: a cancel that fired first has set the flag.
+    _release(response, reusable=cancel is None or not cancel.cancelled)
+    response.close()
+
+
+@contextmanager
+def _open(request: Request, timeout: float, cancel: CancellationToken | None = None):
+    """Open ``request``, aborting the connection if ``cancel`` fires.
+
+    Errors caused by the abort surface as :class:`LLMCancelled`; other
+    errors propagate unchanged for the caller to translate.
+    """
+
+    if cancel is None:
+        with _pooled(request, timeout) as response:
+            yield response
+        return
+    cancel.raise_if_cancelled(LLMCancelled)
+    handle = _AbortHandle()
+    request.abort_handle = handle  # type: ignore[attr-defined]
+    unregister = cancel.on_cancel(handle.abort)
+    try:
+        with _pooled(request, cancel.clamp_timeout(timeout), cancel, unregister) as response:
+            yield response
+    except LLMCancelled:
+        raise
+    except Exception as exc:
+        if cancel.cancelled:
+            raise LLMCancelled(cancel.reason) from exc
+        raise
+    finally:
+        unregister()
+    # An aborted stream can simply end early, so never trust it as complete.
+    cancel.raise_if_cancelled(LLMCancelled)
+
 
 class _OllamaClient(_BaseLLMClient):
-    def generate(self, prompt: str) -> str:
+    provider = "ollama"
+
+    def generate(
+        self,
+        prompt: Prompt | str,
+        max_tokens: int | None = None,
+        cancel: CancellationToken | None = None,
+        on_first_token: Callable[[], None] | None = None,
+    ) -> GenerationResult:
         model = self.settings.model.strip()
         if not model:
             raise LLMError("Model name must not be empty")
-        payload = {
+        prompt = _coerce_prompt(prompt)
+        payload: Dict[str, object] = {
             "model": model,
-            "prompt": prompt,
-            "stream": True,
+            "prompt": prompt.text,
+            "stream": self.settings.stream,
             "options": {
                 "temperature": self.settings.temperature,
                 "top_p": self.settings.top_p,
-                "num_predict": self.settings.max_tokens,
+                "num_predict": max_tokens or self.settings.max_tokens,
                 "presence_penalty": self.settings.presence_penalty,
                 "frequency_penalty": self.settings.frequency_penalty,
                 "repeat_penalty": self.settings.repeat_penalty,
                 "top_k": self.settings.top_k,
             },
         }
+        if self._cache_prefix(prompt):
+            # A stable system prompt lets Ollama reuse the evaluated prefix
+            # from its KV cache while the model stays loaded.
+            payload["system"] = prompt.prefix.strip()
+            payload["prompt"] = prompt.suffix
+        if self.settings.keep_alive:
+            payload["keep_alive"] = _keep_alive_value(self.settings.keep_alive)
+        if self.settings.context_window:
+            payload["options"]["num_ctx"] = self.settings.context_window  # type: ignore[index]
         request = Request(
             url=f"{self.settings.resolved_endpoint().rstrip('/')}/api/generate",
             data=json.dumps(payload).encode("utf-8"),
             headers={"Content-Type": "application/json"},
             method="POST",
         )
+        result = self._new_result()
+        timer = _StreamTimer(on_first_token)
+        pieces: List[str] = []
         try:
-            with urlopen(request, timeout=120) as response:
-                pieces: list[str] = []
-                for raw_line in response:
-                    if not raw_line:
-                        continue
-                    line = raw_line.decode("utf-8").strip()
-                    if not line:
-                        continue
-                    chunk = json.loads(line)
+            with _open(request, REQUEST_TIMEOUT, cancel) as response:
+                # Without streaming the body is a single object, decoded the same way.
+                chunks = iter_ndjson(response) if self.settings.stream else [loads(response.read())]
+                for chunk in chunks:
                     if "error" in chunk:
                         raise LLMError(str(chunk["error"]))
                     text = chunk.get("response")
                     if text:
+                        timer.mark_token()
                         pieces.append(text)
                     if chunk.get("done"):
+                        # The final chunk carries the server-side timings.
+                        # Ollama does not report cached tokens separately.
+                        result.input_tokens = chunk.get("prompt_eval_count")
+                        result.output_tokens = chunk.get("eval_count")
+                        result.load_duration = _nanoseconds(chunk.get("load_duration"))
+                        result.prompt_eval_duration = _nanoseconds(
+                            chunk.get("prompt_eval_duration")
+                        )
+                        result.eval_duration = _nanoseconds(chunk.get("eval_duration"))
                         break
-                return "".join(pieces).strip()
+                result.text = "".join(pieces).strip()
+                return timer.finish(result)
+        except LLMCancelled as exc:
+            exc.partial = self._partial(result, pieces, timer)
+            raise
         except (HTTPError, URLError) as exc:
-            raise LLMError(str(exc)) from exc
+            raise _http_error(exc) from exc
+        except (OSError, http.client.HTTPException) as exc:
+            # Socket errors while reading the body, e.g. a read timeout.
+            raise LLMError(str(exc) or type(exc).__name__) from exc
         except json.JSONDecodeError as exc:  # pragma: no cover - defensive
             raise LLMError("Invalid response from Ollama") from exc
 
 
 class _OpenAIClient(_BaseLLMClient):
-    def generate(self, prompt: str) -> str:
+    provider = "openai"
+
+    def generate(
+        self,
+        prompt: Prompt | str,
+        max_tokens: int | None = None,
+        cancel: CancellationToken | None = None,
+        on_first_token: Callable[[], None] | None = None,
+    ) -> GenerationResult:
         model = self.settings.model.strip()
         if not model:
             raise LLMError("Model name must not be empty")
@@ -191,14 +854,26 @@ class _OpenAIClient(_BaseLLMClient):
         if not api_key:
             raise LLMError("OpenAI API key is required for this provider")
         endpoint = self.settings.resolved_endpoint().rstrip("/")
+        prompt = _coerce_prompt(prompt)
+        if self._cache_prefix(prompt):
+            # OpenAI caches prompts automatically when the leading messages
+            # are identical, so the static instructions always come first.
+            messages = [
+                {"role": "system", "content": prompt.prefix.strip()},
+                {"role": "user", "content": prompt.suffix},
+            ]
+        else:
+            messages = [{"role": "user", "content": prompt.text}]
         payload: Dict[str, object] = {
             "model": model,
+            "messages": messages,
             "temperature": self.settings.temperature,
-            "max_tokens": self.settings.max_tokens,
+            "max_tokens": max_tokens or self.settings.max_tokens,
             "top_p": self.settings.top_p,
             "presence_penalty": self.settings.presence_penalty,
             "frequency_penalty": self.settings.frequency_penalty,
-            "messages": [{"role": "user", "content": prompt}],
+            "stream": True,
+            "stream_options": {"include_usage": True},
         }
         request = Request(
             url=f"{endpoint}/chat/completions",
@@ -209,37 +884,84 @@ class _OpenAIClient(_BaseLLMClient):
             },
             method="POST",
         )
+        result = self._new_result()
+        timer = _StreamTimer(on_first_token)
+        pieces: List[str] = []
         try:
-            with urlopen(request, timeout=120) as response:
-                payload = json.loads(response.read().decode("utf-8"))
+            with _open(request, REQUEST_TIMEOUT, cancel) as response:
+                if response.headers.get_content_type() == "application/json":
+                    # Some compatible servers ignore "stream" and answer in one body.
+                    body = json.loads(response.read().decode("utf-8"))
+                    _raise_payload_error(body)
+                    timer.mark_token()
+                    self._consume(body, pieces, result, streamed=False)
+                else:
+                    for _, data in _iter_sse(response):
+                        if data == "[DONE]":
+                            break
+                        chunk = json.loads(data)
+                        _raise_payload_error(chunk)
+                        if self._consume(chunk, pieces, result, streamed=True):
+                            timer.mark_token()
+        except LLMCancelled as exc:
+            exc.partial = self._partial(result, pieces, timer)
+            raise
         except (HTTPError, URLError) as exc:
-            raise LLMError(str(exc)) from exc
+            raise _http_error(exc) from exc
+        except (OSError, http.client.HTTPException) as exc:
+            # Socket errors while reading the body, e.g. a read timeout.
+            raise LLMError(str(exc) or type(exc).__name__) from exc
         except json.JSONDecodeError as exc:  # pragma: no cover - defensive
             raise LLMError("Invalid response from OpenAI") from exc
 
-        if "error" in payload:
-            error = payload["error"]
-            if isinstance(error, dict) and "message" in error:
-                raise LLMError(str(error["message"]))
-            raise LLMError(str(error))
+        if not pieces:
+            raise LLMError("OpenAI response did not include any content")
+        result.text = "".join(pieces).strip()
+        return timer.finish(result)
+
+    @staticmethod
+    def _consume(
+        payload: Dict[str, object],
+        pieces: List[str],
+        result: GenerationResult,
+        streamed: bool,
+    ) -> bool:
+        usage = payload.get("usage")
+        if isinstance(usage, dict):
+            details = usage.get("prompt_tokens_details")
+            cached = details.get("cached_tokens") if isinstance(details, dict) else 0
+            result.input_tokens = usage.get("prompt_tokens")
+            result.output_tokens = usage.get("completion_tokens")
+            result.cached_input_tokens = int(cached or 0)
 
         choices = payload.get("choices")
         if not isinstance(choices, list):
+            if streamed:
+                return False
             raise LLMError("OpenAI response missing choices")
-        pieces: List[str] = []
+        received = False
         for choice in choices:
-            message = choice.get("message") if isinstance(choice, dict) else None
+            if not isinstance(choice, dict):
+                continue
+            message = choice.get("delta" if streamed else "message")
             if isinstance(message, dict):
                 content = message.get("content")
-                if isinstance(content, str):
-                    pieces.append(content)
-        if not pieces:
-            raise LLMError("OpenAI response did not include any content")
-        return "\n".join(piece.strip() for piece in pieces if piece).strip()
+                if isinstance(content, str) and content:
+                    pieces.append(content if streamed else content.strip() + "\n")
+                    received = True
+        return received
 
 
 class _AnthropicClient(_BaseLLMClient):
-    def generate(self, prompt: str) -> str:
+    provider = "anthropic"
+
+    def generate(
+        self,
+        prompt: Prompt | str,
+        max_tokens: int | None = None,
+        cancel: CancellationToken | None = None,
+        on_first_token: Callable[[], None] | None = None,
+    ) -> GenerationResult:
         model = self.settings.model.strip()
         if not model:
             raise LLMError("Model name must not be empty")
@@ -247,16 +969,27 @@ class _AnthropicClient(_BaseLLMClient):
         if not api_key:
             raise LLMError("Anthropic API key is required for this provider")
         endpoint = self.settings.resolved_endpoint().rstrip("/")
+        prompt = _coerce_prompt(prompt)
         payload: Dict[str, object] = {
             "model": model,
-            "max_tokens": self.settings.max_tokens,
+            "max_tokens": max_tokens or self.settings.max_tokens,
             "temperature": self.settings.temperature,
             "top_p": self.settings.top_p,
             "top_k": self.settings.top_k,
             "presence_penalty": self.settings.presence_penalty,
             "frequency_penalty": self.settings.frequency_penalty,
-            "messages": [{"role": "user", "content": prompt}],
+            "messages": [{"role": "user", "content": prompt.text}],
+            "stream": True,
         }
+        if self._cache_prefix(prompt):
+            payload["system"] = [
+                {
+                    "type": "text",
+                    "text": prompt.prefix.strip(),
+                    "cache_control": {"type": "ephemeral"},
+                }
+            ]
+            payload["messages"] = [{"role": "user", "content": prompt.suffix}]
         request = Request(
             url=f"{endpoint}/messages",
             data=json.dumps(payload).encode("utf-8"),
@@ -267,63 +1000,159 @@ class _AnthropicClient(_BaseLLMClient):
             },
             method="POST",
         )
+        result = self._new_result()
+        timer = _StreamTimer(on_first_token)
+        pieces: List[str] = []
         try:
-            with urlopen(request, timeout=120) as response:
-                payload = json.loads(response.read().decode("utf-8"))
+            with _open(request, REQUEST_TIMEOUT, cancel) as response:
+                for event, data in _iter_sse(response):
+                    chunk = json.loads(data)
+                    _raise_payload_error(chunk)
+                    if event == "message_start":
+                        message = chunk.get("message") or {}
+                        self._apply_usage(message.get("usage"), result)
+                    elif event == "content_block_delta":
+                        delta = chunk.get("delta") or {}
+                        text = delta.get("text")
+                        if delta.get("type") == "text_delta" and isinstance(text, str):
+                            timer.mark_token()
+                            pieces.append(text)
+                    elif event == "message_delta":
+                        self._apply_usage(chunk.get("usage"), result)
+                    elif event == "message_stop":
+                        break
+        except LLMCancelled as exc:
+            exc.partial = self._partial(result, pieces, timer)
+            raise
         except (HTTPError, URLError) as exc:
-            raise LLMError(str(exc)) from exc
+            raise _http_error(exc) from exc
+        except (OSError, http.client.HTTPException) as exc:
+            # Socket errors while reading the body, e.g. a read timeout.
+            raise LLMError(str(exc) or type(exc).__name__) from exc
         except json.JSONDecodeError as exc:  # pragma: no cover - defensive
             raise LLMError("Invalid response from Anthropic") from exc
 
-        if "error" in payload:
-            error = payload["error"]
-            if isinstance(error, dict) and "message" in error:
-                raise LLMError(str(error["message"]))
-            raise LLMError(str(error))
-
-        content = payload.get("content")
-        if not isinstance(content, list):
-            raise LLMError("Anthropic response missing content")
-        pieces: List[str] = []
-        for block in content:
-            if not isinstance(block, dict):
-                continue
-            if block.get("type") == "text" and isinstance(block.get("text"), str):
-                pieces.append(block["text"])
         if not pieces:
             raise LLMError("Anthropic response did not include any text blocks")
-        return "\n".join(piece.strip() for piece in pieces if piece).strip()
+        result.text = "".join(pieces).strip()
+        return timer.finish(result)
+
+    @staticmethod
+    def _apply_usage(usage: object, result: GenerationResult) -> None:
+        if not isinstance(usage, dict):
+            return
+        if "input_tokens" in usage:
+            # input_tokens excludes the tokens read from or written to the cache.
+            cached = int(usage.get("cache_read_input_tokens") or 0)
+            written = int(usage.get("cache_creation_input_tokens") or 0)
+            result.input_tokens = int(usage.get("input_tokens") or 0) + cached + written
+            result.cached_input_tokens = cached
+            result.cache_write_tokens = written
+        if "output_tokens" in usage:
+            result.output_tokens = usage.get("output_tokens")
+
+
+def _keep_alive_value(value: str) -> str | int:
+    """Ollama accepts durations such as ``"10m"`` or plain seconds like ``-1``."""
+
+    value = value.strip()
+    try:
+        return int(value)
+    except ValueError:
+        return value
 
 
 def create_client(settings: LLMSettings) -> _BaseLLMClient:
-    provider = settings.normalized_provider()
-    if provider == "ollama":
-        return _OllamaClient(settings)
-    if provider == "openai":
-        return _OpenAIClient(settings)
-    if provider == "anthropic":
-        return _AnthropicClient(settings)
-    raise LLMError(f"Unsupported provider: {settings.provider}")
+    """Build a client for the settings' provider.
+
+    Unless ``settings.coalesce`` is off, identical concurrent requests share
+    one upstream call (see :mod:`docalypt.singleflight`).
+    """
+
+    client = settings.resolved_provider().client(settings)
+    if settings.coalesce == COALESCE_OFF:
+        return client
+    from .singleflight import SingleFlightClient
+
+    return SingleFlightClient(client)
 
 
 def list_models(settings: LLMSettings) -> list[str]:
-    provider = settings.normalized_provider()
-    if provider == "ollama":
-        return _list_local_models(settings.resolved_endpoint())
-    if provider == "openai":
-        return _list_openai_models(settings)
-    # Anthropic and other providers do not expose a public model listing endpoint.
-    return []
+    return [model.name for model in list_model_info(settings)]
+
 
+def warm_up_model(
+    settings: LLMSettings,
+    keep_alive: str = PINNED_KEEP_ALIVE,
+    cancel: CancellationToken | None = None,
+) -> float:
+    """Load the configured Ollama model and keep it resident.
 
-def _list_local_models(endpoint: str) -> list[str]:
+    Sends an empty prompt, which makes Ollama load the model without
+    generating anything, and returns the wall-clock seconds it took.
+    """
+
+    model = settings.model.strip()
+    if not model:
+        raise LLMError("Model name must not be empty")
+    started = time.perf_counter()
+    payload = _ollama_control_request(
+        settings, _residency_request(settings, _keep_alive_value(keep_alive)), cancel
+    )
+    elapsed = time.perf_counter() - started
+    load_duration = _nanoseconds(payload.get("load_duration"))
+    if load_duration:
+        logger.info(
+            "Loaded model %s in %.2fs (keep_alive=%s)", model, load_duration, keep_alive
+        )
+    else:
+        logger.info(
+            "Model %s already resident, pinned in %.2fs (keep_alive=%s)",
+            model,
+            elapsed,
+            keep_alive,
+        )
+    return elapsed
+
+
+def release_model(settings: LLMSettings) -> float:
+    """Drop a pin set by :func:`warm_up_model`, restoring the idle keep-alive."""
+
+    keep_alive = (settings.keep_alive or DEFAULT_OLLAMA_KEEP_ALIVE).strip()
+    if keep_alive == "0":
+        return unload_model(settings)
+    started = time.perf_counter()
+    _ollama_control_request(settings, _residency_request(settings, _keep_alive_value(keep_alive)))
+    elapsed = time.perf_counter() - started
+    logger.info("Released model %s (keep_alive=%s)", settings.model.strip(), keep_alive)
+    return elapsed
+
+
+def unload_model(settings: LLMSettings) -> float:
+    """Ask Ollama to evict the configured model from memory immediately."""
+
+    model = settings.model.strip()
+    if not model:
+        raise LLMError("Model name must not be empty")
+    started = time.perf_counter()
+    _ollama_control_request(settings, {"model": model, "prompt": "", "keep_alive": 0})
+    elapsed = time.perf_counter() - started
+    logger.info("Unloaded model %s in %.2fs", model, elapsed)
+    return elapsed
+
+
+def list_running_models(settings: LLMSettings) -> list[str]:
+    """Return the Ollama models currently resident in memory (``/api/ps``)."""
+
+    if not settings.resolved_provider().capabilities.model_residency:
+        return []
     request = Request(
-        url=f"{endpoint.rstrip('/')}/api/tags",
+        url=f"{settings.resolved_endpoint().rstrip('/')}/api/ps",
         headers={"Accept": "application/json"},
         method="GET",
     )
     try:
-        with urlopen(request, timeout=10) as response:
+        with _open(request, 10) as response:
             payload = json.loads(response.read().decode("utf-8"))
     except (HTTPError, URLError) as exc:
         raise LLMError(str(exc)) from exc
@@ -331,18 +1160,180 @@ def _list_local_models(endpoint: str) -> list[str]:
         raise LLMError("Invalid response from Ollama") from exc
 
     models: List[str] = []
+    for model in payload.get("models", []):
+        if not isinstance(model, dict):
+            continue
+        name = model.get("model") or model.get("name")
+        if isinstance(name, str) and name.strip():
+            models.append(name.strip())
+    return sorted(dict.fromkeys(models))
+
+
+def _residency_request(settings: LLMSettings, keep_alive: str | int) -> Dict[str, object]:
+    """An empty prompt, which only loads the model or changes its keep-alive."""
+
+    request: Dict[str, object] = {
+        "model": settings.model.strip(),
+        "prompt": "",
+        "keep_alive": keep_alive,
+    }
+    if settings.context_window:
+        # Ollama reloads a model asked for with a different num_ctx.
+        request["options"] = {"num_ctx": settings.context_window}
+    return request
+
+
+def _ollama_control_request(
+    settings: LLMSettings,
+    payload: Dict[str, object],
+    cancel: CancellationToken | None = None,
+) -> Dict[str, object]:
+    if not settings.resolved_provider().capabilities.model_residency:
+        raise LLMError("Model residency is only managed for Ollama providers")
+    payload = {**payload, "stream": False}
+    request = Request(
+        url=f"{settings.resolved_endpoint().rstrip('/')}/api/generate",
+        data=json.dumps(payload).encode("utf-8"),
+        headers={"Content-Type": "application/json"},
+        method="POST",
+    )
+    try:
+        with _open(request, 300, cancel) as response:
+            body = json.loads(response.read().decode("utf-8"))
+    except (HTTPError, URLError) as exc:
+        raise LLMError(str(exc)) from exc
+    except json.JSONDecodeError as exc:  # pragma: no cover - defensive
+        raise LLMError("Invalid response from Ollama") from exc
+    _raise_payload_error(body)
+    return body if isinstance(body, dict) else {}
+
+
+def _ollama_tags(endpoint: str) -> Dict[str, Dict[str, object]]:
+    """Return the ``/api/tags`` entries keyed by model name."""
+
+    request = Request(
+        url=f"{endpoint.rstrip('/')}/api/tags",
+        headers={"Accept": "application/json"},
+        method="GET",
+    )
+    try:
+        with _open(request, 10) as response:
+            payload = json.loads(response.read().decode("utf-8"))
+    except (HTTPError, URLError) as exc:
+        raise LLMError(str(exc)) from exc
+    except json.JSONDecodeError as exc:  # pragma: no cover - defensive
+        raise LLMError("Invalid response from Ollama") from exc
+
+    entries: Dict[str, Dict[str, object]] = {}
     for model in payload.get("models", []):
         name = model.get("model") if isinstance(model, dict) else None
         if not name and isinstance(model, dict):
             name = model.get("name")
         if isinstance(name, str) and name.strip():
-            models.append(name.strip())
+            entries.setdefault(name.strip(), model)
+    return entries
+
+
+def _ollama_model_info(name: str, entry: Dict[str, object]) -> ModelInfo:
+    details = entry.get("details")
+    details = details if isinstance(details, dict) else {}
+    size = entry.get("size")
+    context_length = None
+    model_info = entry.get("model_info")
+    if isinstance(model_info, dict):
+        for key, value in model_info.items():
+            if key.endswith(".context_length") and isinstance(value, int):
+                context_length = value
+                break
+    num_ctx = None
+    parameters = entry.get("parameters")
+    if isinstance(parameters, str):
+        for line in parameters.splitlines():
+            name, _, value = line.strip().partition(" ")
+            if name == "num_ctx" and value.strip().isdigit():
+                num_ctx = int(value.strip())
+    return ModelInfo(
+        name=name,
+        family=details.get("family") or None,
+        parameter_size=details.get("parameter_size") or None,
+        quantization=details.get("quantization_level") or None,
+        size_bytes=size if isinstance(size, int) else None,
+        context_length=context_length,
+        num_ctx=num_ctx,
+    )
+
 
-    unique_sorted = sorted(dict.fromkeys(models))
-    return unique_sorted
+def list_model_info(settings: LLMSettings) -> list[ModelInfo]:
+    """Like :func:`list_models`, with the details each provider reports.
 
+    Providers without a model listing return an empty list. Ollama's listing
+    does not include context lengths; see :func:`show_model`.
+    """
 
-def _list_openai_models(settings: LLMSettings) -> list[str]:
+    lister = settings.resolved_provider().list_models
+    return lister(settings) if lister is not None else []
+
+
+def show_model(settings: LLMSettings, model: str) -> ModelInfo:
+    """Return the full details of one model (for Ollama, from ``/api/show``)."""
+
+    describe = settings.resolved_provider().describe_model
+    return describe(settings, model) if describe is not None else ModelInfo(name=model)
+
+
+def resolve_context_window(settings: LLMSettings) -> LLMSettings:
+    """Fill in ``context_window`` from the model when it is not configured.
+
+    Ollama runs a model with its ``num_ctx`` parameter, else with the
+    server's ``OLLAMA_CONTEXT_LENGTH``; a prompt beyond that is silently
+    truncated. The window is read from ``/api/show`` in that order and
+    falls back to the model's trained context length, capped at
+    ``MAX_AUTO_CONTEXT_WINDOW``. The result is sent as ``num_ctx`` with
+    every request, so budgeting and the server agree. Other providers, and
+    models that cannot be described, keep the provider default.
+    """
+
+    if settings.context_window or settings.resolved_provider().describe_model is None:
+        return settings
+    try:
+        info = show_model(settings, settings.model)
+    except LLMError as exc:
+        logger.warning("Could not read the context window of %s: %s", settings.model, exc)
+        return settings
+    configured = os.getenv(ENV_OLLAMA_CONTEXT_LENGTH, "").strip()
+    window = info.num_ctx or (int(configured) if configured.isdigit() else None)
+    if not window and info.context_length:
+        window = min(info.context_length, MAX_AUTO_CONTEXT_WINDOW)
+    if not window:
+        return settings
+    logger.info("Using a %d-token context window for %s", window, settings.model)
+    return replace(settings, context_window=window)
+
+
+def _list_ollama_models(settings: LLMSettings) -> list[ModelInfo]:
+    tags = _ollama_tags(settings.resolved_endpoint())
+    return [_ollama_model_info(name, tags[name]) for name in sorted(tags)]
+
+
+def _show_ollama_model(settings: LLMSettings, model: str) -> ModelInfo:
+    request = Request(
+        url=f"{settings.resolved_endpoint().rstrip('/')}/api/show",
+        data=json.dumps({"model": model}).encode("utf-8"),
+        headers={"Content-Type": "application/json"},
+        method="POST",
+    )
+    try:
+        with _open(request, 10) as response:
+            payload = json.loads(response.read().decode("utf-8"))
+    except (HTTPError, URLError) as exc:
+        raise LLMError(str(exc)) from exc
+    except json.JSONDecodeError as exc:  # pragma: no cover - defensive
+        raise LLMError("Invalid response from Ollama") from exc
+    _raise_payload_error(payload)
+    return _ollama_model_info(model, payload if isinstance(payload, dict) else {})
+
+
+def _list_openai_models(settings: LLMSettings) -> list[ModelInfo]:
     api_key = settings.resolved_api_key()
     if not api_key:
         raise LLMError("OpenAI API key is required to fetch model list")
@@ -356,7 +1347,7 @@ def _list_openai_models(settings: LLMSettings) -> list[str]:
         method="GET",
     )
     try:
-        with urlopen(request, timeout=10) as response:
+        with _open(request, 10) as response:
             payload = json.loads(response.read().decode("utf-8"))
     except (HTTPError, URLError) as exc:
         raise LLMError(str(exc)) from exc
@@ -373,39 +1364,75 @@ def _list_openai_models(settings: LLMSettings) -> list[str]:
             identifier = model.get("id")
             if isinstance(identifier, str) and identifier.strip():
                 models.append(identifier.strip())
-    return sorted(dict.fromkeys(models))
+    return [ModelInfo(name=name) for name in sorted(dict.fromkeys(models))]
 
 
 def settings_from_env() -> LLMSettings:
+    from .providers import find_provider
+
     provider = os.getenv(ENV_PROVIDER, "ollama")
     model = os.getenv(ENV_MODEL, "llama3")
     endpoint = os.getenv(ENV_ENDPOINT)
-    provider_lower = (provider or "ollama").strip().lower()
+    api_key = None
+    spec = find_provider(provider)
+    if spec is not None:
+        endpoint = endpoint or _first_env(spec.endpoint_env)
+        api_key = _first_env(spec.api_key_env)
 
-    if provider_lower == "openai":
-        endpoint = (
-            endpoint
-            or os.getenv(ENV_OPENAI_ENDPOINT)
-            or os.getenv(LEGACY_OPENAI_ENDPOINT)
-        )
-        api_key = os.getenv(ENV_OPENAI_KEY) or os.getenv(LEGACY_OPENAI_KEY)
-    elif provider_lower == "anthropic":
-        endpoint = (
-            endpoint
-            or os.getenv(ENV_ANTHROPIC_ENDPOINT)
-            or os.getenv(LEGACY_ANTHROPIC_ENDPOINT)
-        )
-        api_key = os.getenv(ENV_ANTHROPIC_KEY) or os.getenv(LEGACY_ANTHROPIC_KEY)
-    else:
-        api_key = None
+    caching = os.getenv(ENV_PROMPT_CACHING, "1").strip().lower()
+    stream = os.getenv(ENV_STREAM, "1").strip().lower()
+    context_window = os.getenv(ENV_CONTEXT_WINDOW, "").strip()
+    coalesce = os.getenv(ENV_COALESCE, COALESCE_PROCESS).strip().lower() or COALESCE_PROCESS
+    if coalesce not in {COALESCE_OFF, COALESCE_PROCESS, COALESCE_HOST}:
+        logger.warning("Ignoring %s=%s; expected off, process or host", ENV_COALESCE, coalesce)
+        coalesce = COALESCE_PROCESS
 
-    return LLMSettings(
+    settings = LLMSettings(
         provider=provider,
         model=model,
         endpoint=endpoint,
         api_key=api_key,
         anthropic_version=os.getenv(ENV_ANTHROPIC_VERSION, DEFAULT_ANTHROPIC_VERSION),
+        prompt_caching=caching not in {"0", "false", "no", "off"},
+        stream=stream not in {"0", "false", "no", "off"},
+        coalesce=coalesce,
+        keep_alive=os.getenv(ENV_OLLAMA_KEEP_ALIVE) or None,
+        context_window=int(context_window) if context_window.isdigit() else None,
     )
+    try:
+        settings.fallbacks = parse_fallbacks(os.getenv(ENV_FALLBACKS, ""), settings)
+    except LLMError as exc:
+        logger.warning("Ignoring %s: %s", ENV_FALLBACKS, exc)
+    return settings
+
+
+def parse_fallbacks(value: str, base: LLMSettings) -> list[LLMSettings]:
+    """Parse comma-separated ``provider:model[@endpoint]`` fallback entries.
+
+    Each fallback inherits the generation parameters of ``base``; API keys
+    come from the provider's environment variables.
+    """
+
+    fallbacks: list[LLMSettings] = []
+    for entry in value.split(","):
+        entry = entry.strip()
+        if not entry:
+            continue
+        provider, separator, rest = entry.partition(":")
+        model, _, endpoint = rest.partition("@")
+        if not separator or not model.strip():
+            raise LLMError(f"Invalid fallback {entry!r}; expected provider:model[@endpoint]")
+        fallback = replace(
+            base,
+            provider=provider.strip(),
+            model=model.strip(),
+            endpoint=endpoint.strip() or None,
+            api_key=None,
+            fallbacks=[],
+        )
+        fallback.normalized_provider()
+        fallbacks.append(fallback)
+    return fallbacks
 
 
 # Backwards compatible aliases -------------------------------------------------
@@ -414,18 +1441,40 @@ OllamaError = LLMError
 
 
 __all__ = [
+    "COALESCE_HOST",
+    "COALESCE_OFF",
+    "COALESCE_PROCESS",
     "DEFAULT_ANTHROPIC_ENDPOINT",
     "DEFAULT_ANTHROPIC_VERSION",
     "DEFAULT_OLLAMA_ENDPOINT",
+    "DEFAULT_OLLAMA_KEEP_ALIVE",
     "DEFAULT_OPENAI_ENDPOINT",
+    "GenerationResult",
+    "LLMCancelled",
     "LLMError",
+    "LLMRateLimited",
     "LLMSettings",
+    "MAX_AUTO_CONTEXT_WINDOW",
+    "ModelInfo",
     "OllamaError",
     "OllamaSettings",
+    "PINNED_KEEP_ALIVE",
     "PROMPT_TEMPLATE",
+    "Prompt",
+    "PromptCacheStats",
+    "REQUEST_TIMEOUT",
     "build_prompt",
+    "close_idle_connections",
     "create_client",
+    "list_model_info",
     "list_models",
+    "list_running_models",
+    "parse_fallbacks",
+    "release_model",
+    "resolve_context_window",
     "settings_from_env",
+    "show_model",
+    "unload_model",
+    "warm_up_model",
 ]
 
@@ -0,0 +1,140 @@
+"""Group small chapters into shared LLM requests.
+
+Intros, outros and sponsor segments are often only a few sentences long, so
+the fixed per-request cost (latency, instruction prefix) outweighs their
+content. Adjacent small chapters are bundled into one request with marker
+lines between them, and the response is split back on the same markers.
+"""
+
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, Iterator, Sequence
+
+from .scheduling import estimate_tokens_from_size
+
+# Chapters estimated below this many tokens are candidates for packing.
+SMALL_CHAPTER_TOKENS = 300
+# Upper bound on the chapter content bundled into one request.
+PACK_BUDGET_TOKENS = 1500
+MAX_PACK_SIZE = 8
+
+PACK_MARKER = "<!-- chapter: {name} -->"
+PACK_INSTRUCTIONS = """
+This request bundles {count} short chapters, each introduced by a marker line such as `{example}`.
+Document every chapter separately and in the same order. Begin each chapter's documentation
+with its marker line copied exactly, and do not add any other marker lines.
+"""
+
+_MARKER_PATTERN = re.compile(r"^[ \t]*<!--\s*chapter:\s*(.+?)\s*-->[ \t]*$", re.MULTILINE)
+_FENCE_PATTERN = re.compile(r"\A\s*```[\w-]*\n(.*)\n```\s*\Z", re.DOTALL)
+
+
+@dataclass(frozen=True, slots=True)
+class ChapterPack:
+    """Adjacent small chapters documented by a single request."""
+
+    chapters: tuple[Path, ...]
+
+    @property
+    def names(self) -> list[str]:
+        return [chapter.name for chapter in self.chapters]
+
+    @property
+    def name(self) -> str:
+        return ", ".join(self.names)
+
+    def __len__(self) -> int:
+        return len(self.chapters)
+
+
+def pack_chapters(
+    chapters: Iterable[Path],
+    small_tokens: int = SMALL_CHAPTER_TOKENS,
+    budget_tokens: int = PACK_BUDGET_TOKENS,
+    max_size: int = MAX_PACK_SIZE,
+) -> Iterator[Path | ChapterPack]:
+    """Yield chapters unchanged, with runs of adjacent small ones grouped.
+
+    Works lazily, so it can wrap a :class:`~docalypt.pipeline.ChapterQueue`;
+    a small chapter is held back only until the next one arrives. Groups of
+    one are yielded as the plain path.
+    """
+
+    group: list[Path] = []
+    group_tokens = 0
+
+    def flush() -> Iterator[Path | ChapterPack]:
+        nonlocal group, group_tokens
+        if len(group) == 1:
+            yield group[0]
+        elif group:
+            yield ChapterPack(tuple(group))
+        group, group_tokens = [], 0
+
+    for chapter in chapters:
+        try:
+            tokens = estimate_tokens_from_size(chapter.stat().st_size)
+        except OSError:
+            tokens = small_tokens
+        if tokens >= small_tokens:
+            yield from flush()
+            yield chapter
+            continue
+        if group and (group_tokens + tokens > budget_tokens or len(group) >= max_size):
+            yield from flush()
+        group.append(chapter)
+        group_tokens += tokens
+    yield from flush()
+
+
+def build_packed_content(sections: Sequence[tuple[str, str]]) -> str:
+    """Join ``(name, text)`` pairs into one content block with marker lines."""
+
+    return "\n\n".join(
+        f"{PACK_MARKER.format(name=name)}\n{text.strip()}" for name, text in sections
+    )
+
+
+def packed_instructions(names: Sequence[str]) -> str:
+    return PACK_INSTRUCTIONS.format(
+        count=len(names), example=PACK_MARKER.format(name=names[0])
+    )
+
+
+def parse_packed_response(text: str, names: Sequence[str]) -> dict[str, str] | None:
+    """Split a packed response back into per-chapter Markdown.
+
+    Returns ``None`` unless every expected chapter appears exactly once with
+    non-empty documentation, so the caller can fall back to single requests.
+    """
+
+    fenced = _FENCE_PATTERN.match(text)
+    if fenced:
+        text = fenced.group(1)
+    matches = list(_MARKER_PATTERN.finditer(text))
+    if len(matches) != len(names) or len(set(names)) != len(names):
+        return None
+    sections: dict[str, str] = {}
+    for position, match in enumerate(matches):
+        end = matches[position + 1].start() if position + 1 < len(matches) else len(text)
+        body = text[match.end() : end].strip()
+        name = match.group(1).strip().strip("`")
+        if name not in names or name in sections or not body:
+            return None
+        sections[name] = body
+    return sections
+
+
+__all__ = [
+    "ChapterPack",
+    "MAX_PACK_SIZE",
+    "PACK_BUDGET_TOKENS",
+    "SMALL_CHAPTER_TOKENS",
+    "build_packed_content",
+    "pack_chapters",
+    "packed_instructions",
+    "parse_packed_response",
+]
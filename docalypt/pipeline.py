@@ -0,0 +1,67 @@
+"""Hand-off primitives for running splitting and documentation as a pipeline."""
+
+from __future__ import annotations
+
+import queue
+import threading
+from pathlib import Path
+from typing import Iterator
+
+_CLOSED = object()
+
+
+class ChapterQueue:
+    """Bounded, closable queue of finished chapter files.
+
+    The splitter puts each chapter as soon as it is written and closes the
+    queue when it is done (or fails). Iterating the queue yields chapters
+    until it is closed, so it can be passed directly as
+    ``DocumentGenerationRequest.chapters``. A full queue blocks the producer,
+    which keeps the splitter from running arbitrarily far ahead. A consumer
+    that gives up calls :meth:`drain` so the producer is never left blocked.
+    """
+
+    def __init__(self, maxsize: int = 4) -> None:
+        self._queue: queue.Queue[object] = queue.Queue(maxsize=max(1, maxsize))
+        self._closed = threading.Event()
+        self._drained = threading.Event()
+
+    @property
+    def closed(self) -> bool:
+        return self._closed.is_set()
+
+    def put(self, chapter: Path) -> None:
+        if self._closed.is_set():
+            raise ValueError("Cannot add chapters to a closed queue")
+        if self._drained.is_set():
+            return
+        self._queue.put(Path(chapter))
+
+    def close(self) -> None:
+        if self._closed.is_set():
+            return
+        self._closed.set()
+        if not self._drained.is_set():
+            self._queue.put(_CLOSED)
+
+    def drain(self) -> None:
+        """Stop consuming: discard queued chapters and drop any put later."""
+
+        self._drained.set()
+        while True:
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                return
+
+    def __iter__(self) -> Iterator[Path]:
+        while not self._drained.is_set():
+            item = self._queue.get()
+            if item is _CLOSED:
+                # Leave the marker for any other consumer of the same queue.
+                self._queue.put(_CLOSED)
+                return
+            yield item  # type: ignore[misc]
+
+
+__all__ = ["ChapterQueue"]
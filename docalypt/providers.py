@@ -0,0 +1,269 @@
+"""Registry of LLM providers and the capabilities they declare.
+
+Every backend (the built-in Ollama, OpenAI-compatible and Anthropic clients,
+or a third-party package) is described by a :class:`Provider`: how to build
+its client, where its endpoint and API key come from, and a
+:class:`ProviderCapabilities` record. Settings resolution, model listing and
+the documentation run consult the registry instead of branching on the
+provider name, so run defaults such as the number of concurrent requests
+follow the provider automatically.
+
+Third-party backends register themselves through the ``docalypt.providers``
+entry point group; the entry point names a :class:`Provider` or a callable
+returning one::
+
+    [project.entry-points."docalypt.providers"]
+    mistral = "docalypt_mistral:PROVIDER"
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Callable, Dict, List
+
+from .llm import (
+    DEFAULT_ANTHROPIC_ENDPOINT,
+    DEFAULT_OLLAMA_ENDPOINT,
+    DEFAULT_OPENAI_ENDPOINT,
+    ENV_ANTHROPIC_ENDPOINT,
+    ENV_ANTHROPIC_KEY,
+    ENV_OPENAI_ENDPOINT,
+    ENV_OPENAI_KEY,
+    LEGACY_ANTHROPIC_ENDPOINT,
+    LEGACY_ANTHROPIC_KEY,
+    LEGACY_OPENAI_ENDPOINT,
+    LEGACY_OPENAI_KEY,
+    LLMError,
+    _AnthropicClient,
+    _list_ollama_models,
+    _list_openai_models,
+    _OllamaClient,
+    _OpenAIClient,
+    _show_ollama_model,
+)
+from .tokens import DEFAULT_CONTEXT_WINDOWS
+
+if TYPE_CHECKING:  # pragma: no cover - annotations only
+    from .cancellation import CancellationToken
+    from .llm import LLMSettings, ModelInfo, _BaseLLMClient
+
+ENTRY_POINT_GROUP = "docalypt.providers"
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True, slots=True)
+class ProviderCapabilities:
+    # Answers can be streamed token by token (needed for time to first token
+    # and for hedging on it).
+    streaming: bool = True
+    # The vendor offers an asynchronous batch API. Informational: the
+    # built-in clients do not submit batches.
+    batch_api: bool = False
+    # Identical prompt prefixes are reused across requests, so prompts are
+    # sent as a static prefix plus a per-chapter suffix.
+    prefix_caching: bool = False
+    # Concurrent requests one endpoint serves without queueing; the default
+    # number of documentation workers.
+    max_concurrency: int = 1
+    # Requests are spaced to stay under this limit (``None``: unlimited).
+    requests_per_minute: int | None = None
+    model_listing: bool = False
+    # Models can be preloaded and pinned in memory (Ollama's keep_alive).
+    model_residency: bool = False
+    # Assumed when LLMSettings.context_window is not set.
+    context_window: int = 4096
+
+
+@dataclass(frozen=True, slots=True)
+class Provider:
+    name: str
+    label: str
+    client: Callable[["LLMSettings"], "_BaseLLMClient"]
+    default_endpoint: str
+    capabilities: ProviderCapabilities = field(default_factory=ProviderCapabilities)
+    # Environment variables consulted, in order, when the settings leave the
+    # endpoint or API key empty.
+    endpoint_env: tuple[str, ...] = ()
+    api_key_env: tuple[str, ...] = ()
+    requires_api_key: bool = False
+    list_models: Callable[["LLMSettings"], List["ModelInfo"]] | None = None
+    # Full details of one model, where listing them is not enough.
+    describe_model: Callable[["LLMSettings", str], "ModelInfo"] | None = None
+
+
+_PROVIDERS: Dict[str, Provider] = {}
+_LOCK = threading.Lock()
+_entry_points_loaded = False
+
+
+def register_provider(provider: Provider, replace: bool = False) -> None:
+    """Make ``provider`` available under ``provider.name``.
+
+    Raises :class:`ValueError` if the name is taken, unless ``replace`` is set.
+    """
+
+    name = provider.name.strip().lower()
+    with _LOCK:
+        if name in _PROVIDERS and not replace:
+            raise ValueError(f"Provider {name!r} is already registered")
+        _PROVIDERS[name] = provider
+
+
+def find_provider(name: str | None) -> Provider | None:
+    """Return the provider registered as ``name``, or ``None``."""
+
+    key = (name or "ollama").strip().lower()
+    provider = _PROVIDERS.get(key)
+    if provider is None and not _entry_points_loaded:
+        _load_entry_points()
+        provider = _PROVIDERS.get(key)
+    return provider
+
+
+def get_provider(name: str | None) -> Provider:
+    """Like :func:`find_provider`, raising :class:`LLMError` for unknown names."""
+
+    provider = find_provider(name)
+    if provider is None:
+        raise LLMError(f"Unsupported provider: {name}")
+    return provider
+
+
+def available_providers() -> List[Provider]:
+    """All registered providers, built-in ones first."""
+
+    _load_entry_points()
+    with _LOCK:
+        return list(_PROVIDERS.values())
+
+
+def _load_entry_points() -> None:
+    global _entry_points_loaded
+    with _LOCK:
+        if _entry_points_loaded:
+            return
+        _entry_points_loaded = True
+    # Imported lazily: scanning installed distributions is comparatively slow.
+    from importlib.metadata import entry_points
+
+    for entry_point in entry_points(group=ENTRY_POINT_GROUP):
+        try:
+            provider = entry_point.load()
+            if not isinstance(provider, Provider):
+                provider = provider()
+            register_provider(provider)
+        except Exception as exc:  # a broken plugin must not break Docalypt
+            logger.warning("Cannot load LLM provider %r: %s", entry_point.name, exc)
+
+
+# Rate limiting ---------------------------------------------------------------
+class RateLimiter:
+    """Spaces requests evenly to stay under a requests-per-minute limit."""
+
+    def __init__(self, requests_per_minute: int) -> None:
+        self.interval = 60.0 / max(1, requests_per_minute)
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self, cancel: CancellationToken | None = None) -> None:
+        """Block until the next request may be sent (or ``cancel`` fires)."""
+
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next)
+            self._next = slot + self.interval
+        delay = slot - now
+        if delay <= 0:
+            return
+        if cancel is not None:
+            cancel.wait(delay)
+        else:
+            time.sleep(delay)
+
+
+_LIMITERS: Dict[tuple[str, str], RateLimiter] = {}
+
+
+def rate_limiter(settings: LLMSettings) -> RateLimiter | None:
+    """The limiter shared by all requests to this provider endpoint, if it has one."""
+
+    limit = get_provider(settings.provider).capabilities.requests_per_minute
+    if not limit:
+        return None
+    key = (settings.normalized_provider(), settings.resolved_endpoint())
+    with _LOCK:
+        return _LIMITERS.setdefault(key, RateLimiter(limit))
+
+
+# Built-in providers ----------------------------------------------------------
+register_provider(
+    Provider(
+        name="ollama",
+        label="Local Ollama",
+        client=_OllamaClient,
+        default_endpoint=DEFAULT_OLLAMA_ENDPOINT,
+        capabilities=ProviderCapabilities(
+            prefix_caching=True,
+            # Ollama serves one request per model unless OLLAMA_NUM_PARALLEL is raised.
+            max_concurrency=1,
+            model_listing=True,
+            model_residency=True,
+            context_window=DEFAULT_CONTEXT_WINDOWS["ollama"],
+        ),
+        list_models=_list_ollama_models,
+        describe_model=_show_ollama_model,
+    )
+)
+register_provider(
+    Provider(
+        name="openai",
+        label="OpenAI compatible",
+        client=_OpenAIClient,
+        default_endpoint=DEFAULT_OPENAI_ENDPOINT,
+        capabilities=ProviderCapabilities(
+            batch_api=True,
+            prefix_caching=True,
+            max_concurrency=4,
+            model_listing=True,
+            context_window=DEFAULT_CONTEXT_WINDOWS["openai"],
+        ),
+        endpoint_env=(ENV_OPENAI_ENDPOINT, LEGACY_OPENAI_ENDPOINT),
+        api_key_env=(ENV_OPENAI_KEY, LEGACY_OPENAI_KEY),
+        requires_api_key=True,
+        list_models=_list_openai_models,
+    )
+)
+register_provider(
+    Provider(
+        name="anthropic",
+        label="Anthropic Claude",
+        client=_AnthropicClient,
+        default_endpoint=DEFAULT_ANTHROPIC_ENDPOINT,
+        capabilities=ProviderCapabilities(
+            batch_api=True,
+            prefix_caching=True,
+            max_concurrency=4,
+            context_window=DEFAULT_CONTEXT_WINDOWS["anthropic"],
+        ),
+        endpoint_env=(ENV_ANTHROPIC_ENDPOINT, LEGACY_ANTHROPIC_ENDPOINT),
+        api_key_env=(ENV_ANTHROPIC_KEY, LEGACY_ANTHROPIC_KEY),
+        requires_api_key=True,
+    )
+)
+
+
+__all__ = [
+    "ENTRY_POINT_GROUP",
+    "Provider",
+    "ProviderCapabilities",
+    "RateLimiter",
+    "available_providers",
+    "find_provider",
+    "get_provider",
+    "rate_limiter",
+    "register_provider",
+]
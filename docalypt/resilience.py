@@ -0,0 +1,357 @@
+"""Circuit breakers and provider failover.
+
+Every endpoint has a :class:`CircuitBreaker` fed by the outcome and the
+latency of its requests. After too many failures or slow answers within
+the recent window the breaker *opens*: requests to the endpoint fail at
+once instead of waiting out the request timeout. After a cool-down it is
+*half-open* and lets a probe request through; a successful probe closes it
+again, a failed one re-opens it.
+
+:class:`FailoverClient` sends each request to the first endpoint of an
+ordered list (``settings`` followed by ``settings.fallbacks``) whose breaker
+is not open, and moves on to the next one when a request fails. Every
+request served by a later entry than the first choice is recorded as a
+:class:`FailoverEvent`. Rate limiting (HTTP 429) is not a failure: it does
+not count against a breaker and is raised to the caller, which backs off
+and retries. A client with a single endpoint waits for an open breaker's
+probe instead of failing requests at once.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from collections import deque
+from dataclasses import asdict, dataclass
+from typing import Callable, Dict, List, Sequence
+
+from .cancellation import CancellationToken
+from .llm import (
+    GenerationResult,
+    LLMCancelled,
+    LLMError,
+    LLMRateLimited,
+    LLMSettings,
+    Prompt,
+    _BaseLLMClient,
+)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half-open"
+
+# Outcomes of the most recent requests considered by a breaker.
+BREAKER_WINDOW = 10
+# Requests needed in the window before the breaker may open.
+MIN_REQUESTS = 3
+FAILURE_RATE = 0.5
+# A request is slow when its first token (or, without streaming, the whole
+# answer) takes longer than this; too many slow requests open the breaker.
+SLOW_REQUEST = 60.0
+SLOW_RATE = 0.8
+# Seconds an open breaker waits before letting a probe through.
+OPEN_DURATION = 30.0
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpen(LLMError):
+    """Raised when every endpoint that could serve a request is unavailable."""
+
+
+class CircuitBreaker:
+    """Closed/open/half-open breaker for one endpoint. Thread-safe."""
+
+    def __init__(
+        self,
+        name: str = "",
+        window: int = BREAKER_WINDOW,
+        min_requests: int = MIN_REQUESTS,
+        failure_rate: float = FAILURE_RATE,
+        slow_request: float = SLOW_REQUEST,
+        slow_rate: float = SLOW_RATE,
+        open_duration: float = OPEN_DURATION,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.name = name
+        self.min_requests = min_requests
+        self.failure_rate = failure_rate
+        self.slow_request = slow_request
+        self.slow_rate = slow_rate
+        self.open_duration = open_duration
+        self._clock = clock
+        self._condition = threading.Condition()
+        # (failed, slow) per request.
+        self._outcomes: deque[tuple[bool, bool]] = deque(maxlen=window)
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probing = False
+        # Times the breaker opened; lets waiters tell a failed probe apart.
+        self._trips = 0
+
+    @property
+    def state(self) -> str:
+        with self._condition:
+            return self._current_state()
+
+    def allow(self) -> bool:
+        """Whether a request may be sent now.
+
+        In the half-open state only one probe is let through at a time.
+        """
+
+        with self._condition:
+            return self._allow()
+
+    def acquire(self, cancel: CancellationToken | None = None) -> bool:
+        """Like :meth:`allow`, but wait out an open breaker.
+
+        Blocks until this caller may send the half-open probe or another
+        caller's probe has closed the breaker. Returns ``False`` if that
+        probe failed (the breaker opened again) or ``cancel`` fired.
+        """
+
+        unregister = cancel.on_cancel(self._wake) if cancel is not None else None
+        try:
+            with self._condition:
+                trips = self._trips
+                while not (cancel is not None and cancel.cancelled):
+                    if self._allow():
+                        return True
+                    if self._trips != trips:
+                        return False
+                    timeout = None
+                    if self._state == OPEN:
+                        timeout = max(0.0, self._opened_at + self.open_duration - self._clock())
+                    self._condition.wait(timeout)
+                return False
+        finally:
+            if unregister is not None:
+                unregister()
+
+    def retry_in(self) -> float:
+        """Seconds until an open breaker lets a probe through (0 otherwise)."""
+
+        with self._condition:
+            if self._current_state() != OPEN:
+                return 0.0
+            return max(0.0, self._opened_at + self.open_duration - self._clock())
+
+    def record_success(self, latency: float) -> None:
+        with self._condition:
+            slow = latency > self.slow_request
+            if self._state != CLOSED:
+                self._probing = False
+                if slow:
+                    self._trip(f"probe took {latency:.1f}s")
+                else:
+                    self._state = CLOSED
+                    self._outcomes.clear()
+                    logger.info("Circuit for %s closed", self.name)
+                self._condition.notify_all()
+                return
+            self._outcomes.append((False, slow))
+            self._evaluate(f"slow answers (last {latency:.1f}s)")
+
+    def record_failure(self, reason: str = "") -> None:
+        with self._condition:
+            if self._state != CLOSED:
+                self._probing = False
+                self._trip(reason or "probe failed")
+                return
+            self._outcomes.append((True, False))
+            self._evaluate(reason or "request failed")
+
+    def release(self) -> None:
+        """Give back a probe slot whose request ended without an outcome."""
+
+        with self._condition:
+            self._probing = False
+            self._condition.notify_all()
+
+    def reset(self) -> None:
+        with self._condition:
+            self._state = CLOSED
+            self._outcomes.clear()
+            self._probing = False
+            self._condition.notify_all()
+
+    def _wake(self) -> None:
+        with self._condition:
+            self._condition.notify_all()
+
+    def _allow(self) -> bool:
+        state = self._current_state()
+        if state == CLOSED:
+            return True
+        if state == HALF_OPEN and not self._probing:
+            self._probing = True
+            return True
+        return False
+
+    def _current_state(self) -> str:
+        if self._state == OPEN and self._clock() - self._opened_at >= self.open_duration:
+            self._state = HALF_OPEN
+        return self._state
+
+    def _evaluate(self, reason: str) -> None:
+        total = len(self._outcomes)
+        if total < self.min_requests:
+            return
+        failures = sum(1 for failed, _ in self._outcomes if failed)
+        slow = sum(1 for _, is_slow in self._outcomes if is_slow)
+        if failures / total >= self.failure_rate or slow / total >= self.slow_rate:
+            self._trip(f"{failures} failed and {slow} slow of {total} requests; {reason}")
+
+    def _trip(self, reason: str) -> None:
+        self._state = OPEN
+        self._opened_at = self._clock()
+        self._outcomes.clear()
+        self._trips += 1
+        self._condition.notify_all()
+        logger.warning(
+            "Circuit for %s opened (%s); retrying in %.0fs", self.name, reason, self.open_duration
+        )
+
+
+_BREAKERS: Dict[tuple[str, str], CircuitBreaker] = {}
+_BREAKERS_LOCK = threading.Lock()
+
+
+def _label(settings: LLMSettings) -> str:
+    return f"{settings.normalized_provider()}:{settings.model} @ {settings.resolved_endpoint()}"
+
+
+def circuit_breaker(settings: LLMSettings) -> CircuitBreaker:
+    """The breaker shared by all requests to this provider endpoint."""
+
+    key = (settings.normalized_provider(), settings.resolved_endpoint().rstrip("/"))
+    with _BREAKERS_LOCK:
+        breaker = _BREAKERS.get(key)
+        if breaker is None:
+            breaker = _BREAKERS[key] = CircuitBreaker(name=f"{key[0]} @ {key[1]}")
+        return breaker
+
+
+@dataclass(slots=True)
+class FailoverEvent:
+    """A request served by (or attempted on) a later entry of the failover list."""
+
+    at: float  # time.time()
+    source: str
+    target: str
+    reason: str
+
+    def to_dict(self) -> Dict[str, object]:
+        return asdict(self)
+
+
+class FailoverClient:
+    """Send requests to the first available client of an ordered list."""
+
+    def __init__(
+        self,
+        clients: Sequence[_BaseLLMClient],
+        breakers: Sequence[CircuitBreaker] | None = None,
+    ) -> None:
+        if not clients:
+            raise ValueError("FailoverClient needs at least one client")
+        self.clients = list(clients)
+        self.breakers = list(breakers) if breakers is not None else [
+            circuit_breaker(client.settings) for client in self.clients
+        ]
+        self.labels = [_label(client.settings) for client in self.clients]
+        self.settings = self.clients[0].settings
+        self.provider = self.clients[0].provider
+        self.events: List[FailoverEvent] = []
+        self._lock = threading.Lock()
+
+    def generate(
+        self,
+        prompt: Prompt | str,
+        max_tokens: int | None = None,
+        cancel: CancellationToken | None = None,
+        on_first_token: Callable[[], None] | None = None,
+    ) -> GenerationResult:
+        reasons: list[str] = []
+        error: LLMError | None = None
+        rate_limited: LLMRateLimited | None = None
+        # With nowhere to fail over to, waiting for the endpoint to recover
+        # beats failing every request while its breaker is open.
+        wait = len(self.clients) == 1
+        for position, (client, breaker) in enumerate(zip(self.clients, self.breakers)):
+            allowed = breaker.allow()
+            if not allowed and wait:
+                logger.debug(
+                    "Circuit for %s is open; waiting %.0fs for a probe",
+                    self.labels[position],
+                    breaker.retry_in(),
+                )
+                allowed = breaker.acquire(cancel)
+                if cancel is not None:
+                    cancel.raise_if_cancelled(LLMCancelled)
+            if not allowed:
+                reasons.append(f"{self.labels[position]}: circuit open")
+                continue
+            if position:
+                self._record(position, "; ".join(reasons))
+            started = time.perf_counter()
+            try:
+                result = client.generate(
+                    prompt, max_tokens, cancel=cancel, on_first_token=on_first_token
+                )
+            except LLMCancelled:
+                breaker.release()
+                raise
+            except LLMRateLimited as exc:
+                # A busy endpoint, not a broken one: the caller backs off.
+                breaker.release()
+                rate_limited = exc
+                reasons.append(f"{self.labels[position]}: {exc}")
+                continue
+            except LLMError as exc:
+                error = exc
+                breaker.record_failure(str(exc))
+                reasons.append(f"{self.labels[position]}: {exc}")
+                if cancel is not None and cancel.cancelled:
+                    raise
+                continue
+            except Exception as exc:
+                # Clients translate transport errors, but a stray one must
+                # still settle the probe slot or the breaker stays half-open.
+                if isinstance(exc, OSError):
+                    breaker.record_failure(str(exc) or type(exc).__name__)
+                else:
+                    breaker.release()
+                raise
+            latency = result.time_to_first_token
+            breaker.record_success(
+                latency if latency is not None else time.perf_counter() - started
+            )
+            return result
+        if rate_limited is not None:
+            raise rate_limited
+        if error is not None and len(reasons) == 1:
+            raise error
+        raise CircuitOpen("No endpoint could serve the request (" + "; ".join(reasons) + ")")
+
+    def _record(self, position: int, reason: str) -> None:
+        event = FailoverEvent(
+            at=time.time(), source=self.labels[0], target=self.labels[position], reason=reason
+        )
+        logger.info("Failing over to %s (%s)", event.target, reason)
+        with self._lock:
+            self.events.append(event)
+
+
+__all__ = [
+    "CLOSED",
+    "CircuitBreaker",
+    "CircuitOpen",
+    "FailoverClient",
+    "FailoverEvent",
+    "HALF_OPEN",
+    "OPEN",
+    "circuit_breaker",
+]
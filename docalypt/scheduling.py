@@ -0,0 +1,152 @@
+"""Makespan-aware ordering of chapters for concurrent documentation runs."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from .llm import GenerationResult
+from .tokens import CHARS_PER_TOKEN
+
+if TYPE_CHECKING:  # pragma: no cover - import cycle only for annotations
+    from .packing import ChapterPack
+
+
+def estimate_tokens_from_size(size: int) -> int:
+    """Cheap token estimate from a character (or byte) count."""
+
+    return max(1, size // CHARS_PER_TOKEN)
+
+
+@dataclass(slots=True)
+class CostModel:
+    """Running estimate of how long a chapter takes to document.
+
+    The model starts from conservative defaults and is updated with an
+    exponentially weighted moving average as real timings arrive, so the
+    estimates converge on the provider and hardware actually in use.
+
+    The expected output is capped by each chapter's own output budget. Among
+    chapters with the same budget the cost only grows with prompt size, so
+    the observed rates matter when budgets differ: a pack of small chapters
+    asks for several chapters' worth of output from a short prompt, and
+    whether it outlasts a single long chapter depends on how much the model
+    actually writes and how fast it decodes compared to prefill.
+    """
+
+    prompt_tokens_per_second: float = 500.0
+    output_tokens_per_second: float = 20.0
+    output_ratio: float = 0.5
+    overhead: float = 0.5
+    smoothing: float = 0.3
+    observations: int = 0
+
+    def estimate(self, prompt_tokens: int, max_tokens: int) -> float:
+        """Return the expected seconds needed for a prompt of this size."""
+
+        output_tokens = min(max_tokens, self.output_ratio * prompt_tokens)
+        return (
+            self.overhead
+            + prompt_tokens / self.prompt_tokens_per_second
+            + output_tokens / self.output_tokens_per_second
+        )
+
+    def observe(self, prompt_tokens: int, generation: GenerationResult) -> None:
+        """Fold the timings of a finished request into the estimates."""
+
+        input_tokens = generation.input_tokens or prompt_tokens
+        prefill_time = generation.prompt_eval_duration or generation.time_to_first_token
+        if prefill_time and input_tokens:
+            self.prompt_tokens_per_second = self._blend(
+                self.prompt_tokens_per_second, input_tokens / prefill_time
+            )
+        rate = generation.tokens_per_second
+        if rate:
+            self.output_tokens_per_second = self._blend(self.output_tokens_per_second, rate)
+        if generation.output_tokens and prompt_tokens:
+            self.output_ratio = self._blend(
+                self.output_ratio, generation.output_tokens / prompt_tokens
+            )
+        self.observations += 1
+
+    def _blend(self, current: float, observed: float) -> float:
+        if observed <= 0:
+            return current
+        if not self.observations:
+            return observed
+        return (1 - self.smoothing) * current + self.smoothing * observed
+
+
+@dataclass(slots=True)
+class ScheduledChapter:
+    index: int
+    chapter: Path | ChapterPack
+    prompt_tokens: int
+    # Output budget of this chapter; ``None`` uses the scheduler's default.
+    max_tokens: int | None = None
+
+
+@dataclass(slots=True)
+class ChapterScheduler:
+    """Dispatch pending chapters longest-processing-time first.
+
+    Costs are re-evaluated against the current :class:`CostModel` on every
+    :meth:`pop`, so the order adapts as observed timings arrive. Ties are
+    broken by input index to keep dispatch deterministic. With
+    ``longest_first`` disabled chapters are dispatched in input order.
+    """
+
+    max_tokens: int = 800
+    longest_first: bool = True
+    cost_model: CostModel = field(default_factory=CostModel)
+    _pending: list[ScheduledChapter] = field(default_factory=list)
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def add(
+        self,
+        index: int,
+        chapter: Path | ChapterPack,
+        prompt_tokens: int,
+        max_tokens: int | None = None,
+    ) -> None:
+        self._pending.append(ScheduledChapter(index, chapter, prompt_tokens, max_tokens))
+
+    def pop(self) -> ScheduledChapter | None:
+        if not self._pending:
+            return None
+        if not self.longest_first:
+            return self._pending.pop(
+                min(range(len(self._pending)), key=lambda position: self._pending[position].index)
+            )
+        best = max(
+            range(len(self._pending)),
+            key=lambda position: (
+                self.estimate(self._pending[position]),
+                -self._pending[position].index,
+            ),
+        )
+        return self._pending.pop(best)
+
+    def drain(self) -> list[ScheduledChapter]:
+        """Remove and return every pending chapter in input order."""
+
+        pending = sorted(self._pending, key=lambda item: item.index)
+        self._pending.clear()
+        return pending
+
+    def estimate(self, item: ScheduledChapter) -> float:
+        return self.cost_model.estimate(item.prompt_tokens, item.max_tokens or self.max_tokens)
+
+    def record(self, prompt_tokens: int, generation: GenerationResult) -> None:
+        self.cost_model.observe(prompt_tokens, generation)
+
+
+__all__ = [
+    "ChapterScheduler",
+    "CostModel",
+    "ScheduledChapter",
+    "estimate_tokens_from_size",
+]
@@ -0,0 +1,331 @@
+"""Incremental full-text search over chapters and generated documentation.
+
+Chapters and ``.docs.md`` files are indexed in a SQLite FTS5 table as they
+are written (see ``TranscriptSplitter.search_index`` and
+``DocumentGenerationRequest.search_index``), together with the source
+transcript and the chapter's timestamp. Files created by other means are
+picked up by :meth:`SearchIndex.refresh`, which only re-reads files whose
+size or modification time changed.
+"""
+
+from __future__ import annotations
+
+import logging
+import re
+import sqlite3
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, List
+
+from .config import CACHE_DIR
+
+INDEX_PATH = CACHE_DIR / "search.sqlite3"
+DOCS_SUFFIX = ".docs.md"
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    kind TEXT NOT NULL,
+    transcript TEXT,
+    title TEXT,
+    timestamp INTEGER,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS entries USING fts5(
+    title, body, tokenize = 'porter unicode61'
+);
+"""
+_QUERY_TOKEN = re.compile(r'"[^"]*"|\S+')
+_OPERATORS = {"AND", "OR", "NOT"}
+
+
+class SearchError(RuntimeError):
+    """Raised when the search index cannot be opened or queried."""
+
+
+@dataclass(slots=True)
+class SearchHit:
+    path: Path
+    kind: str  # "chapter" or "docs"
+    title: str | None
+    transcript: str | None
+    timestamp: int | None  # seconds into the source video
+    snippet: str
+    score: float
+
+    @property
+    def position(self) -> str | None:
+        """The timestamp as ``HH:MM:SS``."""
+
+        if self.timestamp is None:
+            return None
+        hours, remainder = divmod(self.timestamp, 3600)
+        minutes, seconds = divmod(remainder, 60)
+        return f"{hours:02d}:{minutes:02d}:{seconds:02d}"
+
+
+def build_match_query(text: str) -> str:
+    """Turn free text into an FTS5 query that matches all of its words.
+
+    Quoted phrases, a trailing ``*`` for prefix search and upper-case
+    ``AND``/``OR``/``NOT`` keep their FTS5 meaning; everything else is quoted
+    so punctuation such as ``-`` or ``:`` cannot cause syntax errors.
+    """
+
+    parts: list[str] = []
+    for token in _QUERY_TOKEN.findall(text):
+        if token in _OPERATORS:
+            if parts and parts[-1] not in _OPERATORS:
+                parts.append(token)
+            continue
+        prefix = token.endswith("*")
+        word = token.strip('"*').replace('"', "")
+        if not word:
+            continue
+        parts.append(f'"{word}"' + ("*" if prefix else ""))
+    while parts and parts[-1] in _OPERATORS:
+        parts.pop()
+    return " ".join(parts)
+
+
+def _first_heading(text: str) -> str | None:
+    for line in text.splitlines():
+        if line.startswith("# "):
+            return line[2:].strip() or None
+    return None
+
+
+def _chapter_for_docs(path: Path) -> Path:
+    """The chapter a ``<stem>.docs.md`` file was generated from.
+
+    Documentation normally lives in a subdirectory next to the chapters, but
+    hand-organised corpora often keep both side by side.
+    """
+
+    name = path.name[: -len(DOCS_SUFFIX)] + ".md"
+    nested = path.parent.parent / name
+    if nested.exists() and not (path.parent / name).exists():
+        return nested
+    return path.parent / name
+
+
+class SearchIndex:
+    """SQLite FTS5 index of chapter and documentation files.
+
+    The connection is shared between threads (documentation workers index
+    their output concurrently), so every statement runs under a lock.
+    """
+
+    def __init__(self, path: Path | str | None = None) -> None:
+        self.path = Path(path).expanduser() if path else INDEX_PATH
+        self._lock = threading.Lock()
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode = WAL")
+            self._db.execute("PRAGMA synchronous = NORMAL")
+            self._db.executescript(_SCHEMA)
+        except (OSError, sqlite3.Error) as exc:
+            raise SearchError(f"Cannot open search index {self.path}: {exc}") from exc
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+    def __enter__(self) -> "SearchIndex":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM files").fetchone()[0]
+
+    # Indexing -----------------------------------------------------------
+    def add_chapter(
+        self,
+        path: Path,
+        transcript: Path | str | None = None,
+        title: str | None = None,
+        timestamp: int | None = None,
+    ) -> bool:
+        """Index a chapter file; returns ``False`` if it was already current."""
+
+        return self._add(Path(path), "chapter", transcript, title, timestamp)
+
+    def add_documentation(self, path: Path, chapter: Path | None = None) -> bool:
+        """Index a ``.docs.md`` file under the metadata of its chapter."""
+
+        path = Path(path)
+        chapter = Path(chapter) if chapter else _chapter_for_docs(path)
+        with self._lock:
+            row = self._db.execute(
+                "SELECT transcript, title, timestamp FROM files WHERE path = ?",
+                (str(chapter.resolve()),),
+            ).fetchone()
+        transcript, title, timestamp = row or (chapter.parent.name, None, None)
+        return self._add(path, "docs", transcript, title, timestamp)
+
+    def remove(self, path: Path) -> None:
+        with self._lock, self._db:
+            self._delete(str(Path(path).resolve()))
+
+    def refresh(self, root: Path) -> int:
+        """Bring the index up to date with the Markdown files under ``root``.
+
+        New and modified files are (re)indexed, deleted ones are dropped.
+        Returns the number of files that were (re)indexed.
+        """
+
+        root = Path(root).resolve()
+        files = sorted(path for path in root.rglob("*.md") if path.is_file())
+        # Chapters first, so documentation inherits their metadata.
+        files.sort(key=lambda path: path.name.endswith(DOCS_SUFFIX))
+        changed = index_files(self, files)
+        present = {str(path) for path in files}
+        with self._lock, self._db:
+            known = self._db.execute(
+                "SELECT path FROM files WHERE path >= ? AND path < ?",
+                (f"{root}/", f"{root}0"),
+            ).fetchall()
+            for (stale,) in known:
+                if stale not in present:
+                    self._delete(stale)
+        return changed
+
+    def _add(
+        self,
+        path: Path,
+        kind: str,
+        transcript: Path | str | None,
+        title: str | None,
+        timestamp: int | None,
+    ) -> bool:
+        path = path.resolve()
+        try:
+            stat = path.stat()
+            with self._lock:
+                row = self._db.execute(
+                    "SELECT mtime_ns, size, transcript, title, timestamp FROM files WHERE path = ?",
+                    (str(path),),
+                ).fetchone()
+            if row and row[:2] == (stat.st_mtime_ns, stat.st_size):
+                return False
+            text = path.read_text(encoding="utf-8")
+        except (OSError, UnicodeDecodeError) as exc:
+            logger.warning("Cannot index %s: %s", path, exc)
+            return False
+        if row:
+            # Keep metadata recorded when the file was first written.
+            transcript = transcript or row[2]
+            title = title or row[3]
+            timestamp = timestamp if timestamp is not None else row[4]
+        if isinstance(transcript, Path):
+            transcript = transcript.stem
+        title = title or _first_heading(text) or path.stem
+        try:
+            with self._lock, self._db:
+                self._delete(str(path))
+                cursor = self._db.execute(
+                    "INSERT INTO files (path, kind, transcript, title, timestamp, mtime_ns, size)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        str(path),
+                        kind,
+                        transcript or path.parent.name,
+                        title,
+                        timestamp,
+                        stat.st_mtime_ns,
+                        stat.st_size,
+                    ),
+                )
+                self._db.execute(
+                    "INSERT INTO entries (rowid, title, body) VALUES (?, ?, ?)",
+                    (cursor.lastrowid, title, text),
+                )
+        except sqlite3.Error as exc:
+            logger.warning("Cannot index %s: %s", path, exc)
+            return False
+        return True
+
+    def _delete(self, path: str) -> None:
+        row = self._db.execute("SELECT id FROM files WHERE path = ?", (path,)).fetchone()
+        if row:
+            self._db.execute("DELETE FROM entries WHERE rowid = ?", row)
+            self._db.execute("DELETE FROM files WHERE id = ?", row)
+
+    # Querying -----------------------------------------------------------
+    def search(self, query: str, limit: int = 20, kind: str | None = None) -> List[SearchHit]:
+        """Return the best matches for ``query``, most relevant first."""
+
+        match = build_match_query(query)
+        if not match:
+            return []
+        sql = (
+            "SELECT f.path, f.kind, f.title, f.transcript, f.timestamp,"
+            " snippet(entries, 1, '[', ']', '…', 12), bm25(entries, 5.0, 1.0) AS score"
+            " FROM entries JOIN files f ON f.id = entries.rowid"
+            " WHERE entries MATCH ?"
+        )
+        parameters: list[object] = [match]
+        if kind:
+            sql += " AND f.kind = ?"
+            parameters.append(kind)
+        sql += " ORDER BY score LIMIT ?"
+        parameters.append(limit)
+        try:
+            with self._lock:
+                rows = self._db.execute(sql, parameters).fetchall()
+        except sqlite3.Error as exc:
+            raise SearchError(f"Search failed: {exc}") from exc
+        return [
+            SearchHit(
+                path=Path(path),
+                kind=hit_kind,
+                title=title,
+                transcript=transcript,
+                timestamp=timestamp,
+                snippet=" ".join(snippet.split()),
+                score=-score,
+            )
+            for path, hit_kind, title, transcript, timestamp, snippet, score in rows
+        ]
+
+
+def open_index(path: Path | str | None = None) -> SearchIndex | None:
+    """Open the search index, logging a warning instead of failing."""
+
+    try:
+        return SearchIndex(path)
+    except SearchError as exc:
+        logger.warning("%s; search indexing disabled", exc)
+        return None
+
+
+def index_files(index: SearchIndex, paths: Iterable[Path]) -> int:
+    """Index chapter and ``.docs.md`` files, returning how many changed."""
+
+    changed = 0
+    for path in paths:
+        if path.name.endswith(DOCS_SUFFIX):
+            changed += index.add_documentation(path)
+        else:
+            changed += index.add_chapter(path)
+    return changed
+
+
+__all__ = [
+    "INDEX_PATH",
+    "SearchError",
+    "SearchHit",
+    "SearchIndex",
+    "build_match_query",
+    "index_files",
+    "open_index",
+]
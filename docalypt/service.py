@@ -0,0 +1,330 @@
+"""Local job service: an HTTP API over the job queue plus worker processes.
+
+:class:`JobService` runs ``workers`` processes that each take jobs from a
+:class:`~docalypt.jobs.JobStore` one at a time, and an HTTP server through
+which other tools submit, inspect and cancel jobs. All state lives in the
+job database, so the service can be restarted at any time; jobs that were
+running are queued again and resume where they stopped. Several services
+may share one database: each only requeues the jobs of its own workers and
+of workers on its host that have died.
+
+Endpoints (JSON in and out)::
+
+    GET    /health               service status and worker count
+    POST   /jobs                 submit {"kind", "input", "output_dir",
+                                 "priority", "options"}; returns the job
+    GET    /jobs[?state=&limit=] recent jobs
+    GET    /jobs/<id>            a job with its chapters and metrics
+    POST   /jobs/<id>/cancel     cancel a job (also ``DELETE /jobs/<id>``)
+
+The API has no authentication and binds to localhost by default.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import multiprocessing
+import signal
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, List
+from urllib.parse import parse_qs, urlsplit
+
+from .jobs import (
+    PRIORITY_NORMAL,
+    JobError,
+    JobStore,
+    JobWorker,
+    parse_priority,
+    worker_name,
+)
+from .tracing import tracing_from_env
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+# Largest accepted request body.
+MAX_BODY = 1024 * 1024
+# Seconds between checks that the worker processes are alive.
+SUPERVISE_INTERVAL = 1.0
+
+logger = logging.getLogger(__name__)
+
+
+def _worker_main(path: str, stop: Any) -> None:
+    """Entry point of a worker process."""
+
+    # Ctrl-C reaches the whole process group; the service stops workers itself.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    logging.basicConfig(
+        level=logging.INFO,
+        format="[%(asctime)s] %(message)s",
+        datefmt="%Y-%m-%d %H:%M:%S",
+    )
+    # Each worker appends its spans to the DOCALYPT_TRACE file.
+    tracing_from_env()
+    with JobStore(path) as store:
+        worker = JobWorker(store)
+
+        def wait_for_stop() -> None:
+            stop.wait()
+            worker.stop()
+
+        threading.Thread(target=wait_for_stop, daemon=True).start()
+        worker.run()
+
+
+class JobService:
+    """Worker processes plus the HTTP API, sharing one job database."""
+
+    def __init__(
+        self,
+        path: Path | str | None = None,
+        workers: int = 1,
+        host: str = DEFAULT_HOST,
+        port: int = DEFAULT_PORT,
+    ) -> None:
+        self.store = JobStore(path)
+        self.workers = max(1, workers)
+        # Spawned, not forked: the service runs threads and holds a database.
+        self._context = multiprocessing.get_context("spawn")
+        self._stop = self._context.Event()
+        self._processes: List[multiprocessing.process.BaseProcess] = []
+        self._stopped = threading.Event()
+        self._httpd = ThreadingHTTPServer((host, port), _make_handler(self))
+        self._httpd.daemon_threads = True
+        self._thread: threading.Thread | None = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def alive_workers(self) -> int:
+        return sum(1 for process in self._processes if process.is_alive())
+
+    def start(self) -> "JobService":
+        requeued = self.store.requeue_orphans()
+        if requeued:
+            logger.info("Requeued %d interrupted job(s)", requeued)
+        self._processes = [self._spawn() for _ in range(self.workers)]
+        self._thread = threading.Thread(
+            target=self._httpd.serve_forever, name="docalypt-service", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def run(self) -> None:
+        """Supervise the workers until :meth:`request_stop` (or :meth:`stop`) is called."""
+
+        while not self._stopped.wait(SUPERVISE_INTERVAL):
+            for index, process in enumerate(self._processes):
+                if process.is_alive():
+                    continue
+                # The job the dead worker was running goes back to the queue.
+                requeued = self.store.requeue(worker=worker_name(process.pid))
+                logger.warning(
+                    "Worker %s exited with status %s; restarting it (%d job(s) requeued)",
+                    process.pid,
+                    process.exitcode,
+                    requeued,
+                )
+                self._processes[index] = self._spawn()
+
+    def request_stop(self) -> None:
+        """Make :meth:`run` return; safe to call from a signal handler."""
+
+        self._stopped.set()
+
+    def stop(self, timeout: float | None = 30.0) -> None:
+        """Stop the API and the workers; running jobs are requeued."""
+
+        self._stopped.set()
+        self._stop.set()
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread is not None:
+            self._thread.join()
+        for process in self._processes:
+            process.join(timeout)
+            if process.is_alive():
+                logger.warning("Worker %s did not stop; terminating it", process.pid)
+                process.terminate()
+                process.join()
+        # Workers that stopped in time requeued their own job; these are
+        # the ones that had to be terminated.
+        for process in self._processes:
+            self.store.requeue(worker=worker_name(process.pid))
+        self.store.close()
+
+    def __enter__(self) -> "JobService":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def _spawn(self) -> multiprocessing.process.BaseProcess:
+        process = self._context.Process(
+            target=_worker_main,
+            args=(str(self.store.path), self._stop),
+            name="docalypt-worker",
+            daemon=True,
+        )
+        process.start()
+        return process
+
+    # API ----------------------------------------------------------------
+    def submit(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        if not isinstance(payload.get("input"), str):
+            raise JobError("'input' (a transcript or chapter directory path) is required")
+        options = payload.get("options") or {}
+        if not isinstance(options, dict):
+            raise JobError("'options' must be an object")
+        job = self.store.submit(
+            kind=str(payload.get("kind", "split")),
+            input=payload["input"],
+            output_dir=payload.get("output_dir"),
+            priority=parse_priority(payload.get("priority", PRIORITY_NORMAL)),
+            options=options,
+        )
+        logger.info("Queued %s job %d for %s", job.kind, job.id, job.input.name)
+        return job.to_dict()
+
+    def describe(self, job_id: int) -> Dict[str, Any] | None:
+        job = self.store.get(job_id)
+        if job is None:
+            return None
+        record = job.to_dict()
+        record["chapter_files"] = [
+            {
+                "path": str(chapter.path),
+                "state": chapter.state,
+                "destination": str(chapter.destination) if chapter.destination else None,
+                "error": chapter.error,
+            }
+            for chapter in self.store.chapters(job_id)
+        ]
+        return record
+
+
+def _make_handler(service: JobService) -> type[BaseHTTPRequestHandler]:
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        server_version = "Docalypt"
+
+        def log_message(self, format: str, *args) -> None:  # noqa: A002 - stdlib signature
+            logger.debug("%s %s", self.address_string(), format % args)
+
+        # Plumbing -----------------------------------------------------
+        def _send_json(self, payload: object, status: int = 200) -> None:
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            if self.close_connection:
+                self.send_header("Connection", "close")
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _send_error(self, status: int, message: str) -> None:
+            self._send_json({"error": message}, status=status)
+
+        def _read_json(self) -> Dict[str, Any] | None:
+            value = (self.headers.get("Content-Length") or "0").strip()
+            if not (value.isascii() and value.isdigit()):
+                self.close_connection = True
+                self._send_error(400, "Invalid Content-Length")
+                return None
+            length = int(value)
+            if length > MAX_BODY:
+                # The body is not read, so the connection cannot be reused.
+                self.close_connection = True
+                self._send_error(413, "Request body too large")
+                return None
+            try:
+                payload = json.loads(self.rfile.read(length) or b"{}")
+            except ValueError as exc:
+                self._send_error(400, f"Invalid JSON: {exc}")
+                return None
+            if not isinstance(payload, dict):
+                self._send_error(400, "Expected a JSON object")
+                return None
+            return payload
+
+        def _route(self) -> tuple[list[str], Dict[str, list[str]]]:
+            url = urlsplit(self.path)
+            return [part for part in url.path.split("/") if part], parse_qs(url.query)
+
+        def _job_id(self, part: str) -> int | None:
+            if not part.isdigit():
+                self._send_error(404, f"No job {part}")
+                return None
+            return int(part)
+
+        def _cancel(self, part: str) -> None:
+            job_id = self._job_id(part)
+            if job_id is None:
+                return
+            job = service.store.cancel(job_id)
+            if job is None:
+                self._send_error(404, f"No job {job_id}")
+            else:
+                self._send_json(job.to_dict())
+
+        # Endpoints ----------------------------------------------------
+        def do_GET(self) -> None:  # noqa: N802 - stdlib naming
+            parts, query = self._route()
+            if parts == ["health"]:
+                self._send_json({"status": "ok", "workers": service.alive_workers})
+            elif parts == ["jobs"]:
+                state = query.get("state", [None])[0]
+                limit = query.get("limit", ["100"])[0]
+                if not limit.isdigit():
+                    self._send_error(400, "'limit' must be a number")
+                    return
+                jobs = service.store.jobs(state=state, limit=int(limit))
+                self._send_json({"jobs": [job.to_dict() for job in jobs]})
+            elif len(parts) == 2 and parts[0] == "jobs":
+                job_id = self._job_id(parts[1])
+                if job_id is None:
+                    return
+                record = service.describe(job_id)
+                if record is None:
+                    self._send_error(404, f"No job {job_id}")
+                else:
+                    self._send_json(record)
+            else:
+                self._send_error(404, f"Unknown path {self.path}")
+
+        def do_POST(self) -> None:  # noqa: N802 - stdlib naming
+            parts, _ = self._route()
+            payload = self._read_json()
+            if payload is None:
+                return
+            if parts == ["jobs"]:
+                try:
+                    self._send_json(service.submit(payload), status=201)
+                except JobError as exc:
+                    self._send_error(400, str(exc))
+            elif len(parts) == 3 and parts[0] == "jobs" and parts[2] == "cancel":
+                self._cancel(parts[1])
+            else:
+                self._send_error(404, f"Unknown path {self.path}")
+
+        def do_DELETE(self) -> None:  # noqa: N802 - stdlib naming
+            parts, _ = self._route()
+            if len(parts) == 2 and parts[0] == "jobs":
+                self._cancel(parts[1])
+            else:
+                self._send_error(404, f"Unknown path {self.path}")
+
+    return Handler
+
+
+__all__ = [
+    "DEFAULT_HOST",
+    "DEFAULT_PORT",
+    "JobService",
+]
@@ -0,0 +1,415 @@
+"""Single-flight coalescing of identical LLM requests.
+
+When two runs document the same transcript at the same time (the GUI and a
+CLI batch, or two concurrent runs in one process) they send identical
+prompts. :class:`SingleFlightClient`, which :func:`~docalypt.llm.create_client`
+wraps around every client, lets only the first of several concurrent
+identical requests reach the provider; the others wait for it and receive a
+copy of its result marked ``coalesced``.
+
+Requests are identical when the prompt, the output budget and every setting
+that affects the request (provider, endpoint, credentials, model, sampling
+parameters, streaming, keep-alive) match. Nothing is cached: a request that
+starts after an identical one has finished is sent again.
+
+With ``LLMSettings.coalesce = "host"`` requests are also coalesced across
+processes through lock files in ``~/.cache/docalypt/inflight`` (POSIX only):
+the process holding a request's lock writes the result next to it before
+releasing the lock, and processes that were waiting for the lock pick it up.
+Waiters hold a shared lock on a ``.wait`` file until they have read the
+result, and the result file is deleted once none is left.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, fields, replace
+from pathlib import Path
+from typing import BinaryIO, Callable, Dict, Iterator, List
+
+try:  # Optional: file locks for coalescing across processes (POSIX only).
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+from .cancellation import CancellationToken
+from .config import CACHE_DIR
+from .llm import (
+    COALESCE_HOST,
+    GenerationResult,
+    LLMCancelled,
+    LLMSettings,
+    Prompt,
+    _BaseLLMClient,
+)
+
+INFLIGHT_DIR = CACHE_DIR / "inflight"
+# How often a process waiting for another one's lock checks for cancellation.
+POLL_INTERVAL = 0.05
+# Lock and result files older than this are removed, unless still locked.
+PRUNE_AGE = 3600.0
+# Seconds a finished request waits for its waiters to read the result.
+RESULT_LINGER = 30.0
+
+logger = logging.getLogger(__name__)
+
+FirstTokenCallback = Callable[[], None]
+
+
+def request_key(settings: LLMSettings, prompt: Prompt | str, max_tokens: int | None = None) -> str:
+    """Hash of everything that determines the answer to a request."""
+
+    api_key = settings.resolved_api_key()
+    identity = [
+        settings.normalized_provider(),
+        settings.resolved_endpoint().rstrip("/"),
+        # Different accounts may see different models, quotas and answers.
+        hashlib.sha256(api_key.encode("utf-8")).hexdigest() if api_key else None,
+        settings.model.strip(),
+        settings.temperature,
+        settings.top_p,
+        settings.top_k,
+        settings.presence_penalty,
+        settings.frequency_penalty,
+        settings.repeat_penalty,
+        settings.anthropic_version,
+        settings.context_window,
+        settings.stream,
+        settings.keep_alive,
+        settings.prompt_caching,
+        max_tokens or settings.max_tokens,
+        str(prompt),
+    ]
+    encoded = json.dumps(identity, ensure_ascii=False).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+
+class _Flight:
+    __slots__ = ("done", "first_token", "result", "error", "_waiters", "_lock")
+
+    def __init__(self) -> None:
+        self.done = False
+        self.first_token = False
+        self.result: GenerationResult | None = None
+        self.error: BaseException | None = None
+        self._waiters: List[threading.Event] = []
+        self._lock = threading.Lock()
+
+    def join(self) -> threading.Event:
+        wake = threading.Event()
+        with self._lock:
+            self._waiters.append(wake)
+        return wake
+
+    def leave(self, wake: threading.Event) -> None:
+        with self._lock:
+            self._waiters.remove(wake)
+
+    def notify(self) -> None:
+        with self._lock:
+            waiters = list(self._waiters)
+        for wake in waiters:
+            wake.set()
+
+
+class SingleFlight:
+    """Runs at most one call per key at a time; concurrent callers share it."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._flights: Dict[str, _Flight] = {}
+
+    def run(
+        self,
+        key: str,
+        call: Callable[[FirstTokenCallback], GenerationResult],
+        cancel: CancellationToken | None = None,
+        on_first_token: FirstTokenCallback | None = None,
+    ) -> GenerationResult:
+        """Run ``call`` or wait for the identical call already in flight.
+
+        ``call`` receives the callback to invoke on its first token. A waiter
+        whose leader was cancelled does not inherit the cancellation: it
+        retries, becoming the leader of a new flight if need be.
+        """
+
+        while True:
+            with self._lock:
+                flight = self._flights.get(key)
+                leader = flight is None
+                if leader:
+                    flight = self._flights[key] = _Flight()
+            if leader:
+                return self._lead(key, flight, call, on_first_token)
+            result = self._follow(flight, cancel, on_first_token)
+            if result is not None:
+                return result
+
+    def _lead(
+        self,
+        key: str,
+        flight: _Flight,
+        call: Callable[[FirstTokenCallback], GenerationResult],
+        on_first_token: FirstTokenCallback | None,
+    ) -> GenerationResult:
+        def first_token() -> None:
+            flight.first_token = True
+            flight.notify()
+            if on_first_token is not None:
+                on_first_token()
+
+        try:
+            flight.result = call(first_token)
+            return flight.result
+        except BaseException as exc:
+            flight.error = exc
+            raise
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.done = True
+            flight.notify()
+
+    @staticmethod
+    def _follow(
+        flight: _Flight,
+        cancel: CancellationToken | None,
+        on_first_token: FirstTokenCallback | None,
+    ) -> GenerationResult | None:
+        """Wait for ``flight``; ``None`` means it was cancelled and must be retried."""
+
+        wake = flight.join()
+        wake.set()  # the flight may have finished before we joined it
+        unregister = cancel.on_cancel(wake.set) if cancel is not None else None
+        forwarded = False
+        try:
+            while True:
+                wake.wait()
+                wake.clear()
+                if cancel is not None and cancel.cancelled:
+                    raise LLMCancelled(cancel.reason or "Cancelled")
+                if flight.first_token and not forwarded:
+                    forwarded = True
+                    if on_first_token is not None:
+                        on_first_token()
+                if flight.done:
+                    break
+        finally:
+            if unregister is not None:
+                unregister()
+            flight.leave(wake)
+
+        if isinstance(flight.error, LLMCancelled):
+            return None
+        if flight.error is not None:
+            raise flight.error
+        assert flight.result is not None
+        if not forwarded and on_first_token is not None:
+            on_first_token()
+        return replace(flight.result, coalesced=True)
+
+
+_GROUP = SingleFlight()
+
+
+class SingleFlightClient(_BaseLLMClient):
+    """Wrap a client so identical concurrent requests share one upstream call."""
+
+    def __init__(
+        self,
+        client: _BaseLLMClient,
+        group: SingleFlight | None = None,
+        lock_dir: Path | None = None,
+    ) -> None:
+        super().__init__(client.settings)
+        self.client = client
+        self.provider = client.provider
+        self.group = group or _GROUP
+        if lock_dir is None and client.settings.coalesce == COALESCE_HOST:
+            if fcntl is None:
+                logger.debug("Coalescing across processes needs fcntl; using this process only")
+            else:
+                lock_dir = INFLIGHT_DIR
+        self.lock_dir = lock_dir
+
+    def generate(
+        self,
+        prompt: Prompt | str,
+        max_tokens: int | None = None,
+        cancel: CancellationToken | None = None,
+        on_first_token: FirstTokenCallback | None = None,
+    ) -> GenerationResult:
+        key = request_key(self.settings, prompt, max_tokens)
+
+        def call(first_token: FirstTokenCallback) -> GenerationResult:
+            def send() -> GenerationResult:
+                return self.client.generate(
+                    prompt, max_tokens, cancel=cancel, on_first_token=first_token
+                )
+
+            if self.lock_dir is None:
+                return send()
+            return self._across_processes(key, send, cancel, first_token)
+
+        return self.group.run(key, call, cancel, on_first_token)
+
+    # Across processes ---------------------------------------------------
+    def _across_processes(
+        self,
+        key: str,
+        send: Callable[[], GenerationResult],
+        cancel: CancellationToken | None,
+        first_token: FirstTokenCallback,
+    ) -> GenerationResult:
+        assert self.lock_dir is not None
+        lock_path = self.lock_dir / f"{key}.lock"
+        wait_path = self.lock_dir / f"{key}.wait"
+        result_path = self.lock_dir / f"{key}.json"
+        try:
+            self.lock_dir.mkdir(parents=True, exist_ok=True)
+            handle = open(lock_path, "a+b")
+        except OSError as exc:
+            logger.debug("Cannot coalesce across processes: %s", exc)
+            return send()
+        # Closing the file releases the lock.
+        with handle:
+            if not _try_lock(handle):
+                with _waiting(wait_path):
+                    waiting_since = time.time()
+                    while not _try_lock(handle):
+                        if cancel is None:
+                            time.sleep(POLL_INTERVAL)
+                        elif cancel.wait(POLL_INTERVAL):
+                            raise LLMCancelled(cancel.reason or "Cancelled")
+                    shared = _read_result(result_path, waiting_since)
+                if shared is not None:
+                    first_token()
+                    return replace(shared, coalesced=True)
+            result = send()
+            written = _write_result(result_path, result)
+        if written:
+            threading.Thread(
+                target=_discard_result,
+                args=(lock_path, wait_path, result_path),
+                name="docalypt-inflight-cleanup",
+                daemon=True,
+            ).start()
+        return result
+
+
+def _try_lock(handle: BinaryIO, operation: int | None = None) -> bool:
+    try:
+        fcntl.flock(handle, (fcntl.LOCK_EX if operation is None else operation) | fcntl.LOCK_NB)
+    except BlockingIOError:
+        return False
+    return True
+
+
+@contextmanager
+def _waiting(path: Path) -> Iterator[None]:
+    """Hold a shared lock on ``path`` so the result is kept until we read it."""
+
+    try:
+        handle = open(path, "a+b")
+    except OSError as exc:
+        logger.debug("Cannot register as a waiter: %s", exc)
+        yield
+        return
+    with handle:
+        fcntl.flock(handle, fcntl.LOCK_SH)
+        yield
+
+
+def _discard_result(lock_path: Path, wait_path: Path, result_path: Path) -> None:
+    """Delete a shared result once every process waiting for it has read it."""
+
+    deadline = time.monotonic() + RESULT_LINGER
+    try:
+        wait_handle = open(wait_path, "a+b")
+        lock_handle = open(lock_path, "a+b")
+    except OSError:
+        return
+    with wait_handle, lock_handle:
+        while not _try_lock(wait_handle):
+            if time.monotonic() >= deadline:
+                return  # left to _prune
+            time.sleep(POLL_INTERVAL)
+        # A new leader holding the request lock will overwrite the result.
+        if _try_lock(lock_handle):
+            _unlink(result_path)
+
+
+def _read_result(path: Path, written_after: float) -> GenerationResult | None:
+    """The result another process wrote while we waited, if it wrote one."""
+
+    try:
+        if path.stat().st_mtime < written_after:
+            return None
+        data = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    if not isinstance(data, dict):
+        return None
+    names = {item.name for item in fields(GenerationResult)}
+    try:
+        return GenerationResult(**{name: value for name, value in data.items() if name in names})
+    except TypeError:
+        return None
+
+
+def _write_result(path: Path, result: GenerationResult) -> bool:
+    temporary = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    try:
+        temporary.write_text(json.dumps(asdict(result)), encoding="utf-8")
+        os.replace(temporary, path)
+    except OSError as exc:
+        logger.debug("Cannot share result %s: %s", path, exc)
+        return False
+    _prune(path.parent)
+    return True
+
+
+def _prune(directory: Path) -> None:
+    """Remove old files left behind by crashed processes, except held locks."""
+
+    cutoff = time.time() - PRUNE_AGE
+    try:
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                try:
+                    if entry.stat().st_mtime >= cutoff:
+                        continue
+                    if entry.name.endswith((".lock", ".wait")):
+                        # A lock file's mtime does not change while it is held.
+                        with open(entry.path, "a+b") as handle:
+                            if _try_lock(handle):
+                                os.unlink(entry.path)
+                    else:
+                        os.unlink(entry.path)
+                except OSError:
+                    continue
+    except OSError:
+        return
+
+
+def _unlink(path: Path) -> None:
+    try:
+        path.unlink()
+    except FileNotFoundError:
+        pass
+    except OSError as exc:
+        logger.debug("Cannot remove %s: %s", path, exc)
+
+
+__all__ = [
+    "INFLIGHT_DIR",
+    "SingleFlight",
+    "SingleFlightClient",
+    "request_key",
+]
@@ -5,7 +5,7 @@ from __future__ import annotations
 from dataclasses import dataclass, field
 from pathlib import Path
 import re
-from typing import Callable, Iterable, List, Optional, Sequence
+from typing import TYPE_CHECKING, Callable, Iterable, List, Optional, Sequence
 
 try:  # Python <3.11 compatibility for typing.Pattern
     from re import Pattern  # type: ignore[attr-defined]
@@ -13,6 +13,12 @@ except ImportError:  # pragma: no cover - fallback for older versions
     Pattern = type(re.compile(""))
 
 from .config import AppConfig, load_config
+from .formats import read_records, reader_for
+from .pipeline import ChapterQueue
+from .tracing import get_tracer
+
+if TYPE_CHECKING:  # pragma: no cover - annotations only; keeps sqlite3 off the import path
+    from .search import SearchIndex
 
 ProgressCallback = Callable[[int, int], None]
 TextHook = Callable[[str], str]
@@ -50,12 +56,21 @@ class TranscriptSplitter:
     on_progress: ProgressCallback | None = None
     pre_split_hooks: Iterable[TextHook] = field(default_factory=list)
     post_split_hooks: Iterable[FileHook] = field(default_factory=list)
-    config: AppConfig = field(init=False)
+    chapter_queue: Optional[ChapterQueue] = None
+    # Chapters are added to the full-text index as they are written.
+    search_index: Optional[SearchIndex] = None
+    # Derive chapters from the text instead of the header's chapter list.
+    # Transcripts without a header (or a ``Transcript:`` separator) always are.
+    auto_chapters: bool = False
+    # Read from the config file when not given; long-running callers pass
+    # one in so it is not re-read for every transcript.
+    config: Optional[AppConfig] = None
     _marker_pattern: Pattern[str] = field(init=False)
     _chapter_count: int = field(init=False, default=0)
 
     def __post_init__(self) -> None:
-        self.config = load_config()
+        if self.config is None:
+            self.config = load_config()
         self.output_dir = (
             Path(self.output_dir).expanduser().resolve()
             if self.output_dir
@@ -66,25 +81,54 @@ class TranscriptSplitter:
 
     # Public API ---------------------------------------------------------
     def split(self, export_html: bool = False) -> int:
-        result = self._split_internal(export_html=export_html)
-        self._chapter_count = len(result.chapters)
+        with get_tracer().span("transcript", transcript=self.input_path.name) as span:
+            try:
+                result = self._split_internal(export_html=export_html)
+            finally:
+                if self.chapter_queue is not None:
+                    self.chapter_queue.close()
+            self._chapter_count = len(result.chapters)
+            span.set(chapters=self._chapter_count)
         return self._chapter_count
 
     # Internal helpers ---------------------------------------------------
     def _split_internal(self, export_html: bool) -> SplitResult:
-        text = self.input_path.read_text(encoding="utf-8")
-        try:
-            header, body = text.split("\n\nTranscript:", 1)
-        except ValueError as exc:  # pragma: no cover - invalid format guard
-            raise ValueError("Transcript missing 'Transcript:' separator") from exc
-
-        chapters = self._parse_chapters(header)
-        processed_body = self._apply_pre_hooks(body)
-        chapter_files = self._write_chapters(chapters, processed_body)
+        tracer = get_tracer()
+        with tracer.span("split.read", format=self.input_path.suffix.lower()) as span:
+            reader = reader_for(self.input_path)
+            if reader is not None:
+                # Caption files carry no chapter list; hooks see each snippet.
+                header = ""
+                records = [
+                    (timestamp, self._apply_pre_hooks(snippet).strip())
+                    for timestamp, snippet in read_records(self.input_path, reader)
+                ]
+                if not records:
+                    raise ValueError("No captions found in input file")
+            else:
+                text = self.input_path.read_text(encoding="utf-8")
+                header, separator, body = text.partition("\n\nTranscript:")
+                if not separator:
+                    header, body = "", text
+                records = self._parse_records(self._apply_pre_hooks(body))
+                span.set(bytes=len(text))
+            span.set(records=len(records))
+        with tracer.span("split.chapters") as span:
+            chapters = [] if self.auto_chapters else self._parse_chapters(header)
+            span.set(detected=not chapters)
+            if not chapters:
+                # Imported here so NumPy is only loaded when it is needed.
+                from .chaptering import detect_chapters
+
+                chapters = detect_chapters(records)
+            span.set(chapters=len(chapters))
+        with tracer.span("split.write", chapters=len(chapters)):
+            chapter_files = self._write_chapters(chapters, records)
 
         html_path = None
         if export_html:
-            html_path = self._write_html_index(chapters, chapter_files)
+            with tracer.span("split.html"):
+                html_path = self._write_html_index(chapters, chapter_files)
 
         return SplitResult(chapters=chapter_files, html_path=html_path)
 
@@ -105,20 +149,23 @@ class TranscriptSplitter:
             updated = hook(updated)
         return updated
 
-    def _write_chapters(self, chapters: Sequence[Chapter], body: str) -> List[Path]:
-        buckets: dict[str, list[str]] = {chapter.title: [] for chapter in chapters}
+    def _parse_records(self, body: str) -> List[tuple[int, str]]:
+        """Split the body into ``(timestamp, snippet)`` records."""
+
         parts = self._marker_pattern.split(body)
         if len(parts) <= 1:
             raise ValueError("No timestamp markers found in transcript body")
-
-        total = (len(parts) - 1) // 2
-        progress_counter = 0
-
-        for index in range(1, len(parts), 2):
-            progress_counter += 1
-            ts_value = parts[index]
-            snippet = parts[index + 1].strip()
-            timestamp = _parse_hhmmss(ts_value)
+        return [
+            (_parse_hhmmss(parts[index]), parts[index + 1].strip())
+            for index in range(1, len(parts), 2)
+        ]
+
+    def _write_chapters(
+        self, chapters: Sequence[Chapter], records: Sequence[tuple[int, str]]
+    ) -> List[Path]:
+        buckets: dict[str, list[str]] = {chapter.title: [] for chapter in chapters}
+        total = len(records)
+        for progress_counter, (timestamp, snippet) in enumerate(records, start=1):
             owning_title = self._find_chapter_title(timestamp, chapters)
             buckets[owning_title].append(snippet)
             if self.on_progress:
@@ -134,8 +181,17 @@ class TranscriptSplitter:
             destination = self.output_dir / filename
             content_lines = [f"# {chapter.title}", ""] + [snippet for snippet in snippets if snippet]
             destination.write_text("\n\n".join(content_lines).strip() + "\n", encoding="utf-8")
+            if self.search_index is not None:
+                self.search_index.add_chapter(
+                    destination,
+                    transcript=self.input_path,
+                    title=chapter.title,
+                    timestamp=chapter.timestamp,
+                )
             for hook in self.post_split_hooks:
                 hook(destination)
+            if self.chapter_queue is not None:
+                self.chapter_queue.put(destination)
             written_paths.append(destination)
         return written_paths
 
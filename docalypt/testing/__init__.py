@@ -0,0 +1,10 @@
+"""Test doubles for exercising Docalypt without real LLM endpoints."""
+
+from .fake_llm import FakeLLMConfig, FakeLLMServer, FakeLLMStats, LatencyProfile
+
+__all__ = [
+    "FakeLLMConfig",
+    "FakeLLMServer",
+    "FakeLLMStats",
+    "LatencyProfile",
+]
@@ -0,0 +1,429 @@
+"""Local stand-in for the Ollama, OpenAI and Anthropic HTTP APIs.
+
+The server answers with synthetic Markdown at a configurable speed, so
+documentation throughput can be measured (and the clients exercised)
+without a GPU box or API keys. It implements the subset of each API that
+:mod:`docalypt.llm` uses, including streaming, and can inject server
+errors and rate limiting.
+"""
+
+from __future__ import annotations
+
+import json
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Iterator, List
+
+from ..tokens import CHARS_PER_TOKEN
+
+_WORDS = (
+    "the chapter explains how the design balances signal integrity power delivery "
+    "and layout constraints while keeping the workflow practical for a small team"
+).split()
+_PACK_MARKER = re.compile(r"^<!-- chapter: (.+?) -->$", re.MULTILINE)
+
+
+@dataclass(slots=True)
+class LatencyProfile:
+    """Distribution of the delay before the first token.
+
+    ``distribution`` is ``"fixed"``, ``"uniform"`` (median ± spread) or
+    ``"lognormal"`` (``spread`` is the sigma of the underlying normal),
+    which gives the long tail typical of shared GPUs and hosted APIs.
+    """
+
+    distribution: str = "lognormal"
+    median: float = 0.3
+    spread: float = 0.5
+
+    def sample(self, rng: random.Random) -> float:
+        if self.distribution == "fixed":
+            return self.median
+        if self.distribution == "uniform":
+            return max(0.0, rng.uniform(self.median - self.spread, self.median + self.spread))
+        if self.distribution == "lognormal":
+            return rng.lognormvariate(0.0, self.spread) * self.median
+        raise ValueError(f"Unknown latency distribution: {self.distribution}")
+
+
+@dataclass(slots=True)
+class FakeLLMConfig:
+    time_to_first_token: LatencyProfile = field(default_factory=LatencyProfile)
+    tokens_per_second: float = 50.0
+    # Tokens generated per answer, capped by the request's max tokens.
+    output_tokens: int = 120
+    # Probability of answering with HTTP 500 / HTTP 429.
+    error_rate: float = 0.0
+    rate_limit_rate: float = 0.0
+    # Requests processed at once; more are queued, like a single Ollama GPU.
+    # 0 means unlimited.
+    max_concurrency: int = 0
+    models: List[str] = field(default_factory=lambda: ["fake-llama", "fake-mistral"])
+    seed: int | None = None
+    # Reported by /api/show: the trained context length and, if set, the
+    # Modelfile's num_ctx parameter.
+    context_length: int = 8192
+    num_ctx: int | None = None
+
+
+@dataclass(slots=True)
+class FakeLLMStats:
+    requests: int = 0
+    errors: int = 0
+    rate_limited: int = 0
+    output_tokens: int = 0
+
+
+class FakeLLMServer:
+    """Threaded fake LLM server; use as a context manager or call :meth:`start`."""
+
+    def __init__(
+        self, config: FakeLLMConfig | None = None, host: str = "127.0.0.1", port: int = 0
+    ) -> None:
+        self.config = config or FakeLLMConfig()
+        self.stats = FakeLLMStats()
+        self._rng = random.Random(self.config.seed)
+        self._lock = threading.Lock()
+        self._slots = (
+            threading.Semaphore(self.config.max_concurrency)
+            if self.config.max_concurrency > 0
+            else None
+        )
+        self._httpd = ThreadingHTTPServer((host, port), _make_handler(self))
+        self._httpd.daemon_threads = True
+        self._thread: threading.Thread | None = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeLLMServer":
+        self._thread = threading.Thread(
+            target=self._httpd.serve_forever, name="docalypt-fake-llm", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self) -> "FakeLLMServer":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    # Simulation ---------------------------------------------------------
+    def _draw(self) -> tuple[str, float]:
+        """Decide the fate of a request: ``("ok" | "error" | "rate_limited", ttft)``."""
+
+        with self._lock:
+            self.stats.requests += 1
+            roll = self._rng.random()
+            ttft = self.config.time_to_first_token.sample(self._rng)
+            if roll < self.config.rate_limit_rate:
+                self.stats.rate_limited += 1
+                return "rate_limited", 0.0
+            if roll < self.config.rate_limit_rate + self.config.error_rate:
+                self.stats.errors += 1
+                return "error", 0.0
+        return "ok", ttft
+
+    def _tokens(self, prompt: str, max_tokens: int | None) -> Iterator[List[str]]:
+        """Yield batches of output tokens paced at the configured token rate."""
+
+        limit = self.config.output_tokens
+        if max_tokens:
+            limit = min(limit, max_tokens)
+        tokens = _answer_tokens(prompt, limit)
+        with self._lock:
+            self.stats.output_tokens += len(tokens)
+        rate = max(self.config.tokens_per_second, 1e-3)
+        # Flush at most every 20ms so high token rates do not cost a syscall each.
+        batch = max(1, int(rate * 0.02))
+        started = time.perf_counter()
+        for start in range(0, len(tokens), batch):
+            due = started + start / rate
+            delay = due - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            yield tokens[start : start + batch]
+
+    def _acquire(self) -> Callable[[], None]:
+        if self._slots is None:
+            return lambda: None
+        self._slots.acquire()
+        return self._slots.release
+
+
+def _answer_tokens(prompt: str, limit: int) -> List[str]:
+    """Synthetic Markdown; packed prompts get one marked section per chapter."""
+
+    names = [name for name in _PACK_MARKER.findall(prompt) if "{" not in name]
+    sections = names or ["Chapter"]
+    per_section = max(4, limit // len(sections))
+    tokens: List[str] = []
+    for name in sections:
+        if names:
+            tokens.append(f"<!-- chapter: {name} -->\n")
+        tokens.append("## Summary\n\n")
+        for position in range(per_section - 1):
+            tokens.append(_WORDS[position % len(_WORDS)] + " ")
+        tokens.append("\n\n")
+    return tokens
+
+
+def _model_entry(name: str) -> Dict[str, object]:
+    return {
+        "name": name,
+        "model": name,
+        "size": 4_661_224_676,
+        "details": {"family": "llama", "parameter_size": "8.0B", "quantization_level": "Q4_0"},
+    }
+
+
+def _estimate_tokens(text: str) -> int:
+    return max(1, len(text) // CHARS_PER_TOKEN)
+
+
+def _make_handler(server: FakeLLMServer) -> type[BaseHTTPRequestHandler]:
+    config = server.config
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format: str, *args) -> None:  # noqa: A002 - stdlib signature
+            pass
+
+        # Plumbing -----------------------------------------------------
+        def _send_json(self, payload: object, status: int = 200, headers: Dict[str, str] | None = None) -> None:
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _start_stream(self, content_type: str) -> None:
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+
+        def _chunk(self, data: bytes) -> None:
+            self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+            self.wfile.flush()
+
+        def _end_stream(self) -> None:
+            self.wfile.write(b"0\r\n\r\n")
+            self.wfile.flush()
+
+        def _read_json(self) -> Dict[str, object]:
+            length = int(self.headers.get("Content-Length") or 0)
+            raw = self.rfile.read(length) if length else b"{}"
+            try:
+                payload = json.loads(raw or b"{}")
+            except json.JSONDecodeError:
+                payload = {}
+            return payload if isinstance(payload, dict) else {}
+
+        def _fail(self, outcome: str) -> bool:
+            if outcome == "rate_limited":
+                self._send_json(
+                    {"error": {"type": "rate_limit_error", "message": "Rate limit exceeded"}},
+                    status=429,
+                    headers={"Retry-After": "1"},
+                )
+                return True
+            if outcome == "error":
+                self._send_json(
+                    {"error": {"type": "server_error", "message": "Injected server error"}},
+                    status=500,
+                )
+                return True
+            return False
+
+        # Routes ---------------------------------------------------------
+        def do_GET(self) -> None:  # noqa: N802 - stdlib naming
+            path = self.path.rstrip("/")
+            if path.endswith("/api/tags"):
+                self._send_json({"models": [_model_entry(name) for name in config.models]})
+            elif path.endswith("/api/ps"):
+                self._send_json({"models": [{"name": name, "model": name} for name in config.models[:1]]})
+            elif path.endswith("/models"):
+                self._send_json({"data": [{"id": name, "object": "model"} for name in config.models]})
+            else:
+                self._send_json({"error": "not found"}, status=404)
+
+        def do_POST(self) -> None:  # noqa: N802 - stdlib naming
+            payload = self._read_json()
+            path = self.path.rstrip("/")
+            if path.endswith("/api/show"):
+                name = payload.get("model") or payload.get("name")
+                if name not in config.models:
+                    self._send_json({"error": f"model '{name}' not found"}, status=404)
+                    return
+                entry = _model_entry(str(name))
+                entry["model_info"] = {"llama.context_length": config.context_length}
+                if config.num_ctx:
+                    entry["parameters"] = f"num_ctx {config.num_ctx}\nstop <|eot_id|>"
+                self._send_json(entry)
+                return
+            if path.endswith("/api/generate"):
+                handler = self._ollama
+            elif path.endswith("/chat/completions"):
+                handler = self._openai
+            elif path.endswith("/messages"):
+                handler = self._anthropic
+            else:
+                self._send_json({"error": "not found"}, status=404)
+                return
+            release = server._acquire()
+            try:
+                handler(payload)
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # the client cancelled the request
+            finally:
+                release()
+
+        def _ollama(self, payload: Dict[str, object]) -> None:
+            prompt = f"{payload.get('system') or ''}{payload.get('prompt') or ''}"
+            if not payload.get("prompt"):
+                # Empty prompts only load (or unload) the model.
+                self._send_json({"model": payload.get("model"), "response": "", "done": True})
+                return
+            outcome, ttft = server._draw()
+            if self._fail(outcome):
+                return
+            options = payload.get("options") or {}
+            max_tokens = options.get("num_predict") if isinstance(options, dict) else None
+            started = time.perf_counter()
+            time.sleep(ttft)
+            prompt_eval = time.perf_counter() - started
+            if payload.get("stream") is False:
+                tokens = [token for batch in server._tokens(prompt, max_tokens) for token in batch]
+                self._send_json(
+                    self._ollama_final("".join(tokens), prompt, len(tokens), prompt_eval, started)
+                )
+                return
+            self._start_stream("application/x-ndjson")
+            count = 0
+            for batch in server._tokens(prompt, max_tokens):
+                count += len(batch)
+                line = {"model": payload.get("model"), "response": "".join(batch), "done": False}
+                self._chunk((json.dumps(line) + "\n").encode("utf-8"))
+            final = self._ollama_final("", prompt, count, prompt_eval, started)
+            self._chunk((json.dumps(final) + "\n").encode("utf-8"))
+            self._end_stream()
+
+        @staticmethod
+        def _ollama_final(
+            text: str, prompt: str, count: int, prompt_eval: float, started: float
+        ) -> Dict[str, object]:
+            total = time.perf_counter() - started
+            return {
+                "response": text,
+                "done": True,
+                "prompt_eval_count": _estimate_tokens(prompt),
+                "eval_count": count,
+                "prompt_eval_duration": int(prompt_eval * 1e9),
+                "eval_duration": int(max(total - prompt_eval, 1e-6) * 1e9),
+                "load_duration": 0,
+            }
+
+        def _openai(self, payload: Dict[str, object]) -> None:
+            messages = payload.get("messages") or []
+            prompt = "".join(
+                str(message.get("content", "")) for message in messages if isinstance(message, dict)
+            )
+            outcome, ttft = server._draw()
+            if self._fail(outcome):
+                return
+            time.sleep(ttft)
+            usage = {"prompt_tokens": _estimate_tokens(prompt), "completion_tokens": 0}
+            max_tokens = payload.get("max_tokens")
+            if not payload.get("stream"):
+                tokens = [token for batch in server._tokens(prompt, max_tokens) for token in batch]
+                usage["completion_tokens"] = len(tokens)
+                self._send_json(
+                    {
+                        "object": "chat.completion",
+                        "choices": [{"index": 0, "message": {"role": "assistant", "content": "".join(tokens)}}],
+                        "usage": usage,
+                    }
+                )
+                return
+            self._start_stream("text/event-stream")
+            for batch in server._tokens(prompt, max_tokens):
+                usage["completion_tokens"] += len(batch)
+                chunk = {"choices": [{"index": 0, "delta": {"content": "".join(batch)}}]}
+                self._chunk(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+            options = payload.get("stream_options") or {}
+            if isinstance(options, dict) and options.get("include_usage"):
+                self._chunk(f"data: {json.dumps({'choices': [], 'usage': usage})}\n\n".encode("utf-8"))
+            self._chunk(b"data: [DONE]\n\n")
+            self._end_stream()
+
+        def _anthropic(self, payload: Dict[str, object]) -> None:
+            system = payload.get("system") or ""
+            if isinstance(system, list):
+                system = "".join(str(block.get("text", "")) for block in system if isinstance(block, dict))
+            messages = payload.get("messages") or []
+            prompt = str(system) + "".join(
+                str(message.get("content", "")) for message in messages if isinstance(message, dict)
+            )
+            outcome, ttft = server._draw()
+            if self._fail(outcome):
+                return
+            time.sleep(ttft)
+            input_tokens = _estimate_tokens(prompt)
+            max_tokens = payload.get("max_tokens")
+            if not payload.get("stream"):
+                tokens = [token for batch in server._tokens(prompt, max_tokens) for token in batch]
+                self._send_json(
+                    {
+                        "type": "message",
+                        "content": [{"type": "text", "text": "".join(tokens)}],
+                        "usage": {"input_tokens": input_tokens, "output_tokens": len(tokens)},
+                    }
+                )
+                return
+            self._start_stream("text/event-stream")
+
+            def event(name: str, data: Dict[str, object]) -> None:
+                self._chunk(f"event: {name}\ndata: {json.dumps(data)}\n\n".encode("utf-8"))
+
+            event(
+                "message_start",
+                {"type": "message_start", "message": {"usage": {"input_tokens": input_tokens, "output_tokens": 1}}},
+            )
+            count = 0
+            for batch in server._tokens(prompt, max_tokens):
+                count += len(batch)
+                event(
+                    "content_block_delta",
+                    {"type": "content_block_delta", "delta": {"type": "text_delta", "text": "".join(batch)}},
+                )
+            event("message_delta", {"type": "message_delta", "usage": {"output_tokens": count}})
+            event("message_stop", {"type": "message_stop"})
+            self._end_stream()
+
+    return Handler
+
+
+__all__ = [
+    "FakeLLMConfig",
+    "FakeLLMServer",
+    "FakeLLMStats",
+    "LatencyProfile",
+]
@@ -0,0 +1,268 @@
+"""Local token estimation and prompt budgeting.
+
+Nothing here talks to a provider: prompts are measured with a fast local
+tokenizer so oversized chapters and output budgets can be handled before any
+network round trip. The default tokenizer is a dependency-free heuristic;
+others can be registered with :func:`register_tokenizer`. Estimates are
+calibrated per provider from the token counts reported back in telemetry.
+"""
+
+from __future__ import annotations
+
+import re
+import threading
+from dataclasses import dataclass
+from typing import Callable, Dict, Protocol
+
+# Rough characters-per-token ratio for English prose.
+CHARS_PER_TOKEN = 4
+
+# Context windows assumed when LLMSettings.context_window is not set. Ollama
+# truncates silently beyond its default num_ctx, so it is budgeted strictly.
+DEFAULT_CONTEXT_WINDOWS: Dict[str, int] = {
+    "ollama": 4096,
+    "openai": 128_000,
+    "anthropic": 200_000,
+}
+
+# Initial per-provider correction applied on top of the tokenizer estimate.
+DEFAULT_CALIBRATION: Dict[str, float] = {
+    "ollama": 1.0,
+    "openai": 1.0,
+    "anthropic": 1.1,
+}
+
+# Adaptive output budget: tokens of documentation per token of chapter.
+OUTPUT_RATIO = 0.25
+MAX_ADAPTIVE_OUTPUT_TOKENS = 4096
+# Smallest output budget worth sending; below this a chapter is chunked.
+MIN_OUTPUT_TOKENS = 256
+# Headroom for chat formatting and estimation error.
+SAFETY_MARGIN = 0.05
+
+_PIECE_PATTERN = re.compile(r"\w+|[^\w\s]")
+
+
+class Tokenizer(Protocol):
+    name: str
+
+    def count(self, text: str) -> int:  # pragma: no cover - interface only
+        ...
+
+
+class HeuristicTokenizer:
+    """Dependency-free estimate blending character and word/punctuation counts."""
+
+    name = "heuristic"
+
+    def count(self, text: str) -> int:
+        if not text:
+            return 0
+        pieces = len(_PIECE_PATTERN.findall(text))
+        by_chars = len(text) / CHARS_PER_TOKEN
+        # Long words split into several tokens; punctuation is usually one.
+        return max(1, round((by_chars + pieces * 1.1) / 2))
+
+
+class TiktokenTokenizer:
+    """Exact BPE counts via ``tiktoken`` when it is installed."""
+
+    name = "tiktoken"
+
+    def __init__(self, encoding: str = "cl100k_base") -> None:
+        try:
+            import tiktoken
+        except ImportError as exc:  # pragma: no cover - optional dependency
+            raise RuntimeError("The 'tiktoken' package is required for this tokenizer") from exc
+        self._encoding = tiktoken.get_encoding(encoding)
+
+    def count(self, text: str) -> int:
+        return len(self._encoding.encode(text, disallowed_special=()))
+
+
+_TOKENIZER_FACTORIES: Dict[str, Callable[[], Tokenizer]] = {
+    "heuristic": HeuristicTokenizer,
+    "tiktoken": TiktokenTokenizer,
+}
+_TOKENIZERS: Dict[str, Tokenizer] = {}
+_TOKENIZER_LOCK = threading.Lock()
+
+
+def register_tokenizer(name: str, factory: Callable[[], Tokenizer]) -> None:
+    """Make a tokenizer available under ``name`` (e.g. in LLMSettings.tokenizer)."""
+
+    with _TOKENIZER_LOCK:
+        _TOKENIZER_FACTORIES[name] = factory
+        _TOKENIZERS.pop(name, None)
+
+
+def get_tokenizer(name: str = "heuristic") -> Tokenizer:
+    """Return a shared tokenizer instance, falling back to the heuristic."""
+
+    with _TOKENIZER_LOCK:
+        tokenizer = _TOKENIZERS.get(name)
+        if tokenizer is not None:
+            return tokenizer
+        factory = _TOKENIZER_FACTORIES.get(name, HeuristicTokenizer)
+        try:
+            tokenizer = factory()
+        except RuntimeError:
+            tokenizer = HeuristicTokenizer()
+        _TOKENIZERS[name] = tokenizer
+        return tokenizer
+
+
+class TokenEstimator:
+    """Tokenizer estimate scaled by a per-provider calibration factor.
+
+    :meth:`calibrate` folds in the real prompt token count reported by a
+    provider. Samples that disagree wildly with the estimate are ignored,
+    since they usually mean part of the prompt was served from a cache.
+    """
+
+    def __init__(self, tokenizer: Tokenizer | None = None, smoothing: float = 0.2) -> None:
+        self.tokenizer = tokenizer or HeuristicTokenizer()
+        self.smoothing = smoothing
+        self._factors: Dict[str, float] = dict(DEFAULT_CALIBRATION)
+        self._lock = threading.Lock()
+
+    def factor(self, provider: str) -> float:
+        with self._lock:
+            return self._factors.get(provider, 1.0)
+
+    def estimate(self, text: str, provider: str = "ollama") -> int:
+        return max(0, round(self.tokenizer.count(text) * self.factor(provider)))
+
+    def calibrate(self, provider: str, text_tokens: int, actual_tokens: int | None) -> None:
+        """Update the factor from a raw tokenizer count and the provider's count."""
+
+        if not actual_tokens or text_tokens <= 0:
+            return
+        observed = actual_tokens / text_tokens
+        with self._lock:
+            current = self._factors.get(provider, 1.0)
+            if not 0.5 * current <= observed <= 2.0 * current:
+                return
+            self._factors[provider] = (1 - self.smoothing) * current + self.smoothing * observed
+
+
+_ESTIMATORS: Dict[str, TokenEstimator] = {}
+
+
+def get_estimator(tokenizer: str = "heuristic") -> TokenEstimator:
+    """Return the process-wide estimator for a tokenizer, keeping calibration."""
+
+    with _TOKENIZER_LOCK:
+        estimator = _ESTIMATORS.get(tokenizer)
+    if estimator is None:
+        estimator = TokenEstimator(get_tokenizer(tokenizer))
+        with _TOKENIZER_LOCK:
+            estimator = _ESTIMATORS.setdefault(tokenizer, estimator)
+    return estimator
+
+
+def estimate_tokens(text: str, provider: str = "ollama", tokenizer: str = "heuristic") -> int:
+    return get_estimator(tokenizer).estimate(text, provider)
+
+
+@dataclass(frozen=True, slots=True)
+class PromptBudget:
+    """Outcome of preflighting a prompt against a context window."""
+
+    prompt_tokens: int
+    max_tokens: int
+    context_window: int
+
+    @property
+    def fits(self) -> bool:
+        return self.max_tokens >= MIN_OUTPUT_TOKENS
+
+    @property
+    def content_capacity(self) -> int:
+        """Tokens of chapter content that fit alongside a minimum output budget."""
+
+        usable = int(self.context_window * (1 - SAFETY_MARGIN))
+        return max(0, usable - MIN_OUTPUT_TOKENS)
+
+
+def output_budget(content_tokens: int, max_tokens: int, adaptive: bool = True) -> int:
+    """Output tokens to request for this much content, ignoring the context window."""
+
+    if not adaptive:
+        return max_tokens
+    return max(max_tokens, min(MAX_ADAPTIVE_OUTPUT_TOKENS, int(content_tokens * OUTPUT_RATIO)))
+
+
+def plan_budget(
+    prompt_tokens: int,
+    content_tokens: int,
+    context_window: int,
+    max_tokens: int,
+    adaptive: bool = True,
+) -> PromptBudget:
+    """Choose the output budget for a prompt.
+
+    ``max_tokens`` is the configured budget. When ``adaptive`` is set, larger
+    chapters get proportionally more (up to ``MAX_ADAPTIVE_OUTPUT_TOKENS``).
+    The result never exceeds what is left of the context window; if that is
+    below ``MIN_OUTPUT_TOKENS`` the budget reports that the prompt does not fit.
+    """
+
+    target = output_budget(content_tokens, max_tokens, adaptive)
+    remaining = int(context_window * (1 - SAFETY_MARGIN)) - prompt_tokens
+    return PromptBudget(
+        prompt_tokens=prompt_tokens,
+        max_tokens=max(0, min(target, remaining)),
+        context_window=context_window,
+    )
+
+
+def split_to_budget(text: str, max_tokens: int, estimator: TokenEstimator, provider: str) -> list[str]:
+    """Split ``text`` on paragraph boundaries into chunks of at most ``max_tokens``.
+
+    Paragraphs that are too large on their own are cut by characters.
+    """
+
+    max_tokens = max(1, max_tokens)
+    chunks: list[str] = []
+    current: list[str] = []
+    current_tokens = 0
+    for paragraph in re.split(r"\n\s*\n", text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        tokens = estimator.estimate(paragraph, provider)
+        if tokens > max_tokens:
+            if current:
+                chunks.append("\n\n".join(current))
+                current, current_tokens = [], 0
+            step = max(1, int(len(paragraph) * max_tokens / tokens))
+            chunks.extend(paragraph[start : start + step] for start in range(0, len(paragraph), step))
+            continue
+        if current and current_tokens + tokens > max_tokens:
+            chunks.append("\n\n".join(current))
+            current, current_tokens = [], 0
+        current.append(paragraph)
+        current_tokens += tokens
+    if current:
+        chunks.append("\n\n".join(current))
+    return chunks
+
+
+__all__ = [
+    "CHARS_PER_TOKEN",
+    "DEFAULT_CONTEXT_WINDOWS",
+    "HeuristicTokenizer",
+    "MIN_OUTPUT_TOKENS",
+    "PromptBudget",
+    "TiktokenTokenizer",
+    "TokenEstimator",
+    "Tokenizer",
+    "estimate_tokens",
+    "get_estimator",
+    "get_tokenizer",
+    "output_budget",
+    "plan_budget",
+    "register_tokenizer",
+    "split_to_budget",
+]
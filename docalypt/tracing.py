@@ -0,0 +1,393 @@
+"""Span-based tracing of split and documentation runs.
+
+Work is recorded as nested spans: ``run`` → ``transcript`` → ``split.*``
+stages, and ``documentation`` → ``chapter`` → ``llm.request``. Each span
+carries its duration and attributes such as sizes, token counts and errors.
+
+Tracing is off by default: :func:`get_tracer` returns a no-op tracer whose
+spans are one shared object that records nothing, so instrumented code costs
+next to nothing. :func:`configure_tracing` (or ``DOCALYPT_TRACE=<file>``, see
+:func:`tracing_from_env`) writes finished spans to a file, one per line:
+
+* ``jsonl`` (the default): flat span records, easy to load with pandas or jq;
+* ``otlp``: OpenTelemetry ``ExportTraceServiceRequest`` objects in the
+  OTLP/JSON encoding, as written by the collector's file exporter.
+
+:func:`summarize_trace` (``cli.py report``) reads either format back and
+computes per-span-name latency percentiles.
+
+Spans nest automatically within a thread. Work handed to another thread
+passes its parent explicitly (``tracer.span(name, parent=span)``).
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import secrets
+import threading
+import time
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Dict, Iterator, List
+
+ENV_TRACE = "DOCALYPT_TRACE"
+ENV_TRACE_FORMAT = "DOCALYPT_TRACE_FORMAT"
+FORMAT_JSONL = "jsonl"
+FORMAT_OTLP = "otlp"
+TRACE_FORMATS = (FORMAT_JSONL, FORMAT_OTLP)
+
+logger = logging.getLogger(__name__)
+
+_current: ContextVar["Span | None"] = ContextVar("docalypt_span", default=None)
+
+
+class Span:
+    """A timed unit of work. Use as a context manager, via :meth:`Tracer.span`."""
+
+    __slots__ = (
+        "name",
+        "trace_id",
+        "span_id",
+        "parent_id",
+        "start_ns",
+        "end_ns",
+        "attributes",
+        "error",
+        "_tracer",
+        "_token",
+    )
+
+    recording = True
+
+    def __init__(
+        self, tracer: "Tracer", name: str, parent: "Span | None", attributes: Dict[str, Any]
+    ) -> None:
+        self.name = name
+        self.trace_id = parent.trace_id if parent is not None else secrets.token_hex(16)
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent.span_id if parent is not None else None
+        self.start_ns = time.time_ns()
+        self.end_ns: int | None = None
+        self.attributes = attributes
+        self.error: str | None = None
+        self._tracer = tracer
+        self._token = None
+
+    @property
+    def duration(self) -> float | None:
+        """Seconds from start to end, once the span has ended."""
+
+        if self.end_ns is None:
+            return None
+        return (self.end_ns - self.start_ns) / 1e9
+
+    def set(self, **attributes: Any) -> None:
+        """Add or overwrite attributes; ``None`` values are dropped."""
+
+        for key, value in attributes.items():
+            if value is not None:
+                self.attributes[key] = value
+
+    def record_error(self, error: BaseException | str) -> None:
+        if isinstance(error, BaseException):
+            self.attributes["error.type"] = type(error).__name__
+            error = str(error) or type(error).__name__
+        self.error = error
+
+    def end(self) -> None:
+        if self.end_ns is None:
+            self.end_ns = time.time_ns()
+            self._tracer._export(self)
+
+    def __enter__(self) -> "Span":
+        self._token = _current.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, traceback) -> None:
+        if isinstance(exc, SystemExit):
+            # sys.exit(0) inside a span is not an error.
+            if exc.code:
+                self.record_error(f"Exited with status {exc.code}")
+        elif exc is not None:
+            self.record_error(exc)
+        if self._token is not None:
+            _current.reset(self._token)
+            self._token = None
+        self.end()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start": self.start_ns / 1e9,
+            "duration": self.duration,
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+
+class _NoopSpan:
+    """Stands in for every span while tracing is off."""
+
+    __slots__ = ()
+
+    recording = False
+    duration = None
+
+    def set(self, **attributes: Any) -> None:
+        pass
+
+    def record_error(self, error: BaseException | str) -> None:
+        pass
+
+    def end(self) -> None:
+        pass
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, traceback) -> None:
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class Tracer:
+    """Creates spans and writes them to a file when they end. Thread-safe."""
+
+    enabled = True
+
+    def __init__(self, path: Path | str, trace_format: str = FORMAT_JSONL) -> None:
+        if trace_format not in TRACE_FORMATS:
+            raise ValueError(
+                f"Unknown trace format {trace_format!r}; expected one of "
+                + ", ".join(TRACE_FORMATS)
+            )
+        self.path = Path(path).expanduser()
+        self.format = trace_format
+        self._lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # Appending, so several runs (and processes) can share one file.
+        self._file = self.path.open("a", encoding="utf-8")
+
+    def span(self, name: str, parent: Span | None = None, **attributes: Any) -> Span:
+        """Start a span, a child of ``parent`` or of this thread's current span."""
+
+        if parent is None:
+            parent = _current.get()
+        return Span(self, name, parent, {k: v for k, v in attributes.items() if v is not None})
+
+    def close(self) -> None:
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+
+    def _export(self, span: Span) -> None:
+        record = _otlp_request(span) if self.format == FORMAT_OTLP else span.to_dict()
+        line = json.dumps(record, ensure_ascii=False, default=str) + "\n"
+        with self._lock:
+            if self._file.closed:
+                return
+            self._file.write(line)
+            self._file.flush()
+
+
+class _NoopTracer:
+    enabled = False
+    path = None
+
+    def span(self, name: str, parent: Any = None, **attributes: Any) -> _NoopSpan:
+        return _NOOP_SPAN
+
+    def close(self) -> None:
+        pass
+
+
+_tracer: Tracer | _NoopTracer = _NoopTracer()
+_configure_lock = threading.Lock()
+
+
+def get_tracer() -> Tracer | _NoopTracer:
+    """The process-wide tracer (a no-op one unless tracing was configured)."""
+
+    return _tracer
+
+
+def current_span() -> Span | None:
+    """The span currently open in this thread, if tracing is on."""
+
+    return _current.get()
+
+
+def configure_tracing(
+    path: Path | str | None, trace_format: str | None = None
+) -> Tracer | _NoopTracer:
+    """Send spans to ``path`` (``None`` turns tracing off).
+
+    ``trace_format`` defaults to ``otlp`` for ``*.otlp.json``/``*.otlp.jsonl``
+    files and to ``jsonl`` otherwise.
+    """
+
+    global _tracer
+    with _configure_lock:
+        _tracer.close()
+        if path is None:
+            _tracer = _NoopTracer()
+        else:
+            if trace_format is None:
+                trace_format = FORMAT_OTLP if ".otlp." in Path(path).name else FORMAT_JSONL
+            _tracer = Tracer(path, trace_format)
+        return _tracer
+
+
+def tracing_from_env() -> Tracer | _NoopTracer:
+    """Configure tracing from ``DOCALYPT_TRACE`` and ``DOCALYPT_TRACE_FORMAT``."""
+
+    path = os.environ.get(ENV_TRACE, "").strip()
+    if not path:
+        return _tracer
+    trace_format = os.environ.get(ENV_TRACE_FORMAT, "").strip().lower() or None
+    try:
+        return configure_tracing(path, trace_format)
+    except (OSError, ValueError) as exc:
+        logger.warning("Tracing disabled: %s", exc)
+        return configure_tracing(None)
+
+
+# OTLP/JSON ---------------------------------------------------------------------
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp_request(span: Span) -> Dict[str, Any]:
+    record: Dict[str, Any] = {
+        "traceId": span.trace_id,
+        "spanId": span.span_id,
+        "name": span.name,
+        "kind": 1,  # SPAN_KIND_INTERNAL
+        "startTimeUnixNano": str(span.start_ns),
+        "endTimeUnixNano": str(span.end_ns),
+        "attributes": [
+            {"key": key, "value": _otlp_value(value)} for key, value in span.attributes.items()
+        ],
+    }
+    if span.parent_id:
+        record["parentSpanId"] = span.parent_id
+    if span.error is not None:
+        record["status"] = {"code": 2, "message": span.error}  # STATUS_CODE_ERROR
+    return {
+        "resourceSpans": [
+            {
+                "resource": {
+                    "attributes": [{"key": "service.name", "value": {"stringValue": "docalypt"}}]
+                },
+                "scopeSpans": [{"scope": {"name": "docalypt"}, "spans": [record]}],
+            }
+        ]
+    }
+
+
+def _from_otlp(record: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    for resource in record.get("resourceSpans", []):
+        for scope in resource.get("scopeSpans", []):
+            for span in scope.get("spans", []):
+                start = int(span.get("startTimeUnixNano", 0))
+                end = int(span.get("endTimeUnixNano", start))
+                attributes = {}
+                for item in span.get("attributes", []):
+                    value = item.get("value", {})
+                    if "intValue" in value:
+                        attributes[item["key"]] = int(value["intValue"])
+                    else:
+                        attributes[item["key"]] = next(iter(value.values()), None)
+                status = span.get("status") or {}
+                yield {
+                    "name": span.get("name", ""),
+                    "duration": (end - start) / 1e9,
+                    "attributes": attributes,
+                    "error": status.get("message") if status.get("code") == 2 else None,
+                }
+
+
+# Reports -----------------------------------------------------------------------
+def read_spans(path: Path | str) -> Iterator[Dict[str, Any]]:
+    """Spans from a trace file in either format, as ``to_dict``-style records.
+
+    Unreadable lines (e.g. one cut short by a crash) are skipped.
+    """
+
+    with Path(path).expanduser().open(encoding="utf-8") as handle:
+        for line in handle:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if not isinstance(record, dict):
+                continue
+            if "resourceSpans" in record:
+                yield from _from_otlp(record)
+            elif "name" in record and record.get("duration") is not None:
+                yield record
+
+
+def _percentile(ordered: List[float], fraction: float) -> float:
+    index = min(len(ordered) - 1, max(0, round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize_trace(path: Path | str) -> List[Dict[str, Any]]:
+    """Per span name: count, errors, total and p50/p90/p99/max durations (seconds)."""
+
+    durations: Dict[str, List[float]] = {}
+    errors: Dict[str, int] = {}
+    for span in read_spans(path):
+        name = span["name"]
+        durations.setdefault(name, []).append(float(span["duration"]))
+        if span.get("error"):
+            errors[name] = errors.get(name, 0) + 1
+    summary = []
+    for name, values in durations.items():
+        values.sort()
+        summary.append(
+            {
+                "name": name,
+                "count": len(values),
+                "errors": errors.get(name, 0),
+                "total": sum(values),
+                "mean": sum(values) / len(values),
+                "p50": _percentile(values, 0.50),
+                "p90": _percentile(values, 0.90),
+                "p99": _percentile(values, 0.99),
+                "max": values[-1],
+            }
+        )
+    summary.sort(key=lambda row: row["total"], reverse=True)
+    return summary
+
+
+__all__ = [
+    "ENV_TRACE",
+    "ENV_TRACE_FORMAT",
+    "FORMAT_JSONL",
+    "FORMAT_OTLP",
+    "Span",
+    "TRACE_FORMATS",
+    "Tracer",
+    "configure_tracing",
+    "current_span",
+    "get_tracer",
+    "read_spans",
+    "summarize_trace",
+    "tracing_from_env",
+]
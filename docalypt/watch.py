@@ -0,0 +1,584 @@
+"""Watch a folder and process transcripts as they arrive.
+
+:class:`TranscriptWatcher` monitors an input directory (with inotify on
+Linux, by polling modification times elsewhere), waits until a new or
+changed transcript has stopped growing, then splits it into
+``<output>/<transcript stem>/`` and optionally documents the chapters.
+
+Jobs go through a bounded queue to a fixed number of workers. Everything
+that is expensive to set up is created once for the life of the watcher:
+the configuration, the LLM settings (and with them the per-endpoint circuit
+breakers, rate limiters and kept-alive HTTP connections) and, for Ollama,
+the model, which is loaded and pinned at start and released at exit.
+
+What has been processed is recorded in ``.docalypt-watch.json`` in the
+output directory, by content hash, so restarts and touched-but-unchanged
+files do not trigger new work. Failures are recorded too: an unchanged
+transcript that failed is retried only a few times, with growing delays.
+Replacing a transcript removes the chapters and documentation of its
+previous version.
+"""
+
+from __future__ import annotations
+
+import ctypes
+import ctypes.util
+import hashlib
+import json
+import logging
+import os
+import queue
+import select
+import struct
+import sys
+import threading
+import time
+from dataclasses import dataclass, field, replace
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Dict, List
+
+from .cancellation import CancellationToken
+from .config import AppConfig, load_config
+from .documentation import DOCUMENTATION_SUBDIR, DocumentGenerationRequest, generate_documentation
+from .llm import (
+    PINNED_KEEP_ALIVE,
+    LLMError,
+    LLMSettings,
+    close_idle_connections,
+    release_model,
+    warm_up_model,
+)
+from .splitting import TranscriptSplitter
+from .tracing import get_tracer
+
+if TYPE_CHECKING:  # pragma: no cover - annotations only
+    from .search import SearchIndex
+
+# Seconds a file's size and modification time must stay unchanged before it
+# is processed, so transcripts that are still being written are not split.
+DEBOUNCE = 2.0
+POLL_INTERVAL = 1.0
+# Shortest wait between passes of the watch loop, so a zero debounce or poll
+# interval does not spin.
+MIN_WAIT = 0.05
+QUEUE_SIZE = 8
+STATE_FILENAME = ".docalypt-watch.json"
+# A failed transcript left unchanged is retried after RETRY_DELAY seconds,
+# doubling each time, at most MAX_RETRIES times; changing the file starts over.
+RETRY_DELAY = 60.0
+MAX_RETRIES = 3
+_STATE_VERSION = 1
+# Files still being downloaded or edited under a temporary name.
+_PARTIAL_SUFFIXES = (".part", ".partial", ".crdownload", ".download", ".tmp", ".swp")
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(slots=True)
+class WatchJob:
+    path: Path
+    size: int
+    mtime_ns: int
+
+
+@dataclass(slots=True)
+class WatchResult:
+    """Outcome of one processed transcript."""
+
+    path: Path
+    output_dir: Path | None = None
+    chapters: int = 0
+    documented: int = 0
+    failures: List[tuple[Path, str]] = field(default_factory=list)
+    error: str | None = None
+    # The content matched what was processed before; nothing was done.
+    unchanged: bool = False
+    elapsed: float = 0.0
+
+    @property
+    def success(self) -> bool:
+        return self.error is None and not self.failures
+
+
+@dataclass(slots=True)
+class _Pending:
+    size: int
+    mtime_ns: int
+    changed_at: float
+
+
+class TranscriptWatcher:
+    """Long-running split (and document) loop over an input directory."""
+
+    def __init__(
+        self,
+        input_dir: Path,
+        output_dir: Path | None = None,
+        settings: LLMSettings | None = None,
+        workers: int = 1,
+        queue_size: int = QUEUE_SIZE,
+        debounce: float = DEBOUNCE,
+        poll_interval: float = POLL_INTERVAL,
+        marker_regex: str | None = None,
+        auto_chapters: bool = False,
+        search_index: SearchIndex | None = None,
+        use_inotify: bool = True,
+        on_result: Callable[[WatchResult], None] | None = None,
+        request_options: Dict[str, object] | None = None,
+    ) -> None:
+        self.input_dir = Path(input_dir).expanduser().resolve()
+        self.config: AppConfig = load_config()
+        self.output_dir = Path(output_dir or self.config.output_dir).expanduser().resolve()
+        # ``None`` only splits.
+        self.settings = settings
+        self.workers = max(1, workers)
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self.marker_regex = marker_regex
+        self.auto_chapters = auto_chapters
+        self.search_index = search_index
+        self.use_inotify = use_inotify
+        self.on_result = on_result
+        # Extra DocumentGenerationRequest fields (pack_small_chapters, hedge, ...).
+        self.request_options = dict(request_options or {})
+        self.state_path = self.output_dir / STATE_FILENAME
+        self._jobs: queue.Queue[WatchJob | None] = queue.Queue(maxsize=max(1, queue_size))
+        self._state: Dict[str, Dict[str, object]] = self._load_state()
+        self._lock = threading.Lock()
+        self._active: set[Path] = set()
+
+    # Running ------------------------------------------------------------
+    def run(self, cancel: CancellationToken | None = None) -> None:
+        """Watch until ``cancel`` fires; in-flight jobs are cancelled with it."""
+
+        cancel = cancel or CancellationToken()
+        settings = self._warm_up(cancel)
+        threads = [
+            threading.Thread(
+                target=self._work, args=(settings, cancel), name=f"docalypt-watch-{index}"
+            )
+            for index in range(self.workers)
+        ]
+        for thread in threads:
+            thread.start()
+        logger.info("Watching %s → %s", self.input_dir, self.output_dir)
+        try:
+            self._watch(cancel)
+        finally:
+            if not cancel.cancelled:
+                cancel.cancel("Watcher stopped")
+            for _ in threads:
+                self._jobs.put(None)
+            for thread in threads:
+                thread.join()
+            if settings is not self.settings and self.settings is not None:
+                try:
+                    release_model(self.settings)
+                except LLMError as exc:
+                    logger.warning("Failed to release model: %s", exc)
+            close_idle_connections()
+
+    def _warm_up(self, cancel: CancellationToken) -> LLMSettings | None:
+        """Load and pin a local model once for the whole watch session."""
+
+        settings = self.settings
+        if settings is None or not settings.resolved_provider().capabilities.model_residency:
+            return settings
+        try:
+            warm_up_model(settings, cancel=cancel)
+        except LLMError as exc:
+            logger.warning("Model warm-up failed: %s", exc)
+            return settings
+        return replace(settings, keep_alive=PINNED_KEEP_ALIVE)
+
+    def _watch(self, cancel: CancellationToken) -> None:
+        pending: Dict[Path, _Pending] = {}
+        inotify = self._open_inotify()
+        try:
+            self._rescan(pending)
+            while not cancel.cancelled:
+                if inotify is None:
+                    cancel.wait(max(MIN_WAIT, self.poll_interval))
+                    self._rescan(pending)
+                else:
+                    names, overflowed = inotify.read(
+                        max(MIN_WAIT, min(self.poll_interval, self.debounce / 2))
+                    )
+                    if overflowed:
+                        self._rescan(pending)
+                    for name in names:
+                        self._touch(pending, self.input_dir / name)
+                    # inotify reports changes only; retries of unchanged
+                    # transcripts are due by the clock.
+                    self._touch_due_retries(pending)
+                self._promote(pending, cancel)
+        finally:
+            if inotify is not None:
+                inotify.close()
+
+    def _open_inotify(self) -> _Inotify | None:
+        if not self.use_inotify:
+            return None
+        try:
+            return _Inotify(self.input_dir)
+        except OSError as exc:
+            logger.info("inotify unavailable (%s); polling every %.1fs", exc, self.poll_interval)
+            return None
+
+    # Change detection ---------------------------------------------------
+    def _is_transcript(self, path: Path) -> bool:
+        """Any visible file; captions are told apart from Markdown by the splitter."""
+
+        name = path.name
+        return not (
+            name.startswith(".") or name.endswith("~") or name.lower().endswith(_PARTIAL_SUFFIXES)
+        )
+
+    def _rescan(self, pending: Dict[Path, _Pending]) -> None:
+        try:
+            entries = list(os.scandir(self.input_dir))
+        except OSError as exc:
+            logger.warning("Cannot list %s: %s", self.input_dir, exc)
+            return
+        for entry in entries:
+            if entry.is_file() and self._is_transcript(Path(entry.name)):
+                self._touch(pending, Path(entry.path))
+
+    def _touch(self, pending: Dict[Path, _Pending], path: Path) -> None:
+        """Note ``path`` as possibly new or changed."""
+
+        if path in pending or not self._is_transcript(path):
+            return
+        try:
+            stat = path.stat()
+        except OSError:
+            return
+        with self._lock:
+            known = self._state.get(path.name)
+            busy = path in self._active
+        if (
+            known
+            and known.get("size") == stat.st_size
+            and known.get("mtime_ns") == stat.st_mtime_ns
+            # A retry in progress has not updated the state yet.
+            and (busy or not _retry_due(known))
+        ):
+            return
+        pending[path] = _Pending(stat.st_size, stat.st_mtime_ns, time.monotonic())
+
+    def _touch_due_retries(self, pending: Dict[Path, _Pending]) -> None:
+        with self._lock:
+            due = [name for name, entry in self._state.items() if _retry_due(entry)]
+        for name in due:
+            self._touch(pending, self.input_dir / name)
+
+    def _promote(self, pending: Dict[Path, _Pending], cancel: CancellationToken) -> None:
+        """Queue the pending files that have stopped changing."""
+
+        now = time.monotonic()
+        for path, seen in list(pending.items()):
+            try:
+                stat = path.stat()
+            except OSError:
+                del pending[path]
+                continue
+            if (stat.st_size, stat.st_mtime_ns) != (seen.size, seen.mtime_ns):
+                pending[path] = _Pending(stat.st_size, stat.st_mtime_ns, now)
+                continue
+            with self._lock:
+                busy = path in self._active
+            if busy or now - seen.changed_at < self.debounce:
+                continue
+            del pending[path]
+            with self._lock:
+                self._active.add(path)
+            job = WatchJob(path, stat.st_size, stat.st_mtime_ns)
+            # A full queue holds the watcher back until a worker is free.
+            while not cancel.cancelled:
+                try:
+                    self._jobs.put(job, timeout=0.2)
+                    break
+                except queue.Full:
+                    continue
+
+    # Processing ---------------------------------------------------------
+    def _work(self, settings: LLMSettings | None, cancel: CancellationToken) -> None:
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                return
+            try:
+                if cancel.cancelled:
+                    continue
+                try:
+                    result = self.process(job, settings, cancel)
+                except Exception as exc:
+                    # A worker that dies shrinks the pool for good; record
+                    # the failure like any other and carry on.
+                    logger.exception("Failed to process %s", job.path.name)
+                    result = WatchResult(path=job.path, error=str(exc) or type(exc).__name__)
+                    if not cancel.cancelled:
+                        self._remember_failure(job, result.error)
+                if self.on_result is not None:
+                    try:
+                        self.on_result(result)
+                    except Exception:
+                        logger.exception("Result callback failed for %s", job.path.name)
+            finally:
+                with self._lock:
+                    self._active.discard(job.path)
+
+    def process(
+        self,
+        job: WatchJob,
+        settings: LLMSettings | None = None,
+        cancel: CancellationToken | None = None,
+    ) -> WatchResult:
+        """Split (and document) one transcript unless its content is unchanged."""
+
+        with get_tracer().span("watch", transcript=job.path.name) as span:
+            result = self._process(job, settings, cancel)
+            span.set(
+                unchanged=result.unchanged,
+                chapters=result.chapters,
+                documented=result.documented,
+            )
+            if result.error:
+                span.record_error(result.error)
+            return result
+
+    def _process(
+        self,
+        job: WatchJob,
+        settings: LLMSettings | None,
+        cancel: CancellationToken | None,
+    ) -> WatchResult:
+        started = time.perf_counter()
+        result = WatchResult(path=job.path)
+        try:
+            digest = _file_digest(job.path)
+        except OSError as exc:
+            result.error = str(exc)
+            return result
+        with self._lock:
+            previous = dict(self._state.get(job.path.name) or {})
+        if previous.get("sha256") == digest and not previous.get("error"):
+            result.unchanged = True
+            self._remember(job, digest, previous.get("chapters", []))
+            return result
+
+        output_dir = self.output_dir / job.path.stem
+        result.output_dir = output_dir
+        self._remove_chapters(output_dir, previous.get("chapters", []))
+        chapters: list[Path] = []
+        splitter = TranscriptSplitter(
+            input_path=job.path,
+            output_dir=output_dir,
+            marker_regex=self.marker_regex,
+            post_split_hooks=[chapters.append],
+            search_index=self.search_index,
+            auto_chapters=self.auto_chapters,
+            config=self.config,
+        )
+        try:
+            result.chapters = splitter.split()
+        except Exception as exc:
+            result.error = str(exc)
+            logger.error("Failed to split %s: %s", job.path.name, exc)
+            self._remember(job, digest, [path.name for path in chapters], error=result.error)
+            return result
+
+        if settings is not None and chapters:
+            run = generate_documentation(
+                DocumentGenerationRequest(
+                    chapters=chapters,
+                    settings=settings,
+                    warm_up=False,
+                    cancel_token=cancel,
+                    search_index=self.search_index,
+                    **self.request_options,
+                )
+            )
+            result.documented = len(run.written)
+            result.failures = list(run.failures)
+            if run.cancelled:
+                result.error = "Cancelled"
+        result.elapsed = time.perf_counter() - started
+        names = [path.name for path in chapters]
+        if result.success:
+            self._remember(job, digest, names)
+        elif not (cancel is not None and cancel.cancelled):
+            # Interrupted transcripts stay as they were, so the next start
+            # retries them; failed ones wait for their retry or a change.
+            error = result.error or f"{len(result.failures)} chapter(s) could not be documented"
+            self._remember(job, digest, names, error=error)
+        return result
+
+    def _remove_chapters(self, output_dir: Path, names: List[str]) -> None:
+        """Delete the chapters (and their documentation) of a transcript's previous version."""
+
+        docs_dir = output_dir / str(
+            self.request_options.get("destination_dirname", DOCUMENTATION_SUBDIR)
+        )
+        for name in names:
+            chapter = output_dir / name
+            for path in (chapter, docs_dir / f"{chapter.stem}.docs.md"):
+                try:
+                    path.unlink()
+                except FileNotFoundError:
+                    continue
+                except OSError as exc:
+                    logger.warning("Cannot remove outdated file %s: %s", path, exc)
+                    continue
+                if self.search_index is not None:
+                    self.search_index.remove(path)
+
+    # State --------------------------------------------------------------
+    def _remember(
+        self, job: WatchJob, digest: str, chapters: List[str], error: str | None = None
+    ) -> None:
+        with self._lock:
+            previous = self._state.get(job.path.name) or {}
+            entry: Dict[str, object] = {
+                "size": job.size,
+                "mtime_ns": job.mtime_ns,
+                "sha256": digest,
+                "chapters": chapters,
+            }
+            if error is not None:
+                attempts = 1
+                if previous.get("error") and previous.get("sha256") == digest:
+                    attempts += int(previous.get("attempts") or 1)
+                entry.update(error=error, attempts=attempts, retry_at=None)
+                if attempts <= MAX_RETRIES:
+                    delay = RETRY_DELAY * 2 ** (attempts - 1)
+                    entry["retry_at"] = time.time() + delay
+                    logger.info("Retrying %s in %.0fs unless it changes", job.path.name, delay)
+                else:
+                    logger.warning(
+                        "Giving up on %s after %d attempts until it changes",
+                        job.path.name,
+                        attempts,
+                    )
+            self._state[job.path.name] = entry
+            payload = {"version": _STATE_VERSION, "transcripts": self._state}
+            temporary = self.state_path.with_name(f"{self.state_path.name}.{os.getpid()}.tmp")
+            try:
+                self.output_dir.mkdir(parents=True, exist_ok=True)
+                temporary.write_text(json.dumps(payload, indent=1), encoding="utf-8")
+                os.replace(temporary, self.state_path)
+            except OSError as exc:
+                logger.warning("Cannot write watch state %s: %s", self.state_path, exc)
+
+    def _remember_failure(self, job: WatchJob, error: str) -> None:
+        """Record an unexpected failure so the transcript is retried like a failed split."""
+
+        try:
+            digest = _file_digest(job.path)
+        except OSError:
+            digest = ""
+        with self._lock:
+            chapters = list((self._state.get(job.path.name) or {}).get("chapters", []))
+        self._remember(job, digest, chapters, error=error)
+
+    def _load_state(self) -> Dict[str, Dict[str, object]]:
+        try:
+            data = json.loads(self.state_path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as exc:
+            logger.warning("Ignoring unreadable watch state %s: %s", self.state_path, exc)
+            return {}
+        if not isinstance(data, dict) or data.get("version") != _STATE_VERSION:
+            return {}
+        transcripts = data.get("transcripts", {})
+        return {
+            name: entry
+            for name, entry in transcripts.items()
+            if isinstance(entry, dict)
+        }
+
+
+def _retry_due(entry: Dict[str, object]) -> bool:
+    """Whether a failed transcript left unchanged should be tried again now."""
+
+    retry_at = entry.get("retry_at")
+    if not entry.get("error") or not isinstance(retry_at, (int, float)):
+        return False
+    return time.time() >= retry_at
+
+
+def _file_digest(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as handle:
+        for block in iter(lambda: handle.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+# inotify ---------------------------------------------------------------------
+_IN_MODIFY = 0x00000002
+_IN_ATTRIB = 0x00000004
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_Q_OVERFLOW = 0x00004000
+_EVENT = struct.Struct("iIII")
+
+
+class _Inotify:
+    """Minimal inotify reader for one directory, through libc (Linux only)."""
+
+    def __init__(self, directory: Path) -> None:
+        if not sys.platform.startswith("linux"):
+            raise OSError("not supported on this platform")
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or None, use_errno=True)
+        if not hasattr(libc, "inotify_init1"):
+            raise OSError("libc has no inotify")
+        self._fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            error = ctypes.get_errno()
+            raise OSError(error, os.strerror(error))
+        mask = _IN_MODIFY | _IN_ATTRIB | _IN_CLOSE_WRITE | _IN_MOVED_TO | _IN_CREATE
+        if libc.inotify_add_watch(self._fd, os.fsencode(directory), mask) < 0:
+            error = ctypes.get_errno()
+            os.close(self._fd)
+            raise OSError(error, os.strerror(error))
+
+    def read(self, timeout: float) -> tuple[list[str], bool]:
+        """Names changed within ``timeout`` seconds, and whether events were lost."""
+
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        if not ready:
+            return [], False
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return [], False
+        names: list[str] = []
+        overflowed = False
+        offset = 0
+        while offset + _EVENT.size <= len(data):
+            _, mask, _, length = _EVENT.unpack_from(data, offset)
+            offset += _EVENT.size
+            name = data[offset : offset + length].rstrip(b"\0")
+            offset += length
+            if mask & _IN_Q_OVERFLOW:
+                overflowed = True
+            if name:
+                names.append(os.fsdecode(name))
+        return names, overflowed
+
+    def close(self) -> None:
+        os.close(self._fd)
+
+
+__all__ = [
+    "DEBOUNCE",
+    "MAX_RETRIES",
+    "RETRY_DELAY",
+    "STATE_FILENAME",
+    "TranscriptWatcher",
+    "WatchJob",
+    "WatchResult",
+]
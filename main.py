@@ -4,8 +4,10 @@ from __future__ import annotations
 
 from docalypt.env import load_env
 from docalypt.gui.main_window import run
+from docalypt.tracing import tracing_from_env
 
 
 if __name__ == "__main__":
     load_env()
+    tracing_from_env()
     run()
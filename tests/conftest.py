@@ -0,0 +1,35 @@
+"""Shared fixtures."""
+
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+from typing import Callable, Iterator, List
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from docalypt.testing import FakeLLMConfig, FakeLLMServer, LatencyProfile  # noqa: E402
+
+
+@pytest.fixture
+def fake_llm() -> Iterator[Callable[..., FakeLLMServer]]:
+    """Start fake LLM servers (fast by default); all are stopped afterwards."""
+
+    servers: List[FakeLLMServer] = []
+
+    def start(**options) -> FakeLLMServer:
+        options.setdefault("time_to_first_token", LatencyProfile(median=0.005, spread=0.0))
+        options.setdefault("tokens_per_second", 5000.0)
+        options.setdefault("output_tokens", 20)
+        options.setdefault("seed", 7)
+        server = FakeLLMServer(FakeLLMConfig(**options)).start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.stop()
@@ -0,0 +1,36 @@
+"""Helpers shared by the tests."""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import List
+
+from docalypt.llm import COALESCE_OFF, LLMSettings
+from docalypt.testing import FakeLLMServer
+
+
+def fake_settings(server: FakeLLMServer, **overrides) -> LLMSettings:
+    """Settings for the OpenAI-compatible API of ``server``."""
+
+    options = dict(
+        provider="openai",
+        model="fake-llama",
+        endpoint=server.url,
+        api_key="fake",
+        coalesce=COALESCE_OFF,
+    )
+    options.update(overrides)
+    return LLMSettings(**options)
+
+
+def write_chapters(directory: Path, count: int, words: int = 40) -> List[Path]:
+    """Write ``count`` small chapter files and return their paths."""
+
+    directory.mkdir(parents=True, exist_ok=True)
+    chapters = []
+    for index in range(1, count + 1):
+        path = directory / f"{index:02d}_chapter_{index}.md"
+        body = " ".join(f"word{index}_{position}" for position in range(words))
+        path.write_text(f"# Chapter {index}\n\n{body}\n", encoding="utf-8")
+        chapters.append(path)
+    return chapters
@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+import threading
+import time
+
+import pytest
+
+from docalypt import catalog
+from docalypt.catalog import CatalogEntry, ModelCatalog, catalog_key
+from docalypt.llm import LLMError, LLMSettings, ModelInfo
+
+SETTINGS = LLMSettings(provider="openai", model="", endpoint="http://catalog.test", api_key="key")
+
+
+@pytest.fixture
+def listings(monkeypatch):
+    """Answer model listings from a list of name lists (or errors), counting calls."""
+
+    script: list[object] = []
+    calls: list[str] = []
+
+    def list_model_info(settings):
+        calls.append(settings.resolved_endpoint())
+        step = script.pop(0) if script else ["fresh"]
+        if isinstance(step, Exception):
+            raise step
+        return [ModelInfo(name=name) for name in step]
+
+    monkeypatch.setattr(catalog, "list_model_info", list_model_info)
+    return script, calls
+
+
+def age(cache: ModelCatalog, seconds: float) -> None:
+    entry = cache.cached(SETTINGS)
+    entry.fetched_at = time.time() - seconds
+
+
+def test_fresh_entries_are_served_from_the_cache(tmp_path, listings):
+    script, calls = listings
+    script.append(["llama3"])
+    cache = ModelCatalog(tmp_path / "models.json", ttl=60)
+    assert cache.get(SETTINGS).names == ["llama3"]
+    assert cache.get(SETTINGS).names == ["llama3"]
+    assert len(calls) == 1
+    # Another process sees the same catalogue without asking the provider.
+    assert ModelCatalog(tmp_path / "models.json").get(SETTINGS).names == ["llama3"]
+    assert len(calls) == 1
+
+
+def test_stale_entries_are_served_while_revalidating(listings):
+    script, calls = listings
+    script.extend([["old"], ["new"]])
+    cache = ModelCatalog(None, ttl=60)
+    cache.get(SETTINGS)
+    age(cache, 120)
+    updated = threading.Event()
+    updates: list[CatalogEntry] = []
+
+    def on_update(entry):
+        updates.append(entry)
+        updated.set()
+
+    assert cache.get(SETTINGS, on_update=on_update).names == ["old"]
+    assert updated.wait(5)
+    assert updates[0].names == ["new"]
+    assert cache.cached(SETTINGS).names == ["new"]
+    assert len(calls) == 2
+
+
+def test_one_revalidation_per_catalogue(monkeypatch):
+    calls: list[str] = []
+    release = threading.Event()
+
+    def slow(settings):
+        calls.append(settings.resolved_endpoint())
+        release.wait(5)
+        return [ModelInfo(name="new")]
+
+    monkeypatch.setattr(catalog, "list_model_info", slow)
+    cache = ModelCatalog(None)
+    try:
+        assert cache.revalidate(SETTINGS)
+        assert not cache.revalidate(SETTINGS)
+    finally:
+        release.set()
+        cache.wait(5)
+    assert len(calls) == 1
+    assert cache.revalidate(SETTINGS)
+    cache.wait(5)
+
+
+def test_failed_revalidation_keeps_the_stale_entry(listings):
+    script, calls = listings
+    script.extend([["old"], LLMError("offline")])
+    cache = ModelCatalog(None, ttl=60)
+    cache.get(SETTINGS)
+    age(cache, 120)
+    assert cache.get(SETTINGS).names == ["old"]
+    cache.wait(5)
+    assert cache.cached(SETTINGS).names == ["old"]
+
+
+def test_entries_past_max_stale_are_fetched_again(listings):
+    script, calls = listings
+    script.extend([["old"], ["new"]])
+    cache = ModelCatalog(None, ttl=60, max_stale=600)
+    cache.get(SETTINGS)
+    age(cache, 1200)
+    assert cache.cached(SETTINGS) is None
+    assert cache.get(SETTINGS).names == ["new"]
+    assert len(calls) == 2
+
+
+def test_catalogues_are_kept_per_endpoint(listings):
+    script, calls = listings
+    script.extend([["a"], ["b"]])
+    other = LLMSettings(provider="openai", endpoint="http://other.test/", api_key="key")
+    cache = ModelCatalog(None)
+    assert cache.get(SETTINGS).names == ["a"]
+    assert cache.get(other).names == ["b"]
+    assert catalog_key(other) == "openai http://other.test"
+    cache.invalidate(SETTINGS)
+    assert cache.cached(SETTINGS) is None
+    assert cache.cached(other).names == ["b"]
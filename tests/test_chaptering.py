@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+import random
+from collections import Counter
+
+import pytest
+
+from docalypt import chaptering
+from docalypt.chaptering import detect_chapters
+
+TOPICS = [
+    "soldering iron flux solder joint pads heat wick".split(),
+    "battery lithium charge voltage cells capacity discharge".split(),
+    "antenna radio frequency signal wavelength dipole impedance".split(),
+]
+
+
+def lecture(minutes_per_topic: int = 10, seed: int = 1) -> list[tuple[int, str]]:
+    """One snippet every 20 seconds, changing topic every ``minutes_per_topic``."""
+
+    rng = random.Random(seed)
+    per_topic = minutes_per_topic * 3
+    return [
+        (20 * number, " ".join(rng.choices(TOPICS[number // per_topic], k=8)))
+        for number in range(per_topic * len(TOPICS))
+    ]
+
+
+def random_units(count: int, seed: int = 3) -> tuple[list[Counter], dict[str, int]]:
+    rng = random.Random(seed)
+    terms = [f"term{number}" for number in range(60)]
+    units = [Counter(rng.choices(terms, k=rng.randint(0, 8))) for _ in range(count)]
+    return units, {term: column for column, term in enumerate(terms[:50])}
+
+
+@pytest.mark.parametrize("count", [2, 5, 40, 123])
+@pytest.mark.parametrize("block", [2, 6])
+def test_batched_numpy_scores_match_pure_python(monkeypatch, count, block):
+    pytest.importorskip("numpy")
+    units, vocabulary = random_units(count)
+    monkeypatch.setattr(chaptering, "GAP_BATCH", 7)
+    batched = chaptering._gap_similarities_numpy(units, vocabulary, block)
+    monkeypatch.setattr(chaptering, "np", None)
+    expected = chaptering._gap_similarities(units, vocabulary, block)
+    assert batched == pytest.approx(expected, abs=1e-6)
+
+
+@pytest.mark.parametrize("numpy", [True, False])
+def test_chapters_start_where_the_topic_changes(monkeypatch, numpy):
+    if numpy:
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setattr(chaptering, "np", None)
+    chapters = detect_chapters(lecture())
+    assert [chapter.timestamp for chapter in chapters] == [0, 600, 1200]
+    for chapter, topic in zip(chapters, TOPICS):
+        assert {word.lower() for word in chapter.title.split(", ")} <= set(topic)
+
+
+def test_chapter_limits_are_respected():
+    assert len(detect_chapters(lecture(), max_chapters=2)) == 2
+    chapters = detect_chapters(lecture(), min_chapter_seconds=900)
+    starts = [chapter.timestamp for chapter in chapters]
+    assert all(later - earlier >= 900 for earlier, later in zip(starts, starts[1:]))
+
+
+def test_short_transcripts_are_one_chapter():
+    assert detect_chapters([]) == []
+    chapters = detect_chapters([(5, "battery voltage"), (25, "battery charge")])
+    assert [chapter.timestamp for chapter in chapters] == [5]
+    assert chapters[0].title.startswith("Battery")
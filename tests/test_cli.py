@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+import pytest
+from click.testing import CliRunner
+
+import cli
+from docalypt import catalog
+from docalypt.llm import LLMError
+
+
+@pytest.fixture
+def requested(monkeypatch):
+    """Settings each ``models`` call asks the catalogue for."""
+
+    seen = []
+
+    class Catalog:
+        def get(self, settings, refresh=False):
+            seen.append(settings)
+            raise LLMError("offline")
+
+    monkeypatch.setattr(catalog, "default_catalog", Catalog)
+    monkeypatch.setattr(cli, "load_env", lambda: None)
+    for name in ("DOCALYPT_LLM_ENDPOINT", "ANTHROPIC_API_KEY", "DOCALYPT_LLM_FALLBACKS"):
+        monkeypatch.delenv(name, raising=False)
+    monkeypatch.setenv("DOCALYPT_LLM_PROVIDER", "openai")
+    monkeypatch.setenv("DOCALYPT_LLM_MODEL", "gpt-4o-mini")
+    monkeypatch.setenv("DOCALYPT_OPENAI_API_KEY", "sk-openai")
+    return seen
+
+
+def test_models_provider_override_drops_the_configured_key(requested, monkeypatch):
+    monkeypatch.delenv("DOCALYPT_ANTHROPIC_API_KEY", raising=False)
+    CliRunner().invoke(cli.cli, ["models", "--provider", "anthropic"])
+    (settings,) = requested
+    assert settings.provider == "anthropic"
+    assert settings.model == ""
+    assert settings.resolved_api_key() is None
+
+    monkeypatch.setenv("DOCALYPT_ANTHROPIC_API_KEY", "sk-anthropic")
+    CliRunner().invoke(cli.cli, ["models", "--provider", "anthropic"])
+    assert requested[-1].resolved_api_key() == "sk-anthropic"
+
+
+def test_models_endpoint_override_keeps_the_provider(requested):
+    CliRunner().invoke(cli.cli, ["models", "--endpoint", "http://proxy"])
+    (settings,) = requested
+    assert (settings.provider, settings.endpoint) == ("openai", "http://proxy")
+    assert settings.resolved_api_key() == "sk-openai"
+
+
+def test_split_reads_unknown_extensions_as_markdown(tmp_path, monkeypatch):
+    monkeypatch.setattr(cli, "load_env", lambda: None)
+    transcript = tmp_path / "talk.txt"
+    transcript.write_text(
+        "# Talk\n\n00:00:00 - Intro\n00:00:10 - End\n\nTranscript:\n"
+        "(00:00) Welcome to the talk.\n(00:10) Thanks for watching.\n",
+        encoding="utf-8",
+    )
+    result = CliRunner().invoke(
+        cli.cli, ["split", str(transcript), "-o", str(tmp_path / "out"), "--no-index"]
+    )
+    assert result.exit_code == 0, result.output
+    assert len(list((tmp_path / "out").glob("*.md"))) == 2
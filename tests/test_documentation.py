@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+import threading
+import time
+
+import pytest
+
+from docalypt.cancellation import CancellationToken
+from docalypt.documentation import (
+    DocumentGenerationRequest,
+    generate_documentation,
+    iter_documentation,
+)
+
+from helpers import fake_settings, write_chapters
+
+
+def run_with_timeout(request: DocumentGenerationRequest, timeout: float = 30.0):
+    """Run ``request`` in a thread so a hang fails the test instead of the suite."""
+
+    outcome: dict[str, object] = {}
+
+    def target() -> None:
+        try:
+            outcome["run"] = generate_documentation(request)
+        except BaseException as exc:  # noqa: BLE001 - handed to the test
+            outcome["error"] = exc
+
+    thread = threading.Thread(target=target, daemon=True)
+    thread.start()
+    thread.join(timeout)
+    assert not thread.is_alive(), "documentation run hung"
+    if "error" in outcome:
+        raise outcome["error"]  # type: ignore[misc]
+    return outcome["run"]
+
+
+@pytest.mark.parametrize("workers", [1, 4])
+def test_undecodable_chapter_in_a_pack_fails_alone(tmp_path, fake_llm, workers):
+    server = fake_llm()
+    chapters = write_chapters(tmp_path, 4, words=10)
+    chapters[1].write_bytes("# Caf\xe9\n\nr\xe9sum\xe9 of the chapter\n".encode("latin-1"))
+    run = run_with_timeout(
+        DocumentGenerationRequest(
+            chapters=chapters,
+            settings=fake_settings(server),
+            warm_up=False,
+            max_workers=workers,
+            pack_small_chapters=True,
+        )
+    )
+    assert [chapter for chapter, _ in run.failures] == [chapters[1]]
+    assert "utf-8" in run.failures[0][1]
+    assert sorted(chapter for chapter, _ in run.written) == [
+        chapters[0],
+        chapters[2],
+        chapters[3],
+    ]
+
+
+def test_worker_exception_reaches_the_caller(tmp_path, fake_llm):
+    server = fake_llm()
+    chapters = write_chapters(tmp_path, 4, words=10)
+
+    def before_write(chapter):
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError, match="boom"):
+        run_with_timeout(
+            DocumentGenerationRequest(
+                chapters=chapters,
+                settings=fake_settings(server),
+                warm_up=False,
+                max_workers=4,
+                pack_small_chapters=True,
+                before_write=before_write,
+            )
+        )
+
+
+class SlowChapters(list):
+    """A sized chapter source that hands out its chapters slowly."""
+
+    def __iter__(self):
+        for chapter in super().__iter__():
+            time.sleep(0.05)
+            yield chapter
+
+
+@pytest.mark.parametrize("source", [SlowChapters, lambda chapters: iter(SlowChapters(chapters))])
+def test_cancelled_run_reports_every_chapter(tmp_path, fake_llm, source):
+    server = fake_llm()
+    chapters = write_chapters(tmp_path, 12, words=10)
+    cancel = CancellationToken()
+    run = iter_documentation(
+        DocumentGenerationRequest(
+            chapters=source(chapters),
+            settings=fake_settings(server),
+            warm_up=False,
+            max_workers=4,
+            cancel_token=cancel,
+        )
+    )
+    next(run)
+    cancel.cancel("Stopped by test")
+    seen = 1 + sum(1 for _ in run)
+    result = run.result
+    assert seen == 12
+    assert result.cancelled
+    assert result.skipped
+    assert len(result.written) + len(result.failures) + len(result.skipped) == 12
+
+
+def test_run_with_a_deadline_releases_the_callers_token(tmp_path, fake_llm):
+    server = fake_llm()
+    cancel = CancellationToken()
+    before = set(threading.enumerate())
+    result = generate_documentation(
+        DocumentGenerationRequest(
+            chapters=write_chapters(tmp_path, 3, words=10),
+            settings=fake_settings(server),
+            warm_up=False,
+            cancel_token=cancel,
+            deadline=600,
+        )
+    )
+    assert len(result.written) == 3
+    assert not result.cancelled
+    # Nothing of the finished run stays registered on the long-lived token...
+    assert cancel._callbacks == {}
+    # ...and its deadline timer is gone.
+    time.sleep(0.05)
+    assert not [
+        thread
+        for thread in set(threading.enumerate()) - before
+        if isinstance(thread, threading.Timer)
+    ]
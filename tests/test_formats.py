@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import io
+
+import pytest
+
+from docalypt import formats
+from docalypt.formats import (
+    coalesce,
+    read_json,
+    read_records,
+    read_srt,
+    read_vtt,
+    reader_for,
+    register_format,
+    supported_suffixes,
+)
+
+SRT = """1
+00:00:01,000 --> 00:00:03,500
+<i>Hello</i> and welcome.
+
+2
+00:01:05,200 --> 00:01:07,000
+Second cue,
+on two lines.
+"""
+
+VTT = """WEBVTT
+
+00:00:00.000 --> 00:00:02.000
+first line
+
+00:00:02.000 --> 00:00:04.000
+first line
+second line
+
+1:00:04.000 --> 1:00:06.000
+<c.colorE5E5E5>third</c> line
+"""
+
+
+def test_srt_cues_become_records():
+    assert list(read_srt(io.StringIO(SRT))) == [
+        (1, "Hello and welcome."),
+        (65, "Second cue, on two lines."),
+    ]
+
+
+def test_rolling_vtt_lines_are_not_repeated():
+    assert list(read_vtt(io.StringIO(VTT))) == [
+        (0, "first line"),
+        (2, "second line"),
+        (3604, "third line"),
+    ]
+
+
+def test_json3_and_plain_json_captions():
+    json3 = '{"wireMagic": "pb3", "events": [{"tStartMs": 1500, "segs": [{"utf8": "Hi "}, {"utf8": "there"}]}, {"tStartMs": 2000}]}'
+    assert list(read_json(io.StringIO(json3))) == [(1, "Hi there")]
+    plain = '[{"start": 3.2, "text": "one"}, {"start": 9, "text": " two "}]'
+    assert list(read_json(io.StringIO(plain))) == [(3, "one"), (9, "two")]
+
+
+def test_json_captions_are_read_in_chunks(monkeypatch):
+    monkeypatch.setattr(formats, "_CHUNK_SIZE", 7)
+    items = ", ".join(f'{{"start": {number}, "text": "cue {number}"}}' for number in range(50))
+    records = list(read_json(io.StringIO(f"[{items}]")))
+    assert records[0] == (0, "cue 0") and records[-1] == (49, "cue 49")
+    assert len(records) == 50
+
+
+@pytest.mark.parametrize("document", ['{"other": []}', "[{"])
+def test_malformed_json_captions_raise(document):
+    with pytest.raises(ValueError):
+        list(read_json(io.StringIO(document)))
+
+
+def test_short_records_are_coalesced():
+    records = [(0, "a"), (5, "b"), (19, "c"), (20, "d"), (45, "e")]
+    assert list(coalesce(records, seconds=20)) == [(0, "a b c"), (20, "d"), (45, "e")]
+
+
+def test_readers_are_chosen_by_suffix(tmp_path, monkeypatch):
+    monkeypatch.setattr(formats, "_READERS", dict(formats._READERS))
+    assert reader_for(tmp_path / "talk.SRT") is read_srt
+    assert reader_for(tmp_path / "talk.md") is None
+
+    def read_tsv(handle):
+        for line in handle:
+            seconds, text = line.rstrip("\n").split("\t")
+            yield int(seconds), text
+
+    register_format(".tsv", read_tsv)
+    assert ".tsv" in supported_suffixes()
+    path = tmp_path / "talk.tsv"
+    path.write_text("0\tone\n30\ttwo\n", encoding="utf-8")
+    assert list(read_records(path, reader_for(path))) == [(0, "one"), (30, "two")]
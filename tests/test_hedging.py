@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+import time
+
+import pytest
+
+from docalypt.cancellation import CancellationToken
+from docalypt.hedging import HedgedClient
+from docalypt.llm import GenerationResult, LLMError, LLMSettings
+
+
+class StubClient:
+    provider = "openai"
+
+    def __init__(self, text: str | None, delay: float = 0.0) -> None:
+        self.settings = LLMSettings(provider="openai", model="stub")
+        self.text = text
+        self.delay = delay
+        self.cancelled: list[bool] = []
+
+    def generate(self, prompt, max_tokens=None, cancel=None, on_first_token=None):
+        cancel.wait(self.delay)
+        self.cancelled.append(cancel.cancelled)
+        if self.text is None:
+            raise LLMError("failed")
+        return GenerationResult(text=self.text, provider=self.provider)
+
+
+def registered(token: CancellationToken) -> int:
+    return len(token._callbacks)
+
+
+@pytest.mark.parametrize(
+    ("primary", "backup", "expected"),
+    [
+        (StubClient("primary"), StubClient("backup"), "primary"),
+        (StubClient("primary", delay=1.0), StubClient("backup"), "backup"),
+    ],
+)
+def test_finished_requests_leave_no_callbacks_on_the_run_token(primary, backup, expected):
+    client = HedgedClient(primary, [backup], initial_delay=0.05)
+    run = CancellationToken()
+    for _ in range(5):
+        assert client.generate("prompt", cancel=run).text == expected
+    time.sleep(0.1)
+    assert registered(run) == 0
+    assert not run.cancelled
+
+
+def test_failed_requests_leave_no_callbacks_on_the_run_token():
+    client = HedgedClient(StubClient(None, delay=0.1), [StubClient(None)], initial_delay=0.01)
+    run = CancellationToken()
+    with pytest.raises(LLMError):
+        client.generate("prompt", cancel=run)
+    time.sleep(0.2)
+    assert registered(run) == 0
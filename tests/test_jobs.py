@@ -0,0 +1,157 @@
+from __future__ import annotations
+
+import http.client
+import json
+import subprocess
+import sys
+
+import pytest
+
+from docalypt.cancellation import CancellationToken
+from docalypt.jobs import (
+    DOCUMENTED,
+    FAILED,
+    KIND_DOCS,
+    KIND_SPLIT,
+    MAX_ATTEMPTS,
+    QUEUED,
+    RUNNING,
+    SUCCEEDED,
+    JobStore,
+    run_job,
+    worker_name,
+)
+from docalypt.service import MAX_BODY, JobService
+
+from helpers import write_chapters
+
+
+def make_store(tmp_path) -> JobStore:
+    return JobStore(tmp_path / "jobs.sqlite3")
+
+
+def queue_transcript(store: JobStore, tmp_path):
+    transcript = tmp_path / "talk.md"
+    transcript.write_text("# Talk\n", encoding="utf-8")
+    return store.submit(KIND_SPLIT, transcript)
+
+
+def test_job_that_keeps_killing_its_worker_is_failed(tmp_path):
+    with make_store(tmp_path) as store:
+        job = queue_transcript(store, tmp_path)
+        for attempt in range(1, MAX_ATTEMPTS):
+            assert store.claim("worker").attempts == attempt
+            # The worker died; the supervisor puts its job back.
+            assert store.requeue(worker="worker") == 1
+        assert store.claim("worker").attempts == MAX_ATTEMPTS
+        assert store.requeue(worker="worker") == 0
+        failed = store.get(job.id)
+        assert failed.state == FAILED
+        assert f"{MAX_ATTEMPTS} attempts" in failed.error
+        assert store.claim("worker") is None
+
+
+def test_transcripts_of_any_extension_are_accepted(tmp_path):
+    with make_store(tmp_path) as store:
+        transcript = tmp_path / "talk.txt"
+        transcript.write_text("# Talk\n", encoding="utf-8")
+        assert store.submit(KIND_SPLIT, transcript).state == QUEUED
+
+
+def test_stopping_a_worker_does_not_use_up_an_attempt(tmp_path):
+    with make_store(tmp_path) as store:
+        job = queue_transcript(store, tmp_path)
+        for _ in range(MAX_ATTEMPTS + 1):
+            assert store.claim("worker").state == RUNNING
+            store.requeue(job.id, stopped=True)
+        requeued = store.get(job.id)
+        assert requeued.state == QUEUED
+        assert requeued.attempts == 0
+
+
+def test_only_jobs_of_dead_workers_on_this_host_are_requeued(tmp_path):
+    process = subprocess.Popen([sys.executable, "-c", "pass"])
+    process.wait()
+    dead = worker_name(process.pid)
+    with make_store(tmp_path) as store:
+        jobs = {}
+        for worker in (worker_name(), dead, "elsewhere:1"):
+            queue_transcript(store, tmp_path)
+            jobs[worker] = store.claim(worker).id
+        assert store.requeue_orphans() == 1
+        states = {worker: store.get(job_id).state for worker, job_id in jobs.items()}
+        assert states == {worker_name(): RUNNING, dead: QUEUED, "elsewhere:1": RUNNING}
+
+
+def test_service_leaves_other_services_jobs_alone(tmp_path):
+    path = tmp_path / "jobs.sqlite3"
+    with JobStore(path) as store:
+        job = queue_transcript(store, tmp_path)
+        # Another live service's worker (this test process) is running it.
+        store.claim(worker_name())
+    with JobService(path, port=0):
+        pass
+    with JobStore(path) as store:
+        running = store.get(job.id)
+        assert running.state == RUNNING
+        assert running.attempts == 1
+
+
+def test_resumed_job_only_documents_what_is_left(tmp_path, monkeypatch, fake_llm):
+    server = fake_llm()
+    monkeypatch.setenv("DOCALYPT_LLM_PROVIDER", "openai")
+    monkeypatch.setenv("DOCALYPT_LLM_MODEL", "fake-llama")
+    monkeypatch.setenv("DOCALYPT_LLM_ENDPOINT", server.url)
+    monkeypatch.setenv("DOCALYPT_OPENAI_API_KEY", "fake")
+    monkeypatch.setenv("DOCALYPT_LLM_COALESCE", "off")
+    chapters = write_chapters(tmp_path / "chapters", 3)
+    docs = tmp_path / "chapters" / "documentation" / f"{chapters[0].stem}.docs.md"
+    docs.parent.mkdir()
+    docs.write_text("done", encoding="utf-8")
+
+    with make_store(tmp_path) as store:
+        job = store.submit(KIND_DOCS, tmp_path / "chapters", options={"index": False})
+        # An earlier attempt split the job and documented the first chapter.
+        store.claim("worker")
+        store.record_split(job.id, chapters)
+        store.record_chapter(job.id, chapters[0], DOCUMENTED, docs)
+        store.requeue(job.id, stopped=True)
+
+        resumed = store.claim("worker")
+        assert resumed.split_done
+        assert run_job(store, resumed, CancellationToken()) == SUCCEEDED
+        finished = store.get(job.id)
+        assert finished.metrics["resumed"] is True
+        assert finished.metrics["reused"] == 1
+        assert finished.metrics["documented"] == 3
+        assert finished.chapters == {DOCUMENTED: 3}
+        assert server.stats.requests == 2
+        assert docs.read_text(encoding="utf-8") == "done"
+
+
+def test_oversized_body_closes_the_connection(tmp_path):
+    with JobService(tmp_path / "jobs.sqlite3", port=0) as service:
+        host, port = service._httpd.server_address[:2]
+        connection = http.client.HTTPConnection(host, port, timeout=10)
+        connection.putrequest("POST", "/jobs")
+        connection.putheader("Content-Length", str(MAX_BODY + 1))
+        connection.endheaders()
+        response = connection.getresponse()
+        assert response.status == 413
+        assert response.getheader("Connection") == "close"
+        assert "too large" in json.loads(response.read())["error"]
+        connection.close()
+
+
+@pytest.mark.parametrize("length", ["abc", "-5", "1e3"])
+def test_invalid_content_length_is_rejected(tmp_path, length):
+    with JobService(tmp_path / "jobs.sqlite3", port=0) as service:
+        host, port = service._httpd.server_address[:2]
+        connection = http.client.HTTPConnection(host, port, timeout=10)
+        connection.putrequest("POST", "/jobs")
+        connection.putheader("Content-Length", length)
+        connection.endheaders()
+        response = connection.getresponse()
+        assert response.status == 400
+        assert "Content-Length" in json.loads(response.read())["error"]
+        connection.close()
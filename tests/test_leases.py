@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+import threading
+import time
+
+from docalypt.cancellation import CancellationToken
+from docalypt.leases import LEASE_DIRNAME, LeaseManager
+
+
+def node(owner: str, **options) -> LeaseManager:
+    options.setdefault("poll_interval", 0.05)
+    return LeaseManager(owner=owner, **options)
+
+
+def chapter_files(tmp_path, count: int = 1):
+    paths = []
+    for number in range(count):
+        path = tmp_path / f"{number:02d}.md"
+        path.write_text("chapter", encoding="utf-8")
+        paths.append(path)
+    return paths
+
+
+def document(chapter) -> None:
+    docs = chapter.parent / "documentation" / f"{chapter.stem}.docs.md"
+    docs.parent.mkdir(exist_ok=True)
+    docs.write_text("docs", encoding="utf-8")
+
+
+def test_only_one_node_wins_a_chapter(tmp_path):
+    [chapter] = chapter_files(tmp_path)
+    first, second = node("a"), node("b")
+    try:
+        assert first.acquire(chapter) is not None
+        assert second.acquire(chapter) is None
+        assert first.holds(chapter)
+        assert not second.holds(chapter)
+    finally:
+        first.close()
+        second.close()
+    assert list((tmp_path / LEASE_DIRNAME).iterdir()) == []
+
+
+def test_expired_lease_is_taken_over_and_fences_the_old_holder(tmp_path):
+    [chapter] = chapter_files(tmp_path)
+    # The first node stops renewing its lease, as if it hung.
+    stalled = node("a", heartbeat_interval=60)
+    rescuer = node("b", ttl=0.2, heartbeat_interval=0.05)
+    try:
+        lease = stalled.acquire(chapter)
+        assert lease.generation == 1
+        assert rescuer.acquire(chapter) is None  # starts watching the lease
+        time.sleep(0.3)
+        takeover = rescuer.acquire(chapter)
+        assert takeover is not None and takeover.generation == 2
+        # The old holder must not write its result any more.
+        assert not stalled.holds(chapter)
+        assert rescuer.holds(chapter)
+        stalled.release(chapter)
+        assert takeover.path.exists()
+    finally:
+        stalled.close()
+        rescuer.close()
+
+
+def test_renewed_lease_does_not_expire(tmp_path):
+    [chapter] = chapter_files(tmp_path)
+    holder = node("a", heartbeat_interval=0.05)
+    waiter = node("b", ttl=0.2)
+    try:
+        holder.acquire(chapter)
+        for _ in range(6):
+            assert waiter.acquire(chapter) is None
+            time.sleep(0.1)
+        assert holder.holds(chapter)
+    finally:
+        holder.close()
+        waiter.close()
+
+
+def test_failed_chapter_is_picked_up_by_another_node(tmp_path):
+    chapters = chapter_files(tmp_path, 3)
+    first, second = node("a"), node("b")
+    cancel = CancellationToken()
+    claimed: list = []
+    try:
+        mine = first.claim(chapters, cancel)
+        assert next(mine) == chapters[0]
+
+        def claim_rest() -> None:
+            for chapter in second.claim(chapters, cancel):
+                claimed.append(chapter)
+                document(chapter)
+                second.release(chapter)
+
+        thread = threading.Thread(target=claim_rest)
+        thread.start()
+        time.sleep(0.2)
+        assert claimed == chapters[1:]
+        # The first node gives up on its chapter without documenting it.
+        first.release(chapters[0])
+        thread.join(5)
+        assert not thread.is_alive()
+        assert claimed == chapters[1:] + chapters[:1]
+        assert list(mine) == []
+    finally:
+        cancel.cancel()
+        first.close()
+        second.close()
+
+
+def test_documented_chapters_are_never_claimed(tmp_path):
+    chapters = chapter_files(tmp_path, 2)
+    document(chapters[0])
+    manager = node("a")
+    try:
+        assert list(manager.claim(chapters)) == [chapters[1]]
+        assert manager.acquire(chapters[0]) is None
+    finally:
+        manager.close()
@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+from urllib.request import Request
+
+import pytest
+
+from docalypt import llm
+from docalypt.cancellation import CancellationToken
+from docalypt.documentation import DocumentGenerationRequest, generate_documentation
+from docalypt.llm import MAX_AUTO_CONTEXT_WINDOW, LLMSettings, resolve_context_window
+
+from helpers import fake_settings
+
+
+def ollama_settings(server, **overrides) -> LLMSettings:
+    return LLMSettings(provider="ollama", model="fake-llama", endpoint=server.url, **overrides)
+
+
+def test_context_window_comes_from_the_models_num_ctx(fake_llm, monkeypatch):
+    monkeypatch.setenv("OLLAMA_CONTEXT_LENGTH", "2048")
+    server = fake_llm(num_ctx=16384, context_length=131072)
+    assert resolve_context_window(ollama_settings(server)).context_window == 16384
+
+
+def test_context_window_falls_back_to_the_server_setting(fake_llm, monkeypatch):
+    monkeypatch.setenv("OLLAMA_CONTEXT_LENGTH", "32768")
+    server = fake_llm(context_length=131072)
+    assert resolve_context_window(ollama_settings(server)).context_window == 32768
+
+
+@pytest.mark.parametrize(
+    ("context_length", "expected"),
+    [(131072, MAX_AUTO_CONTEXT_WINDOW), (2048, 2048)],
+)
+def test_context_window_is_capped_trained_length(fake_llm, monkeypatch, context_length, expected):
+    monkeypatch.delenv("OLLAMA_CONTEXT_LENGTH", raising=False)
+    server = fake_llm(context_length=context_length)
+    assert resolve_context_window(ollama_settings(server)).context_window == expected
+
+
+def test_configured_context_window_is_kept(fake_llm):
+    server = fake_llm(num_ctx=16384)
+    settings = ollama_settings(server, context_window=4096)
+    assert resolve_context_window(settings) is settings
+
+
+def test_unknown_model_keeps_the_provider_default(fake_llm):
+    server = fake_llm()
+    settings = LLMSettings(provider="ollama", model="missing", endpoint=server.url)
+    assert resolve_context_window(settings).context_window is None
+
+
+def test_chunked_chapter_is_marked_in_its_documentation(tmp_path, fake_llm):
+    server = fake_llm()
+    chapter = tmp_path / "long.md"
+    paragraphs = [" ".join(f"word{p}_{w}" for w in range(120)) for p in range(20)]
+    chapter.write_text("\n\n".join(paragraphs), encoding="utf-8")
+    run = generate_documentation(
+        DocumentGenerationRequest(
+            chapters=[chapter],
+            settings=fake_settings(server, context_window=2048),
+            warm_up=False,
+        )
+    )
+    [(_, destination)] = run.written
+    docs = destination.read_text(encoding="utf-8")
+    assert docs.startswith("<!-- Documented in ")
+    assert "2048-token context window" in docs
+
+
+def pooled_connections() -> list:
+    return [connection for idle in llm._POOL._idle.values() for _, connection in idle]
+
+
+def test_cancel_after_a_request_does_not_abort_its_pooled_connection(fake_llm, monkeypatch):
+    server = fake_llm()
+    llm.close_idle_connections()
+    cancel = CancellationToken()
+    release = llm._release
+
+    def release_then_cancel(response, reusable):
+        release(response, reusable)
+        # The run is cancelled just as the connection went back to the pool.
+        cancel.cancel()
+
+    monkeypatch.setattr(llm, "_release", release_then_cancel)
+    with pytest.raises(llm.LLMCancelled):
+        with llm._open(Request(f"{server.url}/api/tags"), 5, cancel) as response:
+            response.read()
+    monkeypatch.setattr(llm, "_release", release)
+    [connection] = pooled_connections()
+    with llm._open(Request(f"{server.url}/api/tags"), 5) as response:
+        response.read()
+    assert pooled_connections() == [connection]
+    llm.close_idle_connections()
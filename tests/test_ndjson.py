@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+import io
+import json
+
+import pytest
+
+from docalypt import ndjson
+from docalypt.ndjson import iter_ndjson
+
+FRAMES = [
+    {"response": "Hel", "done": False},
+    {"response": "lo – “wörld”", "done": False},
+    {"response": "", "done": True, "eval_count": 3},
+]
+PAYLOAD = b"".join(json.dumps(frame, ensure_ascii=False).encode("utf-8") + b"\n" for frame in FRAMES)
+
+
+class Trickle(io.RawIOBase):
+    """A stream whose reads return at most ``size`` bytes, like a slow socket."""
+
+    def __init__(self, data: bytes, size: int) -> None:
+        self.data = data
+        self.size = size
+
+    def readable(self) -> bool:
+        return True
+
+    def read1(self, limit: int = -1) -> bytes:
+        count = self.size if limit < 0 else min(self.size, limit)
+        chunk, self.data = self.data[:count], self.data[count:]
+        return chunk
+
+    read = read1
+
+
+@pytest.fixture(params=["json", "orjson"])
+def backend(request, monkeypatch):
+    if request.param == "orjson":
+        pytest.importorskip("orjson")
+    else:
+        monkeypatch.setattr(ndjson, "orjson", None)
+    return request.param
+
+
+@pytest.mark.parametrize("size", [1, 2, 7, 30, len(PAYLOAD)])
+def test_frames_split_across_reads(backend, size):
+    # Small reads split frames, and multi-byte characters, between blocks.
+    assert list(iter_ndjson(Trickle(PAYLOAD, size))) == FRAMES
+
+
+def test_small_block_size_limits_reads(backend):
+    assert list(iter_ndjson(io.BytesIO(PAYLOAD), block_size=5)) == FRAMES
+
+
+def test_last_frame_without_newline(backend):
+    assert list(iter_ndjson(io.BytesIO(PAYLOAD.rstrip(b"\n")))) == FRAMES
+
+
+def test_blank_lines_are_skipped(backend):
+    stream = io.BytesIO(b'\r\n{"a": 1}\r\n\n  \n{"b": 2}\n')
+    assert list(iter_ndjson(stream, block_size=4)) == [{"a": 1}, {"b": 2}]
+
+
+def test_malformed_frames_raise(backend):
+    with pytest.raises(json.JSONDecodeError):
+        list(iter_ndjson(io.BytesIO(b'{"a": 1}\n{"b": \n')))
@@ -0,0 +1,17 @@
+from __future__ import annotations
+
+import importlib
+import sys
+
+import pytest
+
+from docalypt import llm
+
+
+def test_legacy_module_warns_and_re_exports_llm():
+    sys.modules.pop("docalypt.ollama", None)
+    with pytest.warns(DeprecationWarning, match="docalypt.llm"):
+        ollama = importlib.import_module("docalypt.ollama")
+    assert ollama.PROMPT_TEMPLATE is llm.PROMPT_TEMPLATE
+    assert ollama.OllamaError is llm.LLMError
+    assert ollama.build_prompt("Intro", "Hello") == llm.build_prompt("Intro", "Hello").text
@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+from docalypt.packing import (
+    ChapterPack,
+    build_packed_content,
+    pack_chapters,
+    packed_instructions,
+    parse_packed_response,
+)
+
+
+def chapter(directory, name: str, size: int):
+    path = directory / name
+    path.write_text("x" * size, encoding="utf-8")
+    return path
+
+
+def sizes(units) -> list[int]:
+    return [len(unit) if isinstance(unit, ChapterPack) else 1 for unit in units]
+
+
+def test_adjacent_small_chapters_are_packed(tmp_path):
+    intro = chapter(tmp_path, "01.md", 100)
+    sponsor = chapter(tmp_path, "02.md", 200)
+    main = chapter(tmp_path, "03.md", 8000)
+    outro = chapter(tmp_path, "04.md", 100)
+    units = list(pack_chapters([intro, sponsor, main, outro]))
+    # A lone small chapter stays a plain path.
+    assert units == [ChapterPack((intro, sponsor)), main, outro]
+
+
+def test_packs_respect_budget_and_size(tmp_path):
+    chapters = [chapter(tmp_path, f"{number:02d}.md", 400) for number in range(7)]
+    # 100 tokens each: two fit a 250-token budget, a third does not.
+    assert sizes(pack_chapters(chapters, budget_tokens=250, max_size=8)) == [2, 2, 2, 1]
+    assert sizes(pack_chapters(chapters, budget_tokens=1000, max_size=3)) == [3, 3, 1]
+
+
+def test_packing_is_lazy(tmp_path):
+    small = chapter(tmp_path, "01.md", 100)
+    large = chapter(tmp_path, "02.md", 8000)
+
+    def source():
+        yield small
+        yield large
+        raise AssertionError("read past the chapter that was needed")
+
+    units = pack_chapters(source())
+    assert next(units) == small
+    assert next(units) == large
+
+
+def test_packed_response_round_trips():
+    names = ["01.md", "02.md"]
+    content = build_packed_content([(name, f"text of {name}") for name in names])
+    assert "<!-- chapter: 01.md -->\ntext of 01.md" in content
+    assert "`<!-- chapter: 01.md -->`" in packed_instructions(names)
+    response = "```markdown\n<!-- chapter: 01.md -->\n# Intro\n\n<!-- chapter: `02.md` -->\n# Sponsor\n```"
+    assert parse_packed_response(response, names) == {"01.md": "# Intro", "02.md": "# Sponsor"}
+
+
+def test_incomplete_packed_response_is_rejected():
+    names = ["01.md", "02.md"]
+    assert parse_packed_response("<!-- chapter: 01.md -->\n# Intro", names) is None
+    assert (
+        parse_packed_response("<!-- chapter: 01.md -->\n# A\n<!-- chapter: 01.md -->\n# B", names)
+        is None
+    )
+    assert (
+        parse_packed_response("<!-- chapter: 01.md -->\n\n<!-- chapter: 02.md -->\n# B", names)
+        is None
+    )
@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+import threading
+from pathlib import Path
+
+import pytest
+
+from docalypt.pipeline import ChapterQueue
+
+
+def produce(chapters: ChapterQueue, count: int) -> threading.Thread:
+    def run() -> None:
+        for index in range(count):
+            chapters.put(Path(f"{index:02d}.md"))
+        chapters.close()
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    return thread
+
+
+def test_chapters_are_yielded_in_order_until_closed():
+    chapters = ChapterQueue(maxsize=2)
+    producer = produce(chapters, 10)
+    assert [path.name for path in chapters] == [f"{index:02d}.md" for index in range(10)]
+    producer.join(5)
+    # Later iterations end at once instead of waiting for more chapters.
+    assert list(chapters) == []
+    with pytest.raises(ValueError):
+        chapters.put(Path("late.md"))
+
+
+def test_full_queue_holds_the_producer_back():
+    chapters = ChapterQueue(maxsize=2)
+    producer = produce(chapters, 10)
+    producer.join(0.2)
+    assert producer.is_alive()
+    iterator = iter(chapters)
+    next(iterator)
+    chapters.drain()
+    producer.join(5)
+    assert not producer.is_alive()
+
+
+def test_drained_queue_never_blocks_the_producer():
+    chapters = ChapterQueue(maxsize=1)
+    chapters.drain()
+    producer = produce(chapters, 10)
+    producer.join(5)
+    assert not producer.is_alive()
+    assert list(chapters) == []
+
+
+def test_failed_documentation_worker_reports_and_drains(monkeypatch, tmp_path):
+    pytest.importorskip("PySide6")
+    from docalypt.documentation import DocumentGenerationRequest
+    from docalypt.gui import common
+    from docalypt.llm import LLMSettings
+
+    def broken(request):
+        raise RuntimeError("index is locked")
+
+    monkeypatch.setattr(common, "iter_documentation", broken)
+    chapters = ChapterQueue(maxsize=1)
+    worker = common.DocumentationWorker(
+        DocumentGenerationRequest(chapters=chapters, settings=LLMSettings(model="m"))
+    )
+    errors: list[str] = []
+    worker.error.connect(errors.append)
+    producer = produce(chapters, 10)
+    worker.run()
+    producer.join(5)
+    assert errors == ["index is locked"]
+    assert not producer.is_alive()
@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+import importlib.metadata
+import time
+
+import pytest
+
+from docalypt import providers
+from docalypt.llm import COALESCE_OFF, LLMError, LLMSettings, ModelInfo, create_client, list_model_info
+from docalypt.providers import (
+    Provider,
+    ProviderCapabilities,
+    RateLimiter,
+    available_providers,
+    get_provider,
+    rate_limiter,
+    register_provider,
+)
+
+
+class EchoClient:
+    def __init__(self, settings: LLMSettings) -> None:
+        self.settings = settings
+
+
+ECHO = Provider(
+    name="echo",
+    label="Echo",
+    client=EchoClient,
+    default_endpoint="http://echo.test",
+    capabilities=ProviderCapabilities(
+        max_concurrency=8, requests_per_minute=600, context_window=32_000
+    ),
+    endpoint_env=("ECHO_ENDPOINT",),
+    api_key_env=("ECHO_API_KEY",),
+    requires_api_key=True,
+    list_models=lambda settings: [ModelInfo(name="echo-1")],
+)
+
+
+@pytest.fixture(autouse=True)
+def registry(monkeypatch):
+    """Keep registrations made by a test out of the others."""
+
+    monkeypatch.setattr(providers, "_PROVIDERS", dict(providers._PROVIDERS))
+    monkeypatch.setattr(providers, "_LIMITERS", {})
+
+
+def test_builtin_providers_come_first():
+    names = [provider.name for provider in available_providers()]
+    assert names[:3] == ["ollama", "openai", "anthropic"]
+    assert get_provider(None).name == "ollama"
+    assert get_provider(" OpenAI ").name == "openai"
+
+
+def test_unknown_providers_are_rejected():
+    with pytest.raises(LLMError, match="Unsupported provider"):
+        get_provider("nope")
+    with pytest.raises(LLMError):
+        LLMSettings(provider="nope").resolved_endpoint()
+
+
+def test_registered_provider_drives_settings(monkeypatch):
+    register_provider(ECHO)
+    monkeypatch.setenv("ECHO_ENDPOINT", "http://from-env.test")
+    monkeypatch.setenv("ECHO_API_KEY", "secret")
+    settings = LLMSettings(provider="Echo", model="echo-1", coalesce=COALESCE_OFF)
+    assert settings.normalized_provider() == "echo"
+    assert settings.resolved_endpoint() == "http://from-env.test"
+    assert settings.resolved_api_key() == "secret"
+    assert settings.resolved_context_window() == 32_000
+    assert isinstance(create_client(settings), EchoClient)
+    assert [model.name for model in list_model_info(settings)] == ["echo-1"]
+    explicit = LLMSettings(provider="echo", endpoint="http://explicit.test", api_key="mine")
+    assert explicit.resolved_endpoint() == "http://explicit.test"
+    assert explicit.resolved_api_key() == "mine"
+
+
+def test_names_are_not_silently_replaced():
+    register_provider(ECHO)
+    with pytest.raises(ValueError, match="already registered"):
+        register_provider(ECHO)
+    register_provider(Provider("echo", "Echo 2", EchoClient, "http://echo-2.test"), replace=True)
+    assert get_provider("echo").label == "Echo 2"
+
+
+def test_providers_without_listing_report_no_models():
+    settings = LLMSettings(provider="anthropic", api_key="key")
+    assert list_model_info(settings) == []
+
+
+def test_plugins_are_loaded_from_entry_points(monkeypatch, caplog):
+    class EntryPoint:
+        def __init__(self, name, target):
+            self.name = name
+            self.target = target
+
+        def load(self):
+            if isinstance(self.target, Exception):
+                raise self.target
+            return self.target
+
+    plugins = [
+        EntryPoint("echo", lambda: ECHO),
+        EntryPoint("broken", ImportError("missing dependency")),
+    ]
+    monkeypatch.setattr(
+        importlib.metadata,
+        "entry_points",
+        lambda group: plugins if group == providers.ENTRY_POINT_GROUP else [],
+    )
+    monkeypatch.setattr(providers, "_entry_points_loaded", False)
+    assert get_provider("echo") is ECHO
+    assert "Cannot load LLM provider 'broken'" in caplog.text
+    assert [provider.name for provider in available_providers()][-1] == "echo"
+
+
+def test_rate_limits_follow_capabilities():
+    register_provider(ECHO)
+    assert rate_limiter(LLMSettings(provider="ollama")) is None
+    limiter = rate_limiter(LLMSettings(provider="echo"))
+    assert limiter is rate_limiter(LLMSettings(provider="echo"))
+    assert limiter is not rate_limiter(LLMSettings(provider="echo", endpoint="http://other.test"))
+    assert limiter.interval == pytest.approx(0.1)
+
+
+def test_rate_limiter_spaces_requests():
+    limiter = RateLimiter(requests_per_minute=1200)
+    started = time.monotonic()
+    for _ in range(4):
+        limiter.acquire()
+    assert time.monotonic() - started >= 0.14
@@ -0,0 +1,165 @@
+from __future__ import annotations
+
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from docalypt import documentation, llm
+from docalypt.documentation import DocumentGenerationRequest, generate_documentation
+from docalypt.llm import COALESCE_OFF, GenerationResult, LLMError, LLMRateLimited, LLMSettings
+from docalypt.resilience import CLOSED, OPEN, CircuitBreaker, FailoverClient
+
+from helpers import fake_settings, write_chapters
+
+
+class StubClient:
+    """Answers from a script: an exception to raise or text to return."""
+
+    provider = "openai"
+
+    def __init__(self, *script, endpoint: str = "http://stub") -> None:
+        self.settings = LLMSettings(provider="openai", model="stub", endpoint=endpoint)
+        self.script = list(script)
+        self.calls = 0
+
+    def generate(self, prompt, max_tokens=None, cancel=None, on_first_token=None):
+        self.calls += 1
+        step = self.script.pop(0) if self.script else "ok"
+        if isinstance(step, Exception):
+            raise step
+        return GenerationResult(text=step, provider=self.provider, time_to_first_token=0.01)
+
+
+def test_rate_limiting_does_not_open_the_breaker():
+    breaker = CircuitBreaker(name="stub")
+    client = FailoverClient(
+        [StubClient(*[LLMRateLimited("HTTP Error 429", retry_after=1)] * 5)], [breaker]
+    )
+    for _ in range(5):
+        with pytest.raises(LLMRateLimited):
+            client.generate("prompt")
+    assert breaker.state == CLOSED
+    assert client.generate("prompt").text == "ok"
+
+
+def test_rate_limited_primary_fails_over_to_a_fallback():
+    primary = StubClient(LLMRateLimited("HTTP Error 429"))
+    backup = StubClient("backup", endpoint="http://backup")
+    client = FailoverClient([primary, backup], [CircuitBreaker(), CircuitBreaker()])
+    assert client.generate("prompt").text == "backup"
+    assert len(client.events) == 1
+
+
+def test_single_endpoint_waits_for_the_probe_instead_of_failing():
+    breaker = CircuitBreaker(name="stub", min_requests=1, open_duration=0.2)
+    breaker.record_failure("boom")
+    assert breaker.state == OPEN
+    client = FailoverClient([StubClient("recovered")], [breaker])
+    started = time.perf_counter()
+    assert client.generate("prompt").text == "recovered"
+    assert time.perf_counter() - started >= 0.15
+    assert breaker.state == CLOSED
+
+
+def test_waiters_fail_when_the_probe_fails():
+    breaker = CircuitBreaker(name="stub", min_requests=1, open_duration=0.2)
+    breaker.record_failure("boom")
+    release = threading.Event()
+
+    class SlowFailure(StubClient):
+        def generate(self, *args, **kwargs):
+            release.wait(2)
+            raise LLMError("still down")
+
+    client = FailoverClient([SlowFailure()], [breaker])
+    errors: list[Exception] = []
+
+    def call() -> None:
+        try:
+            client.generate("prompt")
+        except LLMError as exc:
+            errors.append(exc)
+
+    threads = [threading.Thread(target=call) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.4)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    # One caller sent the probe; the others gave up once it failed.
+    assert sorted(type(error).__name__ for error in errors) == [
+        "CircuitOpen",
+        "CircuitOpen",
+        "LLMError",
+    ]
+
+
+def test_single_endpoint_run_survives_rate_limiting(tmp_path, fake_llm, monkeypatch):
+    monkeypatch.setattr(documentation, "MAX_RETRY_DELAY", 0.01)
+    server = fake_llm(rate_limit_rate=0.3)
+    chapters = write_chapters(tmp_path, 12)
+    run = generate_documentation(
+        DocumentGenerationRequest(
+            chapters=chapters, settings=fake_settings(server), warm_up=False, max_workers=2
+        )
+    )
+    assert server.stats.rate_limited
+    assert len(run.written) == 12
+    assert not run.failures
+
+
+@pytest.mark.parametrize("error", [TimeoutError("timed out"), RuntimeError("bug")])
+def test_unexpected_errors_settle_the_probe(error):
+    breaker = CircuitBreaker(name="stub", min_requests=1, open_duration=0.05)
+    breaker.record_failure("boom")
+    time.sleep(0.1)
+    client = FailoverClient([StubClient(error)], [breaker])
+    with pytest.raises(type(error)):
+        client.generate("prompt")
+    if isinstance(error, OSError):
+        # A transport error is a failed probe: the breaker opens again.
+        assert breaker.state == OPEN
+        time.sleep(0.1)
+    # Either way the next request gets through instead of waiting forever.
+    answers: list[str] = []
+    thread = threading.Thread(
+        target=lambda: answers.append(client.generate("prompt").text), daemon=True
+    )
+    thread.start()
+    thread.join(5)
+    assert answers == ["ok"]
+    assert breaker.state == CLOSED
+
+
+def test_read_timeouts_surface_as_llm_errors(monkeypatch):
+    class Stalling(BaseHTTPRequestHandler):
+        def do_POST(self):
+            self.rfile.read(int(self.headers["Content-Length"]))
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.end_headers()
+            self.wfile.write(b'{"response": "Hel')
+            self.wfile.flush()
+            time.sleep(1)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Stalling)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setattr(llm, "REQUEST_TIMEOUT", 0.2)
+    settings = LLMSettings(
+        provider="ollama",
+        model="stub",
+        endpoint=f"http://127.0.0.1:{server.server_address[1]}",
+        coalesce=COALESCE_OFF,
+    )
+    try:
+        with pytest.raises(LLMError, match="timed out"):
+            llm._OllamaClient(settings).generate("prompt")
+    finally:
+        server.shutdown()
+        server.server_close()
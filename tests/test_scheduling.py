@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+from docalypt.llm import GenerationResult
+from docalypt.scheduling import ChapterScheduler, CostModel
+
+
+def order(scheduler: ChapterScheduler) -> list[str]:
+    names = []
+    while (item := scheduler.pop()) is not None:
+        names.append(item.chapter.name)
+    return names
+
+
+def fill(scheduler: ChapterScheduler) -> None:
+    # A long chapter with the default budget, and a pack of four short
+    # chapters asking for four chapters' worth of output.
+    scheduler.add(0, Path("long.md"), prompt_tokens=2000, max_tokens=800)
+    scheduler.add(1, Path("pack.md"), prompt_tokens=1500, max_tokens=3200)
+    scheduler.add(2, Path("short.md"), prompt_tokens=300, max_tokens=800)
+
+
+def test_longest_prompt_goes_first_by_default():
+    scheduler = ChapterScheduler()
+    fill(scheduler)
+    assert order(scheduler) == ["long.md", "pack.md", "short.md"]
+
+
+def test_observed_timings_change_the_order():
+    scheduler = ChapterScheduler()
+    # The model writes one and a half tokens per prompt token, slowly.
+    scheduler.record(
+        1000,
+        GenerationResult(
+            text="",
+            provider="openai",
+            input_tokens=1000,
+            output_tokens=1500,
+            time_to_first_token=1.0,
+            eval_duration=75.0,
+        ),
+    )
+    fill(scheduler)
+    assert order(scheduler) == ["pack.md", "long.md", "short.md"]
+
+
+def test_output_is_capped_by_each_chapters_budget():
+    model = CostModel(output_ratio=2.0)
+    assert model.estimate(1000, 800) < model.estimate(1000, 1600)
+
+
+def test_input_order_without_longest_first():
+    scheduler = ChapterScheduler(longest_first=False)
+    fill(scheduler)
+    assert order(scheduler) == ["long.md", "pack.md", "short.md"]
+    scheduler.add(5, Path("b.md"), 10)
+    scheduler.add(3, Path("a.md"), 900)
+    assert order(scheduler) == ["a.md", "b.md"]
@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+import os
+
+import pytest
+
+from docalypt.search import SearchIndex, build_match_query
+
+
+@pytest.fixture
+def index(tmp_path):
+    with SearchIndex(tmp_path / "index.sqlite3") as index:
+        yield index
+
+
+@pytest.fixture
+def corpus(tmp_path):
+    root = tmp_path / "talk"
+    (root / "docs").mkdir(parents=True)
+    (root / "01_intro.md").write_text("# Intro\nWelcome to the kubernetes talk.\n", encoding="utf-8")
+    (root / "02_scaling.md").write_text("# Scaling\nAutoscaling pods.\n", encoding="utf-8")
+    (root / "docs" / "02_scaling.docs.md").write_text(
+        "Notes on horizontal autoscaling.\n", encoding="utf-8"
+    )
+    return root
+
+
+def paths(hits) -> list[str]:
+    return sorted(hit.path.name for hit in hits)
+
+
+def test_refresh_indexes_new_files(index, corpus):
+    assert index.refresh(corpus) == 3
+    assert len(index) == 3
+    assert paths(index.search("autoscaling")) == ["02_scaling.docs.md", "02_scaling.md"]
+    docs = index.search("horizontal")[0]
+    # Documentation inherits the metadata of its chapter.
+    assert docs.kind == "docs"
+    assert docs.title == "Scaling"
+
+
+def test_refresh_skips_unchanged_files(index, corpus):
+    index.refresh(corpus)
+    assert index.refresh(corpus) == 0
+
+
+def test_refresh_reindexes_modified_files(index, corpus):
+    index.refresh(corpus)
+    chapter = corpus / "01_intro.md"
+    chapter.write_text("# Intro\nWelcome to the serverless talk.\n", encoding="utf-8")
+    stat = chapter.stat()
+    os.utime(chapter, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert index.refresh(corpus) == 1
+    assert paths(index.search("serverless")) == ["01_intro.md"]
+    assert index.search("kubernetes") == []
+
+
+def test_refresh_drops_deleted_files(index, corpus, tmp_path):
+    other = tmp_path / "talk-2"
+    other.mkdir()
+    (other / "01_intro.md").write_text("Autoscaling again.\n", encoding="utf-8")
+    index.refresh(corpus)
+    index.refresh(other)
+    (corpus / "docs" / "02_scaling.docs.md").unlink()
+    assert index.refresh(corpus) == 0
+    assert len(index) == 3
+    # Files under other roots are left alone.
+    hits = index.search("autoscaling")
+    assert sorted(hit.path.parent.name for hit in hits) == ["talk", "talk-2"]
+    assert index.search("horizontal") == []
+
+
+def test_match_query_quotes_punctuation():
+    assert build_match_query("kube-proxy AND dns*") == '"kube-proxy" AND "dns"*'
+    assert build_match_query("OR") == ""
@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import os
+import threading
+import time
+
+import pytest
+
+from docalypt import singleflight
+from docalypt.llm import GenerationResult, LLMSettings
+from docalypt.singleflight import SingleFlight, SingleFlightClient, request_key
+
+pytestmark = pytest.mark.skipif(singleflight.fcntl is None, reason="needs fcntl")
+
+
+class SlowClient:
+    provider = "openai"
+
+    def __init__(self, delay: float = 0.3) -> None:
+        self.settings = LLMSettings(provider="openai", model="stub", endpoint="http://stub")
+        self.delay = delay
+        self.calls = 0
+
+    def generate(self, prompt, max_tokens=None, cancel=None, on_first_token=None):
+        self.calls += 1
+        time.sleep(self.delay)
+        return GenerationResult(text=f"answer to {prompt}", provider=self.provider)
+
+
+@pytest.mark.parametrize(
+    "change",
+    [
+        {"stream": False},
+        {"keep_alive": "10m"},
+        {"api_key": "other-key"},
+        {"endpoint": "http://other:11434"},
+        {"prompt_caching": False},
+    ],
+)
+def test_request_key_covers_settings_that_change_the_request(change):
+    settings = LLMSettings(provider="ollama", model="llama3", api_key="key")
+    same = LLMSettings(provider="ollama", model="llama3", api_key="key")
+    assert request_key(settings, "prompt") == request_key(same, "prompt")
+    changed = LLMSettings(**{"provider": "ollama", "model": "llama3", "api_key": "key", **change})
+    assert request_key(settings, "prompt") != request_key(changed, "prompt")
+
+
+def test_request_key_does_not_contain_the_api_key():
+    settings = LLMSettings(provider="openai", model="gpt", api_key="secret-key")
+    assert "secret" not in request_key(settings, "prompt")
+
+
+def test_processes_share_a_result_and_remove_it_afterwards(tmp_path):
+    # Separate groups stand in for separate processes.
+    leader = SlowClient()
+    follower = SlowClient()
+    clients = [
+        SingleFlightClient(leader, SingleFlight(), lock_dir=tmp_path),
+        SingleFlightClient(follower, SingleFlight(), lock_dir=tmp_path),
+    ]
+    results: list = [None, None]
+
+    def call(position: int) -> None:
+        results[position] = clients[position].generate("prompt")
+
+    first = threading.Thread(target=call, args=(0,))
+    first.start()
+    time.sleep(0.1)
+    second = threading.Thread(target=call, args=(1,))
+    second.start()
+    first.join(5)
+    second.join(5)
+    assert leader.calls + follower.calls == 1
+    assert [result.text for result in results] == ["answer to prompt"] * 2
+    assert sorted(result.coalesced for result in results) == [False, True]
+
+    deadline = time.monotonic() + 5
+    while list(tmp_path.glob("*.json")) and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert list(tmp_path.glob("*.json")) == []
+
+
+def test_prune_keeps_held_locks(tmp_path):
+    held = tmp_path / "held.lock"
+    idle = tmp_path / "idle.lock"
+    stale = tmp_path / "stale.json"
+    old = time.time() - singleflight.PRUNE_AGE - 60
+    for path in (held, idle, stale):
+        path.write_bytes(b"")
+        os.utime(path, (old, old))
+    with open(held, "a+b") as handle:
+        assert singleflight._try_lock(handle)
+        singleflight._prune(tmp_path)
+        assert held.exists()
+    assert not idle.exists()
+    assert not stale.exists()
+    singleflight._prune(tmp_path)
+    assert not held.exists()
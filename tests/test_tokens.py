@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+from docalypt.tokens import (
+    MAX_ADAPTIVE_OUTPUT_TOKENS,
+    MIN_OUTPUT_TOKENS,
+    SAFETY_MARGIN,
+    TokenEstimator,
+    plan_budget,
+    split_to_budget,
+)
+
+
+def paragraphs(count: int, words: int = 30) -> str:
+    return "\n\n".join(
+        " ".join(f"p{index:02d}w{word:02d}" for word in range(words)) for index in range(count)
+    )
+
+
+def test_split_keeps_paragraphs_whole_and_in_order():
+    estimator = TokenEstimator()
+    text = paragraphs(12)
+    per_paragraph = estimator.estimate(text.split("\n\n")[0], "ollama")
+    chunks = split_to_budget(text, per_paragraph * 3, estimator, "ollama")
+    assert len(chunks) == 4
+    assert all(estimator.estimate(chunk, "ollama") <= per_paragraph * 3 + 1 for chunk in chunks)
+    assert "\n\n".join(chunks) == text
+
+
+def test_split_cuts_oversized_paragraphs():
+    estimator = TokenEstimator()
+    text = "short intro\n\n" + "x" * 4000 + "\n\nshort outro"
+    chunks = split_to_budget(text, 100, estimator, "ollama")
+    assert chunks[0] == "short intro"
+    assert chunks[-1] == "short outro"
+    assert "".join(chunks[1:-1]) == "x" * 4000
+    assert all(estimator.estimate(chunk, "ollama") <= 100 for chunk in chunks)
+
+
+def test_split_of_blank_text_is_empty():
+    assert split_to_budget("\n\n  \n\n", 50, TokenEstimator(), "ollama") == []
+
+
+def test_small_chapters_get_the_configured_budget():
+    budget = plan_budget(500, 400, context_window=8192, max_tokens=512)
+    assert budget.max_tokens == 512
+    assert budget.fits
+
+
+def test_large_chapters_get_a_proportional_budget():
+    budget = plan_budget(1000, 8000, context_window=200_000, max_tokens=512)
+    assert budget.max_tokens == 2000
+    capped = plan_budget(1000, 100_000, context_window=200_000, max_tokens=512)
+    assert capped.max_tokens == MAX_ADAPTIVE_OUTPUT_TOKENS
+    fixed = plan_budget(1000, 8000, context_window=200_000, max_tokens=512, adaptive=False)
+    assert fixed.max_tokens == 512
+
+
+def test_budget_is_limited_by_the_context_window():
+    usable = int(4096 * (1 - SAFETY_MARGIN))
+    budget = plan_budget(usable - 300, 3000, context_window=4096, max_tokens=1024)
+    assert budget.max_tokens == 300
+    assert budget.fits
+    full = plan_budget(usable - 100, 3000, context_window=4096, max_tokens=1024)
+    assert full.max_tokens == 100
+    assert not full.fits
+    assert full.content_capacity == usable - MIN_OUTPUT_TOKENS
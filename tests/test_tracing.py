@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import json
+
+import pytest
+
+from docalypt import tracing
+from docalypt.tracing import configure_tracing, current_span, get_tracer, read_spans, summarize_trace
+
+
+@pytest.fixture
+def traced(tmp_path):
+    def configure(name: str):
+        path = tmp_path / name
+        configure_tracing(path)
+        return path
+
+    yield configure
+    configure_tracing(None)
+
+
+def record_run() -> None:
+    tracer = get_tracer()
+    with tracer.span("documentation", chapters=2):
+        for number in range(2):
+            with tracer.span("chapter", index=number) as chapter:
+                assert current_span() is chapter
+        with pytest.raises(RuntimeError):
+            with tracer.span("chapter", index=2):
+                raise RuntimeError("model went away")
+    with pytest.raises(SystemExit):
+        with tracer.span("run"):
+            raise SystemExit(0)
+
+
+def test_tracing_is_off_by_default():
+    tracer = get_tracer()
+    assert not tracer.enabled
+    with tracer.span("chapter") as span:
+        span.set(index=1)
+    assert current_span() is None
+
+
+@pytest.mark.parametrize("name", ["trace.jsonl", "trace.otlp.jsonl"])
+def test_spans_are_written_and_read_back(traced, name):
+    path = traced(name)
+    record_run()
+    configure_tracing(None)
+    first = json.loads(path.read_text(encoding="utf-8").splitlines()[0])
+    assert ("resourceSpans" in first) == (".otlp." in name)
+
+    spans = list(read_spans(path))
+    assert [span["name"] for span in spans] == ["chapter"] * 3 + ["documentation", "run"]
+    assert spans[0]["attributes"] == {"index": 0}
+    assert spans[2]["error"] == "model went away"
+    assert spans[3]["attributes"]["chapters"] == 2
+    assert spans[4]["error"] is None
+
+
+def test_children_share_their_parents_trace(traced):
+    path = traced("trace.jsonl")
+    record_run()
+    configure_tracing(None)
+    spans = list(read_spans(path))
+    parent = spans[3]
+    for child in spans[:3]:
+        assert child["trace_id"] == parent["trace_id"]
+        assert child["parent_id"] == parent["span_id"]
+    assert spans[4]["parent_id"] is None
+
+
+def test_failed_exit_is_an_error(traced):
+    path = traced("trace.jsonl")
+    with pytest.raises(SystemExit):
+        with get_tracer().span("run"):
+            raise SystemExit(2)
+    configure_tracing(None)
+    assert [span["error"] for span in read_spans(path)] == ["Exited with status 2"]
+
+
+def test_summary_percentiles(tmp_path):
+    path = tmp_path / "trace.jsonl"
+    lines = [json.dumps({"name": "chapter", "duration": float(value)}) for value in range(1, 11)]
+    lines.append(json.dumps({"name": "llm.request", "duration": 0.5, "error": "HTTP 500"}))
+    lines.append('{"name": "chapter", "dura')  # cut short by a crash
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+    chapter, request = summarize_trace(path)
+    assert chapter["name"] == "chapter"
+    assert chapter["count"] == 10 and chapter["errors"] == 0
+    assert chapter["total"] == pytest.approx(55.0)
+    assert chapter["mean"] == pytest.approx(5.5)
+    assert (chapter["p50"], chapter["p90"], chapter["p99"], chapter["max"]) == (5.0, 9.0, 10.0, 10.0)
+    assert request["name"] == "llm.request"
+    assert (request["count"], request["errors"]) == (1, 1)
+
+
+def test_format_is_chosen_by_file_name(traced):
+    traced("trace.otlp.jsonl")
+    assert get_tracer().format == tracing.FORMAT_OTLP
+    traced("trace.jsonl")
+    assert get_tracer().format == tracing.FORMAT_JSONL
+    with pytest.raises(ValueError):
+        configure_tracing(traced.__name__, "xml")
@@ -0,0 +1,168 @@
+from __future__ import annotations
+
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from docalypt import watch
+from docalypt.cancellation import CancellationToken
+from docalypt.watch import TranscriptWatcher, WatchJob
+
+TRANSCRIPT = """# Talk
+
+00:00:00 - Intro
+00:00:10 - Middle
+00:00:20 - End
+
+Transcript:
+(00:00) Welcome to the talk.
+(00:10) The middle part of the talk.
+(00:20) Thanks for watching.
+"""
+
+
+def watch_for(watcher: TranscriptWatcher, seconds: float) -> None:
+    cancel = CancellationToken()
+    thread = threading.Thread(target=watcher.run, args=(cancel,))
+    thread.start()
+    time.sleep(seconds)
+    cancel.cancel()
+    thread.join(10)
+    assert not thread.is_alive()
+
+
+def make_watcher(tmp_path: Path, results: list, **options) -> TranscriptWatcher:
+    options.setdefault("debounce", 0.05)
+    options.setdefault("poll_interval", 0.05)
+    options.setdefault("use_inotify", False)
+    options.setdefault("on_result", results.append)
+    return TranscriptWatcher(tmp_path / "in", output_dir=tmp_path / "out", **options)
+
+
+def inotify_available(tmp_path: Path) -> bool:
+    try:
+        watch._Inotify(tmp_path).close()
+    except OSError:
+        return False
+    return True
+
+
+def job_for(path: Path) -> WatchJob:
+    stat = path.stat()
+    return WatchJob(path, stat.st_size, stat.st_mtime_ns)
+
+
+def test_failed_transcript_is_not_reprocessed_every_poll(tmp_path):
+    (tmp_path / "in").mkdir()
+    (tmp_path / "in" / "broken.md").write_text("no timestamps here\n", encoding="utf-8")
+    results: list = []
+    watch_for(make_watcher(tmp_path, results), 1.0)
+    assert len(results) == 1
+    assert results[0].error
+
+    # The failure survives a restart.
+    results.clear()
+    watch_for(make_watcher(tmp_path, results), 0.5)
+    assert results == []
+
+
+@pytest.mark.parametrize("use_inotify", [False, True])
+def test_failed_transcript_is_retried_with_backoff_then_given_up(
+    tmp_path, monkeypatch, use_inotify
+):
+    if use_inotify and not inotify_available(tmp_path):
+        pytest.skip("inotify is not available")
+    monkeypatch.setattr(watch, "RETRY_DELAY", 0.1)
+    monkeypatch.setattr(watch, "MAX_RETRIES", 2)
+    (tmp_path / "in").mkdir()
+    (tmp_path / "in" / "broken.md").write_text("no timestamps here\n", encoding="utf-8")
+    results: list = []
+    watch_for(make_watcher(tmp_path, results, use_inotify=use_inotify), 1.5)
+    # The first attempt plus two retries.
+    assert len(results) == 3
+
+
+def test_changed_failed_transcript_is_processed_again(tmp_path):
+    (tmp_path / "in").mkdir()
+    source = tmp_path / "in" / "talk.md"
+    source.write_text("no timestamps here\n", encoding="utf-8")
+    results: list = []
+    watcher = make_watcher(tmp_path, results)
+    assert watcher.process(job_for(source)).error
+    source.write_text(TRANSCRIPT, encoding="utf-8")
+    result = watcher.process(job_for(source))
+    assert result.error is None and result.chapters == 3
+
+
+def test_replaced_transcript_removes_old_chapters_and_documentation(tmp_path):
+    (tmp_path / "in").mkdir()
+    source = tmp_path / "in" / "talk.md"
+    source.write_text(TRANSCRIPT, encoding="utf-8")
+    watcher = make_watcher(tmp_path, [])
+    first = watcher.process(job_for(source))
+    chapters = sorted(first.output_dir.glob("*.md"))
+    assert len(chapters) == 3
+    docs_dir = first.output_dir / "documentation"
+    docs_dir.mkdir()
+    docs = [docs_dir / f"{chapter.stem}.docs.md" for chapter in chapters]
+    for path in docs:
+        path.write_text("docs", encoding="utf-8")
+
+    source.write_text(TRANSCRIPT.replace("00:00:20 - End\n", ""), encoding="utf-8")
+    second = watcher.process(job_for(source))
+    assert second.chapters == 2
+    assert len(list(first.output_dir.glob("*.md"))) == 2
+    assert not any(path.exists() for path in docs)
+
+
+def test_any_visible_file_is_a_transcript(tmp_path):
+    watcher = make_watcher(tmp_path, [])
+    assert watcher._is_transcript(Path("talk.txt"))
+    assert watcher._is_transcript(Path("talk"))
+    assert watcher._is_transcript(Path("talk.srt"))
+    for name in (".talk.md", "talk.md~", "talk.srt.part", "talk.vtt.crdownload"):
+        assert not watcher._is_transcript(Path(name))
+
+
+def test_zero_debounce_does_not_spin(tmp_path, monkeypatch):
+    if not inotify_available(tmp_path):
+        pytest.skip("inotify is not available")
+    (tmp_path / "in").mkdir()
+    timeouts: list[float] = []
+    read = watch._Inotify.read
+
+    def recording_read(self, timeout):
+        timeouts.append(timeout)
+        return read(self, timeout)
+
+    monkeypatch.setattr(watch._Inotify, "read", recording_read)
+    watch_for(make_watcher(tmp_path, [], debounce=0, use_inotify=True), 0.3)
+    assert timeouts and min(timeouts) >= watch.MIN_WAIT
+
+
+def test_worker_survives_unexpected_errors(tmp_path, monkeypatch):
+    (tmp_path / "in").mkdir()
+    for name in ("a.md", "b.md", "c.md"):
+        (tmp_path / "in" / name).write_text(TRANSCRIPT, encoding="utf-8")
+    results: list = []
+
+    def on_result(result) -> None:
+        results.append(result)
+        raise RuntimeError("callback bug")
+
+    watcher = make_watcher(tmp_path, results, on_result=on_result)
+    process = watcher.process
+
+    def flaky(job, settings=None, cancel=None):
+        if job.path.name == "b.md":
+            raise RuntimeError("disk on fire")
+        return process(job, settings, cancel)
+
+    monkeypatch.setattr(watcher, "process", flaky)
+    watch_for(watcher, 1.0)
+    # One worker handled all three despite both errors.
+    outcomes = {result.path.name: result.error for result in results}
+    assert outcomes == {"a.md": None, "b.md": "disk on fire", "c.md": None}
+    assert watcher._state["b.md"]["error"] == "disk on fire"